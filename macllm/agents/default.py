@@ -21,6 +21,7 @@ class MacLLMDefaultAgent(MacLLMAgent):
         "read_clipboard",
         *FILESYSTEM_TOOLS,
         "search_notes",
+        "search_conversations",
         "run_command",
         "ask_user",
     ]
@@ -0,0 +1,189 @@
+"""Memory accounting and archival of idle conversations.
+
+Every tab used since startup keeps its log and agent steps in memory.
+:func:`apply_archive_policy` moves conversations back to the state they
+had right after startup: their journal is compacted into one compressed
+snapshot frame, and their log, steps and agent are released.  This
+happens to conversations unused for ``archive_after_days``, and to the
+least recently used ones while the total is above ``memory_budget_mb``.
+An archived conversation stays in the tab list and in the full-text
+index, and :meth:`Conversation.ensure_loaded` reads it back on its next
+activation or query.
+
+The byte counts are estimates: ``sys.getsizeof`` summed over the objects
+reachable from the log and steps, with images counted by their pixel
+buffers.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+import types
+from dataclasses import dataclass
+
+from macllm.core.conversation_log import ConversationLog
+
+DAY = 86_400.0
+
+_OPAQUE = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+@dataclass
+class ConversationMemory:
+    """What one conversation holds in memory."""
+
+    conv_id: str
+    title: str
+    bytes: int
+    materialized: bool
+    last_used: float
+
+
+def deep_sizeof(*roots) -> int:
+    """Estimate the bytes held by *roots* and everything they reference.
+
+    Objects reachable twice are counted once.  Classes, modules and
+    functions are not followed.
+    """
+    seen: set[int] = set()
+    stack = list(roots)
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if obj is None or id(obj) in seen or isinstance(obj, _OPAQUE):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj, 0)
+        if isinstance(obj, (str, bytes, bytearray, int, float, bool)):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif type(obj).__module__.startswith("PIL.") and hasattr(obj, "getbands"):
+            width, height = obj.size
+            total += width * height * len(obj.getbands())
+        else:
+            attributes = getattr(obj, "__dict__", None)
+            if attributes is not None:
+                stack.append(attributes)
+            for slot in getattr(type(obj), "__slots__", ()):
+                stack.append(getattr(obj, slot, None))
+    return total
+
+
+def _steps(conversation) -> list:
+    if conversation.agent is not None:
+        return conversation.agent.memory.steps
+    return getattr(conversation, "_restored_steps", None) or []
+
+
+def conversation_bytes(conversation) -> int:
+    """Estimated bytes held by the log and steps of *conversation*.
+
+    The result is cached until the log or steps change length.
+    """
+    if not conversation.materialized:
+        return 0
+    log, steps = conversation.conversation_log, _steps(conversation)
+    key = (id(log), len(log), id(steps), len(steps))
+    cached = getattr(conversation, "_memory_estimate", None)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    size = deep_sizeof(log, steps)
+    conversation._memory_estimate = (key, size)
+    return size
+
+
+def memory_report(conversation_history) -> list[ConversationMemory]:
+    """Return the memory held by each conversation, in tab order."""
+    return [
+        ConversationMemory(
+            conv_id=conv.conv_id,
+            title=conv.title,
+            bytes=conversation_bytes(conv),
+            materialized=conv.materialized,
+            last_used=conv.last_used,
+        )
+        for conv in list(conversation_history.conversations)
+    ]
+
+
+def _archivable(conversation, active) -> bool:
+    return (
+        conversation.materialized
+        and conversation is not active
+        and not conversation.is_busy()
+        and conversation.pending_approval is None
+        and conversation.pending_user_input is None
+    )
+
+
+def archive_conversation(conversation, store, last_used: float | None = None) -> bool:
+    """Save *conversation*, compact its journal, and release its log, steps and agent.
+
+    Skipped if it was used since *last_used*, or has nothing to persist.
+    """
+    from macllm.core.persistence import flush_conversation
+
+    with conversation._load_lock:
+        # Queries load the conversation and mark it busy under the same
+        # lock, so nothing starts using it between these checks and the
+        # release below.
+        if not conversation.materialized or conversation.is_busy():
+            return False
+        if last_used is not None and conversation.last_used != last_used:
+            return False  # activated since it was picked
+        if not flush_conversation(conversation) or not store.archive(conversation.conv_id):
+            return False
+        conversation.agent = None
+        conversation.current_agent = None
+        conversation._restored_steps = None
+        conversation.conversation_log = ConversationLog()
+        conversation.run_activity.clear()
+        conversation._memory_estimate = None
+        conversation.materialized = False
+    return True
+
+
+def apply_archive_policy(
+    conversation_history,
+    store,
+    archive_after_days: float,
+    memory_budget_mb: float,
+    now: float | None = None,
+) -> list[str]:
+    """Archive idle conversations, then the least recently used ones over budget.
+
+    The active conversation and conversations with a running agent or a
+    pending question are never archived.  ``0`` disables either limit.
+    Returns the ids of the archived conversations.
+    """
+    now = time.time() if now is None else now
+    active = None
+    if 0 <= conversation_history.active_index < len(conversation_history.conversations):
+        active = conversation_history.conversations[conversation_history.active_index]
+    candidates = sorted(
+        (conv for conv in list(conversation_history.conversations) if _archivable(conv, active)),
+        key=lambda conv: conv.last_used,
+    )
+    archived = []
+    if archive_after_days > 0:
+        for conv in list(candidates):
+            idle = now - conv.last_used >= archive_after_days * DAY
+            if idle and archive_conversation(conv, store, conv.last_used):
+                archived.append(conv.conv_id)
+                candidates.remove(conv)
+    if memory_budget_mb > 0:
+        budget = memory_budget_mb * 1024 * 1024
+        total = sum(conversation_bytes(conv) for conv in conversation_history.conversations)
+        for conv in candidates:
+            if total <= budget:
+                break
+            size = conversation_bytes(conv)
+            if archive_conversation(conv, store, conv.last_used):
+                archived.append(conv.conv_id)
+                total -= size
+    return archived
@@ -12,20 +12,13 @@ from macllm.core.context import get_current_conversation
 from macllm.core.virtual_filesystem import create_conversation_root
 from macllm.core.conversation_log import (
     ConversationLog,
-    append_activity_marker,
     append_plan,
     append_run_end,
     append_run_start,
-    add_tool_call as log_add_tool_call,
-    clear_activity_markers,
-    clear_tool_calls as log_clear_tool_calls,
-    complete_last_tool_call as log_complete_last_tool_call,
     message,
     messages_from_log,
-    pop_last_tool_call as log_pop_last_tool_call,
-    record_last_tool_result as log_record_last_tool_result,
-    update_last_tool_message as log_update_last_tool_message,
 )
+from macllm.core.run_activity import RunActivity
 
 
 @dataclass
@@ -46,6 +39,11 @@ class Conversation:
         self.agent_cls = None
         self.ui_update_callback = None
         self.title = "New Agent"
+        # False for a restored conversation whose log and steps are still on disk.
+        self.materialized: bool = True
+        self.last_used: float = time.time()  # wall time of the last load, activation, or query
+        self._load_lock = threading.RLock()  # serializes loading and archiving
+        self._queries_starting = 0  # queries between loading and starting the agent thread
 
         # Per-conversation agent runtime state (transient, not persisted)
         self.agent_thread: threading.Thread | None = None
@@ -67,43 +65,57 @@ class Conversation:
     # ------------------------------------------------------------------
 
     def add_activity_marker(self, kind: str, agent_name: str) -> None:
-        append_activity_marker(self.conversation_log, kind, agent_name)
+        self.run_activity.mark(kind, agent_name, len(self.conversation_log))
         self._notify_ui()
 
     def clear_run_activity(self) -> None:
-        clear_activity_markers(self.conversation_log)
-        log_clear_tool_calls(self.conversation_log)
+        self.run_activity.clear()
 
     def add_tool_call(self, tool_name: str, message: str) -> None:
         """Append a live tool-call entry and repaint the UI."""
-        log_add_tool_call(self.conversation_log, tool_name, message)
+        self.run_activity.add_tool_call(tool_name, message, len(self.conversation_log))
         self._notify_ui()
 
     def update_last_tool_message(self, message: str) -> None:
         """Override the message of the most recent tool-call entry."""
-        log_update_last_tool_message(self.conversation_log, message)
+        self.run_activity.update_last_tool_message(message)
         self._notify_ui()
 
     def complete_last_tool_call(self, *, failed: bool = False) -> None:
         """Compatibility hook for tools that finish a live tool-call entry."""
-        log_complete_last_tool_call(self.conversation_log, failed=failed)
         self._notify_ui()
 
     def record_last_tool_result(self, tool_name: str, result) -> None:
         """Compatibility hook for tools; observations are stored on ActionStep."""
-        log_record_last_tool_result(self.conversation_log, tool_name, result)
 
     def pop_last_tool_call(self) -> None:
-        log_pop_last_tool_call(self.conversation_log)
+        self.run_activity.pop_last_tool_call()
         self._notify_ui()
 
     def clear_tool_calls(self) -> None:
         """Reset the live tool-call list (e.g. after a step completes)."""
-        log_clear_tool_calls(self.conversation_log)
+        self.run_activity.clear_tool_calls()
 
     def is_agent_running(self) -> bool:
         return self.agent_thread is not None and self.agent_thread.is_alive()
 
+    def is_busy(self) -> bool:
+        """True while a query is being started or the agent runs; archiving skips it then."""
+        return self._queries_starting > 0 or self.is_agent_running()
+
+    def ensure_loaded(self) -> None:
+        """Read the persisted log and steps of a restored or archived conversation on use.
+
+        Always taken under ``_load_lock``, so an archive in progress finishes
+        (or sees the new ``last_used`` and backs off) before the caller uses
+        the conversation.
+        """
+        with self._load_lock:
+            self.last_used = time.time()
+            if not self.materialized:
+                from macllm.core.persistence import materialize_conversation
+                materialize_conversation(self)
+
     # ------------------------------------------------------------------
     # submit() — the main entry point for user queries
     # ------------------------------------------------------------------
@@ -119,7 +131,24 @@ class Conversation:
         user_input = user_input.strip()
         if not user_input:
             return
+        self._begin_query()
+        try:
+            self._submit_loaded(user_input)
+        finally:
+            self._end_query()
 
+    def _begin_query(self) -> None:
+        """Load the conversation and mark it busy, so archiving cannot release
+        the log or agent before the agent thread is started."""
+        with self._load_lock:
+            self.ensure_loaded()
+            self._queries_starting += 1
+
+    def _end_query(self) -> None:
+        with self._load_lock:
+            self._queries_starting -= 1
+
+    def _submit_loaded(self, user_input: str) -> None:
         if self.pending_user_input is not None:
             self.add_user_message(user_input)
             self.resolve_user_input(user_input)
@@ -187,7 +216,6 @@ class Conversation:
     def _start_agent_thread(self, request, app) -> None:
         """Spawn the background agent thread for this conversation."""
         from macllm.core.context import set_current_conversation
-        from macllm.core.persistence import save_all_conversations
         from macllm.core.llm_service import get_model_for_speed
 
         conversation = self
@@ -267,7 +295,7 @@ class Conversation:
                 conversation.clear_run_activity()
                 conversation._active_run_started_monotonic = None
                 if not app.ephemeral:
-                    save_all_conversations(app.conversation_history)
+                    app.request_save(conversation)
                 conversation.agent_thread = None
                 conversation.abort_event.clear()
                 conversation._notify_ui()
@@ -285,7 +313,11 @@ class Conversation:
         text = self.pending_input
         self.pending_input = ""
         if text:
-            self._process_query(text)
+            self._begin_query()
+            try:
+                self._process_query(text)
+            finally:
+                self._end_query()
 
     def abort(self) -> None:
         """Signal the running agent to abort.
@@ -348,8 +380,7 @@ class Conversation:
     def _handle_abort(self, app) -> None:
         """After an abort, persist state without adding any message."""
         if not app.ephemeral:
-            from macllm.core.persistence import save_all_conversations
-            save_all_conversations(app.conversation_history)
+            app.request_save(self)
 
     def _maybe_generate_title(self) -> None:
         """Generate a short title after the first exchange."""
@@ -363,7 +394,6 @@ class Conversation:
         try:
             from macllm.macllm import MacLLM
             from macllm.core.llm_service import generate
-            from macllm.core.persistence import save_all_conversations
             app = MacLLM._instance
             user_text = user_msgs[0]["content"][:200]
             asst_text = asst_msgs[0]["content"][:200]
@@ -382,7 +412,7 @@ class Conversation:
             if title:
                 self.title = title[:30]
                 if app and not app.ephemeral:
-                    save_all_conversations(app.conversation_history)
+                    app.request_save(self)
                 self._notify_ui()
         except Exception:
             pass
@@ -482,6 +512,7 @@ class Conversation:
     def reset(self, clear_persisted: bool = False) -> None:
         """Clears messages and metadata, restores default welcome message."""
         self.conversation_log = ConversationLog()
+        self.run_activity = RunActivity()
         self.sources: list[dict] = []
         self._pending_observation_images: list = []
         self.granted_dirs: list[str] = []
@@ -490,6 +521,8 @@ class Conversation:
         self.pending_user_input = None
         self._active_query_text = None
         self._user_situation = None
+        self.materialized = True
+        self._restored_steps: list | None = None  # attached when the agent is created
 
         self._get_agent_cls()
 
@@ -510,6 +543,9 @@ class Conversation:
             speed=self.speed_level,
             conversation=self,
         )
+        if self._restored_steps is not None:
+            self.agent.memory.steps = self._restored_steps
+            self._restored_steps = None
 
 
 class ConversationHistory:
@@ -530,9 +566,15 @@ class ConversationHistory:
         return conversation
 
     def get_current_conversation(self):
-        """Return the active Conversation object, or None if none exists."""
+        """Return the active Conversation object, or None if none exists.
+
+        A restored conversation is loaded from disk when it first becomes
+        the active one.
+        """
         if self.conversations and 0 <= self.active_index < len(self.conversations):
-            return self.conversations[self.active_index]
+            conversation = self.conversations[self.active_index]
+            conversation.ensure_loaded()
+            return conversation
         return None
 
     def set_active(self, index: int) -> bool:
@@ -10,6 +10,10 @@ import tomllib
 import tomli_w
 
 ACCESS_LEVELS = {"read-write", "read-only", "none"}
+SEARCH_ENGINES = {"hybrid", "vector", "keyword"}
+VECTOR_DTYPES = {"float32", "float16", "int8"}
+ANN_BACKENDS = {"exact", "ivf", "hnsw"}
+DOCUMENT_TYPES = {"pdf", "html", "docx", "code"}
 
 
 def _project_root() -> Path:
@@ -46,6 +50,7 @@ class FilesystemMountConfig:
     supervisor_access: str
     subagent_access: str
     index: bool
+    reindex_interval: float = 0.0  # seconds between periodic rescans; 0 = app default
 
 
 @dataclass
@@ -53,11 +58,55 @@ class FilesystemConfig:
     mounts: dict[str, FilesystemMountConfig] = field(default_factory=dict)
 
 
+@dataclass
+class IndexConfig:
+    """Note index build limits and search tuning (``[index]``)."""
+    cpu_budget: float = 0.5
+    embedding_processes: int = 0
+    batch_size: int = 64
+    search_engine: str = "hybrid"
+    vector_weight: float = 1.0
+    keyword_weight: float = 1.0
+    rrf_k: int = 60
+    vector_dtype: str = "float16"
+    ann_backend: str = "ivf"
+    ann_min_rows: int = 10_000
+    ivf_nprobe: int = 16
+    ivf_lists: int = 0
+    hnsw_m: int = 32
+    hnsw_ef_search: int = 64
+    warmup_after_launch: float = 30.0
+    unload_after: float = 900.0
+    document_types: tuple[str, ...] = ("pdf", "html", "docx")
+    extract_processes: int = 2
+    extract_timeout: float = 60.0
+    write_debounce: float = 1.0
+
+
+@dataclass
+class ConversationsConfig:
+    """Archival and export of conversations (``[conversations]``)."""
+    archive_after_days: float = 7.0
+    memory_budget_mb: float = 256.0
+    export_logs: bool = False
+
+
+@dataclass
+class ToolCacheConfig:
+    """Persistent cache of read-only tool results (``[tool_cache]``)."""
+    enabled: bool = True
+    max_mb: float = 64.0
+    ttl: dict[str, float] = field(default_factory=dict)  # seconds per tool; 0 = never cache
+
+
 @dataclass
 class MacLLMConfig:
     api_keys: ApiKeys = field(default_factory=ApiKeys)
     filesystem: FilesystemConfig = field(default_factory=FilesystemConfig)
     shell: ShellConfig = field(default_factory=ShellConfig)
+    index: IndexConfig = field(default_factory=IndexConfig)
+    conversations: ConversationsConfig = field(default_factory=ConversationsConfig)
+    tool_cache: ToolCacheConfig = field(default_factory=ToolCacheConfig)
     agents: dict[str, AgentConfig] = field(default_factory=dict)
 
     def resolved_filesystem_mounts(
@@ -70,6 +119,7 @@ class MacLLMConfig:
                 supervisor_access=mount.supervisor_access,
                 subagent_access=mount.subagent_access,
                 index=mount.index,
+                reindex_interval=mount.reindex_interval,
             )
             for name, mount in self.filesystem.mounts.items()
         }
@@ -159,10 +209,77 @@ def _parse_filesystem(raw: dict[str, Any]) -> FilesystemConfig:
             supervisor_access=supervisor_access,
             subagent_access=subagent_access,
             index=bool(data["index"]),
+            reindex_interval=max(0.0, float(data.get("reindex_interval", 0.0))),
         )
     return FilesystemConfig(mounts)
 
 
+def _parse_index(raw: dict[str, Any]) -> IndexConfig:
+    defaults = IndexConfig()
+    cpu_budget = float(raw.get("cpu_budget", defaults.cpu_budget))
+    if not 0.0 < cpu_budget <= 1.0:
+        raise ValueError("index.cpu_budget must be in (0, 1].")
+    search_engine = str(raw.get("search_engine", defaults.search_engine))
+    if search_engine not in SEARCH_ENGINES:
+        raise ValueError(f"index.search_engine must be one of {sorted(SEARCH_ENGINES)}.")
+    vector_dtype = str(raw.get("vector_dtype", defaults.vector_dtype))
+    if vector_dtype not in VECTOR_DTYPES:
+        raise ValueError(f"index.vector_dtype must be one of {sorted(VECTOR_DTYPES)}.")
+    ann_backend = str(raw.get("ann_backend", defaults.ann_backend))
+    if ann_backend not in ANN_BACKENDS:
+        raise ValueError(f"index.ann_backend must be one of {sorted(ANN_BACKENDS)}.")
+    document_types = tuple(str(t) for t in raw.get("document_types", defaults.document_types))
+    unknown = set(document_types) - DOCUMENT_TYPES
+    if unknown:
+        raise ValueError(
+            f"Unknown index.document_types {sorted(unknown)}; "
+            f"expected any of {sorted(DOCUMENT_TYPES)}."
+        )
+    return IndexConfig(
+        cpu_budget=cpu_budget,
+        embedding_processes=max(0, int(raw.get("embedding_processes", defaults.embedding_processes))),
+        batch_size=max(1, int(raw.get("batch_size", defaults.batch_size))),
+        search_engine=search_engine,
+        vector_weight=max(0.0, float(raw.get("vector_weight", defaults.vector_weight))),
+        keyword_weight=max(0.0, float(raw.get("keyword_weight", defaults.keyword_weight))),
+        rrf_k=max(1, int(raw.get("rrf_k", defaults.rrf_k))),
+        vector_dtype=vector_dtype,
+        ann_backend=ann_backend,
+        ann_min_rows=max(1, int(raw.get("ann_min_rows", defaults.ann_min_rows))),
+        ivf_nprobe=max(1, int(raw.get("ivf_nprobe", defaults.ivf_nprobe))),
+        ivf_lists=max(0, int(raw.get("ivf_lists", defaults.ivf_lists))),
+        hnsw_m=max(2, int(raw.get("hnsw_m", defaults.hnsw_m))),
+        hnsw_ef_search=max(1, int(raw.get("hnsw_ef_search", defaults.hnsw_ef_search))),
+        warmup_after_launch=max(0.0, float(raw.get("warmup_after_launch", defaults.warmup_after_launch))),
+        unload_after=max(0.0, float(raw.get("unload_after", defaults.unload_after))),
+        document_types=document_types,
+        extract_processes=max(1, int(raw.get("extract_processes", defaults.extract_processes))),
+        extract_timeout=max(1.0, float(raw.get("extract_timeout", defaults.extract_timeout))),
+        write_debounce=max(0.0, float(raw.get("write_debounce", defaults.write_debounce))),
+    )
+
+
+def _parse_conversations(raw: dict[str, Any]) -> ConversationsConfig:
+    defaults = ConversationsConfig()
+    return ConversationsConfig(
+        archive_after_days=max(0.0, float(raw.get("archive_after_days", defaults.archive_after_days))),
+        memory_budget_mb=max(0.0, float(raw.get("memory_budget_mb", defaults.memory_budget_mb))),
+        export_logs=bool(raw.get("export_logs", defaults.export_logs)),
+    )
+
+
+def _parse_tool_cache(raw: dict[str, Any]) -> ToolCacheConfig:
+    defaults = ToolCacheConfig()
+    ttl = raw.get("ttl", {}) or {}
+    if not isinstance(ttl, dict):
+        raise ValueError("tool_cache.ttl must be a table of tool names to seconds.")
+    return ToolCacheConfig(
+        enabled=bool(raw.get("enabled", defaults.enabled)),
+        max_mb=max(0.0, float(raw.get("max_mb", defaults.max_mb))),
+        ttl={str(name): max(0.0, float(seconds)) for name, seconds in ttl.items()},
+    )
+
+
 def _parse_agents(raw: dict[str, Any] | None) -> dict[str, AgentConfig]:
     if not raw or not isinstance(raw, dict):
         return {}
@@ -197,6 +314,9 @@ def _from_dict(data: dict[str, Any]) -> MacLLMConfig:
             read_only_paths=shell_data.get("read_only_paths")
             or list(_DEFAULT_READ_ONLY_PATHS),
         ),
+        index=_parse_index(data.get("index", {}) or {}),
+        conversations=_parse_conversations(data.get("conversations", {}) or {}),
+        tool_cache=_parse_tool_cache(data.get("tool_cache", {}) or {}),
         agents=_parse_agents(data.get("agents")),
     )
 
@@ -0,0 +1,442 @@
+"""Versioned encoding of conversation store records.
+
+A record (a journal frame of :mod:`macllm.core.conversation_store`) is
+pickled after one byte, the schema version.  Payloads from before the
+codec are plain pickles and start with ``0x80``; version 1 payloads
+(zlib-compressed JSON) are still read.
+
+The pickler reduces only a few classes itself, through its
+``dispatch_table``, so everything else pickles at C speed:
+
+- smolagents steps and chat messages move long strings into blobs, and
+  ``ChatMessage.raw`` (the provider's raw response) is dropped;
+- log payloads (``FrozenDict``) move long strings into blobs;
+- agent errors are stored by class and message;
+- images are stored as blobs of their zlib-compressed pixels (PNG when
+  they have a palette).
+
+Strings longer than ``BLOB_MIN_CHARS`` and images are stored out of line
+in a :class:`BlobStore`, named by the hash of their content.  The system
+prompt repeated in every step's model input, or a file read twice, is
+therefore stored once.  Classes gone from macllm or smolagents load as
+dicts of their fields.
+"""
+from __future__ import annotations
+
+import copyreg
+import dataclasses
+import functools
+import hashlib
+import importlib
+import io
+import json
+import os
+import pickle
+import threading
+import weakref
+import zlib
+from pathlib import Path
+from typing import Any
+
+SCHEMA_VERSION = 2
+BLOB_MIN_CHARS = 8192
+COMPRESS_LEVEL = 3  # string blobs
+IMAGE_COMPRESS_LEVEL = 1  # screenshots barely shrink at higher levels, but encode much slower
+
+_JSON_VERSION = 1  # zlib-compressed JSON projection; still read
+
+_PICKLE_PREFIX = 0x80
+_TRUSTED_MODULES = ("macllm.", "smolagents.")
+_DROPPED_FIELDS = {"smolagents.models:ChatMessage": {"raw"}}
+_TEXT_FIELDS = {  # fields that may hold strings long enough for a blob
+    "smolagents.models:ChatMessage": ("content",),
+    "smolagents.memory:TaskStep": ("task",),
+    "smolagents.memory:ActionStep": ("model_output", "code_action", "observations"),
+    "smolagents.memory:PlanningStep": ("plan",),
+    "smolagents.memory:SystemPromptStep": ("system_prompt",),
+}
+
+
+class BlobStore:
+    """Content-addressed files in *directory*; writing the same bytes twice is a no-op."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._known: set[str] = set()
+        self._lock = threading.Lock()
+        self._objects: dict[int, tuple[weakref.ref, str]] = {}  # id -> (object, digest of its blob)
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        with self._lock:
+            if digest in self._known:
+                return digest
+        path = self.directory / digest
+        if not path.exists():
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{digest}.{threading.get_ident()}.tmp")
+            with open(tmp, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        with self._lock:
+            self._known.add(digest)
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        return (self.directory / digest).read_bytes()
+
+    def remember(self, obj: Any, digest: str) -> None:
+        """Record that the existing blob *digest* holds *obj* (an image), for :meth:`recall`."""
+        key = id(obj)
+
+        def forget(ref, key=key):
+            with self._lock:
+                if self._objects.get(key, (None,))[0] is ref:
+                    del self._objects[key]
+
+        with self._lock:
+            self._known.add(digest)
+            self._objects[key] = (weakref.ref(obj, forget), digest)
+
+    def recall(self, obj: Any) -> str | None:
+        """Return the digest of the blob holding *obj*, if it was stored or read while alive."""
+        with self._lock:
+            entry = self._objects.get(id(obj))
+            if entry is None or entry[0]() is not obj or entry[1] not in self._known:
+                return None
+            return entry[1]
+
+    def digests(self) -> set[str]:
+        if not self.directory.is_dir():
+            return set()
+        return {path.name for path in self.directory.iterdir() if not path.name.endswith(".tmp")}
+
+    def remove(self, digests) -> None:
+        with self._lock:
+            self._known.difference_update(digests)
+        for digest in digests:
+            (self.directory / digest).unlink(missing_ok=True)
+
+
+# ----------------------------------------------------------------------
+# Records
+# ----------------------------------------------------------------------
+def encode_record(record: Any, blobs: BlobStore, refs: set[str] | None = None) -> bytes:
+    """Return the payload for *record*; digests of the blobs it uses are added to *refs*."""
+    buffer = io.BytesIO()
+    buffer.write(bytes([SCHEMA_VERSION]))
+    _Pickler(buffer, blobs, refs if refs is not None else set()).dump(record)
+    return buffer.getvalue()
+
+
+def decode_record(payload: bytes, blobs: BlobStore) -> Any:
+    if not payload:
+        raise ValueError("Empty payload")
+    if payload[0] == _PICKLE_PREFIX:
+        return pickle.loads(payload)
+    if payload[0] == SCHEMA_VERSION:
+        data = io.BytesIO(payload)
+        data.seek(1)
+        return _Unpickler(data, blobs).load()
+    if payload[0] == _JSON_VERSION:
+        value = json.loads(zlib.decompress(payload[1:]).decode("utf-8"))
+        return _Decoder(blobs).decode(value)
+    raise ValueError(f"Unsupported schema version {payload[0]}")
+
+
+@functools.cache
+def _class_name(cls: type) -> str:
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+@functools.cache
+def _field_names(cls: type) -> tuple[tuple[str, ...], frozenset[str]]:
+    """Return the stored fields of a dataclass and those its ``__init__`` takes."""
+    dropped = _DROPPED_FIELDS.get(_class_name(cls), ())
+    fields = dataclasses.fields(cls)
+    return (
+        tuple(f.name for f in fields if f.name not in dropped),
+        frozenset(f.name for f in fields if f.init),
+    )
+
+
+@functools.cache
+def _resolve(name: str) -> type | None:
+    module_name, _, qualname = name.partition(":")
+    if not module_name.startswith(_TRUSTED_MODULES):
+        return None
+    try:
+        obj: Any = importlib.import_module(module_name)
+        for part in qualname.split("."):
+            obj = getattr(obj, part)
+    except (ImportError, AttributeError):
+        return None
+    return obj if isinstance(obj, type) else None
+
+
+class _BlobRef:
+    """Stands in for a long string in the pickle stream; loads as the string."""
+
+    __slots__ = ("kind", "digest")
+
+    def __init__(self, kind: str, digest: str):
+        self.kind = kind
+        self.digest = digest
+
+    def __reduce__(self):
+        return _blob, (self.kind, self.digest)
+
+
+def _blob(kind: str, digest: str) -> Any:
+    raise RuntimeError("blob references are resolved by the conversation codec's unpickler")
+
+
+def _rebuild_error(cls: type, message: str) -> BaseException:
+    error = cls.__new__(cls)
+    BaseException.__init__(error, message)
+    error.message = message
+    return error
+
+
+class _Missing(dict):
+    """A record of a class that no longer exists, loaded as a dict of its fields."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple):  # (__dict__, __slots__ values)
+            state = {k: v for part in state if part for k, v in part.items()}
+        if isinstance(state, dict):
+            self.update(state)
+
+
+_is_str = functools.partial(type.__instancecheck__, str)
+
+
+def _has_long_text(values) -> bool:
+    """Whether *values* include a string for a blob; runs in C, as most don't."""
+    return max(map(len, filter(_is_str, values)), default=0) > BLOB_MIN_CHARS
+
+
+def _subclasses(cls: type) -> list[type]:
+    found, stack = [], [cls]
+    while stack:
+        cls = stack.pop()
+        found.append(cls)
+        stack.extend(cls.__subclasses__())
+    return found
+
+
+def _special_classes() -> dict[str, list[type]]:
+    """Classes :class:`_Pickler` reduces itself, by how; the rest are pickled natively.
+
+    ``fields``: steps and chat messages, whose long strings go to blobs and
+    whose dropped fields are cleared; ``dicts``: log payloads; ``errors``:
+    agent errors, which do not unpickle through their constructor;
+    ``images``: PIL images, stored as compressed pixels.
+    """
+    from PIL import Image
+    from smolagents.utils import AgentError
+
+    from macllm.core.conversation_log import FrozenDict
+
+    fields = (_resolve(name) for name in {*_TEXT_FIELDS, *_DROPPED_FIELDS})
+    return {
+        "fields": [cls for cls in fields if cls is not None and dataclasses.is_dataclass(cls)],
+        "dicts": [FrozenDict],
+        "errors": _subclasses(AgentError),
+        "images": _subclasses(Image.Image),
+    }
+
+
+class _Pickler(pickle.Pickler):
+    """Pickles a record, moving long strings and images out of line into blobs.
+
+    Only the classes in :func:`_special_classes` run Python code while
+    pickling (through :attr:`dispatch_table`), so a record costs little
+    more than a plain pickle.
+    """
+
+    def __init__(self, file, blobs: BlobStore, refs: set[str]):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.blobs = blobs
+        self.refs = refs
+        self._strings: dict[int, tuple[str, _BlobRef]] = {}  # id of a long string -> its reference
+        reducers = {"dicts": self._reduce_dict, "errors": self._reduce_error, "images": self._reduce_image}
+        self.dispatch_table = dict(copyreg.dispatch_table)
+        for kind, classes in _special_classes().items():
+            for cls in classes:
+                self.dispatch_table[cls] = reducers[kind] if kind in reducers else self._fields_reducer(cls)
+
+    def blob(self, kind: str, data: bytes) -> _BlobRef:
+        digest = self.blobs.put(data)
+        self.refs.add(digest)
+        return _BlobRef(kind, digest)
+
+    def text(self, value: Any) -> Any:
+        if type(value) is not str or len(value) <= BLOB_MIN_CHARS:
+            return value
+        entry = self._strings.get(id(value))
+        if entry is None:
+            entry = self._strings[id(value)] = (
+                value, self.blob("str", zlib.compress(value.encode("utf-8"), COMPRESS_LEVEL))
+            )
+        return entry[1]
+
+    def _fields_reducer(self, cls: type):
+        name = _class_name(cls)
+        text_fields = _TEXT_FIELDS.get(name, ())
+        dropped = _DROPPED_FIELDS.get(name, ())
+        newobj, args = copyreg.__newobj__, (cls,)
+
+        def reduce(obj: Any) -> tuple:
+            state = obj.__dict__
+            changed = None
+            for field in text_fields:
+                value = state.get(field)
+                if type(value) is str and len(value) > BLOB_MIN_CHARS:
+                    changed = changed or {}
+                    changed[field] = self.text(value)
+            for field in dropped:
+                if state.get(field) is not None:
+                    changed = changed or {}
+                    changed[field] = None
+            return newobj, args, {**state, **changed} if changed else state
+
+        return reduce
+
+    def _reduce_dict(self, obj: dict) -> tuple:
+        if _has_long_text(obj.values()):
+            return type(obj), ({k: self.text(v) for k, v in obj.items()},)
+        return type(obj), (dict(obj),)
+
+    def _reduce_error(self, obj: BaseException) -> tuple:
+        return _rebuild_error, (type(obj), str(getattr(obj, "message", obj)))
+
+    def _reduce_image(self, obj: Any) -> tuple:
+        # Snapshots rewrite images already stored; encode each one once.
+        digest = self.blobs.recall(obj)
+        kind = "image" if obj.palette is not None else "pixels"
+        if digest is None:
+            if kind == "pixels":  # PNG filtering costs more than it saves on screenshots
+                header = f"{obj.mode} {obj.width} {obj.height}\n".encode()
+                data = header + zlib.compress(obj.tobytes(), IMAGE_COMPRESS_LEVEL)
+            else:
+                buffer = io.BytesIO()
+                obj.save(buffer, format="PNG", compress_level=IMAGE_COMPRESS_LEVEL)
+                data = buffer.getvalue()
+            digest = self.blobs.put(data)
+            self.blobs.remember(obj, digest)
+        self.refs.add(digest)
+        return _blob, (kind, digest)
+
+
+class _Unpickler(pickle.Unpickler):
+    """Resolves blob references; classes gone from macllm or smolagents load as dicts."""
+
+    def __init__(self, file, blobs: BlobStore):
+        super().__init__(file)
+        self.blobs = _BlobReader(blobs)
+
+    def find_class(self, module: str, name: str) -> Any:
+        if module == __name__ and name == "_blob":
+            return lambda kind, digest: self.blobs.blob(digest, kind)
+        try:
+            return super().find_class(module, name)
+        except (ImportError, AttributeError):
+            if module.startswith(_TRUSTED_MODULES):
+                return _Missing
+            raise
+
+
+class _BlobReader:
+    def __init__(self, blobs: BlobStore):
+        self.blobs = blobs
+        self._cache: dict[str, Any] = {}  # digest -> str/bytes, so repeats share one object
+
+    def blob(self, digest: str, kind: str | None) -> Any:
+        if kind in ("str", "bytes") and digest in self._cache:
+            return self._cache[digest]
+        data = self.blobs.get(digest)
+        if kind == "str":
+            result: Any = zlib.decompress(data).decode("utf-8")
+        elif kind == "image":
+            from PIL import Image
+
+            image = Image.open(io.BytesIO(data))
+            image.load()
+            self.blobs.remember(image, digest)
+            return image
+        elif kind == "pixels":
+            from PIL import Image
+
+            header, _, pixels = data.partition(b"\n")
+            mode, width, height = header.decode().split()
+            image = Image.frombytes(mode, (int(width), int(height)), zlib.decompress(pixels))
+            self.blobs.remember(image, digest)
+            return image
+        elif kind == "pickle":
+            return pickle.loads(data)
+        else:
+            result = data
+        self._cache[digest] = result
+        return result
+
+
+class _Decoder(_BlobReader):
+    """Rebuilds a version 1 (JSON) record."""
+
+    def decode(self, value: Any) -> Any:
+        if isinstance(value, list):
+            return [self.decode(item) for item in value]
+        if not isinstance(value, dict):
+            return value
+        if "$blob" in value:
+            return self.blob(value["$blob"], value.get("t"))
+        if "$tuple" in value:
+            return tuple(self.decode(item) for item in value["$tuple"])
+        if "$items" in value:
+            return {self.decode(k): self.decode(v) for k, v in value["$items"]}
+        if "$enum" in value:
+            cls = _resolve(value["$enum"])
+            raw = self.decode(value["v"])
+            try:
+                return cls(raw) if cls is not None else raw
+            except ValueError:
+                return raw
+        if "$dc" in value:
+            fields = {k: self.decode(v) for k, v in value["f"].items()}
+            cls = _resolve(value["$dc"])
+            if cls is None or not dataclasses.is_dataclass(cls):
+                return fields
+            return _build_dataclass(cls, fields)
+        if "$error" in value:
+            cls = _resolve(value["$error"])
+            if cls is None or not issubclass(cls, BaseException):
+                return value["m"]
+            error = cls.__new__(cls)
+            BaseException.__init__(error, value["m"])
+            error.message = value["m"]
+            return error
+        if "$repr" in value:
+            return value["$repr"]
+        return {k: self.decode(v) for k, v in value.items()}
+
+
+def _build_dataclass(cls: type, fields: dict) -> Any:
+    init = _field_names(cls)[1]
+    try:
+        obj = cls(**{k: v for k, v in fields.items() if k in init})
+    except TypeError:
+        obj = cls.__new__(cls)
+        init = frozenset()
+    for name, value in fields.items():
+        if name not in init:
+            try:
+                object.__setattr__(obj, name, value)
+            except (AttributeError, TypeError):
+                pass
+    return obj
@@ -1,34 +1,187 @@
 from __future__ import annotations
 
-import copy
 import time
 from dataclasses import dataclass
 from typing import Any
 
 RUNTIME_FACT_KINDS = {"run_start", "run_end", "step"}
-ACTIVITY_MARKER_KINDS = {"planning_started", "action_started"}
+PERSISTED_KINDS = {"message", "plan", *RUNTIME_FACT_KINDS}
 
 
-@dataclass
+class FrozenDict(dict):
+    """A ``dict`` that cannot be changed after construction.
+
+    Log payloads are built from these and tuples, so entries can be shared
+    between the log, the store and the UI without copying.
+    """
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("log payloads are read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+
+def freeze(value: Any, depth: int = 0) -> Any:
+    """Return a read-only projection of *value*.
+
+    Dicts become :class:`FrozenDict` with ``str`` keys, lists and tuples
+    become tuples, sets become frozensets, and primitives are kept.  Frozen
+    dicts are returned as they are, so freezing a payload twice costs
+    nothing.  Other objects (images, agent objects) keep their type and are
+    shared, not copied; payload builders project mutable ones first.
+    """
+    if value is None or isinstance(value, (bool, int, float, str, bytes, FrozenDict)):
+        return value
+    if depth > 8:
+        return repr(value)
+    if isinstance(value, dict):
+        return FrozenDict({str(k): freeze(v, depth + 1) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v, depth + 1) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(v, depth + 1) for v in value)
+    return value
+
+
+@dataclass(frozen=True)
 class ConversationLogEntry:
     kind: str
     timestamp: float
     payload: Any
     tokens: int | None = None
 
+    def __post_init__(self):
+        object.__setattr__(self, "payload", freeze(self.payload))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def _reindexing(method):
+    """Wrap a list method so the log rebuilds its index afterwards."""
+
+    def mutate(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._reindex()
+        return result
+
+    mutate.__name__ = method.__name__
+    return mutate
+
 
 class ConversationLog(list[ConversationLogEntry]):
-    """Append-only chronological record of conversation facts."""
+    """Append-only chronological record of durable conversation facts, indexed by kind.
+
+    Reads work as on a plain list.  Besides the entries, the log keeps the
+    positions of each kind and running token totals, so the latest plan,
+    the messages, and the totals are found without scanning the log.
+    Appending updates the index; any other change to the list rebuilds it.
+    Transient run activity lives in :class:`macllm.core.run_activity.RunActivity`.
+    """
+
+    _positions: dict[str, list[int]] | None = None
+    _tokens: list[int]
+
+    def __init__(self, entries=()):
+        super().__init__(entries)
+        self._reindex()
+
+    def __reduce__(self):
+        return type(self), (list(self),)
+
+    def _reindex(self) -> None:
+        self._positions = {}
+        self._tokens = [0, 0]
+        for position, item in enumerate(self):
+            self._note(position, item)
+
+    def _note(self, position: int, item) -> None:
+        self._positions.setdefault(getattr(item, "kind", None), []).append(position)
+        input_tokens, output_tokens = _entry_tokens(item)
+        self._tokens[0] += input_tokens
+        self._tokens[1] += output_tokens
+
+    def _index(self) -> dict[str, list[int]]:
+        if self._positions is None:  # unpickled by an older pickle, without __init__
+            self._reindex()
+        return self._positions
+
+    # -- mutation ------------------------------------------------------
+    def append(self, item) -> None:
+        self._index()
+        super().append(item)
+        self._note(len(self) - 1, item)
+
+    def extend(self, items) -> None:
+        self._index()
+        start = len(self)
+        super().extend(items)
+        for position in range(start, len(self)):
+            self._note(position, list.__getitem__(self, position))
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    __setitem__ = _reindexing(list.__setitem__)
+    __delitem__ = _reindexing(list.__delitem__)
+    __imul__ = _reindexing(list.__imul__)
+    insert = _reindexing(list.insert)
+    pop = _reindexing(list.pop)
+    remove = _reindexing(list.remove)
+    clear = _reindexing(list.clear)
+    sort = _reindexing(list.sort)
+    reverse = _reindexing(list.reverse)
+
+    # -- indexed reads -------------------------------------------------
+    def of_kind(self, kind: str) -> list[ConversationLogEntry]:
+        """Entries of *kind*, oldest first."""
+        return [list.__getitem__(self, i) for i in self._index().get(kind, ())]
+
+    def has_kind(self, kind: str) -> bool:
+        return bool(self._index().get(kind))
+
+    def last_position(self, kind: str) -> int:
+        """Position of the latest entry of *kind*, or -1."""
+        positions = self._index().get(kind)
+        return positions[-1] if positions else -1
+
+    def latest(self, kind: str) -> ConversationLogEntry | None:
+        position = self.last_position(kind)
+        return list.__getitem__(self, position) if position >= 0 else None
+
+    def token_totals(self) -> tuple[int, int]:
+        """Input and output tokens recorded in entries' ``token_usage``."""
+        self._index()
+        return self._tokens[0], self._tokens[1]
+
+
+def _entry_tokens(item) -> tuple[int, int]:
+    payload = getattr(item, "payload", None)
+    usage = payload.get("token_usage") if isinstance(payload, dict) else None
+    if not isinstance(usage, dict):
+        return 0, 0
+    return int(usage.get("input_tokens", 0) or 0), int(usage.get("output_tokens", 0) or 0)
 
 
 def entry(kind: str, payload: Any, *, tokens: int | None = None) -> ConversationLogEntry:
-    """Create a log entry, preserving payload state when practical."""
-    return ConversationLogEntry(
-        kind=kind,
-        timestamp=time.time(),
-        payload=_preserve_payload(payload),
-        tokens=tokens,
-    )
+    """Create a log entry; *payload* is frozen, see :func:`freeze`."""
+    return ConversationLogEntry(kind=kind, timestamp=time.time(), payload=payload, tokens=tokens)
 
 
 def message(role: str, content: str) -> ConversationLogEntry:
@@ -36,27 +189,15 @@ def message(role: str, content: str) -> ConversationLogEntry:
 
 
 def append_run_start(log: list[ConversationLogEntry], payload: dict) -> None:
-    log.append(entry("run_start", _stable_payload(payload)))
+    log.append(entry("run_start", payload))
 
 
 def append_run_end(log: list[ConversationLogEntry], payload: dict) -> None:
-    log.append(entry("run_end", _stable_payload(payload)))
+    log.append(entry("run_end", payload))
 
 
 def append_step(log: list[ConversationLogEntry], payload: dict, *, tokens: int | None = None) -> None:
-    log.append(entry("step", _stable_payload(payload), tokens=tokens))
-
-
-def append_activity_marker(
-    log: list[ConversationLogEntry], kind: str, agent_name: str
-) -> None:
-    if kind not in ACTIVITY_MARKER_KINDS:
-        raise ValueError(f"Unknown activity marker: {kind}")
-    log.append(entry(kind, agent_name))
-
-
-def clear_activity_markers(log: list[ConversationLogEntry]) -> None:
-    log[:] = [item for item in log if item.kind not in ACTIVITY_MARKER_KINDS]
+    log.append(entry("step", payload, tokens=tokens))
 
 
 def append_agent_step(
@@ -80,71 +221,17 @@ def append_agent_step(
 
 def token_usage_totals(log: list[ConversationLogEntry]) -> tuple[int, int]:
     """Return cumulative input/output tokens recorded in step facts."""
+    if isinstance(log, ConversationLog):
+        return log.token_totals()
     input_tokens = 0
     output_tokens = 0
     for item in log:
-        payload = getattr(item, "payload", None)
-        if not isinstance(payload, dict):
-            continue
-        usage = payload.get("token_usage")
-        if not isinstance(usage, dict):
-            continue
-        input_tokens += int(usage.get("input_tokens", 0) or 0)
-        output_tokens += int(usage.get("output_tokens", 0) or 0)
+        item_input, item_output = _entry_tokens(item)
+        input_tokens += item_input
+        output_tokens += item_output
     return input_tokens, output_tokens
 
 
-def add_tool_call(log: list[ConversationLogEntry], tool_name: str, message_text: str) -> None:
-    log.append(ConversationLogEntry(
-        kind="tool_call",
-        timestamp=time.time(),
-        payload={"tool": tool_name, "message": message_text},
-    ))
-
-
-def update_last_tool_message(log: list[ConversationLogEntry], message_text: str) -> None:
-    item = _last_tool_call_entry(log)
-    if item is None or not isinstance(item.payload, dict):
-        return
-    item.payload["message"] = message_text
-
-
-def complete_last_tool_call(log: list[ConversationLogEntry], *, failed: bool = False) -> None:
-    """Compatibility hook for tools; step state is recorded by smolagents."""
-
-
-def record_last_tool_result(log: list[ConversationLogEntry], tool_name: str, result) -> None:
-    """Compatibility hook; result text lives on the corresponding ActionStep."""
-
-
-def pop_last_tool_call(log: list[ConversationLogEntry]) -> None:
-    for index in range(len(log) - 1, -1, -1):
-        item = log[index]
-        if item.kind != "tool_call":
-            continue
-        del log[index]
-        return
-
-
-def tool_calls(log: list[ConversationLogEntry]) -> list[dict]:
-    calls: list[dict] = []
-    for item in log:
-        if item.kind == "tool_call" and isinstance(item.payload, dict):
-            calls.append(item.payload)
-    return calls
-
-
-def clear_tool_calls(log: list[ConversationLogEntry]) -> None:
-    log[:] = [item for item in log if item.kind != "tool_call"]
-
-
-def _last_tool_call_entry(log: list[ConversationLogEntry]) -> ConversationLogEntry | None:
-    for item in reversed(log):
-        if item.kind == "tool_call":
-            return item
-    return None
-
-
 def append_plan(log: list[ConversationLogEntry], *, text: str | None = None, status: str | None = None) -> None:
     prev = latest_plan(log)
     log.append(entry("plan", {
@@ -154,6 +241,9 @@ def append_plan(log: list[ConversationLogEntry], *, text: str | None = None, sta
 
 
 def latest_plan(log: list[ConversationLogEntry]) -> dict | None:
+    if isinstance(log, ConversationLog):
+        item = log.latest("plan")
+        return item.payload if item is not None and isinstance(item.payload, dict) else None
     for item in reversed(log):
         if item.kind == "plan" and isinstance(item.payload, dict):
             return item.payload
@@ -161,21 +251,14 @@ def latest_plan(log: list[ConversationLogEntry]) -> dict | None:
 
 
 def persistable_log(log: list[ConversationLogEntry]) -> ConversationLog:
-    stable = ConversationLog()
-    for item in log:
-        if item.kind in {"message", "plan", *RUNTIME_FACT_KINDS}:
-            stable.append(ConversationLogEntry(
-                kind=item.kind,
-                timestamp=item.timestamp,
-                payload=_preserve_payload(item.payload),
-                tokens=item.tokens,
-            ))
-    return stable
+    """Return the durable entries of *log* (all of them for a current log)."""
+    return ConversationLog(item for item in log if item.kind in PERSISTED_KINDS)
 
 
 def messages_from_log(log: list[ConversationLogEntry]) -> list[dict]:
     messages: list[dict] = []
-    for item in log:
+    items = log.of_kind("message") if isinstance(log, ConversationLog) else log
+    for item in items:
         if item.kind != "message":
             continue
         payload = item.payload
@@ -200,21 +283,6 @@ def log_from_messages(messages: list[dict]) -> ConversationLog:
     return log
 
 
-def _preserve_payload(payload: Any) -> Any:
-    try:
-        return copy.deepcopy(payload)
-    except Exception:
-        try:
-            return copy.copy(payload)
-        except Exception:
-            return payload
-
-
-def _stable_payload(payload: Any) -> Any:
-    """Return a pickle-friendly primitive projection of runtime facts."""
-    return _stable_value(payload)
-
-
 def _agent_step_payload(
     step: Any,
     *,
@@ -233,7 +301,7 @@ def _agent_step_payload(
 
     if step_type == "planning":
         payload.update({
-            "plan": getattr(step, "plan", None),
+            "plan": _content_payload(getattr(step, "plan", None)),
             "model_output": _message_content(getattr(step, "model_output_message", None)),
         })
     elif step_type == "action":
@@ -243,17 +311,17 @@ def _agent_step_payload(
                 _tool_call_payload(tc)
                 for tc in (getattr(step, "tool_calls", None) or [])
             ],
-            "observations": getattr(step, "observations", None),
+            "observations": _content_payload(getattr(step, "observations", None)),
             "error": str(getattr(step, "error", "")) if getattr(step, "error", None) else None,
             "is_final_answer": bool(getattr(step, "is_final_answer", False)),
         })
     elif step_type == "task":
         payload.update({
-            "task": getattr(step, "task", None),
-            "observations": getattr(step, "observations", None),
+            "task": _content_payload(getattr(step, "task", None)),
+            "observations": _content_payload(getattr(step, "observations", None)),
             "error": str(getattr(step, "error", "")) if getattr(step, "error", None) else None,
         })
-    return _stable_payload(payload)
+    return payload
 
 
 def _token_usage_payload(step: Any) -> dict | None:
@@ -295,6 +363,15 @@ def _message_content(message: Any) -> str | None:
     return content if isinstance(content, str) else str(content)
 
 
+def _content_payload(value: Any) -> Any:
+    """Reduce chat messages (and lists of them) to their text; keep anything else."""
+    if isinstance(value, list):
+        return [_content_payload(item) for item in value]
+    if hasattr(value, "role") and hasattr(value, "content"):
+        return _message_content(value)
+    return value
+
+
 def _tool_call_payload(tool_call: Any) -> dict:
     if isinstance(tool_call, dict):
         return {
@@ -302,26 +379,10 @@ def _tool_call_payload(tool_call: Any) -> dict:
             "arguments": tool_call.get("arguments", {}),
             "id": tool_call.get("id"),
         }
+    # ToolCall carries name and arguments itself, ChatMessageToolCall in .function.
+    function = getattr(tool_call, "function", None) or tool_call
     return {
-        "name": getattr(tool_call, "name", None),
-        "arguments": getattr(tool_call, "arguments", {}),
+        "name": getattr(function, "name", None),
+        "arguments": getattr(function, "arguments", {}),
         "id": getattr(tool_call, "id", None),
     }
-
-
-def _stable_value(value: Any, depth: int = 0) -> Any:
-    if depth > 8:
-        return repr(value)
-    if value is None or isinstance(value, (bool, int, float, str)):
-        return value
-    if isinstance(value, dict):
-        return {
-            str(k): _stable_value(v, depth + 1)
-            for k, v in value.items()
-        }
-    if isinstance(value, (list, tuple)):
-        return [_stable_value(v, depth + 1) for v in value]
-    try:
-        return copy.deepcopy(value)
-    except Exception:
-        return repr(value)
@@ -0,0 +1,100 @@
+"""Measure what recording and saving agent steps allocates per step.
+
+    uv run python -m macllm.core.conversation_log_bench --turns 500
+
+Log payloads used to be deep-copied twice when an entry was created and
+once more, with the whole log, on every save.  ``copying`` replays that
+on the same steps; ``frozen`` is the current code, where payloads are
+frozen once and the log is saved as a shallow snapshot.
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any
+
+from macllm.core.conversation_log import ConversationLog, _agent_step_payload, append_agent_step
+from macllm.core.persistence_bench import synthetic_history
+
+
+@dataclass
+class _CopiedEntry:
+    kind: str
+    timestamp: float
+    payload: Any
+    tokens: int | None = None
+
+
+def _copying_append(log: list, step) -> None:
+    payload = _agent_step_payload(step, step_type="action", agent_name="default", agent_role="parent")
+    payload = copy.deepcopy(copy.deepcopy(payload))
+    log.append(_CopiedEntry("step", time.time(), payload, payload["token_usage"]["total_tokens"]))
+
+
+def _frozen_append(log: list, step) -> None:
+    append_agent_step(log, step, step_type="action", agent_name="default", agent_role="parent")
+
+
+_VARIANTS = {
+    "copying": (list, _copying_append, copy.deepcopy),
+    "frozen": (ConversationLog, _frozen_append, list),
+}
+
+
+def _measure(name: str, steps: list) -> dict[str, float]:
+    """Time and peak allocation of appending each step and snapshotting the log, per step."""
+    new_log, append, snapshot = _VARIANTS[name]
+    log = new_log()
+    totals = dict.fromkeys(("append_s", "append_bytes", "save_s", "save_bytes"), 0.0)
+    tracemalloc.start()
+    try:
+        for step in steps:
+            for phase, call in (("append", lambda: append(log, step)), ("save", lambda: snapshot(log))):
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                started = time.perf_counter()
+                result = call()
+                totals[f"{phase}_s"] += time.perf_counter() - started
+                totals[f"{phase}_bytes"] += tracemalloc.get_traced_memory()[1] - baseline
+                del result
+    finally:
+        tracemalloc.stop()
+    return {f"{name}_{key}": value / len(steps) for key, value in totals.items()}
+
+
+def run(turns: int = 500, seed: int = 0) -> dict[str, float]:
+    """Record the action steps of a *turns*-turn history both ways, saving after each.
+
+    Returns ``{"<variant>_<phase>_s", "<variant>_<phase>_bytes"}`` per step for
+    the variants ``copying`` and ``frozen`` and the phases ``append`` and
+    ``save``; bytes are the peak allocated during the phase.
+    """
+    _, steps = synthetic_history(turns, images_every=0, seed=seed)
+    actions = [step for step in steps if hasattr(step, "tool_calls")]
+    result = {}
+    for name in _VARIANTS:
+        result.update(_measure(name, actions))
+    return result
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark per-step allocations of the conversation log.")
+    parser.add_argument("--turns", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    result = run(args.turns)
+    for name in _VARIANTS:
+        print(f"{name:>7}: " + "  ".join(
+            f"{phase}={result[f'{name}_{phase}_s'] * 1e6:.0f}us/"
+            f"{result[f'{name}_{phase}_bytes'] / 1024:.1f}KiB"
+            for phase in ("append", "save")
+        ) + " per step")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,242 @@
+"""Full-text index over persisted conversations, backed by SQLite FTS5.
+
+Every conversation contributes its title, its messages, and the
+observations of its agent steps (tool results).  Indexing is incremental:
+``conversations`` records how many log entries and steps of each
+conversation are indexed, and :meth:`ConversationSearchIndex.update` only
+adds the ones past those counts.  The persistence writer calls it after
+each save, so indexing runs on the writer thread, never on the UI thread.
+Conversations saved before the index existed are added by
+:meth:`ConversationSearchIndex.backfill` on a background thread.
+
+Like :class:`macllm.index.keyword.KeywordIndex`, the database is opened in
+WAL mode with one connection per thread, so queries keep reading while the
+writer indexes.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from macllm.index.keyword import fts_query
+
+MAX_BODY_CHARS = 32_768  # longer observations are indexed by their start only
+CANDIDATES_PER_HIT = 5  # passages fetched per requested conversation before grouping
+MAX_CANDIDATES = 2000  # newest matching passages ranked per query
+
+
+@dataclass
+class ConversationHit:
+    """The best passage of one conversation matching a query."""
+
+    conv_id: str
+    title: str
+    kind: str  # "title", "user", "assistant" or "observation"
+    position: int  # index in the persisted log (messages) or steps (observations); -1 for titles
+    snippet: str
+    score: float  # higher is better
+
+
+def _message_text(item) -> tuple[str, str] | None:
+    payload = getattr(item, "payload", None)
+    if getattr(item, "kind", None) != "message" or not isinstance(payload, dict):
+        return None
+    content = payload.get("content")
+    if not isinstance(content, str) or not content:
+        return None
+    return str(payload.get("role") or "message"), content
+
+
+def _observation_text(step) -> str | None:
+    observations = getattr(step, "observations", None)
+    return observations if isinstance(observations, str) and observations else None
+
+
+class ConversationSearchIndex:
+    """Title, message and observation passages of conversations, ranked by BM25."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._backfill: threading.Thread | None = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                "conv_id TEXT PRIMARY KEY, title TEXT, log_count INTEGER, step_count INTEGER)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS passages ("
+                "rowid INTEGER PRIMARY KEY, conv_id TEXT, kind TEXT, position INTEGER)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS passages_conv ON passages(conv_id)")
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS bodies USING fts5(body)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            # The index can be rebuilt from the journals; losing the last
+            # transactions on power loss is fine.
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT count(*) FROM conversations").fetchone()[0]
+
+    def __contains__(self, conv_id: str) -> bool:
+        return self._conn().execute(
+            "SELECT 1 FROM conversations WHERE conv_id = ?", (conv_id,)
+        ).fetchone() is not None
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def update(self, conv_id: str, title: str, log: list, steps: list, *, only_new: bool = False) -> int:
+        """Index what was appended to *log* and *steps* since the last update.
+
+        If either got shorter, the conversation is reindexed from scratch.
+        With *only_new*, conversations already in the index are left alone.
+        Returns the number of passages added.
+        """
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                row = conn.execute(
+                    "SELECT title, log_count, step_count FROM conversations WHERE conv_id = ?",
+                    (conv_id,),
+                ).fetchone()
+                if row is not None and only_new:
+                    return 0
+                old_title, log_count, step_count = row or (None, 0, 0)
+                if log_count > len(log) or step_count > len(steps):
+                    self._remove(conn, [conv_id])
+                    old_title, log_count, step_count = None, 0, 0
+                passages = []
+                if title != old_title:
+                    conn.execute(
+                        "DELETE FROM bodies WHERE rowid IN "
+                        "(SELECT rowid FROM passages WHERE conv_id = ? AND kind = 'title')",
+                        (conv_id,),
+                    )
+                    conn.execute("DELETE FROM passages WHERE conv_id = ? AND kind = 'title'", (conv_id,))
+                    if title:
+                        passages.append(("title", -1, title))
+                for position in range(log_count, len(log)):
+                    text = _message_text(log[position])
+                    if text is not None:
+                        passages.append((text[0], position, text[1]))
+                for position in range(step_count, len(steps)):
+                    text = _observation_text(steps[position])
+                    if text is not None:
+                        passages.append(("observation", position, text))
+                for kind, position, body in passages:
+                    rowid = conn.execute(
+                        "INSERT INTO passages(conv_id, kind, position) VALUES (?, ?, ?)",
+                        (conv_id, kind, position),
+                    ).lastrowid
+                    conn.execute(
+                        "INSERT INTO bodies(rowid, body) VALUES (?, ?)", (rowid, body[:MAX_BODY_CHARS])
+                    )
+                conn.execute(
+                    "INSERT OR REPLACE INTO conversations(conv_id, title, log_count, step_count) "
+                    "VALUES (?, ?, ?, ?)",
+                    (conv_id, title, len(log), len(steps)),
+                )
+        return len(passages)
+
+    def retain(self, conv_ids) -> None:
+        """Drop every conversation not in *conv_ids*."""
+        keep = set(conv_ids)
+        with self._write_lock:
+            conn = self._conn()
+            gone = [
+                conv_id for (conv_id,) in conn.execute("SELECT conv_id FROM conversations")
+                if conv_id not in keep
+            ]
+            if gone:
+                with conn:
+                    self._remove(conn, gone)
+
+    @staticmethod
+    def _remove(conn: sqlite3.Connection, conv_ids) -> None:
+        for conv_id in conv_ids:
+            conn.execute(
+                "DELETE FROM bodies WHERE rowid IN (SELECT rowid FROM passages WHERE conv_id = ?)",
+                (conv_id,),
+            )
+            conn.execute("DELETE FROM passages WHERE conv_id = ?", (conv_id,))
+            conn.execute("DELETE FROM conversations WHERE conv_id = ?", (conv_id,))
+
+    def backfill(self, store, log: Callable[[str, int], None] | None = None) -> threading.Thread | None:
+        """Index the stored conversations missing from the index on a background thread."""
+        if self._backfill is not None and self._backfill.is_alive():
+            return self._backfill
+        missing = [conv_id for conv_id in store.conversation_ids() if conv_id not in self]
+        if not missing:
+            return None
+
+        def run():
+            for conv_id in missing:
+                try:
+                    stored = store.read(conv_id)
+                    if stored is not None:
+                        self.update(
+                            conv_id, stored.meta.get("title", ""), stored.log, stored.steps, only_new=True
+                        )
+                except Exception as e:
+                    if log is not None:
+                        log(f"Indexing conversation {conv_id} failed: {e}", 2)
+
+        self._backfill = threading.Thread(target=run, daemon=True, name="ConversationSearchBackfill")
+        self._backfill.start()
+        return self._backfill
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def search(self, query: str, limit: int = 10) -> list[ConversationHit]:
+        """Return the best-matching passage of up to *limit* conversations, best first.
+
+        Every word of *query* must occur in the passage.
+        """
+        match = fts_query(query, "AND")
+        if not match:
+            return []
+        conn = self._conn()
+        # Ranking every match of a very common word is slow, so only the
+        # newest MAX_CANDIDATES matching passages are ranked.
+        ranked = conn.execute(
+            "SELECT rowid, rank FROM (SELECT rowid, rank FROM bodies WHERE bodies MATCH ? "
+            "ORDER BY rowid DESC LIMIT ?) ORDER BY rank LIMIT ?",
+            (match, MAX_CANDIDATES, limit * CANDIDATES_PER_HIT),
+        ).fetchall()
+        if not ranked:
+            return []
+        placeholders = ",".join("?" * len(ranked))
+        details = {
+            rowid: rest for rowid, *rest in conn.execute(
+                "SELECT bodies.rowid, passages.conv_id, conversations.title, passages.kind, "
+                "passages.position, snippet(bodies, 0, '[', ']', '…', 12) FROM bodies "
+                "JOIN passages ON passages.rowid = bodies.rowid "
+                "JOIN conversations ON conversations.conv_id = passages.conv_id "
+                f"WHERE bodies MATCH ? AND bodies.rowid IN ({placeholders})",
+                (match, *(rowid for rowid, _ in ranked)),
+            )
+        }
+        rows = [(*details[rowid], rank) for rowid, rank in ranked if rowid in details]
+        hits: dict[str, ConversationHit] = {}
+        for conv_id, title, kind, position, snippet, rank in rows:
+            if conv_id not in hits:
+                hits[conv_id] = ConversationHit(conv_id, title or "", kind, position, snippet, -rank)
+                if len(hits) == limit:
+                    break
+        return list(hits.values())
@@ -0,0 +1,465 @@
+"""Append-only on-disk store for conversations.
+
+Every conversation has its own journal, ``<conv_id>.journal``, in the store
+directory.  A journal is a sequence of frames and every frame is one
+commit: either a full snapshot of the conversation, or what changed since
+the previous frame:
+
+- ``meta``: agent name, speed level and title, when any of them changed;
+- ``log`` / ``steps``: ``(kept, tail)``, the indexes of the previously
+  written items that are still there (``None``: all of them) followed by
+  the items appended since.
+
+:meth:`ConversationStore.flush` compares the live log entries and agent
+steps with the objects it wrote last time by identity, so an unchanged
+conversation costs no I/O and a finished run appends only its own entries
+and steps.  Frames carry their length and CRC and are fsync'd; a torn
+frame at the end of a journal (a crash mid-write) is cut off on load.  Once
+a journal has grown to twice the size of its last snapshot it is compacted
+into a single snapshot frame, written to a temporary file and renamed over
+the journal.
+
+Frames are encoded by :mod:`macllm.core.conversation_codec`.  Large
+strings, images and other blobs go to ``blobs/``, shared by all
+conversations; ``<conv_id>.refs`` lists the blobs a journal refers to.
+Blobs no journal refers to any more are deleted the next time the store
+is opened after a conversation was deleted or compacted.
+
+``index.json`` holds the tab order, the active tab, and a
+:class:`ConversationEntry` per conversation (title, agent, timestamps,
+journal size), so the tabs can be restored without opening a journal.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import operator
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from macllm.core.conversation_codec import BlobStore, decode_record, encode_record
+
+STORE_VERSION = 1
+COMPACT_MIN_BYTES = 256 * 1024
+COMPACT_RATIO = 2
+
+_HEADER = struct.Struct("<II")  # payload length, crc32
+_SAFE_ID_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+@dataclass
+class ConversationEntry:
+    """What ``index.json`` knows about a conversation."""
+
+    conv_id: str
+    title: str = "New Agent"
+    agent_name: str = "default"
+    speed_level: str = "normal"
+    created: float = 0.0
+    updated: float = 0.0
+    size: int = 0  # journal bytes
+
+
+@dataclass
+class StoredConversation:
+    conv_id: str
+    meta: dict
+    log: list
+    steps: list
+
+
+@dataclass
+class _Written:
+    """The state a journal replays to, as references to the live objects."""
+
+    meta: dict
+    log: list
+    steps: list
+    size: int = 0  # journal bytes
+    base_size: int = 0  # bytes of the snapshot the journal starts with
+    refs: set[str] = field(default_factory=set)  # blobs listed in the refs file
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def _diff(old: list, new: list) -> tuple[list[int] | None, list] | None:
+    """Describe *new* as ``[old[i] for i in kept] + tail``.
+
+    ``kept`` is ``None`` when all of *old* is kept.  Returns ``None`` when
+    *new* reorders old items or mixes them with new ones.
+    """
+    if len(new) >= len(old) and all(map(operator.is_, old, new)):
+        return None, new[len(old):]
+    positions = {id(item): i for i, item in enumerate(old)}
+    kept: list[int] = []
+    for item in new:
+        i = positions.get(id(item))
+        if i is None or old[i] is not item:
+            break
+        if kept and i <= kept[-1]:
+            return None
+        kept.append(i)
+    tail = new[len(kept):]
+    if any(id(item) in positions for item in tail):
+        return None
+    return kept, tail
+
+
+def _frame(payload: bytes) -> bytes:
+    return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _read_frames(data: bytes, blobs: BlobStore) -> tuple[list[tuple[dict, int]], int, bool]:
+    """Return the intact ``(record, frame length)`` pairs of a journal.
+
+    Also returns the length they span, and whether reading stopped at a
+    torn frame (rather than at the end or at a record that cannot be
+    decoded, e.g. because a blob is missing).
+    """
+    records: list[tuple[dict, int]] = []
+    offset = 0
+    while offset + _HEADER.size <= len(data):
+        length, crc = _HEADER.unpack_from(data, offset)
+        start = offset + _HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            return records, offset, True
+        try:
+            record = decode_record(payload, blobs)
+        except Exception:
+            return records, offset, False
+        if not isinstance(record, dict):
+            return records, offset, False
+        records.append((record, _HEADER.size + length))
+        offset = start + length
+    return records, offset, offset < len(data)
+
+
+def _replay(records: list[dict]) -> dict | None:
+    state = None
+    for record in records:
+        if "version" in record:
+            if record["version"] != STORE_VERSION:
+                return None
+            state = {
+                "meta": dict(record["meta"]),
+                "log": list(record["log"]),
+                "steps": list(record["steps"]),
+            }
+            continue
+        if state is None:
+            return None
+        if "meta" in record:
+            state["meta"] = dict(record["meta"])
+        for name in ("log", "steps"):
+            if name in record:
+                kept, tail = record[name]
+                items = state[name]
+                if kept is not None:
+                    items = [items[i] for i in kept]
+                state[name] = items + list(tail)
+    return state
+
+
+def _fsync_dir(directory: Path) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """Replace *path* with *data* so readers see either the old or the new file."""
+    tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path.parent)
+
+
+class ConversationStore:
+    """Per-conversation journals plus the tab index in *directory*."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()  # guards _written, _entries and the index
+        self._written: dict[str, _Written] = {}
+        self._entries: dict[str, ConversationEntry] = {}
+        self._index_data: str | None = None  # index.json as last written or read
+        self.blobs = BlobStore(self.directory / "blobs")
+
+    def _journal_path(self, conv_id: str) -> Path:
+        name = conv_id if _SAFE_ID_RE.match(conv_id) else hashlib.blake2b(
+            conv_id.encode("utf-8"), digest_size=16
+        ).hexdigest()
+        return self.directory / f"{name}.journal"
+
+    def _refs_path(self, conv_id: str) -> Path:
+        return self._journal_path(conv_id).with_suffix(".refs")
+
+    def _read_refs(self, conv_id: str) -> set[str]:
+        try:
+            return set(self._refs_path(conv_id).read_text().split())
+        except OSError:
+            return set()
+
+    def _add_refs(self, written: _Written, conv_id: str, refs: set[str]) -> None:
+        """List new blob references before the frame that uses them is written."""
+        new = refs - written.refs
+        if new:
+            with open(self._refs_path(conv_id), "a") as f:
+                f.write("".join(f"{digest}\n" for digest in sorted(new)))
+                f.flush()
+                os.fsync(f.fileno())
+            written.refs |= new
+
+    def has(self, conv_id: str) -> bool:
+        with self._lock:
+            return conv_id in self._written or conv_id in self._entries
+
+    def entry(self, conv_id: str) -> ConversationEntry | None:
+        with self._lock:
+            return self._entries.get(conv_id)
+
+    def _update_entry(self, conv_id: str, meta: dict, size: int) -> None:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(conv_id)
+            if entry is None:
+                entry = self._entries[conv_id] = ConversationEntry(conv_id, created=now)
+            entry.title = meta.get("title", entry.title)
+            entry.agent_name = meta.get("agent_name", entry.agent_name)
+            entry.speed_level = meta.get("speed_level", entry.speed_level)
+            entry.updated = now
+            entry.size = size
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+    def flush(self, conv_id: str, meta: dict, log: list, steps: list) -> bool:
+        """Commit what changed since the last flush; return whether anything was written.
+
+        *log* and *steps* are the items to persist, in order.  Items are
+        assumed not to change once written: only additions, removals and
+        *meta* are detected.
+        """
+        with self._lock:
+            written = self._written.get(conv_id)
+        if written is None:
+            self._write_snapshot(conv_id, meta, log, steps)
+            return True
+        with written.lock:
+            record: dict = {}
+            if meta != written.meta:
+                record["meta"] = dict(meta)
+            for name, items, old in (("log", log, written.log), ("steps", steps, written.steps)):
+                change = _diff(old, items)
+                if change is None:
+                    self._write_snapshot(conv_id, meta, log, steps, written)
+                    return True
+                kept, tail = change
+                if kept is not None or tail:
+                    record[name] = (kept, tail)
+            if not record:
+                return False
+            self.directory.mkdir(parents=True, exist_ok=True)
+            refs: set[str] = set()
+            data = _frame(encode_record(record, self.blobs, refs))
+            self._add_refs(written, conv_id, refs)
+            with open(self._journal_path(conv_id), "ab") as f:
+                try:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                except OSError:
+                    f.truncate(written.size)  # never leave a partial frame to append after
+                    raise
+            written.meta, written.log, written.steps = dict(meta), list(log), list(steps)
+            written.size += len(data)
+            if written.size > max(COMPACT_MIN_BYTES, COMPACT_RATIO * written.base_size):
+                self._write_snapshot(conv_id, meta, log, steps, written)
+            else:
+                self._update_entry(conv_id, meta, written.size)
+        return True
+
+    def compact(self, conv_id: str) -> bool:
+        """Rewrite the journal of *conv_id* as a single snapshot frame."""
+        with self._lock:
+            written = self._written.get(conv_id)
+        if written is None:
+            return False
+        with written.lock:
+            self._write_snapshot(conv_id, written.meta, written.log, written.steps, written)
+        return True
+
+    def archive(self, conv_id: str) -> bool:
+        """Compact the journal of *conv_id* and stop holding its log and steps.
+
+        The conversation stays in the index; :meth:`load` reads it again.
+        """
+        with self._lock:
+            written = self._written.get(conv_id)
+        if written is None:
+            return False
+        with written.lock:
+            if written.size > written.base_size:
+                self._write_snapshot(conv_id, written.meta, written.log, written.steps, written)
+            with self._lock:
+                if self._written.get(conv_id) is written:
+                    del self._written[conv_id]
+        return True
+
+    def _write_snapshot(self, conv_id, meta, log, steps, written: _Written | None = None) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        refs: set[str] = set()
+        data = _frame(encode_record({
+            "version": STORE_VERSION,
+            "meta": dict(meta),
+            "log": list(log),
+            "steps": list(steps),
+        }, self.blobs, refs))
+        # The refs file keeps the old references until the new journal is in place.
+        previous = written.refs if written is not None else self._read_refs(conv_id)
+        with open(self._refs_path(conv_id), "a") as f:
+            f.write("".join(f"{digest}\n" for digest in sorted(refs - previous)))
+        atomic_write(self._journal_path(conv_id), data)
+        atomic_write(self._refs_path(conv_id), "".join(f"{d}\n" for d in sorted(refs)).encode())
+        if previous - refs:
+            self._mark_garbage()
+        if written is None:
+            written = _Written(dict(meta), list(log), list(steps))
+            with self._lock:
+                self._written[conv_id] = written
+        else:
+            written.meta, written.log, written.steps = dict(meta), list(log), list(steps)
+        written.size = written.base_size = len(data)
+        written.refs = refs
+        self._update_entry(conv_id, meta, written.size)
+
+    def write_index(self, conv_ids: list[str], active_index: int) -> bool:
+        """Record the tab order, then delete journals of conversations not in it."""
+        with self._lock:
+            data = json.dumps({
+                "version": STORE_VERSION,
+                "conversations": [
+                    asdict(self._entries.get(conv_id) or ConversationEntry(conv_id))
+                    for conv_id in conv_ids
+                ],
+                "active_index": active_index,
+            })
+            if data == self._index_data:
+                return False
+            self.directory.mkdir(parents=True, exist_ok=True)
+            atomic_write(self.directory / "index.json", data.encode("utf-8"))
+            self._index_data = data
+            live = {self._journal_path(conv_id).name for conv_id in conv_ids}
+            for conv_id in [c for c in self._written if self._journal_path(c).name not in live]:
+                del self._written[conv_id]
+            for conv_id in [c for c in self._entries if self._journal_path(c).name not in live]:
+                del self._entries[conv_id]
+            for path in self.directory.glob("*.journal"):
+                if path.name not in live:
+                    path.unlink(missing_ok=True)
+                    path.with_suffix(".refs").unlink(missing_ok=True)
+                    self._mark_garbage()
+        return True
+
+    def _mark_garbage(self) -> None:
+        (self.directory / "gc.pending").touch()
+
+    def collect_blobs(self, conv_ids) -> int:
+        """Delete blobs none of *conv_ids* refers to; return how many were deleted.
+
+        Must not run while conversations are being flushed; the store calls
+        it from :meth:`read_index`, before anything is written.
+        """
+        live: set[str] = set()
+        for conv_id in conv_ids:
+            live |= self._read_refs(conv_id)
+        dead = self.blobs.digests() - live
+        self.blobs.remove(dead)
+        (self.directory / "gc.pending").unlink(missing_ok=True)
+        return len(dead)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+    def read_index(self) -> tuple[list[ConversationEntry], int] | None:
+        """Return the conversation entries in tab order and the active index."""
+        try:
+            with open(self.directory / "index.json", "r") as f:
+                data = f.read()
+            index = json.loads(data)
+            if index.get("version") != STORE_VERSION:
+                return None
+            entries = [ConversationEntry(**item) for item in index["conversations"]]
+            active_index = int(index.get("active_index", 0))
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+        with self._lock:
+            self._entries = {entry.conv_id: entry for entry in entries}
+            self._index_data = data
+        if (self.directory / "gc.pending").exists():
+            self.collect_blobs([entry.conv_id for entry in entries])
+        return [ConversationEntry(**asdict(entry)) for entry in entries], active_index
+
+    def conversation_ids(self) -> list[str]:
+        """Return the ids in the index as last read or written."""
+        with self._lock:
+            return list(self._entries)
+
+    def read(self, conv_id: str) -> StoredConversation | None:
+        """Replay the journal of *conv_id* without repairing it or tracking it for flushes.
+
+        Safe to call from any thread, e.g. to index conversations that are
+        not loaded.
+        """
+        try:
+            data = self._journal_path(conv_id).read_bytes()
+        except OSError:
+            return None
+        frames, _, _ = _read_frames(data, self.blobs)
+        state = _replay([record for record, _ in frames])
+        if state is None:
+            return None
+        return StoredConversation(conv_id, state["meta"], state["log"], state["steps"])
+
+    def load(self, conv_id: str) -> StoredConversation | None:
+        """Replay the journal of *conv_id*, cutting off a torn final frame."""
+        path = self._journal_path(conv_id)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        frames, end, torn = _read_frames(data, self.blobs)
+        state = _replay([record for record, _ in frames])
+        if state is None:
+            return None
+        if torn:
+            with open(path, "r+b") as f:
+                f.truncate(end)
+                os.fsync(f.fileno())
+        base_size = 0
+        for record, length in frames:
+            if "version" in record:
+                base_size = length
+        with self._lock:
+            self._written[conv_id] = _Written(
+                dict(state["meta"]), list(state["log"]), list(state["steps"]),
+                size=end, base_size=base_size, refs=self._read_refs(conv_id),
+            )
+        return StoredConversation(conv_id, state["meta"], state["log"], state["steps"])
@@ -0,0 +1,266 @@
+"""NDJSON export of conversation logs, and streaming run statistics over exports.
+
+Each conversation is exported to ``<conv_id>.ndjson``, one log entry per
+line::
+
+    {"conv_id": "...", "position": 3, "kind": "step", "timestamp": 1.7e9,
+     "tokens": 150, "payload": {...}}
+
+:class:`LogExporter` only appends the entries past those already in the
+file, so the persistence writer can call it after every save and the
+files grow as the log does.  Existing logs are exported with
+``python -m macllm.core.log_export export``.
+
+The reader side never holds more than one line plus the runs still open:
+:func:`iter_records` yields lines from any number of files, :func:`iter_runs`
+folds each ``run_start`` ... ``run_end`` span into a :class:`RunStats`, and
+:func:`summarize` aggregates those.  ``python -m macllm.core.log_export stats
+DIR`` prints the summary.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+SUFFIX = ".ndjson"
+
+
+def export_record(conv_id: str, position: int, item) -> dict:
+    """Return the JSON object exported for the log entry at *position*."""
+    return {
+        "conv_id": conv_id,
+        "position": position,
+        "kind": item.kind,
+        "timestamp": item.timestamp,
+        "tokens": item.tokens,
+        "payload": item.payload,
+    }
+
+
+def _line(record: dict) -> bytes:
+    return (json.dumps(record, ensure_ascii=False, default=repr) + "\n").encode("utf-8")
+
+
+def _complete_lines(path: Path) -> int:
+    """Count the lines of *path*, cutting off a partial last line."""
+    count = size = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            count += 1
+            size += len(line)
+    if size != path.stat().st_size:
+        os.truncate(path, size)
+    return count
+
+
+class LogExporter:
+    """Appends conversation log entries to per-conversation NDJSON files."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._counts: dict[str, int] = {}  # conv_id -> entries in its file
+
+    def path(self, conv_id: str) -> Path:
+        return self.directory / f"{conv_id}{SUFFIX}"
+
+    def export(self, conv_id: str, log: list) -> int:
+        """Append the entries of *log* not yet exported; return how many were written.
+
+        If *log* is shorter than the export (the conversation was reset),
+        the file is rewritten.
+        """
+        with self._lock:
+            path = self.path(conv_id)
+            count = self._counts.get(conv_id)
+            if count is None:
+                count = _complete_lines(path) if path.exists() else 0
+            mode = "ab"
+            if count > len(log):
+                count, mode = 0, "wb"
+            if count == len(log):
+                self._counts[conv_id] = count
+                return 0
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(path, mode) as f:
+                for position in range(count, len(log)):
+                    f.write(_line(export_record(conv_id, position, log[position])))
+            self._counts[conv_id] = len(log)
+            return len(log) - count
+
+    def export_store(self, store) -> int:
+        """Export every conversation in *store*, one at a time; return the entries written."""
+        written = 0
+        for conv_id in store.conversation_ids():
+            stored = store.read(conv_id)
+            if stored is not None:
+                written += self.export(conv_id, stored.log)
+        return written
+
+
+# ----------------------------------------------------------------------
+# Reading
+# ----------------------------------------------------------------------
+def iter_records(paths: Iterable[Path | str]) -> Iterator[dict]:
+    """Yield the records of the export files in *paths* (directories are searched).
+
+    Lines that are not valid JSON objects are skipped.
+    """
+    for path in map(Path, paths):
+        files = sorted(path.rglob(f"*{SUFFIX}")) if path.is_dir() else [path]
+        for file in files:
+            with open(file, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(record, dict):
+                        yield record
+
+
+@dataclass
+class RunStats:
+    """One agent run: from its ``run_start`` to its ``run_end`` entry."""
+
+    conv_id: str
+    started: float
+    status: str | None = None
+    latency_s: float | None = None
+    steps: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    tool_calls: Counter = field(default_factory=Counter)
+
+
+def _payload(record: dict) -> dict:
+    payload = record.get("payload")
+    return payload if isinstance(payload, dict) else {}
+
+
+def iter_runs(records: Iterable[dict]) -> Iterator[RunStats]:
+    """Yield a :class:`RunStats` for every completed run in *records*.
+
+    Step tokens and tool calls are summed per run.  The run's own totals
+    and ``elapsed_seconds`` from ``run_end`` take precedence when present.
+    Runs without a ``run_end`` are dropped.
+    """
+    open_runs: dict[str, RunStats] = {}
+    for record in records:
+        conv_id, kind, payload = record.get("conv_id"), record.get("kind"), _payload(record)
+        if kind == "run_start":
+            open_runs[conv_id] = RunStats(conv_id, float(record.get("timestamp") or 0.0))
+            continue
+        run = open_runs.get(conv_id)
+        if run is None:
+            continue
+        if kind == "step":
+            run.steps += 1
+            usage = payload.get("token_usage")
+            if isinstance(usage, dict):
+                run.input_tokens += int(usage.get("input_tokens") or 0)
+                run.output_tokens += int(usage.get("output_tokens") or 0)
+            for call in payload.get("tool_calls") or ():
+                if isinstance(call, dict) and call.get("name"):
+                    run.tool_calls[call["name"]] += 1
+        elif kind == "run_end":
+            del open_runs[conv_id]
+            run.status = payload.get("status")
+            elapsed = payload.get("elapsed_seconds")
+            if elapsed is None and record.get("timestamp") is not None:
+                elapsed = float(record["timestamp"]) - run.started
+            run.latency_s = elapsed
+            if payload.get("input_tokens") or payload.get("output_tokens"):
+                run.input_tokens = int(payload.get("input_tokens") or 0)
+                run.output_tokens = int(payload.get("output_tokens") or 0)
+            yield run
+
+
+@dataclass
+class ExportSummary:
+    """Aggregate statistics over the runs of many exported conversations."""
+
+    runs: int = 0
+    conversations: int = 0
+    statuses: Counter = field(default_factory=Counter)
+    latency_mean_s: float | None = None
+    latency_p50_s: float | None = None
+    latency_p95_s: float | None = None
+    steps: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    tool_calls: Counter = field(default_factory=Counter)
+
+
+def summarize(runs: Iterable[RunStats]) -> ExportSummary:
+    """Aggregate *runs*; only their latencies and conversation ids are kept in memory."""
+    summary = ExportSummary()
+    latencies: list[float] = []
+    conversations: set[str] = set()
+    for run in runs:
+        summary.runs += 1
+        conversations.add(run.conv_id)
+        summary.statuses[run.status or "unknown"] += 1
+        summary.steps += run.steps
+        summary.input_tokens += run.input_tokens
+        summary.output_tokens += run.output_tokens
+        summary.tool_calls.update(run.tool_calls)
+        if run.latency_s is not None:
+            latencies.append(run.latency_s)
+    summary.conversations = len(conversations)
+    if latencies:
+        latencies.sort()
+        summary.latency_mean_s = statistics.fmean(latencies)
+        summary.latency_p50_s = latencies[(len(latencies) - 1) // 2]
+        summary.latency_p95_s = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+    return summary
+
+
+def _format(summary: ExportSummary) -> str:
+    def seconds(value: Any) -> str:
+        return "-" if value is None else f"{value:.2f}s"
+
+    lines = [
+        f"runs: {summary.runs} in {summary.conversations} conversation(s)",
+        "status: " + ", ".join(f"{k}={v}" for k, v in summary.statuses.most_common()),
+        f"latency: mean={seconds(summary.latency_mean_s)} p50={seconds(summary.latency_p50_s)} "
+        f"p95={seconds(summary.latency_p95_s)}",
+        f"steps: {summary.steps}",
+        f"tokens: input={summary.input_tokens} output={summary.output_tokens}",
+        "tools: " + ", ".join(f"{k}={v}" for k, v in summary.tool_calls.most_common()),
+    ]
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Export conversation logs as NDJSON and summarise exports.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Export all saved conversations.")
+    export.add_argument("--out", type=Path, help="Output directory (default: the app's export directory).")
+    stats = commands.add_parser("stats", help="Print run statistics of export files or directories.")
+    stats.add_argument("paths", nargs="+", type=Path)
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        from macllm.core.persistence import get_conversation_store, get_export_dir
+
+        out = args.out or get_export_dir()
+        written = LogExporter(out).export_store(get_conversation_store())
+        print(f"Exported {written} entries to {out}")
+    else:
+        print(_format(summarize(iter_runs(iter_records(args.paths)))))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,15 +1,26 @@
-import os
 import pickle
 import threading
+from dataclasses import asdict
 from pathlib import Path
 
 from macllm.agents import get_agent_class
 from macllm.core.chat_history import Conversation
 from macllm.core.context import register_conversation
-from macllm.core.conversation_log import log_from_messages, persistable_log
+from macllm.core.conversation_log import (
+    ConversationLog,
+    log_from_messages,
+    persistable_log,
+)
+from macllm.core.conversation_search import ConversationSearchIndex
+from macllm.core.conversation_store import ConversationStore
+from macllm.core.log_export import LogExporter
 from macllm.core.storage import get_storage_dir
 
-_save_lock = threading.Lock()
+_stores: dict[Path, ConversationStore] = {}
+_searches: dict[Path, ConversationSearchIndex] = {}
+_exporters: dict[Path, LogExporter] = {}
+_stores_lock = threading.Lock()
+_index_lock = threading.Lock()  # keeps index writes in the order their tab lists were taken
 
 def get_latest_path() -> Path:
     return get_storage_dir() / "latest.pkl"
@@ -88,53 +99,235 @@ def clear_conversation() -> bool:
 # ---------------------------------------------------------------------------
 # Multi-conversation persistence
 # ---------------------------------------------------------------------------
-def _serialize_conversation(conversation) -> dict | None:
-    """Serialize a single Conversation to a plain dict."""
-    if conversation.agent is None:
-        return None
-    conv_id = conversation.conv_id
-    try:
-        return {
-            'conv_id': conv_id,
-            'steps': conversation.agent.memory.steps,
-            'conversation_log': _conversation_log(conversation),
-            'agent_name': getattr(conversation.agent, 'macllm_name', 'default'),
-            'speed_level': getattr(conversation, 'speed_level', 'normal'),
-            'title': getattr(conversation, 'title', 'New'),
-        }
-    except Exception:
+def get_store_dir() -> Path:
+    return get_storage_dir() / "conversations"
+
+
+def get_conversation_store() -> ConversationStore:
+    """Return the store for the current storage directory."""
+    directory = get_store_dir()
+    with _stores_lock:
+        store = _stores.get(directory)
+        if store is None:
+            store = _stores[directory] = ConversationStore(directory)
+        return store
+
+
+def get_conversation_search() -> ConversationSearchIndex:
+    """Return the full-text index for the current storage directory."""
+    directory = get_store_dir()
+    with _stores_lock:
+        search = _searches.get(directory)
+        if search is None:
+            search = _searches[directory] = ConversationSearchIndex(directory / "search.sqlite")
+        return search
+
+
+def get_export_dir() -> Path:
+    return get_storage_dir() / "exports"
+
+
+def get_log_exporter() -> LogExporter | None:
+    """Return the NDJSON exporter, or ``None`` unless ``[conversations] export_logs`` is set."""
+    from macllm.core.config import get_runtime_config
+
+    if not get_runtime_config().conversations.export_logs:
         return None
+    directory = get_export_dir()
+    with _stores_lock:
+        exporter = _exporters.get(directory)
+        if exporter is None:
+            exporter = _exporters[directory] = LogExporter(directory)
+        return exporter
+
+
+def _conversation_meta(conversation) -> dict:
+    agent = conversation.agent if conversation.agent is not None else conversation.agent_cls
+    return {
+        'agent_name': getattr(agent, 'macllm_name', 'default') or 'default',
+        'speed_level': getattr(conversation, 'speed_level', 'normal'),
+        'title': getattr(conversation, 'title', 'New'),
+    }
+
+
+def _persisted_entries(conversation) -> list:
+    """Return a snapshot of the live log entries, without copying them.
+
+    The log only holds durable facts, so it is persisted as is; the
+    snapshot keeps entries an agent thread appends meanwhile for the next
+    flush.
+    """
+    log = getattr(conversation, 'conversation_log', None)
+    if not isinstance(log, list):
+        return []
+    return list(log)
+
+
+def _persisted_steps(conversation) -> list | None:
+    """Return the agent steps, or ``None`` for a conversation that never had any."""
+    if conversation.agent is not None:
+        return list(conversation.agent.memory.steps)
+    restored = getattr(conversation, '_restored_steps', None)
+    return list(restored) if restored is not None else None
+
+
+def flush_conversation(conversation) -> bool:
+    """Write the unsaved changes of one conversation; ``False`` if it has nothing to persist."""
+    steps = _persisted_steps(conversation)
+    if steps is None:
+        return False
+    meta, entries = _conversation_meta(conversation), _persisted_entries(conversation)
+    get_conversation_store().flush(conversation.conv_id, meta, entries, steps)
+    written = [(conversation.conv_id, meta['title'], entries, steps)]
+    _update_search(written, None)
+    _export_logs(written)
+    return True
 
 
 def save_all_conversations(conversation_history) -> bool:
-    """Persist every conversation in *conversation_history* to disk.
+    """Flush every changed conversation to the store and record the tab order."""
+    return save_conversations(conversation_history)
 
-    Thread-safe: multiple agent threads may trigger saves concurrently.
+
+def save_conversations(conversation_history, conv_ids=None) -> bool:
+    """Flush the conversations in *conv_ids* (all if ``None``) and record the tab order.
+
+    Conversations the store has not seen yet are always written.
+    Thread-safe: each conversation journal is written under its own lock,
+    so agent threads finishing at the same time do not wait on each other.
+    Conversations that were never loaded since startup are left alone.
+    Written conversations are then added to the full-text index and, if
+    enabled, appended to their NDJSON export.
     """
-    with _save_lock:
+    store = get_conversation_store()
+    ok = True
+    saved = set()
+    written = []
+    for conv in list(conversation_history.conversations):
+        if not getattr(conv, 'materialized', True):
+            continue
+        if conv_ids is not None and conv.conv_id not in conv_ids and store.has(conv.conv_id):
+            continue
+        steps = _persisted_steps(conv)
+        if steps is None:
+            continue
+        meta, entries = _conversation_meta(conv), _persisted_entries(conv)
         try:
-            entries = []
-            for conv in conversation_history.conversations:
-                entry = _serialize_conversation(conv)
-                if entry is not None:
-                    entries.append(entry)
-            data = {
-                'conversations': entries,
-                'active_index': conversation_history.active_index,
-            }
-            with open(get_conversations_path(), 'wb') as f:
-                pickle.dump(data, f)
-            return True
+            store.flush(conv.conv_id, meta, entries, steps)
+            saved.add(conv.conv_id)
+            written.append((conv.conv_id, meta['title'], entries, steps))
+        except Exception:
+            ok = False
+    with _index_lock:
+        conv_ids = [
+            conv.conv_id for conv in conversation_history.conversations
+            if conv.conv_id in saved or store.has(conv.conv_id)
+        ]
+        try:
+            index_changed = store.write_index(conv_ids, conversation_history.active_index)
         except Exception:
             return False
+    _update_search(written, conv_ids if index_changed else None)
+    _export_logs(written)
+    return ok
+
+
+def _update_search(written, conv_ids) -> None:
+    """Index the conversations just written; drop deleted ones if *conv_ids* is given."""
+    try:
+        search = get_conversation_search()
+        for conv_id, title, entries, steps in written:
+            search.update(conv_id, title, entries, steps)
+        if conv_ids is not None:
+            search.retain(conv_ids)
+    except Exception:
+        pass  # the index is derived state; the next save or backfill catches up
+
+
+def _export_logs(written) -> None:
+    """Append the new log entries of the conversations just written to their exports."""
+    try:
+        exporter = get_log_exporter()
+        if exporter is not None:
+            for conv_id, _title, entries, _steps in written:
+                exporter.export(conv_id, entries)
+    except Exception:
+        pass  # exports are derived from the journals; ``log_export export`` rebuilds them
+
+
+def _restore_conversation(conv_id, meta, log, steps) -> Conversation:
+    conv = Conversation()
+    conv.conv_id = conv_id
+    _apply_meta(conv, meta)
+    conv.conversation_log = ConversationLog(log)
+    conv._restored_steps = steps
+    register_conversation(conv)
+    return conv
+
+
+def _apply_meta(conv, meta) -> None:
+    conv.speed_level = meta['speed_level']
+    conv.title = meta['title']
+    conv.agent_cls = get_agent_class(meta['agent_name'])
+
+
+def materialize_conversation(conv) -> bool:
+    """Load the log and steps of a conversation restored from the index.
+
+    The agent is not created here; the restored steps are attached when
+    the conversation first creates it.
+    """
+    conv.materialized = True
+    stored = get_conversation_store().load(conv.conv_id)
+    if stored is None:
+        return False
+    try:
+        _apply_meta(conv, stored.meta)
+    except KeyError:
+        pass
+    conv.conversation_log = ConversationLog(stored.log)
+    conv._restored_steps = stored.steps
+    return True
 
 
 def load_all_conversations(conversation_history) -> bool:
-    """Restore conversations from disk into *conversation_history*.
+    """Restore the tabs of *conversation_history* from the store index.
 
-    Falls back to migrating the legacy single-conversation file if the
-    multi-conversation file doesn't exist yet.
+    Only the index is read: each conversation gets its id, title, agent
+    and speed, and its log and steps are read from its journal when it is
+    first activated or receives a query (:func:`materialize_conversation`).
+
+    Falls back to the legacy ``conversations.pkl`` (and before that
+    ``latest.pkl``) while the store has no index yet; the next save moves
+    those conversations into the store.
     """
+    store = get_conversation_store()
+    index = store.read_index()
+    if index is None:
+        return _load_legacy_conversations(conversation_history)
+    entries, active_index = index
+    if not entries:
+        return False
+
+    conversations = []
+    for entry in entries:
+        conv = Conversation()
+        conv.conv_id = entry.conv_id
+        try:
+            _apply_meta(conv, asdict(entry))
+        except KeyError:
+            pass  # agent no longer exists; keep the default
+        conv.materialized = False
+        register_conversation(conv)
+        conversations.append(conv)
+
+    conversation_history.conversations.clear()
+    conversation_history.conversations.extend(conversations)
+    conversation_history.active_index = max(0, min(active_index, len(conversations) - 1))
+    return True
+
+
+def _load_legacy_conversations(conversation_history) -> bool:
     path = get_conversations_path()
 
     # Migration path: legacy latest.pkl -> single conversation
@@ -162,17 +355,16 @@ def load_all_conversations(conversation_history) -> bool:
         conversation_history.active_index = -1
 
         for entry in entries:
-            conv = Conversation()
-            conv.conv_id = entry['conv_id']
-            agent_name = entry['agent_name']
-            conv.speed_level = entry['speed_level']
-            conv.agent_cls = get_agent_class(agent_name)
-            conv._create_agent()
-            conv.agent.memory.steps = entry['steps']
-            conv.conversation_log = entry['conversation_log']
-            conv.title = entry['title']
-            register_conversation(conv)
-            conversation_history.conversations.append(conv)
+            conversation_history.conversations.append(_restore_conversation(
+                entry['conv_id'],
+                {
+                    'agent_name': entry['agent_name'],
+                    'speed_level': entry['speed_level'],
+                    'title': entry['title'],
+                },
+                list(entry['conversation_log']),
+                entry['steps'],
+            ))
 
         saved_index = data['active_index']
         conversation_history.active_index = max(0, min(saved_index, len(entries) - 1))
@@ -0,0 +1,129 @@
+"""Compare the conversation store against pickling a synthetic agent history.
+
+    uv run python -m macllm.core.persistence_bench --turns 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import pickle
+import tempfile
+import time
+from pathlib import Path
+
+from macllm.core.conversation_log import message
+from macllm.core.conversation_store import ConversationStore
+
+
+def synthetic_history(turns: int, images_every: int = 50, seed: int = 0) -> tuple[list, list]:
+    """Return ``(log, steps)`` shaped like a long agent conversation.
+
+    Every action step carries the full model input (the same long system
+    prompt each time), a tool call, an observation and token usage; every
+    *images_every*-th turn also attaches a screenshot-sized image.
+    """
+    import random
+
+    from PIL import Image
+    from smolagents.memory import ActionStep, TaskStep, ToolCall
+    from smolagents.models import ChatMessage, ChatMessageToolCall, ChatMessageToolCallFunction, MessageRole
+    from smolagents.monitoring import Timing, TokenUsage
+
+    rng = random.Random(seed)
+    system_prompt = "You are a helpful assistant. " * 400
+    system = ChatMessage(role=MessageRole.SYSTEM, content=system_prompt)
+    log, steps = [], []
+    for turn in range(turns):
+        task = f"Question {turn}: summarise note {rng.randrange(10_000)}"
+        log.append(message("user", task))
+        steps.append(TaskStep(task=task))
+        observation = " ".join(f"line {turn}.{i} {rng.random():.6f}" for i in range(150))
+        images = None
+        if images_every and turn % images_every == 0:
+            images = [Image.new("RGB", (320, 200), (turn % 256, 80, 160))]
+        call = ChatMessageToolCall(
+            id=f"call_{turn}", type="function",
+            function=ChatMessageToolCallFunction(name="read_file", arguments={"path": f"/notes/{turn}.md"}),
+        )
+        steps.append(ActionStep(
+            step_number=turn + 1,
+            timing=Timing(start_time=float(turn), end_time=turn + 0.5),
+            model_input_messages=[system, ChatMessage(role=MessageRole.USER, content=task)],
+            tool_calls=[ToolCall(name="read_file", arguments={"path": f"/notes/{turn}.md"}, id=f"call_{turn}")],
+            model_output_message=ChatMessage(role=MessageRole.ASSISTANT, content="", tool_calls=[call]),
+            observations=observation,
+            observations_images=images,
+            token_usage=TokenUsage(input_tokens=2400 + turn, output_tokens=120),
+        ))
+        log.append(message("assistant", f"Note {turn} says {observation[:200]}"))
+    return log, steps
+
+
+def _size(directory: Path) -> int:
+    return sum(path.stat().st_size for path in directory.rglob("*") if path.is_file())
+
+
+def run(turns: int = 1000, images_every: int = 50, seed: int = 0) -> dict[str, float]:
+    """Save and load one *turns*-turn conversation with pickle and with the store.
+
+    Returns ``{"pickle_save_s", "pickle_load_s", "pickle_bytes", "store_save_s",
+    "store_compact_s", "store_load_s", "store_bytes"}``; store bytes include the
+    blobs.  ``store_compact_s`` rewrites the saved conversation as one snapshot,
+    as compaction and archiving do.
+    """
+    log, steps = synthetic_history(turns, images_every, seed)
+    meta = {"title": "Benchmark"}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "conversations.pkl"
+        started = time.perf_counter()
+        with open(path, "wb") as f:
+            pickle.dump({"conversation_log": log, "steps": steps, **meta}, f)
+        pickle_save_s = time.perf_counter() - started
+        started = time.perf_counter()
+        with open(path, "rb") as f:
+            pickle.load(f)
+        pickle_load_s = time.perf_counter() - started
+        pickle_bytes = path.stat().st_size
+
+        directory = Path(tmp) / "store"
+        started = time.perf_counter()
+        store = ConversationStore(directory)
+        store.flush("bench", meta, log, steps)
+        store_save_s = time.perf_counter() - started
+        started = time.perf_counter()
+        store.compact("bench")
+        store_compact_s = time.perf_counter() - started
+        started = time.perf_counter()
+        stored = ConversationStore(directory).load("bench")
+        store_load_s = time.perf_counter() - started
+        assert stored is not None and len(stored.steps) == len(steps)
+        store_bytes = _size(directory)
+    return {
+        "pickle_save_s": pickle_save_s,
+        "pickle_load_s": pickle_load_s,
+        "pickle_bytes": pickle_bytes,
+        "store_save_s": store_save_s,
+        "store_compact_s": store_compact_s,
+        "store_load_s": store_load_s,
+        "store_bytes": store_bytes,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark conversation persistence against pickle.")
+    parser.add_argument("--turns", type=int, default=1000)
+    parser.add_argument("--images-every", type=int, default=50, help="Attach an image every N turns (0: never).")
+    args = parser.parse_args(argv)
+
+    result = run(args.turns, args.images_every)
+    for name in ("pickle", "store"):
+        compact = f"  compact={result['store_compact_s']:.3f}s" if name == "store" else ""
+        print(
+            f"{name:>6}: save={result[f'{name}_save_s']:.3f}s{compact}  load={result[f'{name}_load_s']:.3f}s  "
+            f"size={result[f'{name}_bytes'] / 1e6:.2f}MB"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,173 @@
+"""Background writer for conversation persistence.
+
+Conversations used to be saved synchronously wherever state changed: on
+agent threads when a run ended and on the UI thread on every tab switch.
+:class:`PersistenceWriter` takes "conversation X changed" notifications
+instead, coalesces those that arrive within ``coalesce_window`` seconds of
+the first, and writes them on its own thread.  :meth:`flush` blocks until
+everything requested so far is on disk; the app calls it on quit.  A failed
+save keeps its conversations marked changed and is retried after
+``RETRY_DELAY`` seconds (or by the next flush).
+"""
+
+from __future__ import annotations
+
+import atexit
+import threading
+import time
+from typing import Callable
+
+from macllm.index.metrics import LatencyRecorder
+
+COALESCE_WINDOW = 0.5
+RETRY_DELAY = 2.0  # seconds between attempts after a failed save
+
+
+class PersistenceWriter:
+    """Call ``save(conv_ids)`` on a background thread for coalesced requests.
+
+    *save* receives the ids of the conversations marked changed (possibly
+    empty: only the tab order or active tab changed) and returns whether
+    everything was written.
+    """
+
+    def __init__(
+        self,
+        save: Callable[[set[str]], bool],
+        coalesce_window: float = COALESCE_WINDOW,
+        log: Callable[[str, int], None] | None = None,
+    ):
+        self._save = save
+        self.coalesce_window = coalesce_window
+        self._log = log or (lambda message, level: None)
+        self._cond = threading.Condition()
+        self._dirty: set[str] = set()
+        self._first_request: float | None = None  # monotonic time of the oldest unsaved request
+        self._retry_at = 0.0  # monotonic time before which a failed batch is not retried
+        self._requested = 0  # request sequence numbers
+        self._written = 0
+        self._flush_wanted = False
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+        self._latency = LatencyRecorder()  # oldest request in a batch -> on disk
+        self._write_time = LatencyRecorder()  # duration of the save call
+        self._counts = {"requests": 0, "saves": 0, "failures": 0}
+
+    def request(self, conv_id: str | None = None) -> None:
+        """Mark *conv_id* changed (``None``: only the tab order or active tab) and return."""
+        with self._cond:
+            if conv_id is not None:
+                self._dirty.add(conv_id)
+            if self._first_request is None:
+                self._first_request = time.monotonic()
+            self._requested += 1
+            self._counts["requests"] += 1
+            if self._stopping:
+                inline = True
+            else:
+                inline = False
+                self._ensure_thread()
+                self._cond.notify_all()
+        if inline:
+            self._write_batch()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Write pending requests now and wait until they are on disk.
+
+        Returns False if a save failed or *timeout* ran out first.
+        """
+        with self._cond:
+            target = self._requested
+            if self._written >= target:
+                return True
+            if self._thread is None or not self._thread.is_alive():
+                inline = True
+            else:
+                inline = False
+                failures = self._counts["failures"]
+                self._flush_wanted = True
+                self._cond.notify_all()
+                self._cond.wait_for(
+                    lambda: self._written >= target or self._counts["failures"] > failures, timeout
+                )
+                return self._written >= target
+        if inline:
+            return self._write_batch()
+        return True
+
+    def stop(self, timeout: float | None = 10.0) -> bool:
+        """Flush pending requests and end the writer thread."""
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        return flushed
+
+    def stats(self) -> dict:
+        """Return request/save counters and request-to-disk and write latencies."""
+        with self._cond:
+            counts = dict(self._counts)
+            pending = len(self._dirty) if self._first_request is not None else 0
+        return {
+            **counts,
+            "coalesced": counts["requests"] - counts["saves"],
+            "pending": pending,
+            "latency": self._latency.stats(),
+            "write": self._write_time.stats(),
+        }
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            if self._thread is None:
+                atexit.register(self.stop)
+            self._thread = threading.Thread(target=self._run, daemon=True, name="PersistenceWriter")
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._first_request is not None or self._stopping)
+                if self._first_request is None:
+                    return  # stopping with nothing left to write
+                deadline = max(self._first_request + self.coalesce_window, self._retry_at)
+                while not (self._flush_wanted or self._stopping):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            if not self._write_batch() and self._stopping:
+                return  # later requests write inline and retry what is left
+
+    def _write_batch(self) -> bool:
+        """Save the pending conversations; on failure they stay pending."""
+        with self._cond:
+            if self._first_request is None:
+                return True
+            conv_ids, self._dirty = self._dirty, set()
+            first_request, self._first_request = self._first_request, None
+            target = self._requested
+            self._flush_wanted = False
+        started = time.monotonic()
+        try:
+            ok = self._save(conv_ids)
+        except Exception as e:
+            self._log(f"Saving conversations failed: {e}", 2)
+            ok = False
+        finished = time.monotonic()
+        self._write_time.record(finished - started)
+        self._latency.record(finished - first_request)
+        with self._cond:
+            self._counts["saves"] += 1
+            if ok:
+                self._written = max(self._written, target)
+            else:
+                self._counts["failures"] += 1
+                self._dirty |= conv_ids
+                if self._first_request is None or first_request < self._first_request:
+                    self._first_request = first_request
+                self._retry_at = finished + RETRY_DELAY
+            self._cond.notify_all()
+        return ok
@@ -0,0 +1,113 @@
+"""Transient activity of the current agent run.
+
+Live tool-call lines ("Searching notes for ...") and the
+``planning_started``/``action_started`` markers only matter while a run is
+in progress.  They are kept out of the durable :class:`ConversationLog` in
+a bounded ring buffer per conversation, :class:`RunActivity`.  Agent
+threads append to it without a lock (``deque.append`` is atomic), and it is
+cleared at run boundaries.
+
+Every entry records ``after``, the length of the conversation log when it
+was added, so :func:`merge_activity` can interleave it with the durable
+entries in the order both happened.
+"""
+
+from __future__ import annotations
+
+import itertools
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+ACTIVITY_MARKER_KINDS = {"planning_started", "action_started"}
+ACTIVITY_CAPACITY = 64
+
+_sequence = itertools.count()
+
+
+@dataclass
+class ActivityEntry:
+    kind: str
+    timestamp: float
+    payload: Any
+    after: int  # conversation log length when added
+    seq: int
+
+
+class RunActivity:
+    """Bounded, append-mostly buffer of the transient entries of a run."""
+
+    def __init__(self, capacity: int = ACTIVITY_CAPACITY):
+        self._entries: deque[ActivityEntry] = deque(maxlen=capacity)
+        self._tool_calls_cleared = -1  # tool calls up to this sequence number are hidden
+
+    def append(self, kind: str, payload: Any, after: int) -> ActivityEntry:
+        item = ActivityEntry(kind, time.time(), payload, after, next(_sequence))
+        self._entries.append(item)
+        return item
+
+    def entries(self) -> list[ActivityEntry]:
+        """Visible entries, oldest first."""
+        cleared = self._tool_calls_cleared
+        return [
+            item for item in self._entries.copy()
+            if item.kind != "tool_call" or item.seq > cleared
+        ]
+
+    def __iter__(self) -> Iterator[ActivityEntry]:
+        return iter(self.entries())
+
+    def __len__(self) -> int:
+        return len(self.entries())
+
+    def latest(self, kind: str) -> ActivityEntry | None:
+        return next((item for item in reversed(self.entries()) if item.kind == kind), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    # ------------------------------------------------------------------
+    # Markers and live tool calls
+    # ------------------------------------------------------------------
+    def mark(self, kind: str, agent_name: str, after: int) -> None:
+        if kind not in ACTIVITY_MARKER_KINDS:
+            raise ValueError(f"Unknown activity marker: {kind}")
+        self.append(kind, agent_name, after)
+
+    def add_tool_call(self, tool_name: str, message_text: str, after: int) -> None:
+        self.append("tool_call", {"tool": tool_name, "message": message_text}, after)
+
+    def update_last_tool_message(self, message_text: str) -> None:
+        item = self.latest("tool_call")
+        if item is not None:
+            item.payload["message"] = message_text
+
+    def pop_last_tool_call(self) -> None:
+        item = self.latest("tool_call")
+        if item is not None:
+            try:
+                self._entries.remove(item)
+            except ValueError:
+                pass  # already rotated out
+
+    def tool_calls(self) -> list[dict]:
+        return [item.payload for item in self.entries() if item.kind == "tool_call"]
+
+    def clear_tool_calls(self) -> None:
+        """Hide the tool calls added so far (e.g. once their step has completed)."""
+        self._tool_calls_cleared = next(_sequence)
+
+
+def merge_activity(log, activity: RunActivity | None, start: int = 0) -> list:
+    """Return ``log[start:]`` with the visible activity entries interleaved in order."""
+    merged = []
+    position = start
+    for item in activity.entries() if activity is not None else ():
+        if item.after < start:
+            continue
+        merged.extend(log[position:item.after])
+        position = max(position, item.after)
+        merged.append(item)
+    merged.extend(log[position:])
+    return merged
@@ -0,0 +1,187 @@
+"""Persistent cache of read-only tool results.
+
+Tools opt in through ``@macllm_tool(cache=CachePolicy(namespace, ttl))``:
+a call with the same tool name and arguments within *ttl* seconds returns
+the stored result instead of running again, across runs, conversations
+and restarts.  Tools that change data declare the namespaces they
+affect with ``@macllm_tool(invalidates=(...))``; each of their calls drops
+every cached result in those namespaces, so e.g. ``cal_add_event`` clears
+``cal_get_events`` results.
+
+Results live in an SQLite table (``tool_cache.sqlite`` in the storage
+directory) opened in WAL mode with one connection per thread, like the
+conversation search index.  When the stored results exceed ``max_bytes``
+the least recently used ones are evicted.  Hit and miss counts per tool
+are kept for the running process.
+
+The app installs the cache with :func:`configure_tool_cache`; until then
+(in tests and scripts) tools always run.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+EVICT_BATCH = 64  # rows examined per eviction round
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """How the results of one tool are cached."""
+
+    namespace: str  # invalidated as a whole by write tools
+    ttl: float  # seconds a result stays valid; config can override per tool
+    on_hit: Callable[..., None] | None = None  # replays side effects, called with the call's arguments
+
+
+@dataclass
+class ToolCacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    invalidations: int = 0  # results dropped by write tools
+
+
+def cache_key(tool_name: str, arguments: dict) -> str:
+    """Return the key of a call of *tool_name* with *arguments* (a name -> value mapping)."""
+    text = json.dumps([tool_name, arguments], sort_keys=True, default=repr, ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ToolCache:
+    """Tool results by call key, with per-entry expiry and a size-capped LRU."""
+
+    def __init__(self, path: Path, max_bytes: int = 64 * 1024 * 1024, ttl: dict[str, float] | None = None):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttl_overrides = dict(ttl or {})
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._stats: dict[str, ToolCacheStats] = {}
+        self._stats_lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, namespace TEXT, tool TEXT, value TEXT, "
+                "size INTEGER, expires REAL, used REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_used ON results(used)")
+            conn.execute("CREATE INDEX IF NOT EXISTS results_namespace ON results(namespace)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            # A lost cache entry only costs a tool call.
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, tool_name: str, name: str, n: int = 1) -> None:
+        with self._stats_lock:
+            stats = self._stats.setdefault(tool_name, ToolCacheStats())
+            setattr(stats, name, getattr(stats, name) + n)
+
+    def ttl_for(self, tool_name: str, policy: CachePolicy) -> float:
+        return float(self.ttl_overrides.get(tool_name, policy.ttl))
+
+    # ------------------------------------------------------------------
+    # Reads and writes
+    # ------------------------------------------------------------------
+    def get(self, tool_name: str, key: str, now: float | None = None) -> str | None:
+        """Return the unexpired result stored under *key*, or ``None``."""
+        now = time.time() if now is None else now
+        conn = self._conn()
+        row = conn.execute("SELECT value, expires FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] <= now:
+            self._count(tool_name, "misses")
+            return None
+        with self._write_lock, conn:
+            conn.execute("UPDATE results SET used = ? WHERE key = ?", (now, key))
+        self._count(tool_name, "hits")
+        return row[0]
+
+    def put(
+        self, tool_name: str, namespace: str, key: str, value: str, ttl: float, now: float | None = None
+    ) -> None:
+        """Store *value* for *ttl* seconds, then evict down to ``max_bytes``."""
+        now = time.time() if now is None else now
+        size = len(value.encode("utf-8"))
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO results(key, namespace, tool, value, size, expires, used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, namespace, tool_name, value, size, now + ttl, now),
+                )
+                self._evict(conn, now)
+        self._count(tool_name, "stores")
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM results WHERE expires <= ?", (now,))
+        total = conn.execute("SELECT coalesce(sum(size), 0) FROM results").fetchone()[0]
+        while total > self.max_bytes:
+            oldest = conn.execute(
+                "SELECT key, size FROM results ORDER BY used LIMIT ?", (EVICT_BATCH,)
+            ).fetchall()
+            if not oldest:
+                break
+            for key, size in oldest:
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                total -= size
+
+    def invalidate(self, namespace: str, tool_name: str | None = None) -> int:
+        """Drop every result in *namespace*; *tool_name* is the write tool, for the stats."""
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                dropped = conn.execute("DELETE FROM results WHERE namespace = ?", (namespace,)).rowcount
+        if tool_name is not None:
+            self._count(tool_name, "invalidations", dropped)
+        return dropped
+
+    def clear(self) -> None:
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                conn.execute("DELETE FROM results")
+
+    # ------------------------------------------------------------------
+    # Statistics
+    # ------------------------------------------------------------------
+    def stats(self) -> dict[str, ToolCacheStats]:
+        """Hit, miss, store and invalidation counts per tool since startup."""
+        with self._stats_lock:
+            return {name: ToolCacheStats(**vars(stats)) for name, stats in self._stats.items()}
+
+    def usage(self) -> tuple[int, int]:
+        """Return ``(results, bytes)`` currently stored."""
+        return self._conn().execute("SELECT count(*), coalesce(sum(size), 0) FROM results").fetchone()
+
+
+_cache: ToolCache | None = None
+
+
+def configure_tool_cache(cache: ToolCache | None) -> None:
+    """Install *cache* for ``@macllm_tool``; ``None`` turns caching off."""
+    global _cache
+    _cache = cache
+
+
+def get_tool_cache() -> ToolCache | None:
+    return _cache
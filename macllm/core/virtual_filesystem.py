@@ -30,6 +30,7 @@ class Mount:
     subagent_access: str
     index: bool = False
     root_must_exist: bool = False
+    reindex_interval: float = 0.0
 
     def access(self, restricted: bool) -> str:
         return self.subagent_access if restricted else self.supervisor_access
@@ -102,6 +103,7 @@ def configured_mounts() -> list[Mount]:
             supervisor_access=config.supervisor_access,
             subagent_access=config.subagent_access,
             index=config.index,
+            reindex_interval=config.reindex_interval,
         )
         for name, config in get_runtime_config().resolved_filesystem_mounts().items()
     ]
@@ -0,0 +1 @@
+"""Building blocks for the note index maintained by :class:`FileTag`."""
@@ -0,0 +1,194 @@
+"""Approximate nearest-neighbour backends for large vector index segments.
+
+A backend builds a per-segment :class:`AnnIndex` that proposes candidate
+rows for a query; :class:`~macllm.index.vector_index.Generation` then scores
+only those rows exactly and applies the liveness mask.  Segments are
+immutable, so an ANN structure never has to support in-place updates:
+inserts land in small segments that are scanned exactly, deletes only
+clear mask bits, and the background merge builds a fresh structure for
+the merged segment.
+
+``ivf`` is an inverted file over spherical k-means centroids in plain
+numpy.  ``hnsw`` wraps ``faiss.IndexHNSWFlat`` (faiss ships with txtai)
+and is imported only when selected.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Protocol
+
+import numpy as np
+
+ANN_BACKENDS = {"exact", "ivf", "hnsw"}
+
+
+class AnnIndex(Protocol):
+    def candidates(self, query: np.ndarray, limit: int) -> np.ndarray:
+        """Return row numbers worth scoring exactly for the unit-length *query*."""
+
+    def save(self, stem: Path) -> None: ...
+
+
+class AnnBackend(Protocol):
+    name: str
+    min_rows: int  # smaller segments are scanned exactly
+
+    def build(self, segment) -> AnnIndex: ...
+
+    def load(self, stem: Path) -> AnnIndex | None: ...
+
+
+def _blocks(segment, block_rows: int = 16_384):
+    """Yield ``(start, float32 unit rows)`` for *segment* one block at a time."""
+    rows = len(segment.ids)
+    for start in range(0, rows, block_rows):
+        yield start, segment.unit_vectors(np.arange(start, min(rows, start + block_rows)))
+
+
+# ----------------------------------------------------------------------
+# IVF
+# ----------------------------------------------------------------------
+class IVFIndex:
+    """Rows grouped by nearest centroid; a search scans the ``nprobe`` closest lists."""
+
+    def __init__(self, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray, nprobe: int):
+        self.centroids = centroids  # (lists, dim) unit float32
+        self.order = order  # row numbers sorted by list
+        self.offsets = offsets  # list i holds order[offsets[i]:offsets[i + 1]]
+        self.nprobe = nprobe
+
+    def candidates(self, query: np.ndarray, limit: int) -> np.ndarray:
+        lists = len(self.centroids)
+        probe = min(self.nprobe, lists)
+        scores = self.centroids @ query
+        nearest = np.argpartition(-scores, probe - 1)[:probe] if probe < lists else range(lists)
+        rows = np.concatenate([self.order[self.offsets[i]:self.offsets[i + 1]] for i in nearest])
+        # Sorted rows read a memory-mapped segment front to back.
+        return np.sort(rows)
+
+    def save(self, stem: Path) -> None:
+        with open(f"{stem}.ivf.npz.tmp", "wb") as f:
+            np.savez(f, centroids=self.centroids, order=self.order, offsets=self.offsets)
+        Path(f"{stem}.ivf.npz.tmp").replace(f"{stem}.ivf.npz")
+
+
+class IVFBackend:
+    """Inverted file index; ``lists=0`` picks about ``sqrt(rows)`` lists.
+
+    Higher ``nprobe`` raises recall and latency together.
+    """
+
+    name = "ivf"
+
+    def __init__(
+        self,
+        nprobe: int = 16,
+        lists: int = 0,
+        min_rows: int = 10_000,
+        iterations: int = 10,
+        sample: int = 50_000,
+        seed: int = 0,
+    ):
+        self.nprobe = nprobe
+        self.lists = lists
+        self.min_rows = min_rows
+        self.iterations = iterations
+        self.sample = sample
+        self.seed = seed
+
+    def build(self, segment) -> IVFIndex:
+        rows = len(segment.ids)
+        lists = max(1, min(rows, self.lists or int(np.sqrt(rows))))
+        rng = np.random.default_rng(self.seed)
+        sample = segment.unit_vectors(np.sort(rng.choice(rows, min(rows, self.sample), replace=False)))
+        centroids = sample[rng.choice(len(sample), lists, replace=False)]
+        for _ in range(self.iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=lists)
+            empty = counts == 0
+            # Re-seed empty lists with random sample rows.
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = (sums / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+        labels = np.empty(rows, dtype=np.int32)
+        for start, block in _blocks(segment):
+            labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        order = np.argsort(labels, kind="stable").astype(np.int32)
+        offsets = np.searchsorted(labels[order], np.arange(lists + 1)).astype(np.int64)
+        return IVFIndex(centroids, order, offsets, self.nprobe)
+
+    def load(self, stem: Path) -> IVFIndex | None:
+        try:
+            with np.load(f"{stem}.ivf.npz") as data:
+                return IVFIndex(data["centroids"], data["order"], data["offsets"], self.nprobe)
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+# ----------------------------------------------------------------------
+# HNSW
+# ----------------------------------------------------------------------
+class HNSWIndex:
+    def __init__(self, index, ef_search: int):
+        self.index = index
+        self.ef_search = ef_search
+
+    def candidates(self, query: np.ndarray, limit: int) -> np.ndarray:
+        self.index.hnsw.efSearch = max(self.ef_search, limit)
+        _, rows = self.index.search(query.reshape(1, -1).astype(np.float32), limit)
+        return np.sort(rows[0][rows[0] >= 0])
+
+    def save(self, stem: Path) -> None:
+        import faiss
+
+        faiss.write_index(self.index, f"{stem}.hnsw.tmp")
+        Path(f"{stem}.hnsw.tmp").replace(f"{stem}.hnsw")
+
+
+class HNSWBackend:
+    """faiss HNSW graph; ``m`` sets graph degree, ``ef_search`` the search beam."""
+
+    name = "hnsw"
+
+    def __init__(self, m: int = 32, ef_construction: int = 80, ef_search: int = 64, min_rows: int = 10_000):
+        import faiss  # noqa: F401  (fail at configuration time, not mid-merge)
+
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.min_rows = min_rows
+
+    def build(self, segment) -> HNSWIndex:
+        import faiss
+
+        dim = segment.vectors.shape[1]
+        index = faiss.IndexHNSWFlat(dim, self.m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = self.ef_construction
+        for _, block in _blocks(segment):
+            index.add(np.ascontiguousarray(block, dtype=np.float32))
+        return HNSWIndex(index, self.ef_search)
+
+    def load(self, stem: Path) -> HNSWIndex | None:
+        import faiss
+
+        if not Path(f"{stem}.hnsw").exists():
+            return None
+        return HNSWIndex(faiss.read_index(f"{stem}.hnsw"), self.ef_search)
+
+
+def make_backend(name: str, **params) -> AnnBackend | None:
+    """Return the backend called *name* (``None`` for exact search).
+
+    Raises ``ImportError`` if ``hnsw`` is selected and faiss is missing.
+    """
+    if name == "exact":
+        return None
+    if name == "ivf":
+        return IVFBackend(**params)
+    if name == "hnsw":
+        return HNSWBackend(**params)
+    raise ValueError(f"Unknown ANN backend: {name}")
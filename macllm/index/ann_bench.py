@@ -0,0 +1,93 @@
+"""Measure ANN recall@k and latency against exact search on a synthetic corpus.
+
+    uv run python -m macllm.index.ann_bench --rows 200000 --backend ivf --nprobe 8 16 32
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from macllm.index.ann import make_backend
+from macllm.index.vector_index import VectorIndex
+
+
+def synthetic_corpus(rows: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, closer to real passage embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, rows // 200), dim)).astype(np.float32)
+    vectors = centers[rng.integers(len(centers), size=rows)]
+    vectors += 2.0 * rng.standard_normal((rows, dim)).astype(np.float32)
+    return vectors
+
+
+def run(
+    rows: int = 50_000,
+    dim: int = 384,
+    queries: int = 100,
+    k: int = 10,
+    backend: str = "ivf",
+    dtype: str = "float16",
+    seed: int = 0,
+    **params,
+) -> dict[str, float]:
+    """Index a synthetic corpus twice (exact and *backend*) and compare top-*k* hits.
+
+    Returns ``{"recall", "exact_ms", "ann_ms", "build_s"}``; latencies are
+    means per query.
+    """
+    corpus = synthetic_corpus(rows, dim, seed)
+    docs = [(str(i), vector, None) for i, vector in enumerate(corpus)]
+    rng = np.random.default_rng(seed + 1)
+    probes = corpus[rng.integers(rows, size=queries)] + 2.0 * rng.standard_normal((queries, dim))
+
+    exact = VectorIndex(dtype=dtype, background_compaction=False)
+    exact.index(docs)
+    started = time.perf_counter()
+    truth = [{doc_id for doc_id, _ in exact.search(q, k)} for q in probes]
+    exact_ms = (time.perf_counter() - started) * 1000 / queries
+
+    ann = make_backend(backend, min_rows=1, **params)
+    approximate = VectorIndex(dtype=dtype, background_compaction=False, ann=ann)
+    started = time.perf_counter()
+    approximate.index(docs)
+    build_s = time.perf_counter() - started
+    started = time.perf_counter()
+    found = [{doc_id for doc_id, _ in approximate.search(q, k)} for q in probes]
+    ann_ms = (time.perf_counter() - started) * 1000 / queries
+
+    recall = float(np.mean([len(t & f) / len(t) for t, f in zip(truth, found)]))
+    return {"recall": recall, "exact_ms": exact_ms, "ann_ms": ann_ms, "build_s": build_s}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ANN recall@k against exact search.")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--backend", default="ivf", choices=("ivf", "hnsw"))
+    parser.add_argument("--dtype", default="float16", choices=("float32", "float16", "int8"))
+    parser.add_argument(
+        "--nprobe", type=int, nargs="+", default=[16],
+        help="IVF lists scanned per query (ivf), or the HNSW search beam (hnsw).",
+    )
+    args = parser.parse_args(argv)
+
+    for value in args.nprobe:
+        params = {"nprobe": value} if args.backend == "ivf" else {"ef_search": value}
+        result = run(
+            args.rows, args.dim, args.queries, args.k, args.backend, args.dtype, **params
+        )
+        print(
+            f"{args.backend} {params}: recall@{args.k}={result['recall']:.3f}  "
+            f"exact={result['exact_ms']:.2f}ms  ann={result['ann_ms']:.2f}ms  "
+            f"build={result['build_s']:.1f}s"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
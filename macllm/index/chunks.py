@@ -0,0 +1,164 @@
+"""Split notes into overlapping passages for passage-level embeddings.
+
+Notes are cut at markdown headings first and then packed paragraph by
+paragraph into passages of at most ``max_chars`` characters.  Each passage
+repeats the tail of its predecessor so a sentence spanning a boundary is
+still findable.  Every chunk has a stable id ``<path>#<byte offset>:<hash>``
+so only passages whose content moved or changed need new embeddings.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from dataclasses import dataclass
+
+CHUNK_CHARS = 1000
+CHUNK_OVERLAP = 200
+
+_HEADING_RE = re.compile(r"^#{1,6}\s+\S", re.MULTILINE)
+_PARAGRAPH_RE = re.compile(r"\n[ \t]*\n")
+_CHUNK_ID_RE = re.compile(r"^(?P<path>.+)#(?P<offset>\d+):(?P<digest>[0-9a-f]+)$")
+
+
+@dataclass(frozen=True)
+class Chunk:
+    path: str
+    offset: int  # byte offset of the passage in the file
+    length: int  # byte length of the passage
+    digest: str  # hash of the indexed text
+    text: str  # indexed text: filename, heading and passage
+
+    @property
+    def chunk_id(self) -> str:
+        return f"{self.path}#{self.offset}:{self.digest}"
+
+
+def content_digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _byte_len(text: str) -> int:
+    return len(text.encode("utf-8", "surrogateescape"))
+
+
+def _clean(text: str) -> str:
+    """Replace undecodable bytes kept as surrogates for offset bookkeeping."""
+    return text.encode("utf-8", "surrogateescape").decode("utf-8", "replace")
+
+
+def parse_chunk_id(chunk_id: str) -> tuple[str, int, str] | None:
+    """Return ``(path, offset, digest)`` for a chunk id, ``None`` otherwise."""
+    match = _CHUNK_ID_RE.match(chunk_id)
+    if match is None:
+        return None
+    return match["path"], int(match["offset"]), match["digest"]
+
+
+def _sections(text: str) -> list[tuple[int, int, str]]:
+    """Return ``(start, end, heading)`` character spans split at headings."""
+    starts = [m.start() for m in _HEADING_RE.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    sections = []
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else len(text)
+        first_line = text[start:end].split("\n", 1)[0]
+        heading = first_line.lstrip("#").strip() if first_line.startswith("#") else ""
+        sections.append((start, end, heading))
+    return sections
+
+
+def _paragraphs(text: str, start: int, end: int, max_chars: int) -> list[tuple[int, int]]:
+    """Split ``text[start:end]`` into paragraph spans no longer than *max_chars*."""
+    spans = []
+    pos = start
+    for match in _PARAGRAPH_RE.finditer(text, start, end):
+        spans.append((pos, match.start()))
+        pos = match.end()
+    spans.append((pos, end))
+
+    result = []
+    for p_start, p_end in spans:
+        while p_end - p_start > max_chars:
+            cut = text.rfind(" ", p_start + max_chars // 2, p_start + max_chars)
+            cut = cut if cut > p_start else p_start + max_chars
+            result.append((p_start, cut))
+            p_start = cut
+        if text[p_start:p_end].strip():
+            result.append((p_start, p_end))
+    return result
+
+
+def split_passages(
+    text: str,
+    *,
+    max_chars: int = CHUNK_CHARS,
+    overlap: int = CHUNK_OVERLAP,
+) -> list[tuple[int, int, str]]:
+    """Return ``(start, end, heading)`` character spans covering *text*."""
+    passages = []
+    for sec_start, sec_end, heading in _sections(text):
+        current_start = None
+        current_end = None
+        for p_start, p_end in _paragraphs(text, sec_start, sec_end, max_chars):
+            if (
+                current_start is not None
+                and p_end - current_start > max_chars
+                # A lone heading line stays attached to the text below it.
+                and current_end - current_start > overlap
+            ):
+                passages.append((current_start, current_end, heading))
+                # Carry the tail of the previous passage into the next one.
+                tail = max(current_end - overlap, current_start)
+                boundary = text.find(" ", tail, current_end)
+                current_start = boundary + 1 if 0 <= boundary < p_start else p_start
+                if p_end - current_start > max_chars:
+                    current_start = p_start
+            if current_start is None:
+                current_start = p_start
+            current_end = p_end
+        if current_start is not None:
+            passages.append((current_start, current_end, heading))
+    return passages
+
+
+def chunk_text(path: str, text: str, **kwargs) -> list[Chunk]:
+    """Split *text* (the content of *path*) into chunks."""
+    filename = os.path.basename(path)
+    spans = split_passages(text, **kwargs)
+    if not spans:
+        indexed = filename
+        return [Chunk(path, 0, 0, content_digest(indexed), indexed)]
+
+    chunks = []
+    byte_pos = 0
+    char_pos = 0
+    for start, end, heading in spans:
+        byte_pos += _byte_len(text[char_pos:start])
+        char_pos = start
+        passage = text[start:end]
+        length = _byte_len(passage)
+        header = f"{filename}\n{_clean(heading)}" if heading else filename
+        indexed = f"{header}\n{_clean(passage)}"
+        chunks.append(Chunk(path, byte_pos, length, content_digest(indexed), indexed))
+    return chunks
+
+
+def chunk_file(path: str, max_bytes: int) -> list[Chunk]:
+    """Read up to *max_bytes* of a UTF-8 note and split it into chunks."""
+    with open(path, "rb") as f:
+        data = f.read(max_bytes)
+    text = data.decode("utf-8", errors="surrogateescape")
+    if "\0" in text:
+        raise ValueError("File appears to be binary")
+    return chunk_text(path, text)
+
+
+def read_passage(path: str, offset: int, length: int) -> str:
+    """Read a passage back from disk by byte range."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+    return data.decode("utf-8", errors="ignore")
@@ -0,0 +1,53 @@
+"""Embed large batches across worker processes.
+
+Each worker loads its own copy of the local embedding model once and
+encodes a slice of every batch it is handed.  The pool is only worth its
+start-up cost for large builds, so :class:`FileTag` creates it for the
+duration of one build and shuts it down afterwards.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+_worker_model = None
+
+
+def _init_worker(model_dir: str) -> None:
+    global _worker_model
+    os.environ["OMP_NUM_THREADS"] = "1"
+    import txtai
+
+    _worker_model = txtai.Embeddings(path=model_dir)
+
+
+def _encode(texts: list[str]) -> np.ndarray:
+    return np.asarray(_worker_model.batchtransform(texts), dtype=np.float32)
+
+
+class EncoderPool:
+    """Process pool that splits each batch evenly over its workers."""
+
+    def __init__(self, model_dir: str, processes: int):
+        self.processes = processes
+        self._executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_dir,),
+        )
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        size = -(-len(texts) // self.processes)
+        futures = [
+            self._executor.submit(_encode, texts[start:start + size])
+            for start in range(0, len(texts), size)
+        ]
+        return np.concatenate([future.result() for future in futures])
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
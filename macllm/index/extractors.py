@@ -0,0 +1,367 @@
+"""Text extractors for indexing documents that are not plain UTF-8 notes.
+
+Document types are registered by name with the file extensions they
+cover.  A type without an extract function (``code``) is read like a note,
+so passage offsets point into the file itself.  Every other type yields its
+text in pieces, page by page or paragraph by paragraph, and
+:func:`extract_text` stops pulling pieces once ``max_bytes`` of text have
+been produced, so a huge document is never held in memory whole.
+
+Extraction runs in worker processes (:class:`ExtractorPool`), and the
+result is kept by :class:`ExtractionCache` under the hash of the file's
+bytes.  Passage offsets of extracted documents point into that cached
+text.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Callable, Iterator
+from xml.etree import ElementTree
+
+EXTRACTION_CACHE_VERSION = 1
+READ_BLOCK = 64 * 1024
+
+
+@dataclass(frozen=True)
+class DocumentType:
+    name: str
+    extensions: tuple[str, ...]
+    extract: Callable[[str], Iterator[str]] | None  # ``None``: read as UTF-8 text
+
+
+_TYPES: dict[str, DocumentType] = {}
+
+
+def register(name: str, extensions: tuple[str, ...], extract=None) -> None:
+    _TYPES[name] = DocumentType(name, tuple(ext.lower() for ext in extensions), extract)
+
+
+def document_types() -> dict[str, DocumentType]:
+    return dict(_TYPES)
+
+
+def extensions_for(names) -> tuple[str, ...]:
+    """Return the file extensions of the document types called *names*."""
+    return tuple(ext for name in names for ext in _TYPES[name].extensions)
+
+
+def document_type(path: str, names=None) -> DocumentType | None:
+    """Return the registered type of *path* (among *names*, if given)."""
+    ext = os.path.splitext(path)[1].lower()
+    for doc_type in _TYPES.values():
+        if ext in doc_type.extensions and (names is None or doc_type.name in names):
+            return doc_type
+    return None
+
+
+def extract_text(path: str, max_bytes: int) -> str:
+    """Return at most *max_bytes* (UTF-8) of text extracted from *path*."""
+    doc_type = document_type(path)
+    if doc_type is None or doc_type.extract is None:
+        raise ValueError(f"No extractor for {path}")
+    parts: list[str] = []
+    size = 0
+    pieces = doc_type.extract(path)
+    try:
+        for piece in pieces:
+            data = piece.encode("utf-8")
+            if size + len(data) >= max_bytes:
+                parts.append(data[:max_bytes - size].decode("utf-8", errors="ignore"))
+                break
+            parts.append(piece)
+            size += len(data)
+    finally:
+        pieces.close()
+    return "".join(parts)
+
+
+def file_digest(path: str) -> str:
+    """Hash the file's bytes, reading it block by block."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while block := f.read(1024 * 1024):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ----------------------------------------------------------------------
+# Extractors
+# ----------------------------------------------------------------------
+_BLANK_LINES_RE = re.compile(r"[ \t]*\n[ \t\n]*\n[ \t]*")
+_SPACE_RE = re.compile(r"\s+")
+
+
+class _HTMLText(HTMLParser):
+    """Collect visible text; headings become markdown headings for the chunker."""
+
+    SKIP = {"script", "style", "noscript", "template", "svg"}
+    BLOCKS = {
+        "p", "div", "section", "article", "header", "footer", "main", "aside", "nav",
+        "table", "tr", "ul", "ol", "blockquote", "pre", "title", "dl", "dt", "dd",
+    }
+    HEADINGS = {f"h{level}": level for level in range(1, 7)}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip += 1
+        elif tag in self.HEADINGS:
+            self.parts.append("\n\n" + "#" * self.HEADINGS[tag] + " ")
+        elif tag in self.BLOCKS:
+            self.parts.append("\n\n")
+        elif tag == "li":
+            self.parts.append("\n- ")
+        elif tag in ("br", "td", "th"):
+            self.parts.append("\n" if tag == "br" else " ")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skip = max(0, self._skip - 1)
+        elif tag in self.HEADINGS or tag in self.BLOCKS:
+            self.parts.append("\n\n")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(_SPACE_RE.sub(" ", data))
+
+    def take(self) -> str:
+        text, self.parts = "".join(self.parts), []
+        return _BLANK_LINES_RE.sub("\n\n", text)
+
+
+def extract_html(path: str) -> Iterator[str]:
+    parser = _HTMLText()
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        while block := f.read(READ_BLOCK):
+            parser.feed(block)
+            yield parser.take()
+    parser.close()
+    yield parser.take()
+
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_HEADING_STYLE_RE = re.compile(r"^(?:Heading|heading)\s*(\d)$")
+
+
+def extract_docx(path: str) -> Iterator[str]:
+    """Stream paragraphs out of ``word/document.xml`` without building the tree."""
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as xml:
+        runs: list[str] = []
+        prefix = ""
+        for _, element in ElementTree.iterparse(io.BufferedReader(xml), events=("end",)):
+            tag = element.tag
+            if tag == _W + "t":
+                runs.append(element.text or "")
+            elif tag == _W + "tab":
+                runs.append("\t")
+            elif tag in (_W + "br", _W + "cr"):
+                runs.append("\n")
+            elif tag == _W + "pStyle":
+                style = element.get(_W + "val", "")
+                match = _HEADING_STYLE_RE.match(style)
+                if match:
+                    prefix = "#" * int(match.group(1)) + " "
+                elif style == "Title":
+                    prefix = "# "
+            elif tag == _W + "p":
+                text = "".join(runs)
+                if text.strip():
+                    yield f"{prefix}{text}\n\n"
+                runs, prefix = [], ""
+                element.clear()
+
+
+def extract_pdf(path: str) -> Iterator[str]:
+    """Yield the text of one page at a time (PDFKit, else pypdf)."""
+    try:
+        from Foundation import NSURL
+        from Quartz import PDFDocument
+    except ImportError:
+        from pypdf import PdfReader
+
+        for page in PdfReader(path).pages:
+            yield (page.extract_text() or "") + "\n\n"
+        return
+    document = PDFDocument.alloc().initWithURL_(NSURL.fileURLWithPath_(path))
+    if document is None:
+        raise ValueError(f"Unreadable PDF: {path}")
+    for index in range(document.pageCount()):
+        page = document.pageAtIndex_(index)
+        text = page.string() if page is not None else None
+        if text:
+            yield str(text) + "\n\n"
+
+
+register("html", (".html", ".htm"), extract_html)
+register("docx", (".docx",), extract_docx)
+register("pdf", (".pdf",), extract_pdf)
+register(
+    "code",
+    (
+        ".py", ".js", ".ts", ".tsx", ".jsx", ".go", ".rs", ".java", ".kt", ".swift",
+        ".c", ".h", ".cc", ".cpp", ".hpp", ".m", ".rb", ".php", ".sh", ".sql",
+        ".toml", ".yaml", ".yml", ".json", ".css",
+    ),
+)
+
+
+# ----------------------------------------------------------------------
+# Worker processes and cache
+# ----------------------------------------------------------------------
+class ExtractorPool:
+    """Run :func:`extract_text` in worker processes with a per-file timeout.
+
+    A document that overruns the timeout cannot be cancelled inside a
+    worker, so the workers are terminated and the pool is started afresh;
+    other documents caught in the restart are submitted again.
+    """
+
+    def __init__(self, processes: int, timeout: float):
+        self.processes = max(1, processes)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        # The timeout starts when a worker is free, not while queued behind others.
+        self._slots = threading.Semaphore(self.processes)
+        self._executor = self._new_executor()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.processes, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def extract(self, path: str, max_bytes: int) -> str:
+        """Return the extracted text; raises ``TimeoutError`` for slow files."""
+        retried = False
+        with self._slots:
+            while True:
+                with self._lock:
+                    executor = self._executor
+                try:
+                    future = executor.submit(extract_text, path, max_bytes)
+                    return future.result(timeout=self.timeout)
+                except FutureTimeout:
+                    self._restart(executor)
+                    raise TimeoutError(
+                        f"Extraction took longer than {self.timeout:.0f}s"
+                    ) from None
+                except (BrokenProcessPool, RuntimeError):
+                    # Also raised by submit() on a pool another thread just replaced.
+                    self._restart(executor)
+                    if retried:
+                        raise
+                    retried = True
+
+    def _restart(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = self._new_executor()
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def close(self) -> None:
+        with self._lock:
+            executor = self._executor
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ExtractionCache:
+    """Extracted text stored as ``<content hash>.text`` in *directory*.
+
+    ``paths.json`` remembers the hash of each path together with its mtime
+    and size, so unchanged files are not even re-hashed.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._paths: dict[str, tuple[int, int, str]] = {}  # path -> (mtime_ns, size, digest)
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def digest(self, path: str) -> str:
+        stat = os.stat(path)
+        with self._lock:
+            entry = self._paths.get(path)
+        if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            return entry[2]
+        digest = file_digest(path)
+        with self._lock:
+            self._paths[path] = (stat.st_mtime_ns, stat.st_size, digest)
+            self._dirty = True
+        return digest
+
+    def text_path(self, path: str) -> Path | None:
+        """Return the cached text file for *path*, or ``None`` if not extracted yet."""
+        text_path = self.directory / f"{self.digest(path)}.text"
+        return text_path if text_path.exists() else None
+
+    def get(self, path: str) -> str | None:
+        text_path = self.text_path(path)
+        if text_path is None:
+            return None
+        return text_path.read_text(encoding="utf-8")
+
+    def put(self, path: str, text: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        target = self.directory / f"{self.digest(path)}.text"
+        tmp = target.with_name(f"{target.name}.{threading.get_ident()}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, target)
+
+    def prune(self, live_paths) -> None:
+        """Forget paths no longer indexed and delete text nothing refers to."""
+        live_paths = set(live_paths)
+        with self._lock:
+            for path in [p for p in self._paths if p not in live_paths]:
+                del self._paths[path]
+                self._dirty = True
+            digests = {entry[2] for entry in self._paths.values()}
+        if self.directory.is_dir():
+            for text_path in self.directory.glob("*.text"):
+                if text_path.stem not in digests:
+                    text_path.unlink(missing_ok=True)
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": EXTRACTION_CACHE_VERSION, "paths": self._paths}
+            self._dirty = False
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.directory / "paths.json.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.directory / "paths.json")
+
+    def load(self) -> bool:
+        try:
+            with open(self.directory / "paths.json", "r") as f:
+                data = json.load(f)
+            if data.get("version") != EXTRACTION_CACHE_VERSION:
+                return False
+            paths = {path: tuple(entry) for path, entry in data["paths"].items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return False
+        with self._lock:
+            self._paths = paths
+            self._dirty = False
+        return True
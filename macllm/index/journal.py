@@ -0,0 +1,331 @@
+"""Persistent directory-mtime journal for incremental note indexing.
+
+The journal remembers, for every directory below the indexed roots, its
+mtime, the indexable files it contains (with their mtimes), and its
+subdirectories.  A scan only lists directories whose mtime changed since
+the previous scan, so an unchanged vault costs one ``stat`` per directory
+instead of a full walk.
+
+Directory mtimes do not move when a file is edited in place, so callers
+pass ``verify=True`` for explicit rebuilds (every known file is re-stat'ed,
+but unchanged directories are still not listed) or hand the journal the
+directories a filesystem watcher reported.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import stat
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable
+
+JOURNAL_VERSION = 1
+
+
+@dataclass
+class DirectoryEntry:
+    mtime: float
+    files: dict[str, float] = field(default_factory=dict)
+    subdirs: list[str] = field(default_factory=list)
+
+
+@dataclass
+class ChangeSet:
+    """Files that appeared, changed, or disappeared since the previous scan."""
+
+    added: dict[str, float] = field(default_factory=dict)
+    modified: dict[str, float] = field(default_factory=dict)
+    removed: set[str] = field(default_factory=set)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.modified or self.removed)
+
+    def merge(self, other: ChangeSet) -> None:
+        for path, mtime in other.added.items():
+            if path in self.removed:
+                self.removed.discard(path)
+                self.modified[path] = mtime
+            else:
+                self.added[path] = mtime
+        for path, mtime in other.modified.items():
+            if path in self.added:
+                self.added[path] = mtime
+            else:
+                self.modified[path] = mtime
+        for path in other.removed:
+            if self.added.pop(path, None) is None:
+                self.modified.pop(path, None)
+                self.removed.add(path)
+
+
+class DirectoryJournal:
+    """Directory-mtime tree over a set of indexed roots."""
+
+    def __init__(self, extensions: Iterable[str]):
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.roots: list[str] = []
+        self._dirs: dict[str, DirectoryEntry] = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def files(self) -> dict[str, float]:
+        """Return ``{filepath: mtime}`` for every journaled file."""
+        with self._lock:
+            return {
+                os.path.join(dir_path, name): mtime
+                for dir_path, entry in self._dirs.items()
+                for name, mtime in entry.files.items()
+            }
+
+    def directory_count(self) -> int:
+        return len(self._dirs)
+
+    # ------------------------------------------------------------------
+    # Scanning
+    # ------------------------------------------------------------------
+    def set_roots(self, roots: Iterable[str]) -> ChangeSet:
+        """Replace the indexed roots, forgetting trees that are no longer roots."""
+        changes = ChangeSet()
+        roots = list(dict.fromkeys(roots))
+        with self._lock:
+            for old in self.roots:
+                if old not in roots:
+                    self._forget(old, changes)
+            self.roots = roots
+        return changes
+
+    def scan(
+        self,
+        *,
+        verify: bool = False,
+        dirs: dict[str, bool] | None = None,
+    ) -> ChangeSet:
+        """Bring the journal up to date and return what changed.
+
+        Without *dirs* every root is visited; only directories whose mtime
+        moved are listed.  *dirs* maps watcher-reported directories to a
+        ``recursive`` flag and restricts the scan to those subtrees.
+        """
+        changes = ChangeSet()
+        with self._lock:
+            if dirs is None:
+                for root in self.roots:
+                    self._visit(root, changes, verify=verify)
+            else:
+                for path, recursive in dirs.items():
+                    path = os.path.normpath(path)
+                    if not self._under_root(path):
+                        continue
+                    if path not in self._dirs and path not in self.roots:
+                        # Unknown directory: let its parent's listing find it.
+                        path = os.path.dirname(path)
+                    self._visit(path, changes, verify=recursive, force=True)
+        return changes
+
+    def update_paths(self, paths: Iterable[str]) -> ChangeSet:
+        """Record the current state of *paths* without listing their directories.
+
+        For paths the app changed itself (filesystem tools).  Files are
+        stat'ed, missing paths are forgotten with everything journaled below
+        them, and only a path that is now a directory (a copied tree) is
+        visited.  Parent directory mtimes are left alone, so the next scan
+        still lists those parents once in case something else changed there.
+        """
+        changes = ChangeSet()
+        with self._lock:
+            for path in dict.fromkeys(os.path.normpath(p) for p in paths):
+                if not self._under_root(path):
+                    continue
+                parent, name = os.path.split(path)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    entry = self._dirs.get(parent)
+                    if entry is not None:
+                        if entry.files.pop(name, None) is not None:
+                            changes.removed.add(path)
+                        if name in entry.subdirs:
+                            entry.subdirs.remove(name)
+                    self._forget(path, changes)
+                    continue
+                if stat.S_ISDIR(st.st_mode):
+                    if path in self.roots or self._entry(parent) is not None:
+                        if path not in self.roots and name not in self._dirs[parent].subdirs:
+                            self._dirs[parent].subdirs.append(name)
+                            self._dirs[parent].subdirs.sort()
+                        self._visit(path, changes, verify=True, force=True)
+                    continue
+                if (
+                    not stat.S_ISREG(st.st_mode)
+                    or os.path.splitext(name)[1].lower() not in self.extensions
+                ):
+                    continue
+                entry = self._entry(parent)
+                if entry is None:
+                    continue
+                old_mtime = entry.files.get(name)
+                if old_mtime is None:
+                    changes.added[path] = st.st_mtime
+                elif old_mtime != st.st_mtime:
+                    changes.modified[path] = st.st_mtime
+                entry.files[name] = st.st_mtime
+        return changes
+
+    def _entry(self, path: str) -> DirectoryEntry | None:
+        """Return the journal entry of directory *path*, adding missing ancestors.
+
+        New entries get mtime 0 so the next scan lists them.
+        """
+        entry = self._dirs.get(path)
+        if entry is not None or not self._under_root(path):
+            return entry
+        if path not in self.roots:
+            parent, name = os.path.split(path)
+            parent_entry = self._entry(parent)
+            if parent_entry is None:
+                return None
+            if name not in parent_entry.subdirs:
+                parent_entry.subdirs.append(name)
+                parent_entry.subdirs.sort()
+        entry = self._dirs[path] = DirectoryEntry(0.0)
+        return entry
+
+    def _under_root(self, path: str) -> bool:
+        return any(
+            path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+            for root in self.roots
+        )
+
+    def _visit(
+        self,
+        path: str,
+        changes: ChangeSet,
+        *,
+        verify: bool,
+        force: bool = False,
+    ) -> None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._forget(path, changes)
+            return
+        if not stat.S_ISDIR(st.st_mode):
+            self._forget(path, changes)
+            return
+
+        entry = self._dirs.get(path)
+        if entry is None or force or entry.mtime != st.st_mtime:
+            entry = self._relist(path, st.st_mtime, entry, changes)
+        elif verify:
+            self._restat(path, entry, changes)
+
+        for name in entry.subdirs:
+            self._visit(os.path.join(path, name), changes, verify=verify)
+
+    def _relist(
+        self,
+        path: str,
+        mtime: float,
+        previous: DirectoryEntry | None,
+        changes: ChangeSet,
+    ) -> DirectoryEntry:
+        old_files = previous.files if previous is not None else {}
+        old_subdirs = set(previous.subdirs) if previous is not None else set()
+        entry = DirectoryEntry(mtime)
+        try:
+            with os.scandir(path) as it:
+                for item in it:
+                    try:
+                        if item.is_dir(follow_symlinks=False):
+                            entry.subdirs.append(item.name)
+                        elif (
+                            item.is_file()
+                            and os.path.splitext(item.name)[1].lower() in self.extensions
+                        ):
+                            entry.files[item.name] = item.stat().st_mtime
+                    except OSError:
+                        continue
+        except OSError:
+            self._forget(path, changes)
+            return entry
+
+        entry.subdirs.sort()
+        for name, file_mtime in entry.files.items():
+            filepath = os.path.join(path, name)
+            if name not in old_files:
+                changes.added[filepath] = file_mtime
+            elif old_files[name] != file_mtime:
+                changes.modified[filepath] = file_mtime
+        for name in old_files.keys() - entry.files.keys():
+            changes.removed.add(os.path.join(path, name))
+        for name in old_subdirs - set(entry.subdirs):
+            self._forget(os.path.join(path, name), changes)
+
+        self._dirs[path] = entry
+        return entry
+
+    def _restat(self, path: str, entry: DirectoryEntry, changes: ChangeSet) -> None:
+        for name, old_mtime in list(entry.files.items()):
+            filepath = os.path.join(path, name)
+            try:
+                file_mtime = os.stat(filepath).st_mtime
+            except OSError:
+                del entry.files[name]
+                changes.removed.add(filepath)
+                continue
+            if file_mtime != old_mtime:
+                entry.files[name] = file_mtime
+                changes.modified[filepath] = file_mtime
+
+    def _forget(self, path: str, changes: ChangeSet) -> None:
+        """Drop *path* and everything journaled below it."""
+        prefix = path.rstrip(os.sep) + os.sep
+        for dir_path in [d for d in self._dirs if d == path or d.startswith(prefix)]:
+            entry = self._dirs.pop(dir_path)
+            for name in entry.files:
+                changes.removed.add(os.path.join(dir_path, name))
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def save(self, path: Path) -> None:
+        with self._lock:
+            data = {
+                "version": JOURNAL_VERSION,
+                "extensions": list(self.extensions),
+                "roots": self.roots,
+                "dirs": {
+                    dir_path: [entry.mtime, entry.files, entry.subdirs]
+                    for dir_path, entry in self._dirs.items()
+                },
+            }
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def load(self, path: Path) -> bool:
+        """Restore a saved journal; returns ``False`` if it is missing or stale."""
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            if (
+                data.get("version") != JOURNAL_VERSION
+                or tuple(data.get("extensions", ())) != self.extensions
+            ):
+                return False
+            dirs = {
+                dir_path: DirectoryEntry(float(mtime), dict(files), list(subdirs))
+                for dir_path, (mtime, files, subdirs) in data["dirs"].items()
+            }
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        with self._lock:
+            self.roots = list(data.get("roots", []))
+            self._dirs = dirs
+        return True
@@ -0,0 +1,124 @@
+"""BM25 keyword index over note passages, backed by SQLite FTS5.
+
+Semantic search ranks exact tokens such as ticket ids, passport numbers,
+or rare proper names poorly.  This index stores the same passages as the
+vector index and ranks them with FTS5's built-in ``bm25()``.  The database
+is opened in WAL mode with one connection per thread, so searches keep
+reading while the index builder writes.
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_query(text: str, operator: str = "OR") -> str:
+    """Turn free text into an FTS5 query that joins the quoted tokens with *operator*."""
+    return f" {operator} ".join(f'"{token}"' for token in _TOKEN_RE.findall(text))
+
+
+def reciprocal_rank_fusion(
+    rankings: Iterable[tuple[list[tuple[str, float]], float]],
+    k: int = 60,
+) -> list[tuple[str, float]]:
+    """Fuse ``(ranked hits, weight)`` lists by weighted reciprocal rank.
+
+    Each document scores ``sum(weight / (k + rank))`` over the rankings it
+    appears in (ranks start at 1).
+    """
+    fused: dict[str, float] = {}
+    for hits, weight in rankings:
+        for rank, (doc_id, _) in enumerate(hits, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+class KeywordIndex:
+    """``id -> text`` documents ranked by BM25."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            # FTS5 rows are addressed by rowid; ``docs`` maps ids to rowids so
+            # deletes do not scan the full-text table.
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS docs (rowid INTEGER PRIMARY KEY, doc_id TEXT UNIQUE)"
+            )
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5(body)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            self._local.conn = conn
+        return conn
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT count(*) FROM docs").fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def index(self, docs: Iterable[tuple[str, str]]) -> None:
+        """Replace every document with *docs*."""
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                conn.execute("DELETE FROM passages")
+                conn.execute("DELETE FROM docs")
+                self._insert(conn, docs)
+
+    def upsert(self, docs: Iterable[tuple[str, str]]) -> None:
+        docs = list(docs)
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                self._remove(conn, [doc_id for doc_id, _ in docs])
+                self._insert(conn, docs)
+
+    def delete(self, ids: Iterable[str]) -> None:
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                self._remove(conn, ids)
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, docs: Iterable[tuple[str, str]]) -> None:
+        for doc_id, body in docs:
+            rowid = conn.execute("INSERT INTO docs(doc_id) VALUES (?)", (doc_id,)).lastrowid
+            conn.execute("INSERT INTO passages(rowid, body) VALUES (?, ?)", (rowid, body))
+
+    @staticmethod
+    def _remove(conn: sqlite3.Connection, ids: Iterable[str]) -> None:
+        for doc_id in ids:
+            row = conn.execute("SELECT rowid FROM docs WHERE doc_id = ?", (doc_id,)).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM passages WHERE rowid = ?", row)
+                conn.execute("DELETE FROM docs WHERE rowid = ?", row)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def search(self, query: str, limit: int = 10) -> list[tuple[str, float]]:
+        """Return up to *limit* ``(id, score)`` hits, best first (higher is better)."""
+        match = fts_query(query)
+        if not match:
+            return []
+        rows = self._conn().execute(
+            "SELECT docs.doc_id, bm25(passages) AS rank FROM passages "
+            "JOIN docs ON docs.rowid = passages.rowid "
+            "WHERE passages MATCH ? ORDER BY rank LIMIT ?",
+            (match, limit),
+        ).fetchall()
+        return [(doc_id, -rank) for doc_id, rank in rows]
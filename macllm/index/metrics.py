@@ -0,0 +1,38 @@
+"""Rolling latency percentiles for index operations."""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class LatencyRecorder:
+    """Keep the last ``window`` samples, split by whether a reindex was running."""
+
+    def __init__(self, window: int = 1000):
+        self._samples: dict[bool, deque[float]] = {
+            False: deque(maxlen=window),
+            True: deque(maxlen=window),
+        }
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, during_reindex: bool = False) -> None:
+        with self._lock:
+            self._samples[during_reindex].append(seconds)
+
+    def stats(self, during_reindex: bool | None = None) -> dict[str, float]:
+        """Return ``{"count", "p50_ms", "p99_ms"}`` for the selected samples.
+
+        ``during_reindex=None`` combines both groups.
+        """
+        with self._lock:
+            if during_reindex is None:
+                samples = [*self._samples[False], *self._samples[True]]
+            else:
+                samples = list(self._samples[during_reindex])
+        if not samples:
+            return {"count": 0, "p50_ms": 0.0, "p99_ms": 0.0}
+        p50, p99 = np.percentile(samples, [50, 99]) * 1000
+        return {"count": len(samples), "p50_ms": float(p50), "p99_ms": float(p99)}
@@ -0,0 +1,56 @@
+"""Small in-memory LRU caches for repeated note searches.
+
+Agents often call ``search_notes`` several times with the same query in one
+run.  :class:`FileTag` keeps one :class:`LRUCache` for query vectors, one
+for ranked passage hits keyed by the index generation they were computed
+against, and one for file previews keyed by ``(path, mtime)``.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace so near-identical spellings share cache entries."""
+    return " ".join(query.split())
+
+
+class LRUCache:
+    """Thread-safe bounded ``key -> value`` map with hit/miss counters."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
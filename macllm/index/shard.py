@@ -0,0 +1,89 @@
+"""Per-mount note index shards.
+
+Every mount with ``index = true`` gets its own :class:`IndexShard`.  A
+shard has its own directory journal, passage vectors, BM25 index,
+``path -> chunk ids`` map, and cache directory.  It is rescanned and
+rebuilt on its own schedule, so a write to one mount never rescans or
+re-embeds another.  The shard only holds state; ``FileTag`` drives the
+builds and fans searches out over all shards.
+
+When one indexed root lies inside another, the inner shard owns the
+files below it and the outer shard ignores them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+
+from macllm.index.journal import ChangeSet, DirectoryJournal
+from macllm.index.keyword import KeywordIndex
+from macllm.index.vector_index import VectorIndex
+
+_UNSAFE_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def _contains(root: str, path: str) -> bool:
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+@dataclass(eq=False)
+class IndexShard:
+    name: str  # mount name
+    root: str  # host directory
+    reindex_interval: float = 0.0  # 0: the index loop's default
+    excluded: tuple[str, ...] = ()  # roots of shards nested inside this one
+    journal: DirectoryJournal | None = None
+    embeddings: VectorIndex | None = None  # passage vectors; read without locks
+    keywords: KeywordIndex | None = None
+    file_mtimes: dict[str, float] = field(default_factory=dict)
+    file_chunks: dict[str, list[str]] = field(default_factory=dict)
+    first_build_done: bool = False
+    generation: int = 0  # bumped whenever the shard's searchable passages change
+    embedding_ready: threading.Event = field(default_factory=threading.Event)
+    build_lock: threading.Lock = field(default_factory=threading.Lock)  # serializes builds
+    # Index loop bookkeeping, guarded by ``FileTag._dirty_lock``.
+    requested: bool = False
+    dirty_dirs: dict[str, bool] = field(default_factory=dict)
+    pending_paths: set[str] = field(default_factory=set)  # written by filesystem tools
+    pending_first: float = 0.0  # monotonic time of the oldest and newest queued write
+    pending_last: float = 0.0
+    next_refresh: float = 0.0
+    last_verify: float = 0.0
+
+    @property
+    def key(self) -> str:
+        """Cache directory name; moving the mount to a new root starts afresh."""
+        digest = hashlib.blake2b(self.root.encode("utf-8"), digest_size=4).hexdigest()
+        return f"{_UNSAFE_RE.sub('_', self.name)}-{digest}"
+
+    @property
+    def loaded(self) -> bool:
+        return self.embeddings is not None or self.first_build_done
+
+    def owns(self, path: str) -> bool:
+        return _contains(self.root, path) and not any(
+            _contains(root, path) for root in self.excluded
+        )
+
+    def own(self, changes: ChangeSet) -> ChangeSet:
+        """Drop changes to files that belong to a nested shard."""
+        if not self.excluded:
+            return changes
+        return ChangeSet(
+            added={p: m for p, m in changes.added.items() if self.owns(p)},
+            modified={p: m for p, m in changes.modified.items() if self.owns(p)},
+            removed={p for p in changes.removed if self.owns(p)},
+        )
+
+    def files(self) -> dict[str, float]:
+        """Return ``{filepath: mtime}`` for the files this shard indexes."""
+        if self.journal is None:
+            return {}
+        files = self.journal.files()
+        if self.excluded:
+            files = {path: mtime for path, mtime in files.items() if self.owns(path)}
+        return files
@@ -0,0 +1,168 @@
+"""Trigram posting lists for substring autocomplete over file basenames.
+
+Every lower-cased basename is split into its trigrams and each trigram
+keeps a compact ``array`` of document ids.  A query picks the shortest
+posting list among its own trigrams and verifies the candidates with a
+plain substring test, so cost scales with the rarest trigram rather than
+with the number of indexed files.  Removed documents are tombstoned and
+the postings are compacted once enough of them accumulate.
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+import threading
+import time
+from array import array
+
+from macllm.index.journal import ChangeSet
+
+TIER_PREFIX = 0
+TIER_WORD = 1
+TIER_SUBSTRING = 2
+
+RECENCY_WEIGHT = 0.9  # < 1 so recency only reorders within a tier
+RECENCY_HALF_LIFE = 7 * 24 * 60 * 60
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def match_tier(name: str, term: str) -> int | None:
+    """Return the match tier of *term* in *name*, or ``None`` if absent."""
+    pos = name.find(term)
+    if pos < 0:
+        return None
+    if pos == 0:
+        return TIER_PREFIX
+    while pos >= 0:
+        if not name[pos - 1].isalnum():
+            return TIER_WORD
+        pos = name.find(term, pos + 1)
+    return TIER_SUBSTRING
+
+
+class TrigramIndex:
+    """Incrementally maintained trigram index of ``path -> basename``."""
+
+    COMPACT_MIN_DEAD = 1024
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: dict[str, array] = {}
+        self._names: list[str | None] = []
+        self._paths: list[str | None] = []
+        self._mtimes: list[float] = []
+        self._ids: dict[str, int] = {}
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+    def add(self, path: str, mtime: float = 0.0) -> None:
+        with self._lock:
+            self._add(path, mtime)
+
+    def remove(self, path: str) -> None:
+        with self._lock:
+            self._remove(path)
+            self._maybe_compact()
+
+    def apply(self, changes: ChangeSet) -> None:
+        """Patch the index from a journal change set."""
+        with self._lock:
+            for path in changes.removed:
+                self._remove(path)
+            for path, mtime in changes.added.items():
+                self._add(path, mtime)
+            for path, mtime in changes.modified.items():
+                doc_id = self._ids.get(path)
+                if doc_id is None:
+                    self._add(path, mtime)
+                else:
+                    self._mtimes[doc_id] = mtime
+            self._maybe_compact()
+
+    def _add(self, path: str, mtime: float) -> None:
+        doc_id = self._ids.get(path)
+        if doc_id is not None:
+            self._mtimes[doc_id] = mtime
+            return
+        name = os.path.basename(path).lower()
+        doc_id = len(self._names)
+        self._ids[path] = doc_id
+        self._names.append(name)
+        self._paths.append(path)
+        self._mtimes.append(mtime)
+        for gram in _trigrams(name):
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = array("I")
+            posting.append(doc_id)
+
+    def _remove(self, path: str) -> None:
+        doc_id = self._ids.pop(path, None)
+        if doc_id is None:
+            return
+        self._names[doc_id] = None
+        self._paths[doc_id] = None
+        self._dead += 1
+
+    def _maybe_compact(self) -> None:
+        if self._dead < max(self.COMPACT_MIN_DEAD, len(self._ids) // 4):
+            return
+        live = [
+            (path, self._mtimes[doc_id])
+            for path, doc_id in sorted(self._ids.items(), key=lambda item: item[1])
+        ]
+        self._postings = {}
+        self._names = []
+        self._paths = []
+        self._mtimes = []
+        self._ids = {}
+        self._dead = 0
+        for path, mtime in live:
+            self._add(path, mtime)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def search(self, term: str, max_results: int = 10, now: float | None = None) -> list[str]:
+        """Return up to *max_results* paths whose basename contains *term*.
+
+        Results are ranked prefix match > word-boundary match > substring,
+        with more recently modified files first within a tier.
+        """
+        term = term.lower()
+        if not term or max_results <= 0:
+            return []
+        now = time.time() if now is None else now
+        with self._lock:
+            grams = _trigrams(term)
+            if grams:
+                postings = [self._postings.get(gram) for gram in grams]
+                if any(posting is None for posting in postings):
+                    return []
+                candidates = min(postings, key=len)
+            else:
+                candidates = range(len(self._names))
+
+            def scored():
+                for doc_id in candidates:
+                    name = self._names[doc_id]
+                    if name is None:
+                        continue
+                    tier = match_tier(name, term)
+                    if tier is None:
+                        continue
+                    age = max(0.0, now - self._mtimes[doc_id])
+                    boost = RECENCY_WEIGHT * 0.5 ** (age / RECENCY_HALF_LIFE)
+                    yield (tier - boost, name, self._paths[doc_id])
+
+            best = heapq.nsmallest(max_results, scored())
+        return [path for _, _, path in best]
@@ -0,0 +1,188 @@
+"""Persistent ``content digest -> vector`` cache for passage embeddings.
+
+Passages are keyed by the hash of the exact text that is embedded, so a
+note whose mtime moved without a content change, a passage that shifted
+to a new byte offset, or a note moved to another folder all find their
+vectors here instead of going through the model again.  The cache keeps
+vectors for digests that are no longer indexed until ``max_entries`` is
+exceeded, so a file that disappears and comes back later (sync tools,
+moves across mounts) is also free to re-add.
+
+Vectors live in ``vectors.f16``, a raw ``float16`` row file that is
+memory-mapped on load, with one digest per row in ``vectors.keys``.  Both
+files are append-only: a save appends the vectors added since the last
+one.  Rows of evicted or replaced digests stay behind as garbage until
+they outnumber the live rows, at which point the files are rewritten.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+VECTOR_CACHE_VERSION = 2
+_DTYPE = np.float16
+
+
+class VectorCache:
+    """LRU-ordered ``digest -> vector`` map over an append-only row file."""
+
+    DEFAULT_MAX_ENTRIES = 200_000
+    MIN_GARBAGE_ROWS = 1024  # rows of garbage tolerated before a rewrite is considered
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        # A row number into the mapped file, or an unsaved float32 vector.
+        self._entries: OrderedDict[str, int | np.ndarray] = OrderedDict()
+        self._rows: np.ndarray | None = None
+        self._file_rows = 0
+        self._dim: int | None = None
+        self._directory: Path | None = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, digest: str) -> np.ndarray | None:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            if isinstance(entry, np.ndarray):
+                return entry
+            return self._rows[entry].astype(np.float32)
+
+    def put(self, digest: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._entries[digest] = np.asarray(vector, dtype=np.float32)
+            self._entries.move_to_end(digest)
+            self._evict()
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def save(self, directory: Path) -> None:
+        """Append vectors added since the last save to the files in *directory*."""
+        directory = Path(directory)
+        with self._lock:
+            pending = [
+                (digest, entry) for digest, entry in self._entries.items()
+                if isinstance(entry, np.ndarray)
+            ]
+            dim = len(pending[0][1]) if pending else self._dim
+            live_rows = len(self._entries) - len(pending)
+            garbage = self._file_rows - live_rows
+            rewrite = (
+                directory != self._directory
+                or dim != self._dim
+                or garbage > max(live_rows, self.MIN_GARBAGE_ROWS)
+            )
+            if rewrite:
+                self._rewrite(directory, dim)
+            elif pending:
+                self._append(directory, pending)
+
+    def _append(self, directory: Path, pending: list[tuple[str, np.ndarray]]) -> None:
+        matrix = np.stack([vector for _, vector in pending]).astype(_DTYPE)
+        # Vectors first: a crash before the keys are written leaves rows that
+        # load ignores; the opposite order would pair digests with no data.
+        with open(directory / "vectors.f16", "ab") as f:
+            f.write(matrix.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(directory / "vectors.keys", "a") as f:
+            f.writelines(digest + "\n" for digest, _ in pending)
+            f.flush()
+            os.fsync(f.fileno())
+        for row, (digest, _) in enumerate(pending, start=self._file_rows):
+            self._entries[digest] = row
+        self._file_rows += len(pending)
+        self._map(directory)
+
+    def _rewrite(self, directory: Path, dim: int | None) -> None:
+        """Write only the live entries (of dimension *dim*) to fresh files."""
+        entries = OrderedDict()
+        for digest, entry in self._entries.items():
+            vector = entry if isinstance(entry, np.ndarray) else self._rows[entry]
+            if len(vector) == dim:
+                entries[digest] = vector
+        directory.mkdir(parents=True, exist_ok=True)
+        matrix = (
+            np.stack(list(entries.values())).astype(_DTYPE)
+            if entries else np.zeros((0, dim or 0), dtype=_DTYPE)
+        )
+        for name, write in (
+            ("vectors.f16", lambda f: f.write(matrix.tobytes())),
+            ("vectors.keys", lambda f: f.write("".join(d + "\n" for d in entries).encode())),
+            ("vectors.json", lambda f: f.write(
+                json.dumps({"version": VECTOR_CACHE_VERSION, "dim": dim}).encode()
+            )),
+        ):
+            tmp = directory / f"{name}.tmp"
+            with open(tmp, "wb") as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, directory / name)
+        self._entries = OrderedDict((digest, row) for row, digest in enumerate(entries))
+        self._file_rows = len(entries)
+        self._dim = dim
+        self._directory = directory
+        self._map(directory)
+
+    def _map(self, directory: Path) -> None:
+        if not self._file_rows:
+            self._rows = None
+            return
+        self._rows = np.memmap(
+            directory / "vectors.f16", dtype=_DTYPE, mode="r", shape=(self._file_rows, self._dim)
+        )
+
+    def load(self, directory: Path) -> bool:
+        """Map a saved cache; returns ``False`` if it is missing or unreadable.
+
+        Rows past the last complete digest/vector pair (a torn append) are
+        ignored.
+        """
+        directory = Path(directory)
+        try:
+            with open(directory / "vectors.json", "r") as f:
+                meta = json.load(f)
+            if meta.get("version") != VECTOR_CACHE_VERSION:
+                return False
+            dim = meta["dim"]
+            with open(directory / "vectors.keys", "r") as f:
+                digests = f.read().split("\n")[:-1]
+            row_bytes = (dim or 0) * np.dtype(_DTYPE).itemsize
+            size = (directory / "vectors.f16").stat().st_size
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        rows = min(len(digests), size // row_bytes if row_bytes else 0)
+        with self._lock:
+            # Later rows win: a digest re-added after eviction is appended again.
+            self._entries = OrderedDict()
+            for row, digest in enumerate(digests[:rows]):
+                self._entries[digest] = row
+                self._entries.move_to_end(digest)
+            self._file_rows = rows
+            self._dim = dim
+            self._map(directory)
+            # After a torn append the next save rewrites the files, since
+            # appending would misalign rows and digests.
+            self._directory = directory if size == rows * row_bytes == len(digests) * row_bytes else None
+            self._evict()
+        return True
@@ -0,0 +1,550 @@
+"""Copy-on-write passage vector index with lock-free reads.
+
+Readers grab the current :class:`Generation` with a single attribute read
+and search it without taking any lock.  Writers never modify a published
+generation: an update appends an immutable segment holding the new
+vectors, replaces the liveness mask of every segment that lost rows with
+a fresh copy, and then swaps the new generation in.  A search that is
+already running keeps using the generation it started with.
+
+On disk every segment is a quantized (``float16`` or ``int8``) ``.npy``
+array that is memory-mapped on load, so opening the index reads no
+vectors and resident memory follows the pages searches touch.  Which id
+lives in which row is kept in ``ids.log``, an append-only JSON-lines
+journal: a save writes the new segments and appends the records written
+since the previous save.  Segments are merged on a background thread
+once more than ``MAX_SEGMENTS`` accumulate or too many rows are dead, and
+the journal is rewritten once it holds mostly superseded records.
+
+Segments with at least ``ann.min_rows`` rows get an approximate
+nearest-neighbour structure from the configured backend (see
+:mod:`macllm.index.ann`), built on the same background thread and saved
+next to the segment.  Searches then score only the candidate rows it
+proposes; small and freshly written segments are always scanned exactly.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import threading
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+from macllm.index.ann import AnnBackend, AnnIndex
+
+INDEX_VERSION = 2
+ID_LOG = "ids.log"
+
+# Storage dtype -> factor that turns stored values back into unit-scale floats.
+VECTOR_DTYPES: dict[str, tuple[type, float]] = {
+    "float32": (np.float32, 1.0),
+    "float16": (np.float16, 1.0),
+    "int8": (np.int8, 1.0 / 127),
+}
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows (or a single vector) to unit length for cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+def quantize(unit_vectors: np.ndarray, dtype: str) -> np.ndarray:
+    """Store unit-length float vectors as *dtype* (see ``VECTOR_DTYPES``)."""
+    if dtype == "int8":
+        return np.clip(np.rint(unit_vectors * 127), -127, 127).astype(np.int8)
+    return np.asarray(unit_vectors, dtype=VECTOR_DTYPES[dtype][0])
+
+
+def _scale_of(vectors: np.ndarray) -> float:
+    return VECTOR_DTYPES[np.dtype(vectors.dtype).name][1]
+
+
+@dataclass(frozen=True)
+class Segment:
+    uid: int
+    ids: tuple[str, ...]
+    vectors: np.ndarray  # (rows, dim) quantized unit vectors, read-only, possibly memory-mapped
+    ann: AnnIndex | None = None
+
+    BLOCK_ROWS = 16_384  # rows converted to float32 at a time while scoring
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every row with the unit-length *query*."""
+        out = np.empty(len(self.ids), dtype=np.float32)
+        for start in range(0, len(out), self.BLOCK_ROWS):
+            block = self.vectors[start:start + self.BLOCK_ROWS]
+            out[start:start + len(block)] = block.astype(np.float32, copy=False) @ query
+        scale = _scale_of(self.vectors)
+        return out * scale if scale != 1.0 else out
+
+    def scores_at(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        return self.unit_vectors(rows) @ query
+
+    def unit_vectors(self, rows: np.ndarray) -> np.ndarray:
+        """Return the selected rows as float32."""
+        return self.vectors[rows].astype(np.float32) * _scale_of(self.vectors)
+
+
+@dataclass(frozen=True)
+class Generation:
+    """An immutable snapshot of the index."""
+
+    number: int
+    segments: tuple[Segment, ...] = ()
+    alive: tuple[np.ndarray, ...] = ()  # per-segment read-only bool masks
+    count: int = 0
+
+    def search(self, query: np.ndarray, limit: int) -> list[tuple[str, float]]:
+        hits: list[tuple[float, str]] = []
+        for segment, alive in zip(self.segments, self.alive):
+            if segment.ann is not None:
+                # Ask for extra candidates so dead rows do not crowd out live ones.
+                dead = len(alive) - int(alive.sum())
+                rows = segment.ann.candidates(query, limit + min(dead, 3 * limit))
+                rows = rows[alive[rows]]
+                scores = segment.scores_at(rows, query)
+            else:
+                rows = np.flatnonzero(alive)
+                scores = np.where(alive, segment.scores(query), -np.inf)[rows]
+            take = min(limit, len(scores))
+            if not take:
+                continue
+            top = np.argpartition(-scores, take - 1)[:take] if take < len(scores) else range(take)
+            hits.extend((float(scores[i]), segment.ids[rows[i]]) for i in top)
+        hits.sort(key=lambda hit: hit[0], reverse=True)
+        return [(doc_id, score) for score, doc_id in hits[:limit]]
+
+
+class VectorIndex:
+    """Cosine-similarity index over ``(id, vector)`` documents.
+
+    The write API mirrors the subset of ``txtai.Embeddings`` that
+    :class:`FileTag` uses: ``index``, ``upsert``, ``delete``, ``search``,
+    ``save`` and ``load``.  Writers are serialized; readers never block.
+    New segments are stored as *dtype*.  *ann* (``None`` for exact search
+    only) indexes large segments.  With ``background_compaction`` off,
+    merges and ANN builds run in the writing thread right after the write.
+    """
+
+    MAX_SEGMENTS = 8
+    MAX_DEAD_FRACTION = 0.25  # merge everything once this share of rows is dead
+    LOG_SLACK = 64  # journal records tolerated beyond a fresh rewrite before compacting it
+
+    def __init__(
+        self,
+        dtype: str = "float16",
+        background_compaction: bool = True,
+        ann: AnnBackend | None = None,
+    ):
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unsupported vector dtype: {dtype}")
+        self.dtype = dtype
+        self.ann = ann
+        self.background_compaction = background_compaction
+        self._generation = Generation(0)
+        self._write_lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._compacting = False
+        self._locations: dict[str, tuple[int, int]] = {}  # id -> (segment uid, row)
+        self._uids = itertools.count()
+        self._saved: set[int] = set()
+        self._saved_ann: set[int] = set()
+        self._saved_path: Path | None = None
+        self._pending: list[list] = []  # journal records not yet appended to ids.log
+        self._log_records = 0
+
+    @property
+    def generation(self) -> Generation:
+        return self._generation
+
+    def __len__(self) -> int:
+        return self._generation.count
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def search(self, query: np.ndarray, limit: int = 3) -> list[tuple[str, float]]:
+        generation = self._generation
+        if not generation.count:
+            return []
+        return generation.search(_unit(query), limit)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def index(self, docs: Iterable[tuple]) -> None:
+        """Replace the whole index with *docs* (``(id, vector, tags)`` tuples)."""
+        with self._write_lock:
+            self._locations = {}
+            self._pending.append(["R"])
+            empty = Generation(self._generation.number)
+            if not self._upsert(docs, empty):
+                self._publish(empty, [], [])
+        self._after_write()
+
+    def upsert(self, docs: Iterable[tuple]) -> None:
+        with self._write_lock:
+            self._upsert(docs, self._generation)
+        self._after_write()
+
+    def delete(self, ids: Iterable[str]) -> None:
+        ids = [doc_id for doc_id in ids]
+        with self._write_lock:
+            generation = self._generation
+            alive = self._kill(generation, ids)
+            self._pending.append(["D", ids])
+            self._publish(generation, list(generation.segments), alive)
+        self._after_write()
+
+    def _upsert(self, docs: Iterable[tuple], generation: Generation) -> bool:
+        vectors = {doc[0]: doc[1] for doc in docs}
+        if not vectors:
+            return False
+        alive = self._kill(generation, vectors)
+        unit = _unit(np.stack([np.asarray(v, dtype=np.float32) for v in vectors.values()]))
+        segment = Segment(next(self._uids), tuple(vectors), _frozen(quantize(unit, self.dtype)))
+        for row, doc_id in enumerate(segment.ids):
+            self._locations[doc_id] = (segment.uid, row)
+        self._pending.append(["S", segment.uid, list(segment.ids)])
+        segments = list(generation.segments) + [segment]
+        alive.append(_frozen(np.ones(len(segment.ids), dtype=bool)))
+        self._publish(generation, segments, alive)
+        return True
+
+    def _kill(self, generation: Generation, ids: Iterable[str]) -> list[np.ndarray]:
+        """Return copies of the masks of *generation* with *ids* cleared."""
+        positions = {segment.uid: i for i, segment in enumerate(generation.segments)}
+        alive = list(generation.alive)
+        copied: set[int] = set()
+        for doc_id in ids:
+            location = self._locations.pop(doc_id, None)
+            if location is None:
+                continue
+            i = positions[location[0]]
+            if i not in copied:
+                alive[i] = alive[i].copy()
+                copied.add(i)
+            alive[i][location[1]] = False
+        for i in copied:
+            _frozen(alive[i])
+        return alive
+
+    def _publish(
+        self,
+        previous: Generation,
+        segments: list[Segment],
+        alive: list[np.ndarray],
+    ) -> None:
+        kept = [(s, a) for s, a in zip(segments, alive) if a.any()]
+        self._generation = Generation(
+            previous.number + 1,
+            tuple(s for s, _ in kept),
+            tuple(a for _, a in kept),
+            sum(int(a.sum()) for _, a in kept),
+        )
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+    def _after_write(self) -> None:
+        generation = self._generation
+        if self._merge_start(generation) is None and self._unindexed(generation) is None:
+            return
+        if not self.background_compaction:
+            self.compact()
+            return
+        with self._write_lock:
+            if self._compacting:
+                return
+            self._compacting = True
+        threading.Thread(
+            target=self._compact_in_background, name="VectorIndexCompaction", daemon=True
+        ).start()
+
+    def _compact_in_background(self) -> None:
+        try:
+            while self.compact():
+                pass
+        finally:
+            with self._write_lock:
+                self._compacting = False
+
+    def _wants_ann(self, segment: Segment) -> bool:
+        return self.ann is not None and len(segment.ids) >= self.ann.min_rows
+
+    def _unindexed(self, generation: Generation) -> Segment | None:
+        """Return a segment large enough for an ANN structure that has none."""
+        for segment in generation.segments:
+            if segment.ann is None and self._wants_ann(segment):
+                return segment
+        return None
+
+    def _merge_start(self, generation: Generation) -> int | None:
+        """Return the position of the first segment to merge, or ``None``.
+
+        Too many segments merge the newer ones; the base segment joins once
+        they hold half as many live rows as it does, or once half of its own
+        rows are dead.  A quarter of all rows being dead merges everything.
+        """
+        segments = generation.segments
+        rows = sum(len(s.ids) for s in segments)
+        if len(segments) > 1 and rows - generation.count > rows * self.MAX_DEAD_FRACTION:
+            return 0
+        if len(segments) <= self.MAX_SEGMENTS:
+            return None
+        base = generation.alive[0]
+        base_live = int(base.sum())
+        tail_live = generation.count - base_live
+        return 0 if tail_live * 2 >= base_live or base_live * 2 < len(base) else 1
+
+    def compact(self) -> bool:
+        """Merge segments or index one segment if needed; returns whether it did.
+
+        The merged segment is built from a snapshot without holding the write
+        lock.  Rows that were deleted or replaced in the meantime are marked
+        dead in it when it is swapped in.
+        """
+        with self._compact_lock:
+            snapshot = self._generation
+            start = self._merge_start(snapshot)
+            if start is None:
+                return self._index_segment(snapshot)
+            merging = list(zip(snapshot.segments[start:], snapshot.alive[start:]))
+            ids: list[str] = []
+            origins: list[tuple[int, int]] = []
+            parts: list[np.ndarray] = []
+            for segment, mask in merging:
+                rows = np.flatnonzero(mask)
+                ids.extend(segment.ids[row] for row in rows)
+                origins.extend((segment.uid, int(row)) for row in rows)
+                if np.dtype(segment.vectors.dtype).name == self.dtype:
+                    parts.append(np.asarray(segment.vectors[rows]))
+                else:
+                    parts.append(quantize(segment.unit_vectors(rows), self.dtype))
+            merged_uids = {segment.uid for segment, _ in merging}
+            merged = Segment(next(self._uids), tuple(ids), _frozen(np.concatenate(parts)))
+            if self._wants_ann(merged):
+                merged = replace(merged, ann=self.ann.build(merged))
+
+            with self._write_lock:
+                current = self._generation
+                mask = np.array(
+                    [self._locations.get(doc_id) == origin for doc_id, origin in zip(ids, origins)],
+                    dtype=bool,
+                )
+                for row in np.flatnonzero(mask):
+                    self._locations[ids[row]] = (merged.uid, int(row))
+                segments: list[Segment] = []
+                alive: list[np.ndarray] = []
+                for segment, segment_alive in zip(current.segments, current.alive):
+                    if segment.uid in merged_uids:
+                        if not segments or segments[-1] is not merged:
+                            segments.append(merged)
+                            alive.append(_frozen(mask))
+                        continue
+                    segments.append(segment)
+                    alive.append(segment_alive)
+                self._pending.append(
+                    ["M", merged.uid, sorted(merged_uids), ids, np.flatnonzero(~mask).tolist()]
+                )
+                self._publish(current, segments, alive)
+            return True
+
+    def _index_segment(self, snapshot: Generation) -> bool:
+        segment = self._unindexed(snapshot)
+        if segment is None:
+            return False
+        indexed = replace(segment, ann=self.ann.build(segment))
+        with self._write_lock:
+            current = self._generation
+            segments = [indexed if s.uid == segment.uid else s for s in current.segments]
+            self._publish(current, segments, list(current.alive))
+        return True
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def save(self, path: str) -> None:
+        """Write new segments and append the id map changes since the last save.
+
+        Saving to a different directory than the last save or load (or once
+        the journal holds mostly superseded records) rewrites ``ids.log``
+        from the current generation instead.
+        """
+        directory = Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._save_lock:
+            with self._write_lock:
+                generation = self._generation
+                records, self._pending = self._pending, []
+            for segment in generation.segments:
+                stem = directory / f"segment-{segment.uid}"
+                same_path = self._saved_path == directory
+                if segment.uid not in self._saved or not same_path:
+                    with open(f"{stem}.npy.tmp", "wb") as f:
+                        np.save(f, segment.vectors)
+                    os.replace(f"{stem}.npy.tmp", f"{stem}.npy")
+                    self._saved.add(segment.uid)
+                if segment.ann is not None and (segment.uid not in self._saved_ann or not same_path):
+                    segment.ann.save(stem)
+                    self._saved_ann.add(segment.uid)
+
+            log = directory / ID_LOG
+            rewrite = (
+                self._saved_path != directory
+                or not log.exists()
+                or self._log_records + len(records)
+                > 2 * len(generation.segments) + self.LOG_SLACK
+            )
+            if rewrite:
+                self._write_log(log, generation)
+            elif records:
+                with open(log, "a") as f:
+                    f.writelines(json.dumps(record) + "\n" for record in records)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._log_records += len(records)
+            self._saved_path = directory
+
+            live = {f"segment-{segment.uid}" for segment in generation.segments}
+            for file in directory.glob("segment-*"):
+                if file.name.split(".", 1)[0] not in live:
+                    file.unlink(missing_ok=True)
+            self._saved &= {segment.uid for segment in generation.segments}
+            self._saved_ann &= self._saved
+
+    def _write_log(self, log: Path, generation: Generation) -> None:
+        records: list[list] = [["V", INDEX_VERSION]]
+        for segment, alive in zip(generation.segments, generation.alive):
+            records.append(["S", segment.uid, list(segment.ids)])
+            if not alive.all():
+                records.append(["X", segment.uid, np.flatnonzero(~alive).tolist()])
+        tmp = log.with_name(log.name + ".tmp")
+        with open(tmp, "w") as f:
+            f.writelines(json.dumps(record) + "\n" for record in records)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, log)
+        self._log_records = len(records)
+
+    @staticmethod
+    def _replay(log: Path) -> tuple[dict[int, list[str]], dict[int, np.ndarray], int]:
+        """Rebuild ``uid -> ids`` and ``uid -> alive`` from the journal.
+
+        A torn final line (a crash mid-append) is ignored.
+        """
+        with open(log, "r") as f:
+            lines = f.read().split("\n")
+        ids: dict[int, list[str]] = {}
+        alive: dict[int, np.ndarray] = {}
+        locations: dict[str, tuple[int, int]] = {}
+
+        def kill(doc_id: str) -> None:
+            location = locations.pop(doc_id, None)
+            if location is not None:
+                alive[location[0]][location[1]] = False
+
+        def add(uid: int, doc_ids: list[str], dead: Iterable[int] = ()) -> None:
+            ids[uid] = doc_ids
+            alive[uid] = np.ones(len(doc_ids), dtype=bool)
+            alive[uid][list(dead)] = False
+            for row, doc_id in enumerate(doc_ids):
+                if alive[uid][row]:
+                    kill(doc_id)
+                    locations[doc_id] = (uid, row)
+
+        records = 0
+        for number, line in enumerate(lines):
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                if number >= len(lines) - 2:
+                    break
+                raise
+            records += 1
+            kind = record[0]
+            if kind == "V":
+                if record[1] != INDEX_VERSION:
+                    raise ValueError(f"Unsupported vector index version: {record[1]}")
+            elif kind == "R":
+                ids, alive, locations = {}, {}, {}
+            elif kind == "S":
+                add(int(record[1]), record[2])
+            elif kind == "D":
+                for doc_id in record[1]:
+                    kill(doc_id)
+            elif kind == "X":
+                uid = int(record[1])
+                for row in record[2]:
+                    if locations.get(ids[uid][row]) == (uid, row):
+                        del locations[ids[uid][row]]
+                    alive[uid][row] = False
+            elif kind == "M":
+                for old in record[2]:
+                    for row, doc_id in enumerate(ids.pop(old, ())):
+                        if locations.get(doc_id) == (old, row):
+                            del locations[doc_id]
+                    alive.pop(old, None)
+                add(int(record[1]), record[3], record[4])
+            else:
+                raise ValueError(f"Unknown id log record: {kind}")
+        return ids, alive, records
+
+    def load(self, path: str) -> None:
+        """Restore a saved index; raises if the files are missing or inconsistent.
+
+        Segment vectors are memory-mapped, not read.  Large segments whose
+        ANN structure is missing (or was built by another backend) are
+        indexed in the background.
+        """
+        directory = Path(path)
+        ids, alive, records = self._replay(directory / ID_LOG)
+        segments = []
+        masks = []
+        for uid in sorted(ids):
+            if not alive[uid].any():
+                continue
+            vectors = np.load(directory / f"segment-{uid}.npy", mmap_mode="r")
+            if len(ids[uid]) != len(vectors):
+                raise ValueError(f"Segment {uid} is inconsistent")
+            segment = Segment(uid, tuple(ids[uid]), vectors)
+            if self._wants_ann(segment):
+                segment = replace(segment, ann=self.ann.load(directory / f"segment-{uid}"))
+            segments.append(segment)
+            masks.append(_frozen(alive[uid]))
+
+        with self._write_lock:
+            self._locations = {
+                doc_id: (segment.uid, row)
+                for segment, mask in zip(segments, masks)
+                for row, doc_id in enumerate(segment.ids)
+                if mask[row]
+            }
+            self._uids = itertools.count(max(ids, default=-1) + 1)
+            self._saved = {segment.uid for segment in segments}
+            self._saved_ann = {segment.uid for segment in segments if segment.ann is not None}
+            self._saved_path = directory
+            self._pending = []
+            self._log_records = records
+            self._generation = Generation(
+                self._generation.number + 1,
+                tuple(segments),
+                tuple(masks),
+                len(self._locations),
+            )
+        self._after_write()
@@ -0,0 +1,126 @@
+"""Background warm-up and idle unload of the note search model.
+
+Loading the embedding model and the index on the first ``search_notes``
+call makes that call slow.  :class:`WarmupScheduler` runs the warm-up on a
+low-priority thread instead, as soon as something hints that a note
+search is coming (the window opened, ``@`` typed) or once the app has
+been up for a while, and hands the memory back after a stretch of
+inactivity.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Callable
+
+
+def lower_thread_priority() -> None:
+    """Run the calling thread in the background QoS band where supported (macOS)."""
+    try:
+        if hasattr(os, "PRIO_DARWIN_THREAD"):
+            os.setpriority(os.PRIO_DARWIN_THREAD, 0, os.PRIO_DARWIN_BG)
+    except OSError:
+        pass
+
+
+class WarmupScheduler:
+    """Call *warm* when requested or *launch_delay* seconds after start.
+
+    *unload* is called once nothing used the model (see :meth:`touch`) for
+    *unload_after* seconds.  Zero disables the launch warm-up or the unload.
+    *is_warm* tells whether a warm-up is still needed; *is_loaded* whether
+    there is anything to unload (defaults to *is_warm*).
+    """
+
+    def __init__(
+        self,
+        warm: Callable[[str], None],
+        unload: Callable[[], bool],
+        is_warm: Callable[[], bool],
+        is_loaded: Callable[[], bool] | None = None,
+        launch_delay: float = 30.0,
+        unload_after: float = 900.0,
+        log: Callable[[str, int], None] | None = None,
+    ):
+        self._warm = warm
+        self._unload = unload
+        self._is_warm = is_warm
+        self._is_loaded = is_loaded or is_warm
+        self.launch_delay = launch_delay
+        self.unload_after = unload_after
+        self._log = log or (lambda message, level: None)
+        self._event = threading.Event()
+        self._stop = threading.Event()
+        self._reason = ""
+        self._requested = False
+        self._started = time.monotonic()
+        self._last_used = self._started
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="IndexWarmup")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._event.set()
+
+    def request(self, reason: str) -> None:
+        """Ask for a warm-up soon; cheap enough to call on every keystroke."""
+        self._reason = reason
+        self._requested = True
+        self._event.set()
+
+    def touch(self) -> None:
+        """Record a use of the model, restarting the idle-unload timer.
+
+        Also wakes the thread: a search may just have loaded the model, and
+        the unload deadline is only scheduled while something is loaded.
+        """
+        self._last_used = time.monotonic()
+        self._event.set()
+
+    def _timeout(self, launch_pending: bool) -> float | None:
+        now = time.monotonic()
+        deadlines = []
+        if launch_pending:
+            deadlines.append(self._started + self.launch_delay)
+        if self.unload_after and self._is_loaded():
+            deadlines.append(self._last_used + self.unload_after)
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - now)
+
+    def _run(self) -> None:
+        lower_thread_priority()
+        launch_pending = self.launch_delay > 0
+        while True:
+            self._event.wait(self._timeout(launch_pending))
+            self._event.clear()
+            if self._stop.is_set():
+                return
+            requested, self._requested = self._requested, False
+            now = time.monotonic()
+            if requested:
+                launch_pending = False
+                self._run_warm(self._reason)
+            elif launch_pending and now >= self._started + self.launch_delay:
+                launch_pending = False
+                self._run_warm("idle after launch")
+            elif (
+                self.unload_after
+                and now >= self._last_used + self.unload_after
+                and self._is_loaded()
+            ):
+                self._unload()
+
+    def _run_warm(self, reason: str) -> None:
+        if not self._is_warm():
+            try:
+                self._warm(reason)
+            except Exception as e:
+                self._log(f"Note search warm-up failed: {e}", 1)
+        self.touch()
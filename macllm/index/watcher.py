@@ -0,0 +1,111 @@
+"""Filesystem change notifications for the note index.
+
+On macOS the FSEvents stream reports directories whose contents changed,
+including in-place edits of files inside them.  When FSEvents is not
+available :func:`create_watcher` returns ``None`` and the index loop falls
+back to periodic journal scans.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Callable
+
+# on_change(directories, recursive) — *recursive* asks for a full subtree
+# rescan because the event stream dropped or coalesced events.
+ChangeCallback = Callable[[list[str], bool], None]
+
+
+class FSEventsWatcher:
+    """Watch *roots* with an FSEvents stream on a dedicated run-loop thread."""
+
+    LATENCY = 1.0  # seconds FSEvents coalesces events before calling back
+
+    def __init__(self, roots: list[str], on_change: ChangeCallback):
+        self.roots = list(roots)
+        self._on_change = on_change
+        self._run_loop = None
+        self._stream = None
+        self._started = threading.Event()
+
+    def start(self) -> None:
+        thread = threading.Thread(target=self._run, daemon=True, name="FileTagWatcher")
+        thread.start()
+        self._started.wait(timeout=5.0)
+
+    def stop(self) -> None:
+        import FSEvents
+        from CoreFoundation import CFRunLoopStop
+
+        if self._stream is not None:
+            FSEvents.FSEventStreamStop(self._stream)
+            FSEvents.FSEventStreamInvalidate(self._stream)
+            FSEvents.FSEventStreamRelease(self._stream)
+            self._stream = None
+        if self._run_loop is not None:
+            CFRunLoopStop(self._run_loop)
+            self._run_loop = None
+
+    def _callback(self, _stream, _info, count, paths, flags, _ids):
+        directories = []
+        recursive = False
+        for index in range(count):
+            path = paths[index]
+            if isinstance(path, bytes):
+                path = os.fsdecode(path)
+            directories.append(os.path.normpath(path))
+            if flags[index] & self._rescan_flags:
+                recursive = True
+        if directories:
+            self._on_change(directories, recursive)
+
+    def _run(self) -> None:
+        import FSEvents
+        from CoreFoundation import CFRunLoopGetCurrent, CFRunLoopRun, kCFRunLoopDefaultMode
+
+        self._rescan_flags = (
+            FSEvents.kFSEventStreamEventFlagMustScanSubDirs
+            | FSEvents.kFSEventStreamEventFlagUserDropped
+            | FSEvents.kFSEventStreamEventFlagKernelDropped
+            | FSEvents.kFSEventStreamEventFlagRootChanged
+        )
+        try:
+            self._stream = FSEvents.FSEventStreamCreate(
+                None,
+                self._callback,
+                None,
+                self.roots,
+                FSEvents.kFSEventStreamEventIdSinceNow,
+                self.LATENCY,
+                FSEvents.kFSEventStreamCreateFlagWatchRoot,
+            )
+            self._run_loop = CFRunLoopGetCurrent()
+            FSEvents.FSEventStreamScheduleWithRunLoop(
+                self._stream, self._run_loop, kCFRunLoopDefaultMode
+            )
+            FSEvents.FSEventStreamStart(self._stream)
+        except Exception:
+            self._stream = None
+            return
+        finally:
+            self._started.set()
+        CFRunLoopRun()
+
+
+def create_watcher(roots: list[str], on_change: ChangeCallback) -> FSEventsWatcher | None:
+    """Start a watcher for *roots*, or return ``None`` to request polling."""
+    if not roots:
+        return None
+    try:
+        import FSEvents  # noqa: F401
+    except ImportError:
+        return None
+    watcher = FSEventsWatcher(roots, on_change)
+    try:
+        watcher.start()
+    except Exception:
+        return None
+    if watcher._stream is None:
+        return None
+    return watcher
@@ -12,11 +12,20 @@ from pathlib import Path
 
 from macllm.ui import MacLLMUI  # noqa: F401
 
+from macllm.core.archival import apply_archive_policy, memory_report
 from macllm.core.chat_history import ConversationHistory
 from macllm.core.llm_service import get_model_for_speed, enable_litellm_debug, refresh_models
-from macllm.core.persistence import save_all_conversations, load_all_conversations
+from macllm.core.persistence import (
+    get_conversation_search,
+    get_conversation_store,
+    load_all_conversations,
+    save_conversations,
+)
+from macllm.core.persistence_writer import PersistenceWriter
 from macllm.core.config import load_runtime_config
 from macllm.core.skills import SkillsRegistry
+from macllm.core.storage import get_storage_dir
+from macllm.core.tool_cache import ToolCache, configure_tool_cache, get_tool_cache
 from macllm.core.virtual_filesystem import garbage_collect_filesystems
 from macllm.tags.base import TagPlugin
 from macllm.tags.file_tag import FileTag
@@ -94,6 +103,7 @@ class MacLLM:
         MacLLM._instance = self
         self.args = args or argparse.Namespace(debug=False, show_window_on_start=False)
         self.config = load_runtime_config()
+        self._configure_tool_cache()
         refresh_models()
         SkillsRegistry.reload()
         self.ui = MacLLMUI()
@@ -104,12 +114,14 @@ class MacLLM:
         garbage_collect_filesystems()
         self.conversation_history = ConversationHistory()
         self.ephemeral = bool(getattr(self.args, 'query', None))
+        self.persistence = PersistenceWriter(self._write_conversations, log=self.debug_log)
         if getattr(self.args, 'test', False):
             self.conversation_history.add_conversation()
         elif not self.ephemeral:
             loaded = load_all_conversations(self.conversation_history)
             if not loaded:
                 self.conversation_history.add_conversation()
+            get_conversation_search().backfill(get_conversation_store(), log=self.debug_log)
         else:
             self.conversation_history.add_conversation()
         self.chat_history = self.conversation_history.get_current_conversation()
@@ -117,20 +129,82 @@ class MacLLM:
 
         self._prefix_index = []
 
+    def request_save(self, conversation=None):
+        """Queue *conversation* (or just the tab order) for the background writer."""
+        if not self.ephemeral:
+            self.persistence.request(getattr(conversation, 'conv_id', None))
+
+    def _write_conversations(self, conv_ids) -> bool:
+        """Save *conv_ids*, then archive conversations that are idle or over the memory budget."""
+        ok = save_conversations(self.conversation_history, conv_ids)
+        settings = self.config.conversations
+        archived = apply_archive_policy(
+            self.conversation_history,
+            get_conversation_store(),
+            settings.archive_after_days,
+            settings.memory_budget_mb,
+        )
+        if archived:
+            self.debug_log(f"Archived {len(archived)} conversation(s)", 0)
+        return ok
+
+    def _configure_tool_cache(self):
+        settings = self.config.tool_cache
+        cache = None
+        if settings.enabled and settings.max_mb > 0:
+            try:
+                cache = ToolCache(
+                    get_storage_dir() / "tool_cache.sqlite",
+                    max_bytes=int(settings.max_mb * 1024 * 1024),
+                    ttl=settings.ttl,
+                )
+            except Exception as e:
+                self.debug_log(f"Tool cache unavailable: {e}", 2)
+        configure_tool_cache(cache)
+
+    def tool_cache_stats(self):
+        """Return ``ToolCacheStats`` (hits, misses, stores, invalidations) per tool since startup."""
+        cache = get_tool_cache()
+        return cache.stats() if cache is not None else {}
+
+    def memory_usage(self):
+        """Return a ``ConversationMemory`` (estimated bytes held) per conversation, in tab order."""
+        return memory_report(self.conversation_history)
+
+    def flush_saves(self):
+        """Write queued saves before the app exits; returns whether they all reached disk."""
+        saved = self.persistence.stop()
+        if not saved:
+            self.debug_log("Some conversations could not be saved before quitting", 2)
+        return saved
+
+    def search_conversations(self, query: str, limit: int = 10):
+        """Return ``ConversationHit``s for the saved conversations matching *query*."""
+        return get_conversation_search().search(query, limit)
+
+    def open_conversation(self, conv_id: str) -> bool:
+        """Switch to the open tab holding *conv_id* (e.g. a search hit)."""
+        for index, conv in enumerate(self.conversation_history.conversations):
+            if conv.conv_id == conv_id:
+                if not self.switch_to_conversation(index):
+                    return False
+                self._update_ui_from_callback()
+                return True
+        return False
+
     def switch_to_conversation(self, index: int) -> bool:
         """Switch the active conversation by index."""
-        if not self.ephemeral:
-            save_all_conversations(self.conversation_history)
+        previous = self.chat_history
         if not self.conversation_history.set_active(index):
             return False
+        self.request_save(previous)
         self.chat_history = self.conversation_history.get_current_conversation()
         self.chat_history.ui_update_callback = self._update_ui_from_callback
         return True
 
     def new_conversation(self):
         """Create a new conversation, make it active, and save the old one."""
-        if not self.ephemeral:
-            save_all_conversations(self.conversation_history)
+        self.request_save(self.chat_history)
         conv = self.conversation_history.add_conversation()
         self.chat_history = conv
         self.chat_history.ui_update_callback = self._update_ui_from_callback
@@ -139,8 +213,7 @@ class MacLLM:
     def cycle_conversation(self, delta: int):
         """Cycle through conversations by *delta* (+1 = newer, -1 = older)."""
         if self.conversation_history.cycle(delta):
-            if not self.ephemeral:
-                save_all_conversations(self.conversation_history)
+            self.request_save(self.chat_history)
             self.chat_history = self.conversation_history.get_current_conversation()
             self.chat_history.ui_update_callback = self._update_ui_from_callback
             self._update_ui_from_callback()
@@ -154,10 +227,13 @@ class MacLLM:
             return
         self.chat_history = self.conversation_history.get_current_conversation()
         self.chat_history.ui_update_callback = self._update_ui_from_callback
-        if not self.ephemeral:
-            save_all_conversations(self.conversation_history)
+        self.request_save()
         self._update_ui_from_callback()
 
+    def note_search_likely(self, reason: str):
+        """Hint that a note search may follow so the index warms up in the background."""
+        FileTag.request_warmup(reason)
+
     def _update_ui_from_callback(self):
         if self.ui:
             self.ui.request_update()
@@ -237,6 +313,7 @@ def main():
 
     # Start periodic file index + embedding rebuild
     FileTag.start_index_loop()
+    FileTag.start_warmup_scheduler()
 
     # Warn about deprecated shortcut files during transition.
     project_root = Path(__file__).resolve().parents[2]
@@ -8,7 +8,6 @@ agent is invoked.
 
 from macllm.core.config import load_runtime_config
 from macllm.core.llm_service import refresh_models
-from macllm.core.persistence import save_all_conversations
 from macllm.core.skills import SkillsRegistry
 from macllm.tags.base import TagPlugin
 from macllm.tags.file_tag import FileTag
@@ -42,7 +41,7 @@ class CommandTag(TagPlugin):
         conversation._notify_ui()
 
         if not app.ephemeral:
-            save_all_conversations(app.conversation_history)
+            app.request_save(conversation)
 
         request.expanded_prompt = ""
         return ""
@@ -7,14 +7,39 @@ os.environ["OMP_NUM_THREADS"] = "1"
 os.environ["MKL_NUM_THREADS"] = "1"
 os.environ["LOKY_MAX_CPU_COUNT"] = "1"
 
+import bisect
+import heapq
 import json
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
+import numpy as np
 import txtai
 
+from macllm.core.config import SEARCH_ENGINES, IndexConfig, get_runtime_config
 from macllm.core.model_paths import get_embedding_model_dir
+from macllm.index.ann import AnnBackend, make_backend
+from macllm.index.encoder_pool import EncoderPool
+from macllm.index.extractors import (
+    ExtractionCache,
+    ExtractorPool,
+    document_type,
+    extensions_for,
+)
+from macllm.index.chunks import Chunk, chunk_file, chunk_text, parse_chunk_id, read_passage
+from macllm.index.journal import ChangeSet, DirectoryJournal
+from macllm.index.keyword import KeywordIndex, reciprocal_rank_fusion
+from macllm.index.trigram import TrigramIndex
+from macllm.index.metrics import LatencyRecorder
+from macllm.index.search_cache import LRUCache, normalize_query
+from macllm.index.shard import IndexShard
+from macllm.index.vector_cache import VectorCache
+from macllm.index.vector_index import VectorIndex
+from macllm.index.warmup import WarmupScheduler
+from macllm.index.watcher import create_watcher
 from macllm.core.virtual_filesystem import (
     indexed_mounts,
     indexed_virtual_path,
@@ -50,21 +75,42 @@ class FileTag(TagPlugin):
     MAX_FULL_FILE_LEN = 10 * 1000
     SEARCH_PREVIEW_LEN = 1000
     SEARCH_RESULTS_COUNT = 5
+    SEARCH_CHUNK_OVERSAMPLE = 4  # chunk hits fetched per requested file
+    QUERY_CACHE_SIZE = 256  # cached query vectors and ranked results
+    PREVIEW_CACHE_SIZE = 1024
 
     REINDEX_INTERVAL = 5 * 60  # seconds between periodic re-indexes
-    CACHE_SUBDIR = "embeddings-local-v1"
+    VERIFY_INTERVAL = 60 * 60  # seconds between full file re-stats without a watcher
+    WRITE_MAX_DELAY = 10  # seconds a burst of tool writes may postpone its reindex
+    CACHE_SUBDIR = "embeddings-local-v3"
+    READ_THREADS = 4  # threads reading and chunking files during a build
+    POOL_MIN_BATCHES = 8  # builds smaller than this many batches embed in-process
+    BUILD_SAVE_INTERVAL = 60  # seconds between cache saves during a long build
 
     # Class-level state for file index and embeddings
     _macllm = None
     _index: list[tuple[str, str]] = []
     _indexed_directories: list[str] = []
-    _embeddings: Optional[txtai.Embeddings] = None
-    _embedding_ready = threading.Event()
-    _embedding_lock = threading.Lock()
+    _shards: dict[str, IndexShard] = {}  # mount name -> shard; replaced, never mutated
+    _encoder: Optional[txtai.Embeddings] = None  # embedding model
+    _vector_cache: VectorCache = VectorCache()  # shared by all shards
+    _vector_cache_loaded: bool = False
+    _extractions: Optional[ExtractionCache] = None  # text of PDF/HTML/DOCX files by content hash
+    _search_latency: LatencyRecorder = LatencyRecorder()
+    _index_generation: int = 0  # bumped whenever any shard's passages change
+    _query_vectors: LRUCache = LRUCache(QUERY_CACHE_SIZE)
+    _search_results: LRUCache = LRUCache(QUERY_CACHE_SIZE)
+    _previews: LRUCache = LRUCache(PREVIEW_CACHE_SIZE)
+    _warmup: Optional[WarmupScheduler] = None
+    _warmup_stats: dict = {"warmups": 0, "unloads": 0}
+    _warmed = threading.Event()  # set by warm_up(), cleared when the model is unloaded
+    _end_to_end_latency: LatencyRecorder = LatencyRecorder()  # whole searches, split by cold (True) / warm
     _reindex_event = threading.Event()
-    _file_mtimes: dict[str, float] = {}
     _filepath_to_idx: dict[str, int] = {}
-    _first_build_done: bool = False
+    _trigrams: TrigramIndex = TrigramIndex()
+    _watcher = None
+    _dirty_lock = threading.Lock()  # guards the shards' reindex requests
+    _refresh_lock = threading.Lock()  # serializes scans and shard changes
 
     # ------------------------------------------------------------------
     # Object lifecycle
@@ -74,12 +120,21 @@ class FileTag(TagPlugin):
         FileTag._macllm = macllm
         FileTag._index = []
         FileTag._indexed_directories = []
-        FileTag._embeddings = None
-        FileTag._embedding_ready = threading.Event()
+        FileTag._shards = {}
+        FileTag._vector_cache = VectorCache()
+        FileTag._vector_cache_loaded = False
+        FileTag._extractions = None
+        FileTag._search_latency = LatencyRecorder()
+        FileTag._index_generation = 0
+        FileTag._query_vectors = LRUCache(FileTag.QUERY_CACHE_SIZE)
+        FileTag._search_results = LRUCache(FileTag.QUERY_CACHE_SIZE)
+        FileTag._previews = LRUCache(FileTag.PREVIEW_CACHE_SIZE)
+        FileTag._warmup_stats = {"warmups": 0, "unloads": 0}
+        FileTag._warmed = threading.Event()
+        FileTag._end_to_end_latency = LatencyRecorder()
         FileTag._reindex_event = threading.Event()
-        FileTag._file_mtimes = {}
         FileTag._filepath_to_idx = {}
-        FileTag._first_build_done = False
+        FileTag._trigrams = TrigramIndex()
 
     @classmethod
     def _debug_log(cls, message: str, level: int = 0) -> None:
@@ -88,21 +143,164 @@ class FileTag(TagPlugin):
 
     @classmethod
     def build_index(cls):
-        """Walk all indexed directories and build the file index."""
-        cls._index = []
-        cls._indexed_directories = [
-            str(mount.host)
+        """Bring the file index up to date, re-checking every known file."""
+        cls.refresh_index(verify=True)
+
+    @classmethod
+    def refresh_index(
+        cls,
+        *,
+        verify: bool = False,
+        dirs: dict[str, bool] | None = None,
+        shards: list[IndexShard] | None = None,
+    ) -> ChangeSet:
+        """Scan the shards' directories through their journals and patch the index.
+
+        Only directories whose mtime changed are listed.  *verify* also
+        re-stats known files to catch in-place edits; *dirs* restricts the
+        scan to directories reported by the filesystem watcher.  *shards*
+        defaults to every indexed mount.
+        """
+        with cls._refresh_lock:
+            changes = cls._sync_shards()
+            for shard in cls._shards.values() if shards is None else shards:
+                shard_changes = shard.own(shard.journal.scan(verify=verify, dirs=dirs))
+                cls._apply_changes(shard_changes)
+                changes.merge(shard_changes)
+        return changes
+
+    @classmethod
+    def _sync_shards(cls, load_journals: bool = False) -> ChangeSet:
+        """Create a shard per indexed mount and drop shards of removed mounts.
+
+        With *load_journals*, new shards start from their saved journal
+        so the file index is usable before the first scan.
+        """
+        mounts = [
+            mount
             for mount in indexed_mounts()
             if mount.host is not None and mount.host.is_dir()
         ]
-        for dir_path in cls._indexed_directories:
-            for fp in Path(dir_path).rglob("*"):
-                if fp.is_file() and fp.suffix.lower() in cls.EXTENSIONS:
-                    cls._index.append((fp.name.lower(), str(fp)))
+        changes = ChangeSet()
+        shards: dict[str, IndexShard] = {}
+        for mount in mounts:
+            root = os.path.normpath(str(mount.host))
+            shard = cls._shards.get(mount.name)
+            if shard is None or shard.root != root:
+                shard = IndexShard(mount.name, root)
+                shard.journal = DirectoryJournal(cls._extensions())
+                if load_journals and shard.journal.load(cls._shard_dir(shard) / "journal.json"):
+                    cls._debug_log(
+                        f"Loaded file journal for {mount.name} "
+                        f"({shard.journal.directory_count()} directories)",
+                        0,
+                    )
+                shard.journal.set_roots([root])
+                shard.requested = True
+            shard.reindex_interval = mount.reindex_interval
+            shards[mount.name] = shard
+        for shard in shards.values():
+            shard.excluded = tuple(
+                other.root for other in shards.values()
+                if other is not shard and other.root.startswith(shard.root.rstrip(os.sep) + os.sep)
+            )
+        for name, shard in cls._shards.items():
+            if shards.get(name) is not shard:
+                changes.removed.update(shard.files())
+        for name, shard in shards.items():
+            if cls._shards.get(name) is not shard:
+                changes.merge(ChangeSet(added=shard.files()))
+        if changes:
+            cls._apply_changes(changes)
+        cls._shards = shards
+        cls._indexed_directories = [shard.root for shard in shards.values()]
+        return changes
+
+    @classmethod
+    def notify_paths_changed(cls, paths: list[str]) -> None:
+        """Queue host *paths* the app just wrote, created, copied or deleted.
+
+        Each path goes to the shard that owns it (the innermost one, when
+        shards are nested), whichever mount the tool wrote through.  The
+        index loop applies the queue as one targeted update once no write
+        arrived for ``[index] write_debounce`` seconds (or after
+        ``WRITE_MAX_DELAY`` during a long burst), without scanning the mount.
+        """
+        now = time.monotonic()
+        with cls._dirty_lock:
+            for path in paths:
+                shard = cls._owning_shard(os.path.normpath(path))
+                if shard is None:
+                    continue
+                if not shard.pending_paths:
+                    shard.pending_first = now
+                shard.pending_paths.add(path)
+                shard.pending_last = now
+        cls._reindex_event.set()
+
+    @classmethod
+    def _owning_shard(cls, path: str) -> IndexShard | None:
+        """Return the shard with the longest root containing *path*, if any."""
+        owners = [
+            shard for shard in cls._shards.values()
+            if path == shard.root or path.startswith(shard.root.rstrip(os.sep) + os.sep)
+        ]
+        return max(owners, key=lambda shard: len(shard.root)) if owners else None
+
+    @classmethod
+    def _pending_due(cls, shard: IndexShard) -> float | None:
+        """Return when *shard*'s queued writes should be applied, if any are queued."""
+        if not shard.pending_paths:
+            return None
+        debounce = get_runtime_config().index.write_debounce
+        return min(shard.pending_last + debounce, shard.pending_first + cls.WRITE_MAX_DELAY)
+
+    @classmethod
+    def request_reindex(cls, mount: str | None = None) -> None:
+        """Ask the index loop to rescan *mount* (every mount if ``None``) now."""
+        with cls._dirty_lock:
+            for name, shard in cls._shards.items():
+                if mount is None or name == mount:
+                    shard.requested = True
+        cls._reindex_event.set()
 
-        # Sort alphabetically by basename for deterministic ordering
-        cls._index.sort(key=lambda t: t[0])
-        cls._filepath_to_idx = {fp: idx for idx, (_, fp) in enumerate(cls._index)}
+    @classmethod
+    def _apply_changes(cls, changes: ChangeSet) -> None:
+        """Patch ``_index``, ``_filepath_to_idx`` and the autocomplete trigrams.
+
+        The index stays sorted by basename.  Positions before the first
+        change keep their IDs.  Readers on other threads see either the old
+        or the new list because the patched copy is swapped in at once.
+        """
+        cls._trigrams.apply(changes)
+        if not changes.added and not changes.removed:
+            return
+        index = cls._index
+        first = len(index)
+        positions = [
+            cls._filepath_to_idx[fp]
+            for fp in changes.removed
+            if fp in cls._filepath_to_idx
+        ]
+        if positions:
+            first = min(positions)
+            index = [item for item in index if item[1] not in changes.removed]
+        added = sorted(
+            (Path(fp).name.lower(), fp)
+            for fp in changes.added
+            if fp not in cls._filepath_to_idx or fp in changes.removed
+        )
+        if added:
+            first = min(first, bisect.bisect_left(index, added[0]))
+            index = list(heapq.merge(index, added))
+
+        filepath_to_idx = dict(cls._filepath_to_idx)
+        for filepath in changes.removed:
+            filepath_to_idx.pop(filepath, None)
+        for pos in range(first, len(index)):
+            filepath_to_idx[index[pos][1]] = pos
+        cls._index = index
+        cls._filepath_to_idx = filepath_to_idx
 
     # ------------------------------------------------------------------
     # TagPlugin interface – normal expansion
@@ -199,11 +397,9 @@ class FileTag(TagPlugin):
         if len(search_term) < self.MIN_CHARS:
             return []
 
-        term_lc = search_term.lower()
-        matches = [fp for base, fp in FileTag._index if term_lc in base]
-        matches.sort()
+        matches = FileTag._trigrams.search(search_term, max_results)
         raw_tags: list[str] = []
-        for p in matches[:max_results]:
+        for p in matches:
             virtual = indexed_virtual_path(p)
             if virtual is not None:
                 raw_tags.append(f'@"{virtual}"')
@@ -303,184 +499,809 @@ class FileTag(TagPlugin):
 
     @classmethod
     def _index_loop(cls, interval: float):
+        cls._load_journal()
         while True:
-            cls.build_index()
-            if cls._index and (cls._embeddings is not None or cls._first_build_done):
-                cls._build_embeddings()
-            cls._reindex_event.wait(timeout=interval)
+            cls._sync_shards_locked()
+            cls._ensure_watcher()
+            for shard in list(cls._shards.values()):
+                cls._refresh_shard(shard, interval)
+            now = time.monotonic()
+            deadlines = [shard.next_refresh for shard in cls._shards.values()]
+            with cls._dirty_lock:
+                deadlines.extend(
+                    due for due in map(cls._pending_due, cls._shards.values()) if due is not None
+                )
+            timeout = max(0.0, min(deadlines) - now) if deadlines else interval
+            cls._reindex_event.wait(timeout=timeout)
             cls._reindex_event.clear()
 
+    @classmethod
+    def _refresh_shard(cls, shard: IndexShard, interval: float) -> None:
+        """Update and rebuild *shard* if it has queued writes, a request, or is due.
+
+        Files written by tools are patched in from the write queue without
+        a scan.  Explicit requests (``/reindex``) re-stat every file; watcher
+        reports only rescan the reported directories.  The periodic pass
+        runs every ``reindex_interval`` seconds of the mount (*interval* by
+        default); without a watcher, in-place edits are caught by a slow
+        full pass.
+        """
+        now = time.monotonic()
+        with cls._dirty_lock:
+            requested, shard.requested = shard.requested, False
+            dirty, shard.dirty_dirs = shard.dirty_dirs, {}
+            written: set[str] = set()
+            pending_due = cls._pending_due(shard)
+            if pending_due is not None and (now >= pending_due or requested):
+                written, shard.pending_paths = shard.pending_paths, set()
+        due = now >= shard.next_refresh
+        if not (requested or dirty or due or written):
+            return
+
+        changes = ChangeSet()
+        if written:
+            with cls._refresh_lock:
+                written_changes = shard.own(shard.journal.update_paths(written))
+                cls._apply_changes(written_changes)
+            cls._debug_log(
+                f"Applied {len(written)} written paths to {shard.name}: "
+                f"{len(written_changes.added)} added, {len(written_changes.modified)} modified, "
+                f"{len(written_changes.removed)} removed",
+                0,
+            )
+            changes.merge(written_changes)
+        if requested or dirty or due:
+            verify = requested or (
+                due and cls._watcher is None and now - shard.last_verify >= cls.VERIFY_INTERVAL
+            )
+            if verify:
+                shard.last_verify = now
+            scan_dirs = dirty if dirty and not requested and not due else None
+            changes.merge(cls.refresh_index(verify=verify, dirs=scan_dirs, shards=[shard]))
+            shard.next_refresh = now + (shard.reindex_interval or interval)
+        if changes:
+            cls._save_journal(shard)
+        if shard.loaded:
+            cls._build_embeddings(shard)
+
+    @classmethod
+    def _sync_shards_locked(cls) -> None:
+        with cls._refresh_lock:
+            cls._sync_shards()
+
+    @classmethod
+    def _ensure_watcher(cls) -> None:
+        roots = cls._indexed_directories
+        if cls._watcher is not None:
+            if cls._watcher.roots == roots:
+                return
+            cls._watcher.stop()
+            cls._watcher = None
+        cls._watcher = create_watcher(roots, cls._on_watch_event)
+        if cls._watcher is not None:
+            cls._debug_log(f"Watching {len(roots)} indexed directories for changes", 0)
+
+    @classmethod
+    def _on_watch_event(cls, directories: list[str], recursive: bool) -> None:
+        """Queue reported directories on the shard that owns them."""
+        with cls._dirty_lock:
+            for directory in directories:
+                directory = os.path.normpath(directory)
+                shard = cls._owning_shard(directory)
+                if shard is None:
+                    continue
+                shard.dirty_dirs[directory] = shard.dirty_dirs.get(directory, False) or recursive
+        cls._reindex_event.set()
+
     @classmethod
     def _start_reindex(cls):
         cls._debug_log("Reindexing...", 0)
-        cls._reindex_event.set()
+        cls.request_reindex()
 
     @classmethod
     def _load_embedding_model(cls) -> txtai.Embeddings:
         """Load embeddings from the app-managed local model snapshot only."""
         return txtai.Embeddings(path=str(get_embedding_model_dir()))
 
+    @classmethod
+    def _new_vector_index(cls) -> VectorIndex:
+        """Create an index that stores vectors computed by :meth:`_encode`."""
+        settings = get_runtime_config().index
+        return VectorIndex(dtype=settings.vector_dtype, ann=cls._ann_backend(settings))
+
+    @classmethod
+    def _ann_backend(cls, settings: IndexConfig) -> AnnBackend | None:
+        """Build the configured ANN backend, falling back to IVF without faiss."""
+        if settings.ann_backend == "hnsw":
+            try:
+                return make_backend(
+                    "hnsw",
+                    m=settings.hnsw_m,
+                    ef_search=settings.hnsw_ef_search,
+                    min_rows=settings.ann_min_rows,
+                )
+            except ImportError:
+                cls._debug_log("faiss is not installed; using the IVF index instead", 1)
+        elif settings.ann_backend == "exact":
+            return None
+        return make_backend(
+            "ivf",
+            nprobe=settings.ivf_nprobe,
+            lists=settings.ivf_lists,
+            min_rows=settings.ann_min_rows,
+        )
+
+    @classmethod
+    def _new_keyword_index(cls, shard: IndexShard) -> KeywordIndex:
+        return KeywordIndex(cls._shard_dir(shard) / "keywords.sqlite")
+
+    @classmethod
+    def search_latency_stats(cls, during_reindex: bool | None = None) -> dict[str, float]:
+        """Return p50/p99 search latency in milliseconds (see :class:`LatencyRecorder`)."""
+        return cls._search_latency.stats(during_reindex)
+
+    @classmethod
+    def search_cache_stats(cls) -> dict[str, dict[str, int]]:
+        """Return entry and hit/miss counts of the query, result and preview caches."""
+        return {
+            "query_vectors": cls._query_vectors.stats(),
+            "results": cls._search_results.stats(),
+            "previews": cls._previews.stats(),
+        }
+
+    @classmethod
+    def _bump_generation(cls, shard: IndexShard) -> None:
+        """Mark cached search results of *shard* stale after its indexes changed."""
+        shard.generation += 1
+        cls._index_generation += 1
+
+    @classmethod
+    def _encode(cls, texts: list[str]) -> np.ndarray:
+        """Embed *texts* with the local model, loading it on first use."""
+        return np.asarray(cls._ensure_encoder().batchtransform(texts), dtype=np.float32)
+
+    @classmethod
+    def _ensure_encoder(cls) -> txtai.Embeddings:
+        # A local reference: the warm-up thread may unload the shared one.
+        encoder = cls._encoder
+        if encoder is None:
+            started = time.perf_counter()
+            encoder = cls._encoder = cls._load_embedding_model()
+            cls._warmup_stats["model_load_ms"] = (time.perf_counter() - started) * 1000
+            if cls._warmup is not None:
+                cls._warmup.touch()  # schedules the idle unload
+        return encoder
+
+    # ------------------------------------------------------------------
+    # Warm-up
+    # ------------------------------------------------------------------
+    @classmethod
+    def start_warmup_scheduler(cls) -> None:
+        """Warm the model and index in the background when a search looks likely."""
+        settings = get_runtime_config().index
+        cls._warmup = WarmupScheduler(
+            warm=cls.warm_up,
+            unload=cls.unload_model,
+            is_warm=cls.is_warm,
+            is_loaded=cls.is_model_loaded,
+            launch_delay=settings.warmup_after_launch,
+            unload_after=settings.unload_after,
+            log=cls._debug_log,
+        )
+        cls._warmup.start()
+
+    @classmethod
+    def request_warmup(cls, reason: str) -> None:
+        """Hint that a note search may follow (window opened, ``@`` typed)."""
+        if cls._warmup is not None:
+            cls._warmup.request(reason)
+
+    @classmethod
+    def is_warm(cls) -> bool:
+        """Whether a warm-up finished since the model was last unloaded.
+
+        True even if there was nothing to index, so repeated hints don't
+        warm up (and scan the mounts) again.
+        """
+        return cls._warmed.is_set()
+
+    @classmethod
+    def is_model_loaded(cls) -> bool:
+        return cls._encoder is not None
+
+    @classmethod
+    def _index_loaded(cls) -> bool:
+        shards = list(cls._shards.values())
+        return bool(shards) and all(shard.embeddings is not None for shard in shards)
+
+    @classmethod
+    def warm_up(cls, reason: str = "") -> None:
+        """Load the model and the index and run one inference."""
+        started = time.perf_counter()
+        cls._debug_log(f"Warming up note search ({reason})", 0)
+        cls._encode(["warm up"])
+        if not cls._index:
+            cls.build_index()
+        for shard in list(cls._shards.values()):
+            if shard.embeddings is None and not shard.build_lock.locked():
+                cls._build_embeddings(shard)
+        elapsed = (time.perf_counter() - started) * 1000
+        cls._warmup_stats["warmups"] += 1
+        cls._warmup_stats["last_warmup_ms"] = elapsed
+        cls._warmup_stats["last_reason"] = reason
+        cls._warmed.set()
+        cls._debug_log(f"Note search warm ({elapsed:.0f} ms)", 0)
+
+    @classmethod
+    def unload_model(cls) -> bool:
+        """Drop the embedding model after idle time; returns whether it was loaded.
+
+        Skipped while a build is running.  The memory-mapped indexes stay
+        open; their pages are reclaimed by the OS as needed.
+        """
+        held = []
+        try:
+            for shard in list(cls._shards.values()):
+                if not shard.build_lock.acquire(blocking=False):
+                    return False
+                held.append(shard.build_lock)
+            if cls._encoder is None:
+                return False
+            cls._encoder = None
+            cls._warmed.clear()
+        finally:
+            for lock in held:
+                lock.release()
+        cls._warmup_stats["unloads"] += 1
+        cls._debug_log("Unloaded the embedding model after idle time", 0)
+        return True
+
+    @classmethod
+    def warmup_stats(cls) -> dict:
+        """Return warm-up counters, model load time and cold/warm search timings.
+
+        ``cold_search`` covers searches that had to load the model or the
+        index themselves; ``warm_search`` the rest.
+        """
+        return {
+            "model_loaded": cls.is_model_loaded(),
+            "index_loaded": cls._index_loaded(),
+            **cls._warmup_stats,
+            "cold_search": cls._end_to_end_latency.stats(True),
+            "warm_search": cls._end_to_end_latency.stats(False),
+        }
+
+    @classmethod
+    def _vectors_for(cls, chunks: list[Chunk], pool: EncoderPool | None = None) -> list[np.ndarray]:
+        """Return a vector per chunk, embedding only digests not in the cache."""
+        vectors: list[np.ndarray | None] = [cls._vector_cache.get(c.digest) for c in chunks]
+        missing: dict[str, str] = {}
+        for chunk, vector in zip(chunks, vectors):
+            if vector is None:
+                missing.setdefault(chunk.digest, chunk.text)
+        if missing:
+            texts = list(missing.values())
+            vectors_out = pool.encode(texts) if pool is not None else cls._encode(texts)
+            for digest, vector in zip(missing, vectors_out):
+                cls._vector_cache.put(digest, vector)
+        cls._debug_log(
+            f"Vector cache: {len(chunks) - len(missing)} reused, {len(missing)} embedded", 0
+        )
+        return [
+            vector if vector is not None else cls._vector_cache.get(chunk.digest)
+            for chunk, vector in zip(chunks, vectors)
+        ]
+
     @classmethod
     def _cache_dir(cls) -> Path:
         from macllm.core.persistence import get_storage_dir
         return get_storage_dir() / cls.CACHE_SUBDIR
 
     @classmethod
-    def _save_cache(cls):
+    def _extensions(cls) -> tuple[str, ...]:
+        """Indexed file extensions: notes plus the enabled ``index.document_types``."""
+        return cls.EXTENSIONS + extensions_for(get_runtime_config().index.document_types)
+
+    @classmethod
+    def _extracted_type(cls, filepath: str):
+        """Return the document type of *filepath* if its text must be extracted."""
+        doc_type = document_type(filepath, get_runtime_config().index.document_types)
+        return doc_type if doc_type is not None and doc_type.extract is not None else None
+
+    @classmethod
+    def _extraction_cache(cls) -> ExtractionCache:
+        if cls._extractions is None:
+            extractions = ExtractionCache(cls._cache_dir() / "extracted")
+            extractions.load()
+            cls._extractions = extractions
+        return cls._extractions
+
+    @classmethod
+    def _shard_dir(cls, shard: IndexShard) -> Path:
+        return cls._cache_dir() / "shards" / shard.key
+
+    @classmethod
+    def _load_journal(cls) -> None:
+        """Seed the shards and file index from the last saved directory trees."""
+        with cls._refresh_lock:
+            cls._sync_shards(load_journals=True)
+        if cls._index:
+            cls._debug_log(f"Loaded file journals ({len(cls._index)} files)", 0)
+
+    @classmethod
+    def _save_journal(cls, shard: IndexShard) -> None:
+        try:
+            shard_dir = cls._shard_dir(shard)
+            shard_dir.mkdir(parents=True, exist_ok=True)
+            shard.journal.save(shard_dir / "journal.json")
+        except Exception as e:
+            cls._debug_log(f"Failed to save file journal of {shard.name}: {e}", 1)
+
+    @classmethod
+    def _save_cache(cls, shard: IndexShard):
         try:
             cache_dir = cls._cache_dir()
-            cache_dir.mkdir(parents=True, exist_ok=True)
-            with cls._embedding_lock:
-                if cls._embeddings is not None:
-                    cls._embeddings.save(str(cache_dir))
-            with open(cache_dir / "mtimes.json", "w") as f:
-                json.dump(cls._file_mtimes, f)
+            shard_dir = cls._shard_dir(shard)
+            shard_dir.mkdir(parents=True, exist_ok=True)
+            embeddings = shard.embeddings
+            if embeddings is not None:
+                embeddings.save(str(shard_dir))
+            cls._vector_cache.save(cache_dir)
+            if cls._extractions is not None:
+                cls._extractions.save()
+            with open(shard_dir / "mtimes.json", "w") as f:
+                json.dump(shard.file_mtimes, f)
+            with open(shard_dir / "chunks.json", "w") as f:
+                json.dump(shard.file_chunks, f)
         except Exception as e:
             if cls._macllm:
-                cls._debug_log(f"Failed to save embedding cache: {e}", 1)
+                cls._debug_log(f"Failed to save embedding cache of {shard.name}: {e}", 1)
 
     @classmethod
-    def _load_cache(cls) -> bool:
-        """Attempt to restore embeddings from disk cache.
+    def _load_vector_cache(cls) -> None:
+        # Vectors are reusable even when a shard's index has to be rebuilt.
+        if not cls._vector_cache_loaded:
+            cls._vector_cache.load(cls._cache_dir())
+            cls._vector_cache_loaded = True
+
+    @classmethod
+    def _load_cache(cls, shard: IndexShard) -> bool:
+        """Attempt to restore *shard*'s indexes from its disk cache.
 
         Returns ``True`` if the cache was loaded successfully, populating
-        ``_embeddings``, ``_file_mtimes``, and setting ``_first_build_done``.
-        On any failure the state is left clean so a full rebuild can proceed.
+        the shard's ``embeddings``, ``keywords``, ``file_mtimes`` and
+        ``file_chunks`` and setting ``first_build_done``.  On any failure
+        the shard is left clean so a full rebuild can proceed.
         """
-        cache_dir = cls._cache_dir()
-        mtimes_path = cache_dir / "mtimes.json"
+        cls._load_vector_cache()
+        shard_dir = cls._shard_dir(shard)
+        mtimes_path = shard_dir / "mtimes.json"
+        chunks_path = shard_dir / "chunks.json"
         if not mtimes_path.exists():
             return False
         try:
             with open(mtimes_path, "r") as f:
-                cls._file_mtimes = json.load(f)
-            embeddings = cls._load_embedding_model()
-            embeddings.load(str(cache_dir))
-            cls._embeddings = embeddings
-            cls._first_build_done = True
+                shard.file_mtimes = json.load(f)
+            if chunks_path.exists():
+                with open(chunks_path, "r") as f:
+                    shard.file_chunks = json.load(f)
+            embeddings = cls._new_vector_index()
+            embeddings.load(str(shard_dir))
+            keywords = cls._new_keyword_index(shard)
+            expected = sum(len(ids) for ids in shard.file_chunks.values())
+            if len(keywords) != expected:
+                raise ValueError(f"keyword index has {len(keywords)} of {expected} passages")
+            shard.embeddings = embeddings
+            shard.keywords = keywords
+            cls._bump_generation(shard)
+            shard.first_build_done = True
             cls._debug_log(
-                f"Loaded embedding cache ({len(cls._file_mtimes)} files)", 0
+                f"Loaded embedding cache of {shard.name} ({len(shard.file_mtimes)} files)", 0
             )
             return True
         except Exception as e:
-            cls._debug_log(f"Cache load failed, rebuilding: {e}", 1)
-            cls._file_mtimes = {}
-            cls._embeddings = None
-            cls._first_build_done = False
+            cls._debug_log(f"Cache load of {shard.name} failed, rebuilding: {e}", 1)
+            shard.file_mtimes = {}
+            shard.file_chunks = {}
+            shard.embeddings = None
+            shard.keywords = None
+            shard.first_build_done = False
             return False
 
     @classmethod
-    def _prepare_docs(cls, filepaths: list[str]) -> list[tuple]:
-        """Build txtai document tuples for the given filepaths.
+    def _chunk_files(cls, filepaths: list[str]) -> dict[str, list[Chunk]]:
+        """Split each file into passage chunks on a thread pool, skipping unreadable files.
 
-        Each tuple is ``(filepath, indexed_content, None)`` where *filepath*
-        is used as a stable document ID.
+        PDF, HTML and DOCX files are chunked from their extracted text.  Text
+        not in the extraction cache is extracted in worker processes, so a
+        slow document only holds up its own reader thread.
         """
-        docs = []
-        for filepath in filepaths:
+        settings = get_runtime_config().index
+        extractions = cls._extraction_cache()
+        pool: ExtractorPool | None = None
+        pool_lock = threading.Lock()
+
+        def extract(filepath: str) -> str:
+            nonlocal pool
+            text = extractions.get(filepath)
+            if text is None:
+                with pool_lock:
+                    if pool is None:
+                        pool = ExtractorPool(settings.extract_processes, settings.extract_timeout)
+                text = pool.extract(filepath, cls.MAX_CONTEXT_LEN)
+                extractions.put(filepath, text)
+            return text
+
+        def read(filepath: str) -> list[Chunk] | None:
             try:
-                filename = Path(filepath).name
-                with open(filepath, "r", encoding="utf-8") as f:
-                    content = f.read(cls.SEARCH_PREVIEW_LEN)
-                indexed_content = f"{filename}\n{content}"
-                docs.append((filepath, indexed_content, None))
+                if cls._extracted_type(filepath) is not None:
+                    return chunk_text(filepath, extract(filepath))
+                return chunk_file(filepath, cls.MAX_CONTEXT_LEN)
             except Exception as e:
                 cls._debug_log(f"Skipping unreadable file: {filepath} ({e})", 1)
-        return docs
+                return None
+
+        chunks: dict[str, list[Chunk]] = {}
+        try:
+            with ThreadPoolExecutor(max_workers=cls.READ_THREADS) as executor:
+                for filepath, file_chunks in zip(filepaths, executor.map(read, filepaths)):
+                    if file_chunks is not None:
+                        chunks[filepath] = file_chunks
+        finally:
+            if pool is not None:
+                pool.close()
+        return chunks
 
     @classmethod
-    def _build_embeddings(cls):
-        if not cls._first_build_done:
-            cls._load_cache()
+    def _prepare_docs(cls, chunks: list[Chunk], pool: EncoderPool | None = None) -> list[tuple]:
+        """Build txtai document tuples ``(chunk_id, vector, None)``."""
+        vectors = cls._vectors_for(chunks, pool) if chunks else []
+        return [(chunk.chunk_id, vector, None) for chunk, vector in zip(chunks, vectors)]
 
-        current_mtimes: dict[str, float] = {}
-        for _, filepath in cls._index:
-            try:
-                current_mtimes[filepath] = os.path.getmtime(filepath)
-            except OSError:
-                continue
+    @classmethod
+    def _build_embeddings(cls, shard: IndexShard | None = None):
+        """Bring *shard*'s passage indexes up to date (every shard if ``None``)."""
+        for shard in [shard] if shard is not None else list(cls._shards.values()):
+            with shard.build_lock:
+                cls._run_embedding_build(shard)
+
+    @classmethod
+    def _run_embedding_build(cls, shard: IndexShard):
+        if not shard.first_build_done:
+            cls._load_cache(shard)
 
-        new_files = [fp for fp in current_mtimes if fp not in cls._file_mtimes]
+        current_mtimes = shard.files()
+
+        new_files = [fp for fp in current_mtimes if fp not in shard.file_mtimes]
         changed_files = [
             fp for fp in current_mtimes
-            if fp in cls._file_mtimes and cls._file_mtimes[fp] != current_mtimes[fp]
+            if fp in shard.file_mtimes and shard.file_mtimes[fp] != current_mtimes[fp]
         ]
-        deleted_files = [fp for fp in cls._file_mtimes if fp not in current_mtimes]
+        deleted_files = [fp for fp in shard.file_mtimes if fp not in current_mtimes]
 
-        if not new_files and not changed_files and not deleted_files and cls._first_build_done:
-            cls._embedding_ready.set()
+        if not new_files and not changed_files and not deleted_files and shard.first_build_done:
+            shard.embedding_ready.set()
             return
 
         n_new, n_changed, n_deleted = len(new_files), len(changed_files), len(deleted_files)
         n_unchanged = len(current_mtimes) - n_new - n_changed
         cls._debug_log(
-            f"Embedding update: {n_new} new, {n_changed} changed, "
+            f"Embedding update of {shard.name}: {n_new} new, {n_changed} changed, "
             f"{n_deleted} deleted, {n_unchanged} unchanged",
             0,
         )
 
-        with cls._embedding_lock:
-            if cls._embeddings is None:
-                cls._embeddings = cls._load_embedding_model()
-
-            if not cls._first_build_done:
-                docs = cls._prepare_docs(list(current_mtimes.keys()))
-                if docs:
-                    cls._embeddings.index(docs)
-                cls._first_build_done = True
-            else:
-                if deleted_files:
-                    cls._embeddings.delete(deleted_files)
-                files_to_upsert = new_files + changed_files
-                if files_to_upsert:
-                    docs = cls._prepare_docs(files_to_upsert)
+        chunked = cls._chunk_files(new_files + changed_files)
+        stale_ids: list[str] = []
+        for filepath in deleted_files:
+            stale_ids.extend(shard.file_chunks.get(filepath, []))
+        for filepath in changed_files:
+            new_ids = {chunk.chunk_id for chunk in chunked.get(filepath, [])}
+            stale_ids.extend(
+                chunk_id for chunk_id in shard.file_chunks.get(filepath, [])
+                if chunk_id not in new_ids
+            )
+        fresh: dict[str, list[Chunk]] = {}
+        for filepath in new_files + changed_files:
+            old_ids = set(shard.file_chunks.get(filepath, []))
+            fresh[filepath] = [
+                chunk for chunk in chunked.get(filepath, []) if chunk.chunk_id not in old_ids
+            ]
+
+        if shard.embeddings is None:
+            shard.embeddings = cls._new_vector_index()
+        if shard.keywords is None:
+            shard.keywords = cls._new_keyword_index(shard)
+        embeddings, keywords = shard.embeddings, shard.keywords
+        if stale_ids and shard.first_build_done:
+            embeddings.delete(stale_ids)
+            keywords.delete(stale_ids)
+            cls._bump_generation(shard)
+        for filepath in deleted_files:
+            shard.file_mtimes.pop(filepath, None)
+            shard.file_chunks.pop(filepath, None)
+
+        settings = get_runtime_config().index
+        total = sum(len(chunks) for chunks in fresh.values())
+        pool = cls._start_encoder_pool(total, settings)
+        done = 0
+        last_save = time.monotonic()
+        try:
+            for files, chunks in cls._batches(fresh, settings.batch_size):
+                started = time.monotonic()
+                docs = cls._prepare_docs(chunks, pool)
+                passages = [(chunk.chunk_id, chunk.text) for chunk in chunks]
+                # Each write publishes a new index generation; searches in
+                # flight keep reading the one they started with.
+                if not shard.first_build_done:
                     if docs:
-                        cls._embeddings.upsert(docs)
+                        embeddings.index(docs)
+                    keywords.index(passages)
+                    shard.first_build_done = True
+                elif docs:
+                    embeddings.upsert(docs)
+                    keywords.upsert(passages)
+                cls._bump_generation(shard)
+                for filepath in files:
+                    shard.file_mtimes[filepath] = current_mtimes[filepath]
+                    shard.file_chunks[filepath] = [
+                        chunk.chunk_id for chunk in chunked.get(filepath, [])
+                    ]
+                # Searches can use the passages published so far.
+                shard.embedding_ready.set()
+
+                done += len(chunks)
+                if total:
+                    cls._debug_log(
+                        f"Embedding progress: {done}/{total} passages "
+                        f"({done * 100 // total}%)",
+                        0,
+                    )
+                if time.monotonic() - last_save >= cls.BUILD_SAVE_INTERVAL:
+                    cls._save_cache(shard)
+                    last_save = time.monotonic()
+                cls._throttle(time.monotonic() - started, settings.cpu_budget)
+        finally:
+            if pool is not None:
+                pool.close()
+
+        if not shard.first_build_done:
+            keywords.index([])
+            shard.first_build_done = True
+            cls._bump_generation(shard)
+        cls._debug_log(
+            f"Indexed {total} passages, removed {len(stale_ids)}", 0
+        )
+        latency = cls._search_latency.stats(during_reindex=True)
+        if latency["count"]:
+            cls._debug_log(
+                f"Search latency during reindex: p50 {latency['p50_ms']:.1f} ms, "
+                f"p99 {latency['p99_ms']:.1f} ms ({latency['count']} searches)",
+                0,
+            )
+        shard.embedding_ready.set()
+        if cls._extractions is not None:
+            cls._extractions.prune(
+                {path for other in list(cls._shards.values()) for path in other.files()}
+            )
+        cls._save_cache(shard)
+
+    @staticmethod
+    def _batches(
+        fresh: dict[str, list[Chunk]], batch_size: int
+    ) -> Iterator[tuple[list[str], list[Chunk]]]:
+        """Group whole files into batches of roughly *batch_size* passages."""
+        files: list[str] = []
+        chunks: list[Chunk] = []
+        for filepath, file_chunks in fresh.items():
+            files.append(filepath)
+            chunks.extend(file_chunks)
+            if len(chunks) >= batch_size:
+                yield files, chunks
+                files, chunks = [], []
+        if files:
+            yield files, chunks
+
+    @classmethod
+    def _start_encoder_pool(cls, total: int, settings: IndexConfig) -> EncoderPool | None:
+        """Start worker processes for builds large enough to amortize them."""
+        if settings.embedding_processes < 1 or total < settings.batch_size * cls.POOL_MIN_BATCHES:
+            return None
+        try:
+            return EncoderPool(str(get_embedding_model_dir()), settings.embedding_processes)
+        except Exception as e:
+            cls._debug_log(f"Embedding process pool unavailable: {e}", 1)
+            return None
 
-        cls._file_mtimes = current_mtimes
-        cls._embedding_ready.set()
-        cls._save_cache()
+    @staticmethod
+    def _throttle(elapsed: float, cpu_budget: float) -> None:
+        """Sleep so that computing takes at most *cpu_budget* of wall time."""
+        if cpu_budget < 1.0:
+            time.sleep(elapsed * (1.0 - cpu_budget) / cpu_budget)
 
     @classmethod
-    def search(cls, query: str, n: int = SEARCH_RESULTS_COUNT, timeout: float = 60.0) -> list[tuple[int, float, str, str, bool]]:
+    def search(
+        cls,
+        query: str,
+        n: int = SEARCH_RESULTS_COUNT,
+        timeout: float = 60.0,
+        pooling: str = "max",
+        engine: str | None = None,
+    ) -> list[tuple[int, float, str, str, bool, int]]:
+        """Return the *n* best files as ``(id, score, path, passage, truncated, offset)``.
+
+        *engine* is ``"vector"`` (semantic), ``"keyword"`` (BM25), or
+        ``"hybrid"`` (both, fused by weighted reciprocal rank); it defaults
+        to ``[index] search_engine``.  Passage hits are pooled per file
+        (``"max"`` or ``"mean"`` of the file's hit scores); *passage* is the
+        best-matching passage and *offset* its byte offset in the file.
+
+        Every shard is searched and the passage hits are merged by score.
+        Shards still building are waited for (up to *timeout*), except
+        that one never built yet is built here first.
+        """
+        search_started = time.perf_counter()
+        cold = not (cls.is_model_loaded() and cls._index_loaded())
+        if cls._warmup is not None:
+            cls._warmup.touch()
         if not cls._index:
             cls.build_index()
 
         if not cls._index:
             return []
 
-        if cls._embeddings is None:
-            cls._embedding_ready.clear()
-            cls._build_embeddings()
-        elif not cls._embedding_ready.wait(timeout=timeout):
+        deadline = time.monotonic() + timeout
+        shards = []
+        for shard in list(cls._shards.values()):
+            if shard.embeddings is None and not shard.build_lock.locked():
+                shard.embedding_ready.clear()
+                cls._build_embeddings(shard)
+            elif not shard.embedding_ready.wait(timeout=max(0.0, deadline - time.monotonic())):
+                continue
+            if shard.embeddings is not None:
+                shards.append(shard)
+        if not shards:
             return []
 
-        with cls._embedding_lock:
-            if cls._embeddings is None:
-                return []
-            results = cls._embeddings.search(query, n)
+        started = time.perf_counter()
+        during_reindex = any(shard.build_lock.locked() for shard in shards)
+        limit = n * cls.SEARCH_CHUNK_OVERSAMPLE
+        results = heapq.nlargest(
+            limit,
+            (
+                hit
+                for shard in shards
+                for hit in cls._search_passages(shard, query, limit, engine)
+            ),
+            key=lambda hit: hit[1],
+        )
+        cls._search_latency.record(time.perf_counter() - started, during_reindex)
 
-        output = []
+        # filepath -> (scores, best score, best offset)
+        hits: dict[str, tuple[list[float], float, int | None]] = {}
         for doc_id, score in results:
+            offset = None
             if isinstance(doc_id, str):
-                filepath = doc_id
+                parsed = parse_chunk_id(doc_id)
+                if parsed is not None:
+                    filepath, offset, _ = parsed
+                else:
+                    filepath = doc_id
             elif 0 <= doc_id < len(cls._index):
                 filepath = cls._index[doc_id][1]
             else:
                 continue
-            idx = cls._filepath_to_idx.get(filepath)
-            if idx is None:
+            if filepath not in cls._filepath_to_idx:
                 continue
-            truncated = False
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    preview = f.read(cls.SEARCH_PREVIEW_LEN)
-                    truncated = f.read(1) != ""
-            except Exception:
-                preview = "(unable to read file)"
-            output.append((idx, score, filepath, preview, truncated))
+            scores, best, best_offset = hits.get(filepath, ([], float("-inf"), None))
+            scores.append(score)
+            if score > best:
+                best, best_offset = score, offset
+            hits[filepath] = (scores, best, best_offset)
+
+        def pooled(scores: list[float]) -> float:
+            return sum(scores) / len(scores) if pooling == "mean" else max(scores)
+
+        ranked = sorted(hits.items(), key=lambda item: pooled(item[1][0]), reverse=True)
+        output = []
+        for filepath, (scores, _, offset) in ranked[:n]:
+            preview, truncated = cls._read_preview(filepath, offset)
+            output.append((
+                cls._filepath_to_idx[filepath],
+                pooled(scores),
+                filepath,
+                preview,
+                truncated,
+                offset or 0,
+            ))
+        cls._end_to_end_latency.record(time.perf_counter() - search_started, cold)
         return output
 
+    @classmethod
+    def _search_passages(
+        cls,
+        shard: IndexShard,
+        query: str,
+        limit: int,
+        engine: str | None,
+    ) -> list[tuple[str | int, float]]:
+        settings = get_runtime_config().index
+        engine = engine or settings.search_engine
+        if engine not in SEARCH_ENGINES:
+            raise ValueError(f"Unknown search engine: {engine}")
+        # Read both once: a concurrent cache load may swap them.
+        embeddings, keywords = shard.embeddings, shard.keywords
+        if keywords is None:
+            engine = "vector"
+
+        query = normalize_query(query)
+        key = (shard.name, shard.generation, query, engine, limit)
+        results = cls._search_results.get(key)
+        if results is None:
+            results = cls._rank_passages(embeddings, keywords, query, limit, engine, settings)
+            cls._search_results.put(key, results)
+        return results
+
+    @classmethod
+    def _rank_passages(
+        cls,
+        embeddings: VectorIndex,
+        keywords: KeywordIndex | None,
+        query: str,
+        limit: int,
+        engine: str,
+        settings: IndexConfig,
+    ) -> list[tuple[str | int, float]]:
+        if engine == "keyword":
+            return keywords.search(query, limit)
+        vector_hits = embeddings.search(cls._query_vector(query), limit)
+        if engine == "vector":
+            return vector_hits
+        keyword_hits = keywords.search(query, limit)
+        return reciprocal_rank_fusion(
+            [(vector_hits, settings.vector_weight), (keyword_hits, settings.keyword_weight)],
+            k=settings.rrf_k,
+        )[:limit]
+
+    @classmethod
+    def _query_vector(cls, query: str) -> np.ndarray:
+        """Embed *query*; vectors depend only on the model, not on the index."""
+        vector = cls._query_vectors.get(query)
+        if vector is None:
+            vector = cls._encode([query])[0]
+            cls._query_vectors.put(query, vector)
+        return vector
+
+    @classmethod
+    def _read_preview(cls, filepath: str, offset: int | None) -> tuple[str, bool]:
+        """Read the passage at *offset* (or the file head) and whether more exists.
+
+        Previews are cached by ``(path, mtime, size, offset)``.  Offsets of
+        extracted documents point into their cached text.
+        """
+        try:
+            stat = os.stat(filepath)
+            if offset is None:
+                offset = 0
+            key = (filepath, stat.st_mtime_ns, stat.st_size, offset)
+            cached = cls._previews.get(key)
+            if cached is not None:
+                return cached
+            source, size = filepath, stat.st_size
+            if cls._extracted_type(filepath) is not None:
+                text_path = cls._extraction_cache().text_path(filepath)
+                if text_path is None:
+                    return "(not extracted yet)", False
+                source, size = str(text_path), text_path.stat().st_size
+            preview = read_passage(source, offset, cls.SEARCH_PREVIEW_LEN * 4)
+            preview = preview[:cls.SEARCH_PREVIEW_LEN]
+            end = offset + len(preview.encode("utf-8"))
+            result = (preview, offset > 0 or end < size)
+            cls._previews.put(key, result)
+            return result
+        except Exception:
+            return "(unable to read file)", False
+
     @classmethod
     def get_file_content(cls, file_id: int) -> tuple[str, str]:
         if file_id < 0 or file_id >= len(cls._index):
@@ -10,6 +10,7 @@ from macllm.tools.filesystem import (
     write_file,
 )
 from macllm.tools.note import search_notes
+from macllm.tools.conversations import search_conversations
 from macllm.tools.calendar import (
     cal_list_calendars,
     cal_get_events,
@@ -61,6 +62,7 @@ __all__ = [
     "delete_file",
     "create_directory",
     "search_notes",
+    "search_conversations",
     "cal_list_calendars",
     "cal_get_events",
     "cal_find_events",
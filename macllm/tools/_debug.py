@@ -1,5 +1,5 @@
 """macllm_tool: drop-in replacement for ``@smolagents.tool`` with live
-tool-call tracking on the current conversation."""
+tool-call tracking on the current conversation and opt-in result caching."""
 
 import functools
 import inspect
@@ -13,6 +13,8 @@ warnings.filterwarnings("ignore", message=".*has decorators other than @tool")
 from PIL import Image as PILImage
 from smolagents import tool as _smolagents_tool
 
+from macllm.core.tool_cache import CachePolicy, cache_key, get_tool_cache
+
 _tool_conv_id = threading.local()
 
 
@@ -42,14 +44,48 @@ def set_tool_message(message: str, conv_id: str | None = None) -> None:
         conv.update_last_tool_message(message)
 
 
-def macllm_tool(fn):
-    """Register a smolagents tool and preserve invocation state on the conversation."""
+def _is_cacheable(result) -> bool:
+    return isinstance(result, str) and not result.startswith("Error")
+
+
+def macllm_tool(fn=None, *, cache: CachePolicy | None = None, invalidates: tuple[str, ...] = ()):
+    """Register a smolagents tool and preserve invocation state on the conversation.
+
+    Use as ``@macllm_tool`` or ``@macllm_tool(cache=..., invalidates=...)``.
+    With *cache*, results of read-only calls are reused across runs for the
+    policy's TTL (see :mod:`macllm.core.tool_cache`); error results are
+    never cached.  Every call of a tool with *invalidates* drops the cached
+    results of those namespaces.
+    """
+    if fn is None:
+        return functools.partial(macllm_tool, cache=cache, invalidates=tuple(invalidates))
+
+    signature = inspect.signature(fn)
+
     @functools.wraps(fn)
     def wrapper(*args, **kwargs):
         conv = _get_conversation()
         conv_id = getattr(conv, 'conv_id', None) if conv is not None else None
         _tool_conv_id.value = conv_id
 
+        store = get_tool_cache() if cache is not None or invalidates else None
+        key = None
+        if store is not None and cache is not None and store.ttl_for(fn.__name__, cache) > 0:
+            try:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                key = cache_key(fn.__name__, bound.arguments)
+            except TypeError:
+                key = None  # let the call fail as it would uncached
+            cached = store.get(fn.__name__, key) if key is not None else None
+            if cached is not None:
+                if cache.on_hit is not None:
+                    cache.on_hit(**bound.arguments)
+                if conv is not None:
+                    conv.add_tool_call(fn.__name__, f"Using tool: {fn.__name__} (cached)")
+                    conv.complete_last_tool_call()
+                return cached
+
         if conv is not None:
             conv.add_tool_call(fn.__name__, f"Using tool: {fn.__name__}")
 
@@ -64,6 +100,8 @@ def macllm_tool(fn):
                 return "Image observation."
             if result is None:
                 return ""
+            if key is not None and _is_cacheable(result):
+                store.put(fn.__name__, cache.namespace, key, result, store.ttl_for(fn.__name__, cache))
             return str(result)
         except Exception:
             failed = True
@@ -73,7 +111,10 @@ def macllm_tool(fn):
         finally:
             if conv is not None and not failed:
                 conv.complete_last_tool_call()
-    wrapper.__signature__ = inspect.signature(fn)
+            if store is not None:
+                for namespace in invalidates:
+                    store.invalidate(namespace, fn.__name__)
+    wrapper.__signature__ = signature
     wrapper.__qualname__ = fn.__qualname__
     del wrapper.__wrapped__
     return _smolagents_tool(wrapper)
@@ -5,10 +5,13 @@ import re
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
+from macllm.core.tool_cache import CachePolicy
 from macllm.tools._debug import macllm_tool, set_tool_message
 
 _store_singleton = None
 
+CALENDAR_CACHE = CachePolicy("calendar", ttl=120)  # events also change in Calendar.app
+
 
 def _get_store():
     """Lazy-initialize a singleton CalendarStore."""
@@ -206,7 +209,7 @@ def _format_event_summary(ev) -> str:
 # ---------------------------------------------------------------------------
 
 
-@macllm_tool
+@macllm_tool(cache=CALENDAR_CACHE)
 def cal_list_calendars() -> str:
     """
     List all available macOS calendars.
@@ -228,7 +231,7 @@ def cal_list_calendars() -> str:
     return "\n".join(lines)
 
 
-@macllm_tool
+@macllm_tool(cache=CALENDAR_CACHE)
 def cal_get_events(start: str, end: str, calendars: str = "") -> str:
     """
     Fetch all calendar events in a date range.
@@ -252,7 +255,7 @@ def cal_get_events(start: str, end: str, calendars: str = "") -> str:
     return "\n\n".join(_format_event_summary(ev) for ev in events)
 
 
-@macllm_tool
+@macllm_tool(cache=CALENDAR_CACHE)
 def cal_find_events(
     query: str, start: str, end: str, calendars: str = "", fields: str = ""
 ) -> str:
@@ -287,7 +290,7 @@ def cal_find_events(
     return "\n\n".join(_format_event_summary(ev) for ev in events)
 
 
-@macllm_tool
+@macllm_tool(cache=CALENDAR_CACHE)
 def cal_get_event(event_id: str) -> str:
     """
     Get full details of a calendar event by its ID.
@@ -306,7 +309,7 @@ def cal_get_event(event_id: str) -> str:
     return _format_event(ev)
 
 
-@macllm_tool
+@macllm_tool(invalidates=("calendar",))
 def cal_add_event(
     title: str,
     start: str,
@@ -350,7 +353,7 @@ def cal_add_event(
     return "Event created:\n\n" + _format_event(event)
 
 
-@macllm_tool
+@macllm_tool(invalidates=("calendar",))
 def cal_update_event(
     event_id: str,
     title: str = "",
@@ -398,7 +401,7 @@ def cal_update_event(
     return "Event updated:\n\n" + _format_event(event)
 
 
-@macllm_tool
+@macllm_tool(cache=CALENDAR_CACHE)
 def cal_find_free_time(
     start: str,
     end: str,
@@ -0,0 +1,20 @@
+"""Full-text search over earlier conversations."""
+
+from macllm.core.persistence import get_conversation_search
+from macllm.tools._debug import macllm_tool, set_tool_message
+
+
+@macllm_tool
+def search_conversations(query: str) -> str:
+    """Search earlier conversations for messages or tool results containing every word of the query.
+
+    Args:
+        query: Words to look for, e.g. a name, a ticket id, or a topic discussed before.
+    """
+    set_tool_message(f'Searching conversations for "{query}"')
+    hits = get_conversation_search().search(query)
+    output = [
+        f"[{hit.title or 'Untitled'}] conversation {hit.conv_id} ({hit.kind})\n{hit.snippet}"
+        for hit in hits
+    ]
+    return "\n---\n".join(output) if output else "No matching conversations found"
@@ -2,11 +2,12 @@
 
 from __future__ import annotations
 
+from macllm.core.tool_cache import CachePolicy
 from macllm.tools._debug import macllm_tool, set_tool_message
 
-
 DEFAULT_EMAIL_BODY_CHARS = 2000
 MAX_EMAIL_BODY_CHARS = 50000
+EMAIL_CACHE = CachePolicy("email", ttl=120)
 
 
 def _parse_body_char_limit(value: str) -> int:
@@ -66,7 +67,7 @@ def _fmt_message(msg) -> str:
     return "\n".join(parts)
 
 
-@macllm_tool
+@macllm_tool(cache=EMAIL_CACHE)
 def email_inbox(limit: str = "20") -> str:
     """
     List recent inbox threads from the user's email.
@@ -90,7 +91,7 @@ def email_inbox(limit: str = "20") -> str:
     return "\n\n---\n\n".join(_fmt_thread_summary(t) for t in threads)
 
 
-@macllm_tool
+@macllm_tool(cache=EMAIL_CACHE)
 def email_search(query: str, limit: str = "20") -> str:
     """
     Search email threads by keyword or query string.
@@ -117,7 +118,7 @@ def email_search(query: str, limit: str = "20") -> str:
     return "\n\n---\n\n".join(_fmt_thread_summary(t) for t in threads)
 
 
-@macllm_tool
+@macllm_tool(cache=EMAIL_CACHE)
 def email_read_thread(thread_id: str, max_chars: str = "2000") -> str:
     """
     Read the full content of an email thread by its ID (or ID prefix).
@@ -160,7 +161,7 @@ def email_read_thread(thread_id: str, max_chars: str = "2000") -> str:
     return output
 
 
-@macllm_tool
+@macllm_tool(cache=EMAIL_CACHE)
 def email_sent(limit: str = "20") -> str:
     """
     List recent sent email threads.
@@ -184,7 +185,7 @@ def email_sent(limit: str = "20") -> str:
     return "\n\n---\n\n".join(_fmt_thread_summary(t) for t in threads)
 
 
-@macllm_tool
+@macllm_tool(cache=EMAIL_CACHE)
 def email_starred(limit: str = "20") -> str:
     """
     List starred/flagged email threads.
@@ -208,7 +209,7 @@ def email_starred(limit: str = "20") -> str:
     return "\n\n---\n\n".join(_fmt_thread_summary(t) for t in threads)
 
 
-@macllm_tool
+@macllm_tool(cache=EMAIL_CACHE)
 def email_contacts(query: str = "", limit: str = "30") -> str:
     """
     List or search email contacts. Without a query, returns top contacts
@@ -244,7 +245,7 @@ def email_contacts(query: str = "", limit: str = "30") -> str:
     return "\n".join(lines)
 
 
-@macllm_tool
+@macllm_tool(cache=EMAIL_CACHE)
 def email_split_inboxes() -> str:
     """
     List all split inbox definitions (Superhuman split inboxes).
@@ -269,7 +270,7 @@ def email_split_inboxes() -> str:
     return "\n".join(lines)
 
 
-@macllm_tool
+@macllm_tool(cache=EMAIL_CACHE)
 def email_split_inbox_threads(split_id: str, limit: str = "20") -> str:
     """
     List recent threads from a specific split inbox.
@@ -295,7 +296,7 @@ def email_split_inbox_threads(split_id: str, limit: str = "20") -> str:
     return "\n\n---\n\n".join(_fmt_thread_summary(t) for t in threads)
 
 
-@macllm_tool
+@macllm_tool(cache=EMAIL_CACHE)
 def email_profile(email_address: str) -> str:
     """
     Look up a contact's enrichment profile (name, bio, location, timezone).
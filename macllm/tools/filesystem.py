@@ -10,6 +10,7 @@ from PIL import Image
 from macllm.core.chat_history import add_source
 from macllm.core.virtual_filesystem import (
     FilesystemError,
+    ResolvedPath,
     list_virtual_directory,
     resolve_path,
 )
@@ -35,9 +36,10 @@ def _error(exc: Exception) -> str:
     return f"Error: {exc}"
 
 
-def _refresh_index(mount) -> None:
-    if mount.index:
-        FileTag._reindex_event.set()
+def _refresh_index(target: ResolvedPath) -> None:
+    """Queue a changed path for the note index; the indexer debounces the queue."""
+    if target.mount.index:
+        FileTag.notify_paths_changed([str(target.path)])
 
 
 @macllm_tool
@@ -118,7 +120,7 @@ def write_file(path: str, content: str) -> str:
         flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_NOFOLLOW", 0)
         with os.fdopen(os.open(target.path, flags, 0o644), "w", encoding="utf-8") as handle:
             handle.write(content)
-        _refresh_index(target.mount)
+        _refresh_index(target)
         return f"Wrote {target.virtual}"
     except Exception as exc:
         return _error(exc)
@@ -140,7 +142,7 @@ def append_file(path: str, content: str) -> str:
         flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, "O_NOFOLLOW", 0)
         with os.fdopen(os.open(target.path, flags, 0o644), "a", encoding="utf-8") as handle:
             handle.write(content)
-        _refresh_index(target.mount)
+        _refresh_index(target)
         return f"Appended to {target.virtual}"
     except Exception as exc:
         return _error(exc)
@@ -198,7 +200,7 @@ def copy_file(source: str, destination: str) -> str:
             shutil.copytree(src.canonical, dst.path)
         else:
             shutil.copy2(src.canonical, dst.path)
-        _refresh_index(dst.mount)
+        _refresh_index(dst)
         return f"Copied {src.virtual} to {dst.virtual}"
     except Exception as exc:
         return _error(exc)
@@ -225,7 +227,7 @@ def delete_file(path: str, recursive: bool = False) -> str:
             shutil.rmtree(target.path)
         else:
             return _error(FilesystemError(f"Path '{target.virtual}' does not exist."))
-        _refresh_index(target.mount)
+        _refresh_index(target)
         return f"Deleted {target.virtual}"
     except Exception as exc:
         return _error(exc)
@@ -244,7 +246,7 @@ def create_directory(path: str) -> str:
         if not target.path.parent.is_dir():
             return _error(FilesystemError("Parent directory does not exist."))
         target.path.mkdir()
-        _refresh_index(target.mount)
+        _refresh_index(target)
         return f"Created {target.virtual}"
     except Exception as exc:
         return _error(exc)
@@ -8,22 +8,27 @@ from macllm.tools._debug import macllm_tool, set_tool_message
 
 
 @macllm_tool
-def search_notes(query: str) -> str:
-    """Search indexed notes using semantic similarity.
+def search_notes(query: str, engine: str = "") -> str:
+    """Search indexed notes by meaning and by exact keywords.
 
     Args:
         query: Query describing the notes to find.
+        engine: Optional. "hybrid" (default) combines both, "vector" matches by meaning only,
+            "keyword" matches exact terms such as ids, numbers, or names.
     """
     set_tool_message(f'Searching notes for "{query}"')
-    results = FileTag.search(query)
+    try:
+        results = FileTag.search(query, engine=engine or None)
+    except ValueError as e:
+        return f"Error: {e}"
     output = []
-    for _file_id, score, filepath, preview, truncated in results:
+    for _file_id, score, filepath, passage, truncated, offset in results:
         virtual = indexed_virtual_path(filepath)
         if virtual is None:
             continue
         status = "(truncated)" if truncated else "(complete)"
         output.append(
             f"[{virtual}] {Path(filepath).name} {status}\n"
-            f"Score: {score:.3f}\n{preview}\n"
+            f"Score: {score:.3f}  Passage at byte {offset}\n{passage}\n"
         )
     return "\n---\n".join(output) if output else "No matching notes found"
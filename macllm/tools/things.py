@@ -7,8 +7,11 @@ import time
 from datetime import datetime, timezone
 from typing import Any
 
+from macllm.core.tool_cache import CachePolicy
 from macllm.tools._debug import macllm_tool, set_tool_message
 
+THINGS_CACHE = CachePolicy("things", ttl=60)  # to-dos also change in Things.app
+
 def _things():
     import things
 
@@ -361,7 +364,7 @@ def _update_command_for_item(item: dict[str, Any]) -> str:
     raise ValueError(f"Things item type '{item_type}' does not support this operation.")
 
 
-@macllm_tool
+@macllm_tool(cache=THINGS_CACHE)
 def things_list_areas() -> str:
     """
     List all Things areas from the local Things database.
@@ -374,7 +377,7 @@ def things_list_areas() -> str:
     return _format_items(items, "No Things areas found.")
 
 
-@macllm_tool
+@macllm_tool(cache=THINGS_CACHE)
 def things_list_projects(area: str = "", include_completed: bool = False) -> str:
     """
     List Things projects, optionally scoped to an area.
@@ -396,7 +399,7 @@ def things_list_projects(area: str = "", include_completed: bool = False) -> str
     return _format_items(items, "No Things projects found.")
 
 
-@macllm_tool
+@macllm_tool(cache=THINGS_CACHE)
 def things_list_tags() -> str:
     """
     List all Things tags from the local Things database.
@@ -409,7 +412,7 @@ def things_list_tags() -> str:
     return _format_items(items, "No Things tags found.")
 
 
-@macllm_tool
+@macllm_tool(cache=THINGS_CACHE)
 def things_list_todos(
     bucket: str = "",
     area: str = "",
@@ -447,7 +450,7 @@ def things_list_todos(
     return _format_items(items, "No Things to-dos found.")
 
 
-@macllm_tool
+@macllm_tool(cache=THINGS_CACHE)
 def things_search(query: str, status: str = "", limit: int = 25) -> str:
     """
     Search Things data by text.
@@ -471,7 +474,7 @@ def things_search(query: str, status: str = "", limit: int = 25) -> str:
     return _format_items(matches, f"No Things items found matching '{query}'.")
 
 
-@macllm_tool
+@macllm_tool(cache=THINGS_CACHE)
 def things_get_item(item_id: str, include_items: bool = True) -> str:
     """
     Get a single Things item by ID.
@@ -505,7 +508,7 @@ def things_show_item(item_id: str) -> str:
     return "Opened in Things:\n\n" + _format_item(item)
 
 
-@macllm_tool
+@macllm_tool(invalidates=("things",))
 def things_create_todo(
     title: str,
     when: str = "",
@@ -578,7 +581,7 @@ def things_create_todo(
     return "To-do created:\n\n" + _format_item(item)
 
 
-@macllm_tool
+@macllm_tool(invalidates=("things",))
 def things_create_project(
     title: str,
     when: str = "",
@@ -644,7 +647,7 @@ def things_create_project(
     return "Project created:\n\n" + _format_item(item)
 
 
-@macllm_tool
+@macllm_tool(invalidates=("things",))
 def things_update_todo(
     item_id: str,
     title: str = "",
@@ -724,7 +727,7 @@ def things_update_todo(
     return "To-do updated:\n\n" + _format_item(updated)
 
 
-@macllm_tool
+@macllm_tool(invalidates=("things",))
 def things_update_project(
     item_id: str,
     title: str = "",
@@ -786,7 +789,7 @@ def things_update_project(
     return "Project updated:\n\n" + _format_item(updated)
 
 
-@macllm_tool
+@macllm_tool(invalidates=("things",))
 def things_complete_item(item_id: str, completed: bool = True) -> str:
     """
     Mark a Things to-do or project complete or incomplete.
@@ -806,7 +809,7 @@ def things_complete_item(item_id: str, completed: bool = True) -> str:
     return "Item updated:\n\n" + _format_item(updated)
 
 
-@macllm_tool
+@macllm_tool(invalidates=("things",))
 def things_cancel_item(item_id: str, canceled: bool = True) -> str:
     """
     Mark a Things to-do or project canceled or incomplete.
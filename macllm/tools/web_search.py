@@ -6,6 +6,7 @@ import requests
 
 from macllm.core.chat_history import add_source
 from macllm.core.config import get_runtime_config
+from macllm.core.tool_cache import CachePolicy
 from macllm.tools._debug import macllm_tool, set_tool_message
 
 _state = {"search_count": 0}
@@ -17,6 +18,13 @@ BRAVE_API_URL = "https://api.search.brave.com/res/v1/web/search"
 WEB_USER_AGENT = "Mozilla/5.0"
 
 
+def _record_fetched_source(url: str, start: int = 0) -> None:
+    add_source("web", url.strip())
+
+
+WEB_FETCH_CACHE = CachePolicy("web", ttl=3600, on_hit=_record_fetched_source)
+
+
 def reset_search_counter():
     """Reset the search counter. Call this before each agent run."""
     _state["search_count"] = 0
@@ -109,7 +117,7 @@ def web_search(query: str) -> str:
     return _format_results(results) or "No results found."
 
 
-@macllm_tool
+@macllm_tool(cache=WEB_FETCH_CACHE)
 def web_fetch(url: str, start: int = 0) -> str:
     """
     Fetch readable text for a URL.
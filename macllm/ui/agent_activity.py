@@ -2,6 +2,9 @@ from __future__ import annotations
 
 import re
 
+from macllm.core.conversation_log import ConversationLog
+from macllm.core.run_activity import RunActivity, merge_activity
+
 
 def extract_update(text: str | None) -> str | None:
     if not text:
@@ -17,12 +20,17 @@ def without_update(text: str) -> str:
     ).strip()
 
 
-def active_run_entries(log):
-    start = next(
+def _active_run_start(log) -> int:
+    if isinstance(log, ConversationLog):
+        return log.last_position("run_start") + 1
+    return next(
         (i + 1 for i in range(len(log) - 1, -1, -1) if log[i].kind == "run_start"),
         0,
     )
-    return log[start:]
+
+
+def active_run_entries(log):
+    return log[_active_run_start(log):]
 
 
 def active_plan(log):
@@ -36,11 +44,15 @@ def active_plan(log):
     )
 
 
-def project_activity(log, parent_name: str):
-    """Return (persistent updates, ephemeral (kind, value)) for the active run."""
+def project_activity(log, parent_name: str, activity: RunActivity | None = None):
+    """Return (persistent updates, ephemeral (kind, value)) for the active run.
+
+    *activity* holds the run's markers and live tool calls; they are
+    replayed in order with the log entries.
+    """
     updates, pending, current = [], None, None
 
-    for item in active_run_entries(log):
+    for item in merge_activity(log, activity, _active_run_start(log)):
         payload = item.payload
         if item.kind == "planning_started" and payload == parent_name:
             pending, current = None, ("planning", None)
@@ -120,6 +120,11 @@ class AppDelegate(NSObject):
     def terminate_(self, sender):
         NSApp().terminate_(self)
 
+    def applicationWillTerminate_(self, notification):
+        macllm = getattr(self.macllm_ui, "macllm", None)
+        if macllm is not None:
+            macllm.flush_saves()
+
     def signalCheck_(self, timer):
         pass
 
@@ -656,6 +661,7 @@ class MacLLMUI:
             win.makeKeyWindow()  # Make it the key window
             self.app.activateIgnoringOtherApps_(True)
             InputFieldHandler.focus_input_field(self.input_field)  # Set focus to the input field
+            self.macllm.note_search_likely("window opened")
         else:
             # Just refresh the window display for resize
             win.needsDisplay = True
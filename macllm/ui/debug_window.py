@@ -6,7 +6,7 @@ from dataclasses import dataclass
 from typing import Any
 
 import AppKit
-from macllm.core.conversation_log import ACTIVITY_MARKER_KINDS
+from macllm.core.run_activity import ACTIVITY_MARKER_KINDS, merge_activity
 from Cocoa import (
     NSAttributedString,
     NSButton,
@@ -93,7 +93,13 @@ class DebugWindow:
     def refresh(self):
         if self.panel is None or self.conversation is None:
             return
-        cards = extract_cards(self.conversation)
+        from macllm.tags.file_tag import FileTag
+
+        cards = [note_index_card(FileTag.warmup_stats())]
+        macllm = getattr(self.macllm_ui, "macllm", None)
+        if macllm is not None:
+            cards.append(persistence_card(macllm.persistence.stats()))
+        cards.extend(extract_cards(self.conversation))
         text = render_attributed_cards(cards, self.expanded_ids, self.collapsed_ids)
         self.text_view.textStorage().setAttributedString_(text)
 
@@ -189,12 +195,55 @@ class DebugWindow:
         self.text_view = text_view
 
 
+def note_index_card(stats: dict) -> DebugCard:
+    """Summarize note search warm-up state and cold/warm search timings."""
+    state = "warm" if stats.get("model_loaded") and stats.get("index_loaded") else "cold"
+    lines = [
+        f"State: {state} (model {'loaded' if stats.get('model_loaded') else 'not loaded'}, "
+        f"index {'loaded' if stats.get('index_loaded') else 'not loaded'})",
+        f"Warm-ups: {stats.get('warmups', 0)}, unloads: {stats.get('unloads', 0)}",
+    ]
+    if "last_warmup_ms" in stats:
+        lines.append(
+            f"Last warm-up: {stats['last_warmup_ms']:.0f} ms ({stats.get('last_reason') or '-'})"
+        )
+    if "model_load_ms" in stats:
+        lines.append(f"Model load: {stats['model_load_ms']:.0f} ms")
+    for label, key in (("Cold searches", "cold_search"), ("Warm searches", "warm_search")):
+        timing = stats.get(key) or {}
+        if timing.get("count"):
+            lines.append(
+                f"{label}: {timing['count']}, p50 {timing['p50_ms']:.0f} ms, "
+                f"p99 {timing['p99_ms']:.0f} ms"
+            )
+    return DebugCard(id="note-index", title=f"Note Search: {state}", body="\n".join(lines))
+
+
+def persistence_card(stats: dict) -> DebugCard:
+    """Summarize background conversation saves."""
+    lines = [
+        f"Save requests: {stats.get('requests', 0)}, writes: {stats.get('saves', 0)} "
+        f"({stats.get('coalesced', 0)} coalesced), failures: {stats.get('failures', 0)}",
+    ]
+    if stats.get("pending"):
+        lines.append(f"Pending conversations: {stats['pending']}")
+    for label, key in (("Request to disk", "latency"), ("Write", "write")):
+        timing = stats.get(key) or {}
+        if timing.get("count"):
+            lines.append(
+                f"{label}: p50 {timing['p50_ms']:.0f} ms, p99 {timing['p99_ms']:.0f} ms"
+            )
+    return DebugCard(id="persistence", title="Persistence", body="\n".join(lines))
+
+
 def extract_cards(conversation) -> list[DebugCard]:
     cards: list[DebugCard] = []
     total_input = 0
     total_output = 0
     total_time = 0.0
-    log = list(getattr(conversation, "conversation_log", []))
+    log = merge_activity(
+        getattr(conversation, "conversation_log", []), getattr(conversation, "run_activity", None)
+    )
     skip_indices: set[int] = set()
     suppress_assistant_text: str | None = None
     for index, item in enumerate(log):
@@ -444,7 +493,7 @@ def _runtime_body(kind: str, payload: dict) -> str:
     if payload.get("task"):
         sections.append(_section("Subagent request", payload.get("task")))
     tool_calls = payload.get("tool_calls")
-    if isinstance(tool_calls, list):
+    if isinstance(tool_calls, (list, tuple)):
         for index, call in enumerate(tool_calls, start=1):
             if not isinstance(call, dict):
                 continue
@@ -488,7 +537,7 @@ def _planning_body(payload: dict, parsed_plan: dict | None) -> str:
 
 def _final_answer_text(payload: dict) -> str | None:
     calls = payload.get("tool_calls")
-    if not isinstance(calls, list) or len(calls) != 1:
+    if not isinstance(calls, (list, tuple)) or len(calls) != 1:
         return None
     call = calls[0]
     if not isinstance(call, dict) or call.get("name") != "final_answer":
@@ -571,7 +620,7 @@ def _format_value(value: Any, indent: int = 0) -> str:
             f"{prefix}{key}: {_format_value(val, indent + 2)}"
             for key, val in value.items()
         )
-    if isinstance(value, list):
+    if isinstance(value, (list, tuple)):
         if not value:
             return "[]"
         return "\n" + "\n".join(
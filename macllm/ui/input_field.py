@@ -77,6 +77,8 @@ class InputFieldDelegate(NSObject):
             fragment = self._current_fragment()
             if self.autocomplete:
                 self.autocomplete.update_suggestions(fragment)
+            if fragment.startswith("@"):
+                self.macllm_ui.macllm.note_search_likely("@ typed")
             # Push the previous state onto the undo stack before rebuilding
             self._push_undo_snapshot()
             # Full-buffer re-render with pill conversion
@@ -116,7 +116,9 @@ class MainTextHandler:
         )
 
         parent_name = getattr(agent, "macllm_name", None) or getattr(agent, "name", "")
-        updates, current = project_activity(conversation.conversation_log, parent_name)
+        updates, current = project_activity(
+            conversation.conversation_log, parent_name, getattr(conversation, "run_activity", None)
+        )
         for update in updates:
             _append(f"{update}\n", light, style=update_style)
 
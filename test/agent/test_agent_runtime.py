@@ -42,7 +42,7 @@ def test_action_marker_precedes_dispatch(monkeypatch):
     agent = _agent(monkeypatch)
 
     def execute(_self, _name, _arguments):
-        marker = agent._conversation.conversation_log[-1]
+        marker = agent._conversation.run_activity.entries()[-1]
         assert (marker.kind, marker.payload) == ("action_started", "default")
         return "done"
 
@@ -54,7 +54,7 @@ def test_planning_marker_precedes_model_call(monkeypatch):
     agent = _agent(monkeypatch)
 
     def generate(_self, _task, _is_first_step, _step):
-        marker = agent._conversation.conversation_log[-1]
+        marker = agent._conversation.run_activity.entries()[-1]
         assert (marker.kind, marker.payload) == ("planning_started", "default")
         yield "done"
 
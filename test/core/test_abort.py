@@ -49,9 +49,8 @@ class TestAbortMessage:
         app.ephemeral = False
 
         conv.agent = Mock()
-        with patch("macllm.core.persistence.save_all_conversations") as mock_save:
-            conv._handle_abort(app)
-            mock_save.assert_called_once_with(app.conversation_history)
+        conv._handle_abort(app)
+        app.request_save.assert_called_once_with(conv)
 
     def test_abort_skips_save_when_ephemeral(self):
         conv = Conversation()
@@ -59,9 +58,8 @@ class TestAbortMessage:
         app.ephemeral = True
 
         conv.agent = Mock()
-        with patch("macllm.core.persistence.save_all_conversations") as mock_save:
-            conv._handle_abort(app)
-            mock_save.assert_not_called()
+        conv._handle_abort(app)
+        app.request_save.assert_not_called()
 
     def test_full_abort_flow_via_agent_thread(self):
         """Submit triggers agent.run; abort adds exactly one 'Interrupted.'
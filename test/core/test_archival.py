@@ -0,0 +1,181 @@
+import threading
+
+import pytest
+from PIL import Image
+
+from macllm.core import agent_service, conversation_store, persistence
+from macllm.core.archival import (
+    apply_archive_policy,
+    archive_conversation,
+    conversation_bytes,
+    deep_sizeof,
+    memory_report,
+)
+from macllm.core.chat_history import Conversation, ConversationHistory
+from macllm.core.config import ConversationsConfig, _from_dict
+from macllm.core.persistence import save_all_conversations
+
+
+class MockAgentMemory:
+    def __init__(self):
+        self.steps = []
+
+
+class MockAgent:
+    macllm_name = "default"
+
+    def __init__(self):
+        self.memory = MockAgentMemory()
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr("macllm.core.persistence.get_storage_dir", lambda: tmp_path)
+    monkeypatch.setattr(agent_service, "create_agent", lambda **kwargs: MockAgent())
+    return tmp_path
+
+
+def make_history(*titles):
+    history = ConversationHistory()
+    for i, title in enumerate(titles):
+        conv = Conversation()
+        conv._create_agent()
+        conv.title = title
+        conv.add_user_message(f"hello from {title} " + "x" * 1000 * (i + 1))
+        conv.agent.memory.steps.append({"task": title})
+        conv.last_used = 1000.0 + i
+        history.conversations.append(conv)
+    history.active_index = len(titles) - 1
+    return history
+
+
+def test_deep_sizeof_counts_shared_objects_once_and_image_pixels():
+    text = "y" * 10_000
+    assert deep_sizeof([text, text]) < deep_sizeof([text, "z" * 10_000])
+    assert deep_sizeof(Image.new("RGB", (100, 100))) >= 100 * 100 * 3
+
+
+def test_idle_conversations_are_archived_and_rehydrated(storage):
+    history = make_history("Old", "Active")
+    old, active = history.conversations
+    save_all_conversations(history)
+    old.add_assistant_message("unsaved reply")
+
+    archived = apply_archive_policy(
+        history, persistence.get_conversation_store(), 7, 0, now=1000.0 + 8 * 86_400
+    )
+    assert archived == [old.conv_id]
+    assert not old.materialized and old.agent is None and len(old.conversation_log) == 0
+    assert active.materialized
+    assert [m.bytes == 0 for m in memory_report(history)] == [True, False]
+
+    data = (storage / "conversations" / f"{old.conv_id}.journal").read_bytes()
+    frames, _, _ = conversation_store._read_frames(data, persistence.get_conversation_store().blobs)
+    assert len(frames) == 1
+    assert [h.conv_id for h in persistence.get_conversation_search().search("unsaved")] == [old.conv_id]
+
+    history.set_active(0)
+    assert history.get_current_conversation() is old
+    assert [e.payload["content"] for e in old.conversation_log][-1] == "unsaved reply"
+    old._create_agent()
+    assert old.agent.memory.steps == [{"task": "Old"}]
+
+
+def test_least_recently_used_conversations_are_archived_over_budget(storage):
+    history = make_history("First", "Second", "Third", "Active")
+    save_all_conversations(history)
+    sizes = [conversation_bytes(conv) for conv in history.conversations]
+    budget = (sum(sizes) - sizes[0] - sizes[1] // 2) / (1024 * 1024)
+
+    archived = apply_archive_policy(history, persistence.get_conversation_store(), 0, budget)
+    assert archived == [c.conv_id for c in history.conversations[:2]]
+    assert [c.materialized for c in history.conversations] == [False, False, True, True]
+
+
+def test_running_or_recently_used_conversations_are_kept(storage):
+    history = make_history("Busy", "Active")
+    save_all_conversations(history)
+    busy = history.conversations[0]
+    busy.pending_approval = object()
+    assert apply_archive_policy(history, persistence.get_conversation_store(), 1, 0, now=10**10) == []
+    assert busy.materialized
+
+
+def test_submit_during_archive_waits_for_it(storage, monkeypatch):
+    history = make_history("Old", "Active")
+    save_all_conversations(history)
+    old = history.conversations[0]
+    monkeypatch.setattr(Conversation, "_process_query", lambda self, text: self.add_user_message(text))
+    flush = persistence.flush_conversation
+    submit = threading.Thread(target=old.submit, args=("late question",))
+
+    def flush_then_submit(conv):
+        flushed = flush(conv)
+        submit.start()  # the UI thread submits while the archive is under way
+        submit.join(0.2)
+        return flushed
+
+    monkeypatch.setattr(persistence, "flush_conversation", flush_then_submit)
+    assert archive_conversation(old, persistence.get_conversation_store(), old.last_used)
+    submit.join(5)
+
+    assert old.materialized
+    assert [e.payload["content"] for e in old.conversation_log][-1] == "late question"
+    assert [e.payload["content"] for e in old.conversation_log][0].startswith("hello from Old")
+
+
+def test_queued_input_during_archive_waits_for_it(storage, monkeypatch):
+    history = make_history("Old", "Active")
+    save_all_conversations(history)
+    old = history.conversations[0]
+    old.pending_input = "queued question"
+    monkeypatch.setattr(Conversation, "_process_query", lambda self, text: self.add_user_message(text))
+    flush = persistence.flush_conversation
+    drain = threading.Thread(target=old._drain_pending_input)
+
+    def flush_then_drain(conv):
+        flushed = flush(conv)
+        drain.start()  # the finished run's thread drains queued input meanwhile
+        drain.join(0.2)
+        return flushed
+
+    monkeypatch.setattr(persistence, "flush_conversation", flush_then_drain)
+    assert archive_conversation(old, persistence.get_conversation_store(), old.last_used)
+    drain.join(5)
+
+    assert old.materialized
+    assert [e.payload["content"] for e in old.conversation_log][-1] == "queued question"
+
+
+def test_slow_query_does_not_block_archiving(storage, monkeypatch):
+    history = make_history("Old", "Active")
+    save_all_conversations(history)
+    old = history.conversations[0]
+    started, release = threading.Event(), threading.Event()
+
+    def slow_query(self, text):
+        started.set()
+        release.wait(5)  # e.g. a slow note search during tag expansion
+
+    monkeypatch.setattr(Conversation, "_process_query", slow_query)
+    submit = threading.Thread(target=old.submit, args=("question",))
+    submit.start()
+    try:
+        assert started.wait(5)
+        result = []
+        archived = threading.Thread(
+            target=lambda: result.append(archive_conversation(old, persistence.get_conversation_store()))
+        )
+        archived.start()
+        archived.join(2)
+        assert result == [False]  # busy, and the lock was free
+    finally:
+        release.set()
+        submit.join(5)
+    assert not old.is_busy()
+
+
+def test_conversations_config():
+    assert _from_dict({}).conversations == ConversationsConfig()
+    config = _from_dict({"conversations": {"archive_after_days": 0, "memory_budget_mb": -5}})
+    assert config.conversations == ConversationsConfig(archive_after_days=0.0, memory_budget_mb=0.0)
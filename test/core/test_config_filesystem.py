@@ -23,6 +23,26 @@ def test_filesystem_mount_config():
     assert mount.supervisor_access == "read-write"
     assert mount.subagent_access == "read-only"
     assert mount.index is True
+    assert mount.reindex_interval == 0.0
+
+
+def test_filesystem_mount_reindex_interval():
+    config = _from_dict({
+        "filesystem": {
+            "mounts": {
+                "memory": {
+                    "virtual": "/memory",
+                    "path": "~/memory",
+                    "supervisor_access": "read-write",
+                    "subagent_access": "read-only",
+                    "index": True,
+                    "reindex_interval": 30,
+                }
+            }
+        }
+    })
+    assert config.filesystem.mounts["memory"].reindex_interval == 30.0
+    assert config.resolved_filesystem_mounts()["memory"].reindex_interval == 30.0
 
 
 def test_filesystem_mount_requires_every_field():
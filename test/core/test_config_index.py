@@ -0,0 +1,60 @@
+"""Tests for index config loading."""
+
+import pytest
+
+from macllm.core.config import IndexConfig, _from_dict
+
+
+class TestIndexConfig:
+    def test_defaults_when_no_index_section(self):
+        assert _from_dict({}).index == IndexConfig()
+
+    def test_custom_values(self):
+        data = {"index": {"cpu_budget": 0.25, "embedding_processes": 2, "batch_size": 16}}
+        config = _from_dict(data)
+        assert config.index == IndexConfig(cpu_budget=0.25, embedding_processes=2, batch_size=16)
+
+    def test_invalid_cpu_budget(self):
+        with pytest.raises(ValueError):
+            _from_dict({"index": {"cpu_budget": 0}})
+
+    def test_search_tuning(self):
+        data = {"index": {"search_engine": "keyword", "keyword_weight": 2, "rrf_k": 10}}
+        config = _from_dict(data)
+        assert config.index.search_engine == "keyword"
+        assert config.index.keyword_weight == 2.0
+        assert config.index.rrf_k == 10
+
+    def test_invalid_search_engine(self):
+        with pytest.raises(ValueError):
+            _from_dict({"index": {"search_engine": "fuzzy"}})
+
+    def test_vector_dtype(self):
+        assert _from_dict({"index": {"vector_dtype": "int8"}}).index.vector_dtype == "int8"
+        with pytest.raises(ValueError):
+            _from_dict({"index": {"vector_dtype": "float64"}})
+
+    def test_ann_settings(self):
+        config = _from_dict({"index": {"ann_backend": "hnsw", "hnsw_ef_search": 128, "ivf_nprobe": 0}})
+        assert config.index.ann_backend == "hnsw"
+        assert config.index.hnsw_ef_search == 128
+        assert config.index.ivf_nprobe == 1
+        with pytest.raises(ValueError):
+            _from_dict({"index": {"ann_backend": "lsh"}})
+
+    def test_warmup_settings(self):
+        config = _from_dict({"index": {"warmup_after_launch": 0, "unload_after": -5}})
+        assert config.index.warmup_after_launch == 0.0
+        assert config.index.unload_after == 0.0
+
+    def test_document_types(self):
+        config = _from_dict({"index": {"document_types": ["pdf", "code"], "extract_processes": 0}})
+        assert config.index.document_types == ("pdf", "code")
+        assert config.index.extract_processes == 1
+        assert _from_dict({"index": {"document_types": []}}).index.document_types == ()
+        with pytest.raises(ValueError):
+            _from_dict({"index": {"document_types": ["epub"]}})
+
+    def test_write_debounce(self):
+        assert _from_dict({}).index.write_debounce == 1.0
+        assert _from_dict({"index": {"write_debounce": -2}}).index.write_debounce == 0.0
@@ -0,0 +1,108 @@
+import json
+import pickle
+import sys
+import types
+import zlib
+
+from PIL import Image
+from smolagents.memory import ActionStep, TaskStep, ToolCall
+from smolagents.models import ChatMessage, MessageRole
+from smolagents.monitoring import Timing, TokenUsage
+from smolagents.utils import AgentError
+
+from macllm.core import conversation_codec, persistence_bench
+from macllm.core.conversation_codec import BlobStore, decode_record, encode_record
+from macllm.core.conversation_log import message
+
+
+def round_trip(record, tmp_path):
+    blobs = BlobStore(tmp_path / "blobs")
+    refs = set()
+    payload = encode_record(record, blobs, refs)
+    assert payload[0] == conversation_codec.SCHEMA_VERSION
+    return decode_record(payload, blobs), refs, blobs
+
+
+def test_agent_steps_round_trip(tmp_path):
+    prompt = "system " * 2000
+    step = ActionStep(
+        step_number=3,
+        timing=Timing(start_time=1.0, end_time=2.5),
+        model_input_messages=[ChatMessage(role=MessageRole.SYSTEM, content=prompt)],
+        tool_calls=[ToolCall(name="search", arguments={"q": "x"}, id="call_1")],
+        model_output_message=ChatMessage(role=MessageRole.ASSISTANT, content="done", raw={"big": "response"}),
+        observations="found it",
+        observations_images=[Image.new("RGB", (4, 3), (255, 0, 0))],
+        token_usage=TokenUsage(input_tokens=10, output_tokens=5),
+    )
+    record = {"log": [message("user", "hi")], "steps": (None, [TaskStep(task=prompt), step])}
+    decoded, refs, _ = round_trip(record, tmp_path)
+
+    kept, (task, action) = decoded["steps"]
+    assert kept is None
+    assert task.task == prompt
+    assert decoded["log"][0].payload == {"role": "user", "content": "hi"}
+    assert action.model_input_messages[0].role is MessageRole.SYSTEM
+    assert action.model_input_messages[0].content == prompt
+    assert action.model_output_message.raw is None
+    assert action.tool_calls[0].arguments == {"q": "x"}
+    assert action.token_usage.total_tokens == 15
+    assert action.timing.duration == 1.5
+    assert action.observations_images[0].size == (4, 3)
+    assert len(refs) == 2  # the prompt once, plus the image
+
+
+def test_images_keep_their_pixels_and_palette(tmp_path):
+    photo = Image.new("RGB", (5, 2), (1, 2, 3))
+    photo.putpixel((4, 1), (9, 8, 7))
+    palette = Image.new("P", (3, 3), 2)
+    palette.putpalette([0, 0, 0, 10, 20, 30, 40, 50, 60])
+    decoded, refs, blobs = round_trip({"images": [photo, palette]}, tmp_path)
+
+    for before, after in zip([photo, palette], decoded["images"]):
+        assert after.mode == before.mode and after.tobytes() == before.tobytes()
+    assert decoded["images"][1].getpalette()[:9] == palette.getpalette()[:9]
+    encode_record({"again": photo}, blobs, set())
+    assert len(blobs.digests()) == len(refs) == 2  # stored once
+
+
+def test_errors_and_unusual_keys(tmp_path):
+    error = AgentError.__new__(AgentError)
+    Exception.__init__(error, "boom")
+    error.message = "boom"
+    record = {"meta": {"$tuple": 1, 2: "int key"}, "error": error, "pair": (1, "a")}
+    decoded, _, _ = round_trip(record, tmp_path)
+    assert decoded["meta"] == {"$tuple": 1, 2: "int key"}
+    assert decoded["pair"] == (1, "a")
+    assert isinstance(decoded["error"], AgentError) and decoded["error"].message == "boom"
+
+
+def test_unknown_classes_degrade_to_fields(tmp_path):
+    blobs = BlobStore(tmp_path / "blobs")
+    value = {"$dc": "elsewhere.module:Thing", "f": {"a": 1}}
+    payload = bytes([conversation_codec._JSON_VERSION]) + zlib.compress(json.dumps({"x": value}).encode())
+    assert decode_record(payload, blobs) == {"x": {"a": 1}}
+
+
+def test_removed_classes_load_as_their_fields(tmp_path, monkeypatch):
+    module = types.ModuleType("macllm.gone")
+    Thing = type("Thing", (), {"__module__": "macllm.gone"})
+    module.Thing = Thing
+    monkeypatch.setitem(sys.modules, "macllm.gone", module)
+    thing = Thing()
+    thing.a = 1
+    blobs = BlobStore(tmp_path / "blobs")
+    payload = encode_record({"x": thing}, blobs, set())
+
+    monkeypatch.delitem(sys.modules, "macllm.gone")
+    assert decode_record(payload, blobs) == {"x": {"a": 1}}
+
+
+def test_legacy_pickle_payloads_decode(tmp_path):
+    blobs = BlobStore(tmp_path / "blobs")
+    assert decode_record(pickle.dumps({"version": 1, "meta": {}}), blobs) == {"version": 1, "meta": {}}
+
+
+def test_benchmark_runs():
+    result = persistence_bench.run(turns=20, images_every=10)
+    assert result["store_bytes"] < result["pickle_bytes"]
@@ -0,0 +1,113 @@
+import pytest
+
+from macllm.core import agent_service, persistence
+from macllm.core.chat_history import Conversation, ConversationHistory
+from macllm.core.conversation_log import message
+from macllm.core.conversation_search import ConversationSearchIndex
+from macllm.core.persistence import save_all_conversations
+from macllm.tools.conversations import search_conversations
+
+
+class Step:
+    def __init__(self, observations):
+        self.observations = observations
+
+
+class MockAgentMemory:
+    def __init__(self):
+        self.steps = []
+
+
+class MockAgent:
+    macllm_name = "default"
+
+    def __init__(self):
+        self.memory = MockAgentMemory()
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr("macllm.core.persistence.get_storage_dir", lambda: tmp_path)
+    monkeypatch.setattr(agent_service, "create_agent", lambda **kwargs: MockAgent())
+    return tmp_path
+
+
+def test_updates_are_incremental(tmp_path):
+    index = ConversationSearchIndex(tmp_path / "search.sqlite")
+    log = [message("user", "where is the passport"), message("assistant", "in the drawer")]
+    steps = [Step("passport number X123")]
+    assert index.update("a", "Travel", log, steps) == 4
+    assert index.update("a", "Travel", log, steps) == 0
+
+    log.append(message("user", "and the visa"))
+    assert index.update("a", "Travel", log, steps) == 1
+    hits = index.search("visa")
+    assert [(h.conv_id, h.kind, h.position) for h in hits] == [("a", "user", 2)]
+    assert "[visa]" in hits[0].snippet
+
+    assert [h.kind for h in index.search("X123")] == ["observation"]
+    assert [h.kind for h in index.search("travel")] == ["title"]
+    assert index.search("passport drawer") == []  # every word must be in one passage
+
+
+def test_hits_are_grouped_by_conversation(tmp_path):
+    index = ConversationSearchIndex(tmp_path / "search.sqlite")
+    index.update("a", "One", [message("user", "budget"), message("assistant", "budget budget")], [])
+    index.update("b", "Two", [message("user", "the budget")], [])
+    hits = index.search("budget")
+    assert sorted(h.conv_id for h in hits) == ["a", "b"]
+    assert len(index.search("budget", limit=1)) == 1
+
+
+def test_shrunk_conversations_are_reindexed_and_retain_drops(tmp_path):
+    index = ConversationSearchIndex(tmp_path / "search.sqlite")
+    index.update("a", "A", [message("user", "alpha"), message("user", "beta")], [])
+    index.update("a", "Renamed", [message("user", "gamma")], [])
+    assert index.search("beta") == [] and index.search("alpha") == []
+    assert [h.title for h in index.search("gamma")] == ["Renamed"]
+    assert index.search("A") == []
+
+    index.update("b", "B", [message("user", "gamma")], [])
+    index.retain(["b"])
+    assert [h.conv_id for h in index.search("gamma")] == ["b"]
+    assert "a" not in index and len(index) == 1
+
+
+def test_saves_index_conversations(storage):
+    history = ConversationHistory()
+    for title in ("Taxes", "Garden"):
+        conv = Conversation()
+        conv._create_agent()
+        conv.title = title
+        conv.add_user_message(f"question about {title.lower()}")
+        history.conversations.append(conv)
+    taxes, garden = history.conversations
+    taxes.agent.memory.steps.append(Step("form 1040 downloaded"))
+    save_all_conversations(history)
+
+    assert [h.conv_id for h in persistence.get_conversation_search().search("1040")] == [taxes.conv_id]
+    assert "conversation " + garden.conv_id in search_conversations("garden")
+
+    history.remove_conversation(0)
+    save_all_conversations(history)
+    assert persistence.get_conversation_search().search("1040") == []
+    assert search_conversations("1040") == "No matching conversations found"
+
+
+def test_backfill_indexes_stored_conversations(storage):
+    history = ConversationHistory()
+    conv = Conversation()
+    conv._create_agent()
+    conv.add_user_message("remember the lighthouse")
+    history.conversations.append(conv)
+    save_all_conversations(history)
+
+    persistence._searches.clear()
+    (storage / "conversations" / "search.sqlite").unlink()
+    for suffix in ("-wal", "-shm"):
+        (storage / "conversations" / f"search.sqlite{suffix}").unlink(missing_ok=True)
+    search = persistence.get_conversation_search()
+    assert search.search("lighthouse") == []
+    search.backfill(persistence.get_conversation_store()).join(5)
+    assert [h.conv_id for h in search.search("lighthouse")] == [conv.conv_id]
+    assert search.backfill(persistence.get_conversation_store()) is None
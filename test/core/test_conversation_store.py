@@ -0,0 +1,262 @@
+import pickle
+
+import pytest
+
+from macllm.core import agent_service, conversation_store, persistence
+from macllm.core.chat_history import Conversation, ConversationHistory
+from macllm.core.conversation_log import message
+from macllm.core.conversation_store import ConversationStore
+from macllm.core.persistence import load_all_conversations, save_all_conversations
+
+
+class MockAgentMemory:
+    def __init__(self):
+        self.steps = []
+
+
+class MockAgent:
+    macllm_name = "default"
+
+    def __init__(self):
+        self.memory = MockAgentMemory()
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr("macllm.core.persistence.get_storage_dir", lambda: tmp_path)
+    monkeypatch.setattr(agent_service, "create_agent", lambda **kwargs: MockAgent())
+    return tmp_path
+
+
+def make_history(*titles):
+    history = ConversationHistory()
+    for title in titles:
+        conv = Conversation()
+        conv._create_agent()
+        conv.title = title
+        conv.add_user_message(f"hello from {title}")
+        conv.agent.memory.steps.append({"task": title})
+        history.conversations.append(conv)
+    history.active_index = len(titles) - 1
+    return history
+
+
+def restore():
+    history = ConversationHistory()
+    assert load_all_conversations(history)
+    for conv in history.conversations:
+        conv.ensure_loaded()
+        conv._create_agent()
+    return history
+
+
+def journal(storage, conv):
+    return storage / "conversations" / f"{conv.conv_id}.journal"
+
+
+def test_round_trip(storage):
+    history = make_history("First", "Second")
+    history.conversations[0].add_assistant_message("hi")
+    history.conversations[0].add_tool_call("search", "live only")
+    assert save_all_conversations(history)
+
+    restored = restore()
+    assert [c.title for c in restored.conversations] == ["First", "Second"]
+    assert [c.conv_id for c in restored.conversations] == [c.conv_id for c in history.conversations]
+    assert restored.active_index == 1
+    first = restored.conversations[0]
+    assert [e.kind for e in first.conversation_log] == ["message", "message"]
+    assert first.conversation_log[1].payload == {"role": "assistant", "content": "hi"}
+    assert first.agent.memory.steps == [{"task": "First"}]
+
+
+def test_only_changed_conversations_are_written(storage):
+    history = make_history("First", "Second")
+    save_all_conversations(history)
+    first, second = history.conversations
+    sizes = (journal(storage, first).stat().st_size, journal(storage, second).stat().st_size)
+
+    assert save_all_conversations(history)
+    assert (journal(storage, first).stat().st_size, journal(storage, second).stat().st_size) == sizes
+
+    second.add_assistant_message("reply")
+    second.agent.memory.steps.append({"task": "next"})
+    save_all_conversations(history)
+    assert journal(storage, first).stat().st_size == sizes[0]
+    data = journal(storage, second).read_bytes()
+    frames, end, torn = conversation_store._read_frames(data, persistence.get_conversation_store().blobs)
+    records = [record for record, _ in frames]
+    assert end == len(data) and not torn and len(records) == 2
+    assert records[1]["log"][0] is None
+    assert [e.payload["content"] for e in records[1]["log"][1]] == ["reply"]
+    assert records[1]["steps"] == (None, [{"task": "next"}])
+
+
+def test_removed_steps_and_new_title_replay(storage):
+    history = make_history("First")
+    conv = history.conversations[0]
+    conv.agent.memory.steps.extend([{"plan": 1}, {"task": "b"}])
+    save_all_conversations(history)
+
+    steps = conv.agent.memory.steps
+    conv.agent.memory.steps = [steps[0], steps[2], {"task": "c"}]
+    conv.title = "Renamed"
+    save_all_conversations(history)
+
+    restored = restore()
+    assert restored.conversations[0].agent.memory.steps == [
+        {"task": "First"}, {"task": "b"}, {"task": "c"}
+    ]
+    assert restored.conversations[0].title == "Renamed"
+
+
+def test_torn_frame_is_cut_off(storage):
+    history = make_history("First")
+    save_all_conversations(history)
+    conv = history.conversations[0]
+    path = journal(storage, conv)
+    good = path.stat().st_size
+    with open(path, "ab") as f:
+        f.write(b"\x40\x00\x00\x00partial")
+
+    store = ConversationStore(storage / "conversations")
+    stored = store.load(conv.conv_id)
+    assert stored.meta["title"] == "First"
+    assert path.stat().st_size == good
+
+    stored.log.append(message("user", "x"))
+    assert store.flush(conv.conv_id, stored.meta, stored.log, stored.steps)
+    assert len(ConversationStore(storage / "conversations").load(conv.conv_id).log) == 2
+
+
+def test_journal_is_compacted(storage, monkeypatch):
+    monkeypatch.setattr(conversation_store, "COMPACT_MIN_BYTES", 0)
+    history = make_history("First")
+    conv = history.conversations[0]
+    for i in range(30):
+        conv.add_user_message(f"message {i}")
+        conv.agent.memory.steps = conv.agent.memory.steps[-2:]
+        save_all_conversations(history)
+    frames, _, _ = conversation_store._read_frames(
+        journal(storage, conv).read_bytes(), persistence.get_conversation_store().blobs
+    )
+    assert len(frames) < 5
+    assert "version" in frames[0][0]
+
+    restored = restore()
+    assert len(restored.conversations[0].conversation_log) == 31
+    assert restored.conversations[0].agent.memory.steps == conv.agent.memory.steps
+
+
+def test_deleted_conversation_journal_is_removed(storage):
+    history = make_history("First", "Second")
+    save_all_conversations(history)
+    gone = history.conversations[0]
+    history.remove_conversation(0)
+    save_all_conversations(history)
+    assert not journal(storage, gone).exists()
+    restored = restore()
+    assert [c.title for c in restored.conversations] == ["Second"]
+
+
+def test_legacy_pickle_is_migrated(storage):
+    with open(storage / "conversations.pkl", "wb") as f:
+        pickle.dump({
+            "conversations": [{
+                "conv_id": "legacy-id",
+                "steps": [{"task": "old"}],
+                "conversation_log": [],
+                "agent_name": "default",
+                "speed_level": "normal",
+                "title": "Legacy",
+            }],
+            "active_index": 0,
+        }, f)
+    history = ConversationHistory()
+    assert load_all_conversations(history)
+    save_all_conversations(history)
+
+    (storage / "conversations.pkl").unlink()
+    restored = restore()
+    assert restored.conversations[0].conv_id == "legacy-id"
+    assert restored.conversations[0].agent.memory.steps == [{"task": "old"}]
+
+
+def test_startup_reads_only_the_index(storage, monkeypatch):
+    history = make_history("First", "Second", "Third")
+    save_all_conversations(history)
+
+    created, loaded = [], []
+    monkeypatch.setattr(agent_service, "create_agent", lambda **kwargs: created.append(1) or MockAgent())
+    load = ConversationStore.load
+    monkeypatch.setattr(
+        ConversationStore, "load", lambda self, conv_id: loaded.append(conv_id) or load(self, conv_id)
+    )
+    persistence._stores.clear()
+    restored = ConversationHistory()
+    assert load_all_conversations(restored)
+    assert [c.title for c in restored.conversations] == ["First", "Second", "Third"]
+    assert not created and not loaded
+    entry = persistence.get_conversation_store().entry(history.conversations[0].conv_id)
+    assert entry.size == journal(storage, history.conversations[0]).stat().st_size
+    assert entry.created <= entry.updated
+
+    active = restored.get_current_conversation()
+    assert loaded == [active.conv_id] and not created
+    assert [e.payload["content"] for e in active.conversation_log] == ["hello from Third"]
+    assert not restored.conversations[0].materialized
+
+    active._create_agent()
+    assert active.agent.memory.steps == [{"task": "Third"}]
+
+
+def test_saving_leaves_unloaded_conversations_untouched(storage):
+    history = make_history("First", "Second")
+    save_all_conversations(history)
+    persistence._stores.clear()
+    restored = ConversationHistory()
+    load_all_conversations(restored)
+    first_journal = journal(storage, history.conversations[0]).read_bytes()
+
+    active = restored.get_current_conversation()
+    active.add_user_message("more")
+    assert save_all_conversations(restored)
+
+    assert journal(storage, history.conversations[0]).read_bytes() == first_journal
+    reloaded = restore()
+    assert [c.title for c in reloaded.conversations] == ["First", "Second"]
+    assert len(reloaded.conversations[1].conversation_log) == 2
+
+
+def test_save_conversations_writes_only_the_requested_ones(storage):
+    history = make_history("First", "Second")
+    save_all_conversations(history)
+    first, second = history.conversations
+    first.add_user_message("not requested")
+    second.add_user_message("requested")
+    third = make_history("Third").conversations[0]
+    history.conversations.append(third)
+
+    assert persistence.save_conversations(history, {second.conv_id})
+    restored = restore()
+    assert [len(c.conversation_log) for c in restored.conversations] == [1, 2, 1]
+
+
+def test_long_strings_are_shared_and_collected(storage, monkeypatch):
+    monkeypatch.setattr("macllm.core.conversation_codec.BLOB_MIN_CHARS", 10)
+    history = make_history("First", "Second")
+    shared = "the same long tool output"
+    for conv in history.conversations:
+        conv.add_assistant_message(shared)
+    history.conversations[0].add_assistant_message("only in the first one")
+    save_all_conversations(history)
+    blobs = storage / "conversations" / "blobs"
+    assert len(list(blobs.iterdir())) == 4  # two greetings, the shared output, the extra one
+
+    history.remove_conversation(0)
+    save_all_conversations(history)
+    persistence._stores.clear()
+    restored = restore()
+    assert [e.payload["content"] for e in restored.conversations[0].conversation_log][-1] == shared
+    assert len(list(blobs.iterdir())) == 2
+    assert not (storage / "conversations" / "gc.pending").exists()
@@ -1,18 +1,28 @@
+import copy
+import pickle
+import pytest
+from PIL import Image
+from smolagents.memory import ActionStep
+from smolagents.models import ChatMessage, ChatMessageToolCall, ChatMessageToolCallFunction, MessageRole
+from smolagents.monitoring import Timing
+
+from macllm.core import conversation_log_bench
 from macllm.core.chat_history import Conversation
+from macllm.core.conversation_codec import BlobStore, decode_record, encode_record
 from macllm.core.conversation_log import (
     ConversationLog,
     ConversationLogEntry,
-    add_tool_call,
-    append_activity_marker,
+    append_agent_step,
+    append_plan,
     append_run_end,
     append_run_start,
     append_step,
-    clear_activity_markers,
+    latest_plan,
     log_from_messages,
     message,
     messages_from_log,
     persistable_log,
-    update_last_tool_message,
+    token_usage_totals,
 )
 
 
@@ -40,8 +50,7 @@ def test_messages_round_trip_through_log():
 
 
 def test_persistable_log_preserves_entry_timestamp():
-    entry = message("user", "hello")
-    entry.timestamp = 123.0
+    entry = ConversationLogEntry("message", 123.0, {"role": "user", "content": "hello"})
 
     stable = persistable_log([entry])
 
@@ -63,32 +72,14 @@ def test_conversation_displayable_messages_come_from_log():
     ]
 
 
-def test_tool_call_entries_store_simple_log_payloads():
-    log = ConversationLog()
-
-    add_tool_call(log, "search_notes", "Using tool: search_notes")
-    update_last_tool_message(log, 'Searching notes for "budget"')
-
-    assert log[0].kind == "tool_call"
-    assert log[0].payload == {
-        "tool": "search_notes",
-        "message": 'Searching notes for "budget"',
-    }
-
-
-def test_activity_markers_are_minimal_transient_entries():
-    log = ConversationLog()
-    append_activity_marker(log, "planning_started", "default")
-    append_activity_marker(log, "action_started", "notes")
-
-    assert [(item.kind, item.payload) for item in log] == [
-        ("planning_started", "default"),
-        ("action_started", "notes"),
-    ]
-    assert persistable_log(log) == []
+def test_run_activity_stays_out_of_the_log():
+    conv = Conversation()
+    conv.add_user_message("hello")
+    conv.add_activity_marker("planning_started", "default")
+    conv.add_tool_call("search_notes", "Using tool: search_notes")
 
-    clear_activity_markers(log)
-    assert log == []
+    assert [item.kind for item in conv.conversation_log] == ["message"]
+    assert [item.kind for item in conv.run_activity] == ["planning_started", "tool_call"]
 
 
 def test_runtime_fact_entries_are_persistable():
@@ -110,3 +101,94 @@ def test_runtime_fact_entries_are_persistable():
     assert [item.kind for item in stable] == ["run_start", "step", "run_end"]
     assert stable[1].tokens == 15
     assert stable[1].payload["observations"] == "verbatim result"
+
+
+def _naive_positions(log):
+    positions = {}
+    for position, item in enumerate(log):
+        positions.setdefault(item.kind, []).append(position)
+    return positions
+
+
+def test_indexes_follow_appends():
+    log = ConversationLog([message("user", "q")])
+    for step in range(3):
+        append_step(log, {"token_usage": {"input_tokens": 10, "output_tokens": 1}})
+        append_plan(log, text=f"plan {step}")
+        log.append(message("assistant", f"a{step}"))
+
+        assert log._positions == _naive_positions(log)
+    assert latest_plan(log) == {"text": "plan 2", "status": None}
+    assert token_usage_totals(log) == (30, 3)
+    assert log.last_position("plan") == len(log) - 2
+    assert [m["content"] for m in messages_from_log(log)] == ["q", "a0", "a1", "a2"]
+
+    del log[1]  # any other mutation rebuilds the index
+    assert token_usage_totals(log) == (20, 2)
+    assert {k: v for k, v in log._positions.items() if v} == _naive_positions(log)
+
+
+def test_log_copies_and_plain_lists_keep_working():
+    log = ConversationLog()
+    append_plan(log, text="plan")
+    append_step(log, {"token_usage": {"input_tokens": 4, "output_tokens": 2}})
+    copied = pickle.loads(pickle.dumps(log))
+    assert isinstance(copied, ConversationLog) and copied == log
+    assert latest_plan(copy.deepcopy(log)) == {"text": "plan", "status": None}
+
+    plain = list(log)
+    assert latest_plan(plain) == {"text": "plan", "status": None}
+    assert token_usage_totals(plain) == (4, 2)
+
+
+def test_payloads_are_frozen_and_shared():
+    observations = ["first"]
+    log = ConversationLog()
+    append_step(log, {"tool_calls": [{"name": "search", "arguments": {"q": "x"}}], "observations": observations})
+    observations.append("second")
+    payload = log[0].payload
+
+    assert payload["observations"] == ("first",)
+    assert payload["tool_calls"][0]["arguments"] == {"q": "x"}
+    with pytest.raises(TypeError):
+        payload["observations"] = "changed"
+    with pytest.raises(TypeError):
+        payload["tool_calls"][0]["arguments"].update(q="y")
+    assert copy.deepcopy(log)[0] is log[0]
+    assert pickle.loads(pickle.dumps(log))[0].payload == payload
+
+
+def test_sets_are_frozen_and_agent_objects_projected():
+    tags = {"urgent"}
+    step = ActionStep(
+        step_number=1,
+        timing=Timing(start_time=1.0),
+        observations=[ChatMessage(role=MessageRole.TOOL_RESPONSE, content="found it")],
+        tool_calls=[ChatMessageToolCall(ChatMessageToolCallFunction(name="search", arguments={"q": "x"}), id="c1", type="function")],
+    )
+    log = ConversationLog()
+    append_agent_step(log, step, step_type="action", agent_name="default", agent_role="parent")
+    append_step(log, {"tags": tags})
+    tags.add("later")
+
+    assert log[0].payload["observations"] == ("found it",)
+    assert log[0].payload["tool_calls"] == ({"name": "search", "arguments": {"q": "x"}, "id": "c1"},)
+    assert log[1].payload["tags"] == frozenset({"urgent"})
+
+
+def test_image_observations_keep_their_type_through_the_store(tmp_path):
+    image = Image.new("RGB", (4, 3), (255, 0, 0))
+    log = ConversationLog()
+    append_step(log, {"observations": [image]})
+    assert log[0].payload["observations"][0] is image
+
+    blobs = BlobStore(tmp_path / "blobs")
+    [restored] = decode_record(encode_record(list(log), blobs), blobs)
+    [observation] = restored.payload["observations"]
+    assert isinstance(observation, Image.Image)
+    assert observation.size == (4, 3) and observation.getpixel((0, 0)) == (255, 0, 0)
+
+
+def test_log_benchmark_runs():
+    result = conversation_log_bench.run(turns=5)
+    assert result["frozen_save_bytes"] < result["copying_save_bytes"]
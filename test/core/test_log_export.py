@@ -0,0 +1,84 @@
+import json
+
+from macllm.core import agent_service, config
+from macllm.core.chat_history import Conversation, ConversationHistory
+from macllm.core.config import _from_dict
+from macllm.core.conversation_log import ConversationLog, append_run_end, append_run_start, append_step, message
+from macllm.core.log_export import LogExporter, iter_records, iter_runs, main, summarize
+from macllm.core.persistence import get_export_dir, save_all_conversations
+
+
+def _run(log, latency, tools, status="success"):
+    append_run_start(log, {"query": "q"})
+    for tool in tools:
+        append_step(log, {
+            "step_type": "action",
+            "tool_calls": [{"name": tool, "arguments": {}}],
+            "token_usage": {"input_tokens": 100, "output_tokens": 10},
+        })
+    append_run_end(log, {"status": status, "elapsed_seconds": latency})
+
+
+def test_exports_grow_with_the_log(tmp_path):
+    exporter = LogExporter(tmp_path)
+    log = ConversationLog([message("user", "hi")])
+    assert exporter.export("c1", log) == 1
+    _run(log, 2.0, ["search"])
+    assert exporter.export("c1", log) == 3
+    assert exporter.export("c1", log) == 0
+
+    lines = exporter.path("c1").read_text().splitlines()
+    assert [json.loads(line)["position"] for line in lines] == [0, 1, 2, 3]
+    assert json.loads(lines[2])["payload"]["tool_calls"] == [{"name": "search", "arguments": {}}]
+
+    # A fresh exporter resumes after the complete lines and drops a torn one.
+    with open(exporter.path("c1"), "ab") as f:
+        f.write(b'{"conv_id": "c1", "posi')
+    log.append(message("assistant", "done"))
+    assert LogExporter(tmp_path).export("c1", log) == 1
+    assert len(exporter.path("c1").read_text().splitlines()) == 5
+
+    assert LogExporter(tmp_path).export("c1", ConversationLog([message("user", "new")])) == 1
+    assert len(exporter.path("c1").read_text().splitlines()) == 1
+
+
+def test_run_stats_stream_over_many_files(tmp_path):
+    exporter = LogExporter(tmp_path)
+    for i in range(20):
+        log = ConversationLog()
+        _run(log, float(i), ["search", "read"] if i % 2 else ["search"])
+        append_run_start(log, {"query": "unfinished"})
+        exporter.export(f"c{i}", log)
+    (tmp_path / "c0.ndjson").open("a").write("not json\n")
+
+    runs = list(iter_runs(iter_records([tmp_path])))
+    assert len(runs) == 20
+    assert runs[1].tool_calls == {"search": 1, "read": 1}
+    assert (runs[1].input_tokens, runs[1].output_tokens) == (200, 20)
+
+    summary = summarize(runs)
+    assert (summary.runs, summary.conversations, summary.steps) == (20, 20, 30)
+    assert summary.tool_calls == {"search": 20, "read": 10}
+    assert summary.latency_p50_s == 9.0
+    assert summary.latency_p95_s == 19.0
+    assert summary.statuses == {"success": 20}
+
+
+def test_saves_export_when_enabled(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr("macllm.core.persistence.get_storage_dir", lambda: tmp_path)
+    monkeypatch.setattr(config, "_RUNTIME_CONFIG", _from_dict({"conversations": {"export_logs": True}}))
+    monkeypatch.setattr(agent_service, "create_agent", lambda **kwargs: None)
+    history = ConversationHistory()
+    conv = Conversation()
+    conv._restored_steps = []
+    conv.add_user_message("hello")
+    history.conversations.append(conv)
+
+    assert save_all_conversations(history)
+    conv.add_assistant_message("hi")
+    assert save_all_conversations(history)
+
+    records = list(iter_records([get_export_dir()]))
+    assert [r["payload"]["content"] for r in records] == ["hello", "hi"]
+    assert main(["stats", str(get_export_dir())]) == 0
+    assert "runs: 0" in capsys.readouterr().out
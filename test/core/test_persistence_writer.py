@@ -0,0 +1,85 @@
+import threading
+
+from macllm.core.persistence_writer import PersistenceWriter
+
+
+class RecordingSave:
+    def __init__(self, ok=True):
+        self.calls: list[set[str]] = []
+        self.ok = ok
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, conv_ids):
+        self.release.wait(5)
+        self.calls.append(set(conv_ids))
+        return self.ok
+
+
+def test_requests_within_the_window_are_coalesced():
+    save = RecordingSave()
+    writer = PersistenceWriter(save, coalesce_window=60)
+    try:
+        for conv_id in ("a", "b", "a", None):
+            writer.request(conv_id)
+        assert save.calls == []  # still inside the window
+        assert writer.flush(timeout=5)
+        assert save.calls == [{"a", "b"}]
+        stats = writer.stats()
+        assert stats["requests"] == 4 and stats["saves"] == 1 and stats["coalesced"] == 3
+        assert stats["latency"]["count"] == 1 and stats["write"]["count"] == 1
+    finally:
+        writer.stop()
+
+
+def test_writes_happen_off_the_calling_thread():
+    save = RecordingSave()
+    save.release.clear()
+    writer = PersistenceWriter(save, coalesce_window=0)
+    try:
+        writer.request("a")  # returns while the save is blocked
+        assert save.calls == []
+        save.release.set()
+        assert writer.flush(timeout=5)
+        assert save.calls == [{"a"}]
+    finally:
+        writer.stop()
+
+
+def test_stop_flushes_pending_requests_and_later_requests_write_inline():
+    save = RecordingSave()
+    writer = PersistenceWriter(save, coalesce_window=60)
+    writer.request("a")
+    assert writer.stop(timeout=5)
+    assert save.calls == [{"a"}]
+    writer.request("b")
+    assert save.calls == [{"a"}, {"b"}]
+
+
+def test_failed_saves_are_retried():
+    save = RecordingSave(ok=False)
+    writer = PersistenceWriter(save, coalesce_window=60)
+    try:
+        writer.request("a")
+        writer.request("b")
+        assert not writer.flush(timeout=5)
+        assert writer.stats()["failures"] == 1 and writer.stats()["pending"] == 2
+
+        save.ok = True
+        writer.request("c")
+        assert writer.flush(timeout=5)
+        assert save.calls == [{"a", "b"}, {"a", "b", "c"}]
+        assert writer.stats()["pending"] == 0
+    finally:
+        writer.stop()
+
+
+def test_stop_reports_a_failed_save():
+    save = RecordingSave(ok=False)
+    writer = PersistenceWriter(save, coalesce_window=0)
+    writer.request("a")
+    assert not writer.stop(timeout=5)
+    assert writer.stats()["failures"] >= 1
+    save.ok = True
+    assert writer.flush()  # written inline now that the thread has ended
+    assert save.calls[-1] == {"a"}
@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+from macllm.core.conversation_log import ConversationLog, append_step, message
+from macllm.core.run_activity import RunActivity, merge_activity
+
+
+def test_buffer_is_bounded():
+    activity = RunActivity(capacity=4)
+    for i in range(10):
+        activity.add_tool_call("search", f"call {i}", after=0)
+
+    assert [call["message"] for call in activity.tool_calls()] == [f"call {i}" for i in range(6, 10)]
+
+
+def test_tool_calls_update_pop_and_clear():
+    activity = RunActivity()
+    activity.mark("action_started", "default", after=0)
+    activity.add_tool_call("search_notes", "Using tool: search_notes", after=0)
+    activity.update_last_tool_message('Searching notes for "budget"')
+    assert activity.tool_calls() == [{"tool": "search_notes", "message": 'Searching notes for "budget"'}]
+
+    activity.add_tool_call("read", "second", after=0)
+    activity.pop_last_tool_call()
+    assert len(activity.tool_calls()) == 1
+
+    activity.clear_tool_calls()
+    activity.add_tool_call("read", "after the step", after=1)
+    assert activity.tool_calls() == [{"tool": "read", "message": "after the step"}]
+    assert activity.latest("action_started").payload == "default"
+
+    activity.clear()
+    assert len(activity) == 0
+
+
+def test_unknown_marker_is_rejected():
+    with pytest.raises(ValueError):
+        RunActivity().mark("thinking", "default", after=0)
+
+
+def test_merge_interleaves_by_log_position():
+    log = ConversationLog([message("user", "q")])
+    activity = RunActivity()
+    activity.mark("planning_started", "default", len(log))
+    append_step(log, {"step_type": "planning"})
+    activity.add_tool_call("search", "x", len(log))
+    append_step(log, {"step_type": "action"})
+
+    assert [item.kind for item in merge_activity(log, activity)] == [
+        "message", "planning_started", "step", "tool_call", "step",
+    ]
+    assert [item.kind for item in merge_activity(log, activity, start=2)] == ["tool_call", "step"]
+    assert merge_activity(log, None) == list(log)
+
+
+def test_concurrent_appends_are_not_lost():
+    activity = RunActivity(capacity=10_000)
+
+    def add(worker):
+        for i in range(1000):
+            activity.add_tool_call(f"tool{worker}", str(i), after=0)
+
+    threads = [threading.Thread(target=add, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(activity) == 4000
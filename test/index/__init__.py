@@ -0,0 +1 @@
+# Tests for the note index building blocks
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from macllm.index import ann_bench
+from macllm.index.ann import IVFBackend, make_backend
+from macllm.index.vector_index import Segment, VectorIndex
+
+
+def _docs(vectors, prefix="d"):
+    return [(f"{prefix}{i}", vector, None) for i, vector in enumerate(vectors)]
+
+
+def test_ivf_lists_partition_every_row():
+    vectors = ann_bench.synthetic_corpus(500, 16)
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    segment = Segment(0, tuple(str(i) for i in range(500)), unit)
+    ivf = IVFBackend(lists=10, nprobe=2).build(segment)
+    assert len(ivf.centroids) == 10
+    assert sorted(ivf.order.tolist()) == list(range(500))
+    assert len(ivf.candidates(np.ones(16, dtype=np.float32) / 4, 5)) < 500
+    ivf.nprobe = 10
+    assert ivf.candidates(np.ones(16, dtype=np.float32) / 4, 5).tolist() == list(range(500))
+
+
+def test_recall_benchmark_on_synthetic_corpus():
+    result = ann_bench.run(rows=3000, dim=32, queries=20, k=5, nprobe=16)
+    assert result["recall"] >= 0.8
+    assert result["ann_ms"] > 0 and result["exact_ms"] > 0
+
+
+def test_large_segments_get_an_ann_index_and_respect_deletes(tmp_path):
+    vectors = ann_bench.synthetic_corpus(400, 16)
+    index = VectorIndex(background_compaction=False, ann=IVFBackend(nprobe=64, min_rows=100))
+    index.index(_docs(vectors[:50]))
+    assert index.generation.segments[0].ann is None
+    index.upsert(_docs(vectors[50:], prefix="e"))
+    big = [s for s in index.generation.segments if len(s.ids) >= 100]
+    assert big and all(s.ann is not None for s in big)
+
+    target = big[0].ids[0]
+    query = big[0].unit_vectors(np.array([0]))[0]
+    assert index.search(query, 1)[0][0] == target
+    index.delete([target])
+    assert target not in [doc_id for doc_id, _ in index.search(query, 5)]
+
+    index.save(str(tmp_path))
+    assert list(tmp_path.glob("segment-*.ivf.npz"))
+    restored = VectorIndex(ann=IVFBackend(nprobe=64, min_rows=100))
+    restored.load(str(tmp_path))
+    assert all(s.ann is not None for s in restored.generation.segments if len(s.ids) >= 100)
+    assert restored.search(query, 5) == index.search(query, 5)
+
+
+def test_missing_ann_files_are_rebuilt_after_load(tmp_path):
+    vectors = ann_bench.synthetic_corpus(200, 8)
+    index = VectorIndex(background_compaction=False)
+    index.index(_docs(vectors))
+    index.save(str(tmp_path))
+
+    restored = VectorIndex(background_compaction=False, ann=IVFBackend(min_rows=100))
+    restored.load(str(tmp_path))
+    assert restored.generation.segments[0].ann is not None
+
+
+def test_unknown_backend():
+    assert make_backend("exact") is None
+    with pytest.raises(ValueError):
+        make_backend("lsh")
+
+
+def test_hnsw_backend():
+    pytest.importorskip("faiss")
+    result = ann_bench.run(rows=2000, dim=32, queries=20, k=5, backend="hnsw")
+    assert result["recall"] >= 0.8
@@ -0,0 +1,36 @@
+from macllm.index.chunks import chunk_file, chunk_text, parse_chunk_id, read_passage, split_passages
+
+
+def test_split_passages_respects_headings_and_size():
+    text = "# A\n\nalpha\n\n# B\n\n" + "\n\n".join(["word " * 30] * 10)
+    spans = split_passages(text, max_chars=400, overlap=50)
+    assert spans[0][2] == "A"
+    assert all(heading == "B" for _, _, heading in spans[1:])
+    assert all(end - start <= 400 for start, end, _ in spans)
+    # Consecutive passages overlap.
+    assert spans[2][0] < spans[1][1]
+
+
+def test_chunk_ids_are_stable_and_offsets_are_bytes(tmp_path):
+    note = tmp_path / "note.md"
+    note.write_text("# Café\n\nprémier paragraphe\n\n# Second\n\nsecond body", encoding="utf-8")
+    chunks = chunk_file(str(note), 10_000)
+    assert chunks == chunk_file(str(note), 10_000)
+    assert len(chunks) == 2
+    second = chunks[1]
+    assert read_passage(str(note), second.offset, second.length) == "# Second\n\nsecond body"
+    assert parse_chunk_id(second.chunk_id) == (str(note), second.offset, second.digest)
+    assert second.text.startswith("note.md\nSecond\n")
+
+
+def test_editing_one_section_keeps_other_chunk_ids():
+    before = chunk_text("/n.md", "# One\n\nsame\n\n# Two\n\nold")
+    after = chunk_text("/n.md", "# One\n\nsame\n\n# Two\n\nnew")
+    assert before[0].chunk_id == after[0].chunk_id
+    assert before[1].chunk_id != after[1].chunk_id
+
+
+def test_empty_file_yields_filename_chunk():
+    (chunk,) = chunk_text("/notes/empty.md", "")
+    assert chunk.text == "empty.md"
+    assert parse_chunk_id("/plain/path.md") is None
@@ -0,0 +1,120 @@
+import zipfile
+
+import pytest
+
+from macllm.index.chunks import chunk_text
+from macllm.index.extractors import (
+    ExtractionCache,
+    ExtractorPool,
+    document_type,
+    extensions_for,
+    extract_docx,
+    extract_html,
+    extract_text,
+)
+
+DOCX_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">
+  <w:body>
+    <w:p><w:pPr><w:pStyle w:val="Heading1"/></w:pPr><w:r><w:t>Budget</w:t></w:r></w:p>
+    <w:p><w:r><w:t>Travel is </w:t></w:r><w:r><w:t>capped.</w:t></w:r></w:p>
+    <w:p></w:p>
+    <w:p><w:r><w:t>Second</w:t><w:tab/><w:t>line</w:t></w:r></w:p>
+  </w:body>
+</w:document>
+"""
+
+
+def write_docx(path, xml=DOCX_XML):
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", xml)
+
+
+def test_registry_maps_extensions_to_types():
+    assert document_type("/a/Paper.PDF").name == "pdf"
+    assert document_type("/a/page.htm").name == "html"
+    assert document_type("/a/main.py").extract is None
+    assert document_type("/a/main.py", names=("pdf", "html")) is None
+    assert document_type("/a/note.md") is None
+    assert extensions_for(["docx"]) == (".docx",)
+
+
+def test_html_skips_scripts_and_keeps_headings(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_text(
+        "<html><head><title>T</title><style>p{}</style><script>var x = 1;</script></head>"
+        "<body><h2>Plans</h2><p>Ship &amp; test</p><ul><li>one</li></ul></body></html>"
+    )
+    text = "".join(extract_html(str(page)))
+    assert "var x" not in text and "p{}" not in text
+    assert "## Plans" in text
+    assert "Ship & test" in text
+    assert "- one" in text
+    assert any(chunk.text.splitlines()[1] == "Plans" for chunk in chunk_text(str(page), text))
+
+
+def test_html_is_read_in_blocks(tmp_path):
+    page = tmp_path / "big.html"
+    page.write_text("<p>" + "word " * 40_000 + "</p>")
+    pieces = list(extract_html(str(page)))
+    assert len(pieces) > 1
+
+
+def test_docx_paragraphs_and_headings(tmp_path):
+    doc = tmp_path / "memo.docx"
+    write_docx(doc)
+    text = "".join(extract_docx(str(doc)))
+    assert text == "# Budget\n\nTravel is capped.\n\nSecond\tline\n\n"
+
+
+def test_extract_text_stops_at_byte_cap(tmp_path):
+    page = tmp_path / "big.html"
+    page.write_text("<p>" + "é" * 200_000 + "</p>")
+    text = extract_text(str(page), 1001)
+    assert len(text.encode("utf-8")) <= 1001
+    assert text.endswith("é")
+
+
+def test_extract_text_rejects_native_types(tmp_path):
+    with pytest.raises(ValueError):
+        extract_text(str(tmp_path / "main.py"), 100)
+
+
+def test_cache_reuses_text_for_identical_content(tmp_path):
+    cache = ExtractionCache(tmp_path / "extracted")
+    first, second = tmp_path / "a.html", tmp_path / "b.html"
+    first.write_text("<p>same</p>")
+    second.write_text("<p>same</p>")
+    assert cache.get(str(first)) is None
+    cache.put(str(first), "same")
+    assert cache.get(str(second)) == "same"
+
+    cache.save()
+    reloaded = ExtractionCache(tmp_path / "extracted")
+    assert reloaded.load()
+    assert reloaded.get(str(first)) == "same"
+
+
+def test_cache_misses_after_edit_and_prunes_orphans(tmp_path):
+    cache = ExtractionCache(tmp_path / "extracted")
+    page = tmp_path / "a.html"
+    page.write_text("<p>old</p>")
+    cache.put(str(page), "old")
+    page.write_text("<p>newer</p>")
+    assert cache.get(str(page)) is None
+    cache.put(str(page), "newer")
+
+    cache.prune([str(page)])
+    assert [p.read_text() for p in (tmp_path / "extracted").glob("*.text")] == ["newer"]
+    cache.prune([])
+    assert list((tmp_path / "extracted").glob("*.text")) == []
+
+
+def test_pool_extracts_in_worker_process(tmp_path):
+    doc = tmp_path / "memo.docx"
+    write_docx(doc)
+    pool = ExtractorPool(1, timeout=60)
+    try:
+        assert pool.extract(str(doc), 10_000).startswith("# Budget")
+    finally:
+        pool.close()
@@ -0,0 +1,194 @@
+import os
+from unittest.mock import patch
+
+from macllm.index.journal import ChangeSet, DirectoryJournal
+
+
+def _touch(path, text="x", mtime=None):
+    path.write_text(text)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def _journal(root):
+    journal = DirectoryJournal((".md", ".txt"))
+    journal.set_roots([str(root)])
+    return journal
+
+
+def test_first_scan_reports_all_indexable_files(tmp_path):
+    _touch(tmp_path / "a.md")
+    (tmp_path / "sub").mkdir()
+    _touch(tmp_path / "sub" / "b.txt")
+    _touch(tmp_path / "image.png")
+
+    changes = _journal(tmp_path).scan()
+
+    assert set(changes.added) == {str(tmp_path / "a.md"), str(tmp_path / "sub" / "b.txt")}
+    assert not changes.modified and not changes.removed
+
+
+def test_unchanged_tree_is_not_relisted(tmp_path):
+    _touch(tmp_path / "a.md")
+    (tmp_path / "sub").mkdir()
+    journal = _journal(tmp_path)
+    journal.scan()
+
+    with patch("macllm.index.journal.os.scandir") as scandir:
+        changes = journal.scan()
+
+    assert not changes
+    scandir.assert_not_called()
+
+
+def test_added_and_removed_files_are_detected(tmp_path):
+    _touch(tmp_path / "a.md")
+    journal = _journal(tmp_path)
+    journal.scan()
+
+    os.remove(tmp_path / "a.md")
+    _touch(tmp_path / "b.md")
+    os.utime(tmp_path, (1, 1))  # force a visible directory mtime change
+
+    changes = journal.scan()
+
+    assert set(changes.added) == {str(tmp_path / "b.md")}
+    assert changes.removed == {str(tmp_path / "a.md")}
+
+
+def test_in_place_edit_needs_verify(tmp_path):
+    note = tmp_path / "a.md"
+    _touch(note, mtime=1000)
+    journal = _journal(tmp_path)
+    journal.scan()
+    dir_mtime = os.stat(tmp_path).st_mtime
+
+    _touch(note, "edited", mtime=2000)
+    os.utime(tmp_path, (dir_mtime, dir_mtime))
+
+    assert not journal.scan()
+    changes = journal.scan(verify=True)
+    assert changes.modified == {str(note): 2000}
+
+
+def test_watcher_dirs_rescan_only_that_directory(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    _touch(tmp_path / "a" / "one.md", mtime=1000)
+    _touch(tmp_path / "b" / "two.md", mtime=1000)
+    journal = _journal(tmp_path)
+    journal.scan()
+
+    _touch(tmp_path / "a" / "one.md", "edited", mtime=2000)
+    _touch(tmp_path / "b" / "two.md", "edited", mtime=2000)
+    changes = journal.scan(dirs={str(tmp_path / "a"): False})
+
+    assert set(changes.modified) == {str(tmp_path / "a" / "one.md")}
+
+
+def test_removed_directory_forgets_subtree(tmp_path):
+    sub = tmp_path / "sub" / "deep"
+    sub.mkdir(parents=True)
+    _touch(sub / "a.md")
+    journal = _journal(tmp_path)
+    journal.scan()
+
+    os.remove(sub / "a.md")
+    sub.rmdir()
+    (tmp_path / "sub").rmdir()
+    os.utime(tmp_path, (1, 1))
+
+    changes = journal.scan()
+    assert changes.removed == {str(sub / "a.md")}
+    assert journal.files() == {}
+
+
+def test_dropping_root_removes_its_files(tmp_path):
+    _touch(tmp_path / "a.md")
+    journal = _journal(tmp_path)
+    journal.scan()
+
+    changes = journal.set_roots([])
+
+    assert changes.removed == {str(tmp_path / "a.md")}
+
+
+def test_save_and_load_round_trip(tmp_path):
+    root = tmp_path / "notes"
+    root.mkdir()
+    _touch(root / "a.md")
+    journal = _journal(root)
+    journal.scan()
+    journal.save(tmp_path / "journal.json")
+
+    restored = DirectoryJournal((".md", ".txt"))
+    assert restored.load(tmp_path / "journal.json")
+    assert restored.files() == journal.files()
+    with patch("macllm.index.journal.os.scandir") as scandir:
+        assert not restored.scan()
+    scandir.assert_not_called()
+
+
+def test_load_rejects_corrupt_journal(tmp_path):
+    (tmp_path / "journal.json").write_text("{not json")
+    assert not DirectoryJournal((".md",)).load(tmp_path / "journal.json")
+
+
+def test_changeset_merge_cancels_add_then_remove():
+    changes = ChangeSet(added={"/a.md": 1.0})
+    changes.merge(ChangeSet(removed={"/a.md"}))
+    assert not changes
+
+    changes = ChangeSet(removed={"/b.md"})
+    changes.merge(ChangeSet(added={"/b.md": 2.0}))
+    assert changes.modified == {"/b.md": 2.0}
+
+
+def test_update_paths_records_written_files_without_listing(tmp_path):
+    _touch(tmp_path / "a.md")
+    _touch(tmp_path / "gone.md")
+    journal = _journal(tmp_path)
+    journal.scan()
+    _touch(tmp_path / "a.md", "edited", mtime=1_000_000)
+    _touch(tmp_path / "b.md")
+    _touch(tmp_path / "image.png")
+    os.remove(tmp_path / "gone.md")
+
+    with patch("macllm.index.journal.os.scandir") as scandir:
+        changes = journal.update_paths(
+            [str(tmp_path / name) for name in ("a.md", "b.md", "b.md", "image.png", "gone.md")]
+            + ["/elsewhere/c.md"]
+        )
+
+    scandir.assert_not_called()
+    assert set(changes.added) == {str(tmp_path / "b.md")}
+    assert set(changes.modified) == {str(tmp_path / "a.md")}
+    assert changes.removed == {str(tmp_path / "gone.md")}
+    assert set(journal.files()) == {str(tmp_path / "a.md"), str(tmp_path / "b.md")}
+    # The next scan lists the root once and finds nothing new.
+    assert not journal.scan()
+
+
+def test_update_paths_adds_new_directories_and_copied_trees(tmp_path):
+    journal = _journal(tmp_path)
+    journal.scan()
+    (tmp_path / "new" / "deep").mkdir(parents=True)
+    _touch(tmp_path / "new" / "deep" / "n.md")
+    (tmp_path / "copy").mkdir()
+    _touch(tmp_path / "copy" / "c.md")
+
+    changes = journal.update_paths(
+        [str(tmp_path / "new" / "deep" / "n.md"), str(tmp_path / "copy")]
+    )
+
+    assert set(changes.added) == {
+        str(tmp_path / "new" / "deep" / "n.md"),
+        str(tmp_path / "copy" / "c.md"),
+    }
+    assert not journal.scan()
+
+    os.remove(tmp_path / "new" / "deep" / "n.md")
+    os.rmdir(tmp_path / "new" / "deep")
+    changes = journal.update_paths([str(tmp_path / "new" / "deep")])
+    assert changes.removed == {str(tmp_path / "new" / "deep" / "n.md")}
+    assert set(journal.files()) == {str(tmp_path / "copy" / "c.md")}
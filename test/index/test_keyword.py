@@ -0,0 +1,48 @@
+import threading
+
+from macllm.index.keyword import KeywordIndex, fts_query, reciprocal_rank_fusion
+
+
+def test_exact_tokens_rank_first(tmp_path):
+    index = KeywordIndex(tmp_path / "kw.sqlite")
+    index.index([
+        ("a", "Travel notes: passport number X1234567 renews in May"),
+        ("b", "Travel notes: hotels and trains"),
+        ("c", "Ticket PROJ-4521 blocks the release"),
+    ])
+    assert [doc_id for doc_id, _ in index.search("X1234567")] == ["a"]
+    assert [doc_id for doc_id, _ in index.search("what about PROJ-4521?")][0] == "c"
+    assert index.search("???") == []
+
+
+def test_upsert_and_delete(tmp_path):
+    index = KeywordIndex(tmp_path / "kw.sqlite")
+    index.upsert([("a", "alpha"), ("b", "beta")])
+    index.upsert([("a", "gamma")])
+    index.delete(["b"])
+    assert len(index) == 1
+    assert index.search("alpha") == []
+    assert [doc_id for doc_id, _ in index.search("gamma")] == ["a"]
+
+
+def test_reads_from_other_threads(tmp_path):
+    index = KeywordIndex(tmp_path / "kw.sqlite")
+    index.upsert([("a", "shared text")])
+    results = []
+    thread = threading.Thread(target=lambda: results.extend(index.search("shared")))
+    thread.start()
+    thread.join()
+    assert [doc_id for doc_id, _ in results] == ["a"]
+
+
+def test_fts_query_quotes_tokens():
+    assert fts_query('say "hi" to O\'Brien') == '"say" OR "hi" OR "to" OR "O" OR "Brien"'
+
+
+def test_reciprocal_rank_fusion_weights():
+    vector = [("x", 0.9), ("y", 0.8)]
+    keyword = [("y", 12.0), ("z", 3.0)]
+    fused = reciprocal_rank_fusion([(vector, 1.0), (keyword, 1.0)], k=60)
+    assert [doc_id for doc_id, _ in fused] == ["y", "x", "z"]
+    fused = reciprocal_rank_fusion([(vector, 1.0), (keyword, 0.0)], k=60)
+    assert [doc_id for doc_id, _ in fused][:2] == ["x", "y"]
@@ -0,0 +1,17 @@
+from macllm.index.search_cache import LRUCache, normalize_query
+
+
+def test_normalize_query_collapses_whitespace():
+    assert normalize_query("  machine\tlearning \n notes ") == "machine learning notes"
+
+
+def test_lru_cache_evicts_and_counts():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.stats() == {"entries": 2, "hits": 1, "misses": 1}
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,76 @@
+from macllm.index.journal import ChangeSet
+from macllm.index.trigram import (
+    TIER_PREFIX,
+    TIER_SUBSTRING,
+    TIER_WORD,
+    TrigramIndex,
+    match_tier,
+)
+
+NOW = 1_000_000_000.0
+DAY = 24 * 60 * 60
+
+
+def test_match_tiers():
+    assert match_tier("budget.md", "bud") == TIER_PREFIX
+    assert match_tier("q3 budget.md", "bud") == TIER_WORD
+    assert match_tier("rebudget-budget.md", "bud") == TIER_WORD
+    assert match_tier("rebudget.md", "bud") == TIER_SUBSTRING
+    assert match_tier("notes.md", "bud") is None
+
+
+def test_search_ranks_prefix_then_word_then_substring():
+    index = TrigramIndex()
+    for path in ("/n/rebudget.md", "/n/q3 budget.md", "/n/budget.md", "/n/travel.md"):
+        index.add(path, NOW)
+
+    assert index.search("bud", now=NOW) == [
+        "/n/budget.md",
+        "/n/q3 budget.md",
+        "/n/rebudget.md",
+    ]
+
+
+def test_recency_orders_within_a_tier_only():
+    index = TrigramIndex()
+    index.add("/n/budget-old.md", NOW - 365 * DAY)
+    index.add("/n/budget-new.md", NOW)
+    index.add("/n/rebudget.md", NOW)
+
+    assert index.search("budget", now=NOW) == [
+        "/n/budget-new.md",
+        "/n/budget-old.md",
+        "/n/rebudget.md",
+    ]
+
+
+def test_search_is_case_insensitive_and_bounded():
+    index = TrigramIndex()
+    for i in range(50):
+        index.add(f"/n/Meeting {i}.md", NOW)
+
+    results = index.search("MEET", max_results=5, now=NOW)
+
+    assert len(results) == 5
+
+
+def test_apply_changeset_updates_postings():
+    index = TrigramIndex()
+    index.apply(ChangeSet(added={"/n/alpha.md": NOW, "/n/beta.md": NOW}))
+    index.apply(ChangeSet(added={"/n/gamma.md": NOW}, removed={"/n/alpha.md"}))
+
+    assert index.search("alp", now=NOW) == []
+    assert index.search("gam", now=NOW) == ["/n/gamma.md"]
+    assert len(index) == 2
+
+
+def test_compaction_keeps_live_documents():
+    index = TrigramIndex()
+    index.COMPACT_MIN_DEAD = 2
+    for name in ("a", "b", "c", "d"):
+        index.add(f"/n/note-{name}.md", NOW)
+    index.remove("/n/note-a.md")
+    index.remove("/n/note-b.md")
+
+    assert index._dead == 0
+    assert sorted(index.search("note", now=NOW)) == ["/n/note-c.md", "/n/note-d.md"]
@@ -0,0 +1,74 @@
+import numpy as np
+
+from macllm.index.vector_cache import VectorCache
+
+
+def test_save_and_load_round_trip(tmp_path):
+    cache = VectorCache()
+    cache.put("a", np.array([1.0, 0.0]))
+    cache.put("b", np.array([0.0, 1.0]))
+    cache.save(tmp_path)
+
+    restored = VectorCache()
+    assert restored.load(tmp_path)
+    assert len(restored) == 2
+    np.testing.assert_array_equal(restored.get("b"), [0.0, 1.0])
+    assert restored.get("c") is None
+    assert (restored.hits, restored.misses) == (1, 1)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = VectorCache(max_entries=2)
+    cache.put("a", np.zeros(2))
+    cache.put("b", np.zeros(2))
+    cache.get("a")
+    cache.put("c", np.zeros(2))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+
+def test_saves_append_new_vectors(tmp_path):
+    cache = VectorCache()
+    cache.put("a", np.array([1.0, 0.0]))
+    cache.save(tmp_path)
+    cache.put("b", np.array([0.0, 1.0]))
+    cache.save(tmp_path)
+    assert (tmp_path / "vectors.keys").read_text() == "a\nb\n"
+    assert (tmp_path / "vectors.f16").stat().st_size == 2 * 2 * 2
+
+    restored = VectorCache()
+    assert restored.load(tmp_path)
+    np.testing.assert_array_equal(restored.get("a"), [1.0, 0.0])
+    np.testing.assert_array_equal(restored.get("b"), [0.0, 1.0])
+
+
+def test_garbage_rows_trigger_a_rewrite(tmp_path):
+    cache = VectorCache(max_entries=2)
+    cache.MIN_GARBAGE_ROWS = 1
+    for digest in "abcde":
+        cache.put(digest, np.zeros(2))
+        cache.save(tmp_path)
+    assert len((tmp_path / "vectors.keys").read_text().split()) <= 4
+
+    restored = VectorCache()
+    assert restored.load(tmp_path)
+    assert restored.get("e") is not None and restored.get("a") is None
+
+
+def test_load_ignores_torn_append(tmp_path):
+    cache = VectorCache()
+    cache.put("a", np.array([1.0, 0.0]))
+    cache.save(tmp_path)
+    with open(tmp_path / "vectors.keys", "a") as f:
+        f.write("b\n")
+    restored = VectorCache()
+    assert restored.load(tmp_path)
+    assert len(restored) == 1
+    restored.put("c", np.array([0.0, 1.0]))
+    restored.save(tmp_path)
+
+    again = VectorCache()
+    assert again.load(tmp_path)
+    np.testing.assert_array_equal(again.get("c"), [0.0, 1.0])
+    assert again.get("b") is None
+    assert not VectorCache().load(tmp_path / "missing")
@@ -0,0 +1,175 @@
+import threading
+
+import numpy as np
+
+from macllm.index.vector_index import VectorIndex
+
+
+def _docs(prefix, vectors):
+    return [(f"{prefix}{i}", vector, None) for i, vector in enumerate(vectors)]
+
+
+def test_search_ranks_by_cosine_similarity():
+    index = VectorIndex()
+    index.index([("x", [1.0, 0.0], None), ("y", [0.0, 2.0], None), ("xy", [1.0, 1.0], None)])
+    results = index.search(np.array([3.0, 0.1]), 2)
+    assert [doc_id for doc_id, _ in results] == ["x", "xy"]
+    assert results[0][1] > 0.99
+
+
+def test_published_generation_is_unaffected_by_writes():
+    index = VectorIndex()
+    index.index([("a", [1.0, 0.0], None)])
+    snapshot = index.generation
+
+    index.upsert([("a", [0.0, 1.0], None), ("b", [1.0, 0.0], None)])
+    index.delete(["b"])
+
+    assert snapshot.search(np.array([1.0, 0.0], dtype=np.float32), 5) == [("a", 1.0)]
+    assert index.generation.number > snapshot.number
+    assert [doc_id for doc_id, _ in index.search(np.array([1.0, 0.0]), 5)] == ["a"]
+    assert len(index) == 1
+
+
+def test_segments_are_merged_and_search_matches_brute_force():
+    rng = np.random.default_rng(0)
+    index = VectorIndex(background_compaction=False)
+    index.index(_docs("base", rng.standard_normal((50, 8))))
+    for round_ in range(20):
+        docs = _docs(f"r{round_}-", rng.standard_normal((5, 8)))
+        index.upsert(docs)
+        index.delete([f"base{round_}"])
+    assert len(index.generation.segments) <= VectorIndex.MAX_SEGMENTS
+    assert len(index) == 50 - 20 + 100
+
+    live = {}
+    generation = index.generation
+    for segment, alive in zip(generation.segments, generation.alive):
+        for row, doc_id in enumerate(segment.ids):
+            if alive[row]:
+                live[doc_id] = segment.unit_vectors(np.array([row]))[0]
+    query = rng.standard_normal(8)
+    unit = query / np.linalg.norm(query)
+    expected = sorted(live, key=lambda doc_id: -float(live[doc_id] @ unit))[:5]
+    assert [doc_id for doc_id, _ in index.search(query, 5)] == expected
+
+
+def test_save_writes_only_new_segments(tmp_path):
+    index = VectorIndex(background_compaction=False)
+    index.index([
+        ("a", [1.0, 0.0], None),
+        ("c", [1.0, 1.0], None),
+        ("d", [1.0, -1.0], None),
+        ("e", [-1.0, 0.0], None),
+    ])
+    index.save(str(tmp_path))
+    first = {p.name: p.stat().st_mtime_ns for p in tmp_path.glob("segment-*")}
+    log = (tmp_path / "ids.log").read_text()
+
+    index.upsert([("b", [0.0, 1.0], None)])
+    index.delete(["a"])
+    index.save(str(tmp_path))
+
+    after = {p.name: p.stat().st_mtime_ns for p in tmp_path.glob("segment-*")}
+    assert {name: after[name] for name in first} == first
+    assert len(after) == len(first) + 1
+    assert (tmp_path / "ids.log").read_text().startswith(log)
+
+    restored = VectorIndex()
+    restored.load(str(tmp_path))
+    assert [doc_id for doc_id, _ in restored.search(np.array([0.0, 1.0]), 2)] == ["b", "c"]
+
+
+def test_quantized_storage_keeps_ranking():
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((200, 32))
+    query = rng.standard_normal(32)
+    exact = VectorIndex(dtype="float32")
+    exact.index(_docs("d", vectors))
+    expected = [doc_id for doc_id, _ in exact.search(query, 5)]
+    for dtype in ("float16", "int8"):
+        index = VectorIndex(dtype=dtype)
+        index.index(_docs("d", vectors))
+        assert index.generation.segments[0].vectors.dtype == np.dtype(dtype)
+        results = index.search(query, 5)
+        assert [doc_id for doc_id, _ in results][:3] == expected[:3]
+        assert abs(results[0][1] - exact.search(query, 1)[0][1]) < 0.02
+
+
+def test_load_maps_segments_and_replays_the_id_log(tmp_path):
+    index = VectorIndex(dtype="int8", background_compaction=False)
+    index.index([("a", [1.0, 0.0], None), ("b", [0.0, 1.0], None)])
+    index.save(str(tmp_path))
+    index.upsert([("a", [1.0, 1.0], None)])
+    index.delete(["b"])
+    index.save(str(tmp_path))
+
+    restored = VectorIndex()
+    restored.load(str(tmp_path))
+    assert isinstance(restored.generation.segments[0].vectors, np.memmap)
+    assert len(restored) == 1
+    [(doc_id, score)] = restored.search(np.array([1.0, 1.0]), 5)
+    assert doc_id == "a" and score > 0.99
+
+    # New writes after a load append to the same log.
+    restored.upsert([("c", [0.0, 1.0], None)])
+    restored.save(str(tmp_path))
+    again = VectorIndex()
+    again.load(str(tmp_path))
+    assert sorted(doc_id for doc_id, _ in again.search(np.array([1.0, 1.0]), 5)) == ["a", "c"]
+
+
+def test_torn_log_tail_is_ignored(tmp_path):
+    index = VectorIndex()
+    index.index([("a", [1.0, 0.0], None)])
+    index.save(str(tmp_path))
+    with open(tmp_path / "ids.log", "a") as f:
+        f.write('["D", ["a"')
+    restored = VectorIndex()
+    restored.load(str(tmp_path))
+    assert len(restored) == 1
+
+
+def test_compaction_keeps_writes_made_while_merging(tmp_path):
+    index = VectorIndex(background_compaction=False)
+    index.index(_docs("base", np.eye(4)))
+    for i in range(VectorIndex.MAX_SEGMENTS - 1):
+        index.upsert([(f"n{i}", np.ones(4), None)])
+    snapshot_segments = len(index.generation.segments)
+
+    # Simulate a write landing between the snapshot and the swap.
+    original = index._merge_start
+    injected = []
+    def merge_start(generation):
+        start = original(generation)
+        if start is not None and index._compact_lock.locked() and "base0" not in injected:
+            injected.append("base0")
+            index._upsert([("base0", [0.0, 1.0, 0.0, 0.0], None)], index.generation)
+        return start
+    index._merge_start = merge_start
+    index.upsert([("n-last", np.ones(4), None)])
+
+    assert len(index.generation.segments) < snapshot_segments
+    assert injected
+    assert len(index) == 4 + VectorIndex.MAX_SEGMENTS
+    top = index.search(np.array([0.0, 1.0, 0.0, 0.0]), 2)
+    assert {doc_id for doc_id, _ in top} == {"base0", "base1"}
+    assert index.search(np.array([1.0, 0.0, 0.0, 0.0]), 1)[0][0] != "base0"
+
+    index.save(str(tmp_path))
+    restored = VectorIndex()
+    restored.load(str(tmp_path))
+    assert len(restored) == len(index)
+
+
+def test_background_compaction_merges_segments():
+    index = VectorIndex()
+    index.index(_docs("base", np.eye(4)))
+    for i in range(VectorIndex.MAX_SEGMENTS + 1):
+        index.upsert([(f"n{i}", np.ones(4), None)])
+    for _ in range(200):
+        if len(index.generation.segments) <= VectorIndex.MAX_SEGMENTS and not index._compacting:
+            break
+        threading.Event().wait(0.01)
+    assert len(index.generation.segments) <= VectorIndex.MAX_SEGMENTS
+    assert len(index) == 4 + VectorIndex.MAX_SEGMENTS + 1
@@ -0,0 +1,102 @@
+import threading
+import time
+
+from macllm.index.warmup import WarmupScheduler
+
+
+class Model:
+    def __init__(self):
+        self.loaded = False
+        self.reasons = []
+        self.unloaded = threading.Event()
+        self.warmed = threading.Event()
+
+    def warm(self, reason):
+        self.loaded = True
+        self.reasons.append(reason)
+        self.warmed.set()
+
+    def unload(self):
+        self.loaded = False
+        self.unloaded.set()
+        return True
+
+
+def _scheduler(model, **kwargs):
+    scheduler = WarmupScheduler(model.warm, model.unload, lambda: model.loaded, **kwargs)
+    scheduler.start()
+    return scheduler
+
+
+def test_request_warms_once():
+    model = Model()
+    scheduler = _scheduler(model, launch_delay=0, unload_after=0)
+    try:
+        scheduler.request("@ typed")
+        assert model.warmed.wait(2)
+        scheduler.request("window opened")
+        time.sleep(0.05)
+        assert model.reasons == ["@ typed"]
+    finally:
+        scheduler.stop()
+
+
+def test_warms_after_launch_delay():
+    model = Model()
+    scheduler = _scheduler(model, launch_delay=0.05, unload_after=0)
+    try:
+        assert model.warmed.wait(2)
+        assert model.reasons == ["idle after launch"]
+    finally:
+        scheduler.stop()
+
+
+def test_unloads_after_idle_and_touch_postpones_it():
+    model = Model()
+    scheduler = _scheduler(model, launch_delay=0, unload_after=0.2)
+    try:
+        scheduler.request("window opened")
+        assert model.warmed.wait(2)
+        for _ in range(4):
+            time.sleep(0.08)
+            scheduler.touch()
+        assert not model.unloaded.is_set()
+        assert model.unloaded.wait(2)
+        assert not model.loaded
+    finally:
+        scheduler.stop()
+
+
+def test_model_loaded_by_a_search_is_unloaded():
+    model = Model()
+    scheduler = _scheduler(model, launch_delay=0, unload_after=0.1)
+    try:
+        time.sleep(0.05)  # the thread is idle: nothing loaded, no deadline
+        model.loaded = True  # a search loaded the model itself
+        scheduler.touch()
+        assert model.unloaded.wait(2)
+        assert model.reasons == []
+    finally:
+        scheduler.stop()
+
+
+def test_failed_warm_up_is_logged():
+    logged = []
+
+    def warm(reason):
+        raise RuntimeError("model missing")
+
+    scheduler = WarmupScheduler(
+        warm, lambda: False, lambda: False, launch_delay=0, unload_after=0,
+        log=lambda message, level: logged.append(message),
+    )
+    scheduler.start()
+    try:
+        scheduler.request("@ typed")
+        for _ in range(100):
+            if logged:
+                break
+            time.sleep(0.01)
+        assert logged == ["Note search warm-up failed: model missing"]
+    finally:
+        scheduler.stop()
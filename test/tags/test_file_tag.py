@@ -123,6 +123,35 @@ def test_indexed_autocomplete_inserts_readable_virtual_path(tmp_path, monkeypatc
     assert 'read_file("/notes/test/alpha.md")' in result
 
 
+def test_indexed_autocomplete_prefers_prefix_matches(tmp_path, monkeypatch):
+    (tmp_path / "rebudget.md").write_text("x")
+    (tmp_path / "budget.md").write_text("x")
+    (tmp_path / "travel.md").write_text("x")
+    monkeypatch.setattr(
+        config_mod,
+        "_RUNTIME_CONFIG",
+        MacLLMConfig(
+            filesystem=FilesystemConfig({
+                "notes": FilesystemMountConfig(
+                    "/notes/test",
+                    str(tmp_path),
+                    "read-write",
+                    "read-only",
+                    True,
+                )
+            })
+        ),
+    )
+    tag = FileTag(DummyApp())
+    FileTag.build_index()
+
+    assert tag.autocomplete("@budg") == [
+        '@"/notes/test/budget.md"',
+        '@"/notes/test/rebudget.md"',
+    ]
+    assert tag.autocomplete("@xyz") == []
+
+
 # ------------------------------------------------------------------
 # Path rewrite tests (no payload injection)
 # ------------------------------------------------------------------
@@ -1,12 +1,15 @@
+import hashlib
 import json
 import os
 import time
 import threading
+
+import numpy as np
 import pytest
 from unittest.mock import patch, MagicMock, call
 
 from macllm.core import config as config_mod
-from macllm.core.config import FilesystemConfig, FilesystemMountConfig, MacLLMConfig
+from macllm.core.config import FilesystemConfig, FilesystemMountConfig, IndexConfig, MacLLMConfig
 from macllm.tags.file_tag import FileTag
 
 
@@ -24,6 +27,20 @@ class DummyApp:
         pass
 
 
+class FakeEncoder:
+    """Deterministic stand-in for the embedding model."""
+
+    def __init__(self):
+        self.texts = []
+
+    def batchtransform(self, texts):
+        self.texts.extend(texts)
+        return [
+            np.frombuffer(hashlib.sha256(text.encode()).digest(), dtype=np.uint8)[:8] / 255.0
+            for text in texts
+        ]
+
+
 @pytest.fixture
 def file_tag_with_files(tmp_path, monkeypatch):
     doc1 = tmp_path / "doc1.md"
@@ -49,6 +66,7 @@ def file_tag_with_files(tmp_path, monkeypatch):
         ),
     )
     tag = FileTag(DummyApp())
+    FileTag._encoder = FakeEncoder()
     FileTag.build_index()
 
     with patch.object(FileTag, "_cache_dir", return_value=tmp_path / "no_cache"):
@@ -56,12 +74,19 @@ def file_tag_with_files(tmp_path, monkeypatch):
 
     FileTag._index = []
     FileTag._indexed_directories = []
-    FileTag._embeddings = None
-    FileTag._embedding_ready = threading.Event()
+    FileTag._shards = {}
+    FileTag._encoder = None
     FileTag._reindex_event = threading.Event()
-    FileTag._file_mtimes = {}
     FileTag._filepath_to_idx = {}
-    FileTag._first_build_done = False
+
+
+def shard():
+    """The shard of the fixture's single indexed mount."""
+    return FileTag._shards["test"]
+
+
+def shard_dir():
+    return FileTag._shard_dir(shard())
 
 
 def test_index_populated_from_filesystem_mount(file_tag_with_files):
@@ -75,7 +100,7 @@ def test_index_populated_from_filesystem_mount(file_tag_with_files):
 
 def test_embedding_not_ready_initially(file_tag_with_files):
     tag, _ = file_tag_with_files
-    assert not FileTag._embedding_ready.is_set()
+    assert not shard().embedding_ready.is_set()
 
 
 def test_build_embeddings_sets_ready_flag(file_tag_with_files, tmp_path):
@@ -83,28 +108,27 @@ def test_build_embeddings_sets_ready_flag(file_tag_with_files, tmp_path):
     no_cache = tmp_path / "no_cache"
 
     mock_embeddings = MagicMock()
-    with patch("macllm.tags.file_tag.txtai.Embeddings", return_value=mock_embeddings), \
+    with patch.object(FileTag, "_new_vector_index", return_value=mock_embeddings), \
          patch.object(FileTag, "_cache_dir", return_value=no_cache):
         FileTag._build_embeddings()
 
-    assert FileTag._embedding_ready.is_set()
-    assert FileTag._embeddings is mock_embeddings
+    assert shard().embedding_ready.is_set()
+    assert shard().embeddings is mock_embeddings
     mock_embeddings.index.assert_called_once()
 
 
 def test_start_index_loop_defers_embeddings_until_search(file_tag_with_files):
     tag, _ = file_tag_with_files
 
-    mock_embeddings = MagicMock()
-    with patch("macllm.tags.file_tag.txtai.Embeddings", return_value=mock_embeddings):
+    with patch.object(FileTag, "_new_vector_index") as new_index:
         FileTag.start_index_loop(interval=9999)
         deadline = time.time() + 5.0
         while len(FileTag._index) != 3 and time.time() < deadline:
             time.sleep(0.01)
 
     assert len(FileTag._index) == 3
-    assert not FileTag._embedding_ready.is_set()
-    mock_embeddings.assert_not_called()
+    assert not shard().embedding_ready.is_set()
+    new_index.assert_not_called()
 
 
 def test_search_returns_results(file_tag_with_files):
@@ -115,8 +139,8 @@ def test_search_returns_results(file_tag_with_files):
 
     mock_embeddings = MagicMock()
     mock_embeddings.search.return_value = [(fp0, 0.9), (fp2, 0.7)]
-    FileTag._embeddings = mock_embeddings
-    FileTag._embedding_ready.set()
+    shard().embeddings = mock_embeddings
+    shard().embedding_ready.set()
 
     results = FileTag.search("machine learning")
     assert len(results) == 2
@@ -127,18 +151,265 @@ def test_search_returns_results(file_tag_with_files):
     assert results[0][4] is False  # not truncated (short file)
 
 
+def test_search_returns_best_passage_and_pools_per_file(file_tag_with_files):
+    tag, tmp_path = file_tag_with_files
+    doc1 = tmp_path / "doc1.md"
+    doc1.write_text("# Intro\n\nSomething else.\n\n" + "filler " * 200 + "\n\n# Target\n\nThe passage we want.")
+    FileTag.build_index()
+    with patch.object(FileTag, "_new_vector_index", return_value=MagicMock()):
+        FileTag._build_embeddings()
+    first_id, target_id = shard().file_chunks[str(doc1)][0], shard().file_chunks[str(doc1)][-1]
+    doc2_id = shard().file_chunks[str(tmp_path / "doc2.md")][0]
+
+    shard().embeddings.search.return_value = [
+        (target_id, 0.8), (doc2_id, 0.7), (first_id, 0.2),
+    ]
+    results = FileTag.search("target", engine="vector")
+    assert [r[2] for r in results] == [str(doc1), str(tmp_path / "doc2.md")]
+    assert results[0][1] == 0.8
+    assert results[0][3].startswith("# Target")
+    assert results[0][4] is True
+    assert doc1.read_bytes()[results[0][5]:].startswith(b"# Target")
+
+    results = FileTag.search("target", pooling="mean", engine="vector")
+    assert [r[2] for r in results] == [str(tmp_path / "doc2.md"), str(doc1)]
+    assert results[1][1] == pytest.approx(0.5)
+
+
+def test_hybrid_search_finds_exact_tokens(file_tag_with_files):
+    tag, tmp_path = file_tag_with_files
+    (tmp_path / "ticket.md").write_text("Release blocked by PROJ-4521 until Friday.")
+    FileTag.build_index()
+    FileTag._build_embeddings()
+    ticket = str(tmp_path / "ticket.md")
+
+    keyword = FileTag.search("PROJ-4521", engine="keyword")
+    assert [r[2] for r in keyword] == [ticket]
+
+    # Push the ticket to the bottom of the semantic ranking.
+    shard().embeddings.search = lambda vector, limit: [
+        (doc_id, 1.0 - i / 10)
+        for i, doc_id in enumerate(
+            chunk_id for path in sorted(shard().file_chunks, key=lambda p: p == ticket)
+            for chunk_id in shard().file_chunks[path]
+        )
+    ][:limit]
+    hybrid = FileTag.search("PROJ-4521", n=2, engine="hybrid")
+    assert hybrid[0][2] == ticket
+
+
+def test_keyword_index_follows_changes(file_tag_with_files):
+    tag, tmp_path = file_tag_with_files
+    FileTag._build_embeddings()
+    os.remove(tmp_path / "doc3.txt")
+    time.sleep(0.05)
+    (tmp_path / "doc1.md").write_text("Now about kubernetes clusters.")
+    FileTag.build_index()
+    FileTag._build_embeddings()
+
+    assert FileTag.search("SQL databases", engine="keyword") == []
+    assert [r[2] for r in FileTag.search("kubernetes", engine="keyword")] == [
+        str(tmp_path / "doc1.md")
+    ]
+    assert len(shard().keywords) == sum(len(ids) for ids in shard().file_chunks.values())
+
+
+def test_html_and_docx_notes_are_searchable_from_extracted_text(file_tag_with_files):
+    tag, tmp_path = file_tag_with_files
+    (tmp_path / "page.html").write_text(
+        "<html><script>ignored()</script><body><h1>Offsite</h1><p>Venue is Lisbon.</p></body></html>"
+    )
+    FileTag.build_index()
+    FileTag._build_embeddings()
+
+    hits = FileTag.search("Lisbon", engine="keyword")
+    assert [hit[2] for hit in hits] == [str(tmp_path / "page.html")]
+    preview = hits[0][3]
+    assert "Venue is Lisbon." in preview
+    assert "<p>" not in preview and "ignored" not in preview
+    assert (tmp_path / "no_cache" / "extracted" / "paths.json").exists()
+
+
+def test_unchanged_documents_are_not_extracted_again(file_tag_with_files):
+    tag, tmp_path = file_tag_with_files
+    (tmp_path / "page.html").write_text("<p>Venue is Lisbon.</p>")
+    FileTag.build_index()
+    FileTag._build_embeddings()
+
+    FileTag(DummyApp())
+    FileTag._encoder = FakeEncoder()
+    FileTag.build_index()
+    (shard_dir() / "mtimes.json").unlink()
+    with patch("macllm.tags.file_tag.ExtractorPool") as pool:
+        FileTag._build_embeddings()
+    pool.assert_not_called()
+    assert FileTag.search("Lisbon", engine="keyword")[0][2] == str(tmp_path / "page.html")
+
+
+def test_repeated_searches_reuse_query_vectors_results_and_previews(file_tag_with_files):
+    tag, tmp_path = file_tag_with_files
+    FileTag._build_embeddings()
+    encoded = len(FileTag._encoder.texts)
+
+    first = FileTag.search("machine learning", engine="vector")
+    with patch("macllm.tags.file_tag.read_passage") as read:
+        again = FileTag.search("  machine   learning ", engine="vector")
+    read.assert_not_called()
+    assert again == first
+    assert len(FileTag._encoder.texts) == encoded + 1
+    stats = FileTag.search_cache_stats()
+    assert stats["results"]["hits"] == 1
+    assert stats["previews"]["hits"] == len(first)
+
+
+def test_search_cache_is_invalidated_by_reindex(file_tag_with_files):
+    tag, tmp_path = file_tag_with_files
+    FileTag._build_embeddings()
+    assert FileTag.search("kubernetes", engine="keyword") == []
+
+    time.sleep(0.05)
+    (tmp_path / "doc1.md").write_text("Now about kubernetes clusters.")
+    FileTag.build_index()
+    FileTag._build_embeddings()
+
+    [hit] = FileTag.search("kubernetes", engine="keyword")
+    assert hit[2] == str(tmp_path / "doc1.md")
+    assert "kubernetes" in hit[3]
+
+
+def test_warm_up_loads_index_and_unload_drops_model(file_tag_with_files):
+    tag, _ = file_tag_with_files
+    encoder = FileTag._encoder
+    FileTag._encoder = None
+    with patch.object(FileTag, "_load_embedding_model", return_value=encoder):
+        FileTag.warm_up("@ typed")
+    assert FileTag.is_warm()
+    stats = FileTag.warmup_stats()
+    assert stats["warmups"] == 1 and stats["last_reason"] == "@ typed"
+    assert "model_load_ms" in stats
+
+    FileTag.search("machine learning", engine="vector")
+    assert FileTag.warmup_stats()["warm_search"]["count"] == 1
+
+    assert FileTag.unload_model()
+    assert not FileTag.is_warm()
+    assert FileTag.warmup_stats()["unloads"] == 1
+    with patch.object(FileTag, "_load_embedding_model", return_value=encoder):
+        FileTag.search("web development", engine="vector")
+    assert FileTag.warmup_stats()["cold_search"]["count"] == 1
+
+
+def test_unload_is_skipped_during_a_build(file_tag_with_files):
+    FileTag._build_embeddings()
+    with shard().build_lock:
+        assert not FileTag.unload_model()
+    assert FileTag._encoder is not None
+
+
+def test_missing_keyword_index_forces_rebuild(file_tag_with_files, tmp_path):
+    tag, _ = file_tag_with_files
+    FileTag._build_embeddings()
+    (shard_dir() / "keywords.sqlite").unlink()
+
+    FileTag(DummyApp())
+    FileTag._encoder = FakeEncoder()
+    FileTag.build_index()
+    assert FileTag._load_cache(shard()) is False
+
+
+def test_unchanged_passages_are_not_reembedded(file_tag_with_files):
+    tag, tmp_path = file_tag_with_files
+    doc1 = tmp_path / "doc1.md"
+    doc1.write_text("# One\n\nFirst section.\n\n# Two\n\nSecond section.")
+    FileTag.build_index()
+
+    mock_embeddings = MagicMock()
+    with patch.object(FileTag, "_new_vector_index", return_value=mock_embeddings):
+        FileTag._build_embeddings()
+        mock_embeddings.reset_mock()
+        FileTag._encoder.texts.clear()
+
+        time.sleep(0.05)
+        doc1.write_text("# One\n\nFirst section.\n\n# Two\n\nSecond section, edited.")
+        FileTag.build_index()
+        FileTag._build_embeddings()
+
+    assert len(mock_embeddings.upsert.call_args[0][0]) == 1
+    assert len(mock_embeddings.delete.call_args[0][0]) == 1
+    assert len(FileTag._encoder.texts) == 1
+    assert "edited" in FileTag._encoder.texts[0]
+
+
+def test_moved_and_touched_files_reuse_cached_vectors(file_tag_with_files):
+    tag, tmp_path = file_tag_with_files
+    mock_embeddings = MagicMock()
+    with patch.object(FileTag, "_new_vector_index", return_value=mock_embeddings):
+        FileTag._build_embeddings()
+        mock_embeddings.reset_mock()
+        FileTag._encoder.texts.clear()
+
+        (tmp_path / "archive").mkdir()
+        os.rename(tmp_path / "doc1.md", tmp_path / "archive" / "doc1.md")
+        doc2 = tmp_path / "doc2.md"
+        os.utime(doc2, (time.time() + 10, time.time() + 10))
+        FileTag.build_index()
+        FileTag._build_embeddings()
+
+    assert FileTag._encoder.texts == []
+    upserted = mock_embeddings.upsert.call_args[0][0]
+    assert [doc_id.split("#")[0] for doc_id, _, _ in upserted] == [
+        str(tmp_path / "archive" / "doc1.md")
+    ]
+    assert isinstance(upserted[0][1], np.ndarray)
+
+
+def test_vector_cache_survives_index_rebuild(file_tag_with_files):
+    tag, tmp_path = file_tag_with_files
+    with patch.object(FileTag, "_new_vector_index", return_value=MagicMock()):
+        FileTag._build_embeddings()
+    assert (tmp_path / "no_cache" / "vectors.f16").exists()
+
+    FileTag(DummyApp())
+    FileTag._encoder = FakeEncoder()
+    FileTag.build_index()
+    (shard_dir() / "mtimes.json").unlink()
+    mock_embeddings = MagicMock()
+    with patch.object(FileTag, "_new_vector_index", return_value=mock_embeddings):
+        FileTag._build_embeddings()
+
+    mock_embeddings.index.assert_called_once()
+    assert FileTag._encoder.texts == []
+
+
+def test_search_does_not_block_during_reindex(file_tag_with_files):
+    tag, _ = file_tag_with_files
+    FileTag._build_embeddings()
+    assert shard().build_lock.acquire(timeout=1)
+    try:
+        started = time.monotonic()
+        results = FileTag.search("machine learning", timeout=5.0)
+        assert time.monotonic() - started < 1.0
+    finally:
+        shard().build_lock.release()
+
+    assert len(results) == 3
+    stats = FileTag.search_latency_stats(during_reindex=True)
+    assert stats["count"] == 1
+    assert stats["p99_ms"] >= stats["p50_ms"] > 0
+
+
 def test_search_waits_for_embedding_ready(file_tag_with_files):
     tag, _ = file_tag_with_files
-    FileTag._embedding_ready.clear()
+    shard().embedding_ready.clear()
 
     mock_embeddings = MagicMock()
     mock_embeddings.search.return_value = []
-    FileTag._embeddings = mock_embeddings
+    shard().embeddings = mock_embeddings
 
     def set_ready_after_delay():
         import time
         time.sleep(0.1)
-        FileTag._embedding_ready.set()
+        shard().embedding_ready.set()
 
     threading.Thread(target=set_ready_after_delay, daemon=True).start()
     results = FileTag.search("test", timeout=2.0)
@@ -147,8 +418,8 @@ def test_search_waits_for_embedding_ready(file_tag_with_files):
 
 def test_search_timeout_returns_empty(file_tag_with_files):
     tag, _ = file_tag_with_files
-    FileTag._embedding_ready.clear()
-    FileTag._embeddings = MagicMock()
+    shard().embedding_ready.clear()
+    shard().embeddings = MagicMock()
 
     results = FileTag.search("test", timeout=0.01)
     assert results == []
@@ -211,14 +482,14 @@ def test_first_build_calls_index(file_tag_with_files, tmp_path):
     no_cache = tmp_path / "no_cache"
 
     mock_embeddings = MagicMock()
-    with patch("macllm.tags.file_tag.txtai.Embeddings", return_value=mock_embeddings), \
+    with patch.object(FileTag, "_new_vector_index", return_value=mock_embeddings), \
          patch.object(FileTag, "_cache_dir", return_value=no_cache):
         FileTag._build_embeddings()
 
     mock_embeddings.index.assert_called_once()
     mock_embeddings.upsert.assert_not_called()
-    assert FileTag._first_build_done is True
-    assert len(FileTag._file_mtimes) == 3
+    assert shard().first_build_done is True
+    assert len(shard().file_mtimes) == 3
 
 
 def test_skip_when_nothing_changed(file_tag_with_files):
@@ -226,7 +497,7 @@ def test_skip_when_nothing_changed(file_tag_with_files):
     tag, _ = file_tag_with_files
 
     mock_embeddings = MagicMock()
-    with patch("macllm.tags.file_tag.txtai.Embeddings", return_value=mock_embeddings):
+    with patch.object(FileTag, "_new_vector_index", return_value=mock_embeddings):
         FileTag._build_embeddings()
         mock_embeddings.reset_mock()
         FileTag._build_embeddings()
@@ -241,7 +512,7 @@ def test_upsert_on_changed_file(file_tag_with_files):
     tag, tmp_path = file_tag_with_files
 
     mock_embeddings = MagicMock()
-    with patch("macllm.tags.file_tag.txtai.Embeddings", return_value=mock_embeddings):
+    with patch.object(FileTag, "_new_vector_index", return_value=mock_embeddings):
         FileTag._build_embeddings()
         mock_embeddings.reset_mock()
 
@@ -255,7 +526,9 @@ def test_upsert_on_changed_file(file_tag_with_files):
     mock_embeddings.upsert.assert_called_once()
     upserted_docs = mock_embeddings.upsert.call_args[0][0]
     assert len(upserted_docs) == 1
-    assert upserted_docs[0][0] == str(doc1)
+    assert upserted_docs[0][0].startswith(str(doc1) + "#")
+    mock_embeddings.delete.assert_called_once()
+    assert mock_embeddings.delete.call_args[0][0][0].startswith(str(doc1) + "#")
 
 
 def test_upsert_on_new_file(file_tag_with_files):
@@ -263,7 +536,7 @@ def test_upsert_on_new_file(file_tag_with_files):
     tag, tmp_path = file_tag_with_files
 
     mock_embeddings = MagicMock()
-    with patch("macllm.tags.file_tag.txtai.Embeddings", return_value=mock_embeddings):
+    with patch.object(FileTag, "_new_vector_index", return_value=mock_embeddings):
         FileTag._build_embeddings()
         mock_embeddings.reset_mock()
 
@@ -276,7 +549,7 @@ def test_upsert_on_new_file(file_tag_with_files):
     mock_embeddings.upsert.assert_called_once()
     upserted_docs = mock_embeddings.upsert.call_args[0][0]
     assert len(upserted_docs) == 1
-    assert upserted_docs[0][0] == str(new_file)
+    assert upserted_docs[0][0].startswith(str(new_file) + "#")
 
 
 def test_delete_on_removed_file(file_tag_with_files):
@@ -284,7 +557,7 @@ def test_delete_on_removed_file(file_tag_with_files):
     tag, tmp_path = file_tag_with_files
 
     mock_embeddings = MagicMock()
-    with patch("macllm.tags.file_tag.txtai.Embeddings", return_value=mock_embeddings):
+    with patch.object(FileTag, "_new_vector_index", return_value=mock_embeddings):
         FileTag._build_embeddings()
         mock_embeddings.reset_mock()
 
@@ -297,7 +570,7 @@ def test_delete_on_removed_file(file_tag_with_files):
 
     mock_embeddings.delete.assert_called_once()
     deleted_ids = mock_embeddings.delete.call_args[0][0]
-    assert removed_path in deleted_ids
+    assert [i for i in deleted_ids if i.startswith(removed_path + "#")] == deleted_ids
 
 
 def test_filepath_to_idx_populated(file_tag_with_files):
@@ -308,6 +581,60 @@ def test_filepath_to_idx_populated(file_tag_with_files):
         assert filepath in FileTag._filepath_to_idx
 
 
+def test_build_index_patches_index_incrementally(file_tag_with_files):
+    """New and removed files are patched into the sorted index in place."""
+    tag, tmp_path = file_tag_with_files
+    doc1_id = FileTag._filepath_to_idx[str(tmp_path / "doc1.md")]
+
+    (tmp_path / "zeta.md").write_text("Last alphabetically.")
+    os.remove(tmp_path / "doc2.md")
+    changes = FileTag.refresh_index()
+
+    assert set(changes.added) == {str(tmp_path / "zeta.md")}
+    assert changes.removed == {str(tmp_path / "doc2.md")}
+    assert [name for name, _ in FileTag._index] == ["doc1.md", "doc3.txt", "zeta.md"]
+    assert FileTag._filepath_to_idx[str(tmp_path / "doc1.md")] == doc1_id
+    for idx, (_, filepath) in enumerate(FileTag._index):
+        assert FileTag._filepath_to_idx[filepath] == idx
+
+
+def test_refresh_without_changes_skips_directory_listing(file_tag_with_files):
+    tag, _ = file_tag_with_files
+    index_before = FileTag._index
+
+    with patch("macllm.index.journal.os.scandir") as scandir:
+        changes = FileTag.refresh_index()
+
+    assert not changes
+    scandir.assert_not_called()
+    assert FileTag._index is index_before
+
+
+def test_watch_event_marks_directory_dirty(file_tag_with_files):
+    tag, tmp_path = file_tag_with_files
+    FileTag._reindex_event.clear()
+
+    FileTag._on_watch_event([str(tmp_path)], False)
+
+    assert FileTag._reindex_event.is_set()
+    assert shard().dirty_dirs == {str(tmp_path): False}
+
+
+def test_saved_journal_seeds_index(file_tag_with_files, tmp_path):
+    tag, _ = file_tag_with_files
+    cache_dir = tmp_path / "cache"
+
+    with patch.object(FileTag, "_cache_dir", return_value=cache_dir):
+        FileTag._save_journal(shard())
+        FileTag._index = []
+        FileTag._filepath_to_idx = {}
+        FileTag._shards = {}
+        FileTag._load_journal()
+
+    assert sorted(name for name, _ in FileTag._index) == ["doc1.md", "doc2.md", "doc3.txt"]
+    assert shard().journal.files()
+
+
 # ------------------------------------------------------------------
 # Disk persistence tests
 # ------------------------------------------------------------------
@@ -318,79 +645,84 @@ def test_save_cache_creates_files(file_tag_with_files, tmp_path):
     cache_dir = tmp_path / "cache"
 
     mock_embeddings = MagicMock()
-    with patch("macllm.tags.file_tag.txtai.Embeddings", return_value=mock_embeddings), \
+    with patch.object(FileTag, "_new_vector_index", return_value=mock_embeddings), \
          patch.object(FileTag, "_cache_dir", return_value=cache_dir):
         FileTag._build_embeddings()
 
-    assert (cache_dir / "mtimes.json").exists()
-    with open(cache_dir / "mtimes.json") as f:
+    shard_cache = cache_dir / "shards" / shard().key
+    assert (shard_cache / "mtimes.json").exists()
+    with open(shard_cache / "mtimes.json") as f:
         saved_mtimes = json.load(f)
     assert len(saved_mtimes) == 3
-    mock_embeddings.save.assert_called_once_with(str(cache_dir))
+    mock_embeddings.save.assert_called_once_with(str(shard_cache))
+    assert (cache_dir / "vectors.f16").exists()
 
 
 def test_load_cache_restores_state(file_tag_with_files, tmp_path):
     """_load_cache() should restore _file_mtimes and _embeddings from disk."""
     tag, _ = file_tag_with_files
     cache_dir = tmp_path / "cache"
-    cache_dir.mkdir()
+    shard_cache = cache_dir / "shards" / shard().key
+    shard_cache.mkdir(parents=True)
 
     fake_mtimes = {fp: 1000.0 for _, fp in FileTag._index}
-    with open(cache_dir / "mtimes.json", "w") as f:
+    with open(shard_cache / "mtimes.json", "w") as f:
         json.dump(fake_mtimes, f)
 
     mock_embeddings = MagicMock()
     with patch.object(FileTag, "_cache_dir", return_value=cache_dir), \
-         patch("macllm.tags.file_tag.txtai.Embeddings", return_value=mock_embeddings):
-        result = FileTag._load_cache()
+         patch.object(FileTag, "_new_vector_index", return_value=mock_embeddings):
+        result = FileTag._load_cache(shard())
 
     assert result is True
-    assert FileTag._first_build_done is True
-    assert FileTag._file_mtimes == fake_mtimes
-    assert FileTag._embeddings is mock_embeddings
-    mock_embeddings.load.assert_called_once_with(str(cache_dir))
+    assert shard().first_build_done is True
+    assert shard().file_mtimes == fake_mtimes
+    assert shard().embeddings is mock_embeddings
+    mock_embeddings.load.assert_called_once_with(str(shard_cache))
 
 
 def test_cold_start_with_cache_skips_full_index(file_tag_with_files, tmp_path):
     """When a valid cache exists, first build should use upsert, not index."""
     tag, _ = file_tag_with_files
     cache_dir = tmp_path / "cache"
-    cache_dir.mkdir()
+    shard_cache = cache_dir / "shards" / shard().key
+    shard_cache.mkdir(parents=True)
 
     current_mtimes = {}
     for _, fp in FileTag._index:
         current_mtimes[fp] = os.path.getmtime(fp)
-    with open(cache_dir / "mtimes.json", "w") as f:
+    with open(shard_cache / "mtimes.json", "w") as f:
         json.dump(current_mtimes, f)
 
     mock_embeddings = MagicMock()
     with patch.object(FileTag, "_cache_dir", return_value=cache_dir), \
-         patch("macllm.tags.file_tag.txtai.Embeddings", return_value=mock_embeddings):
+         patch.object(FileTag, "_new_vector_index", return_value=mock_embeddings):
         FileTag._build_embeddings()
 
     mock_embeddings.load.assert_called_once()
     mock_embeddings.index.assert_not_called()
     mock_embeddings.upsert.assert_not_called()
-    assert FileTag._embedding_ready.is_set()
+    assert shard().embedding_ready.is_set()
 
 
 def test_cold_start_with_stale_cache_upserts_changed(file_tag_with_files, tmp_path):
     """Cache with outdated mtimes should trigger upsert for changed files."""
     tag, data_dir = file_tag_with_files
     cache_dir = tmp_path / "cache"
-    cache_dir.mkdir()
+    shard_cache = cache_dir / "shards" / shard().key
+    shard_cache.mkdir(parents=True)
 
     stale_mtimes = {}
     for _, fp in FileTag._index:
         stale_mtimes[fp] = os.path.getmtime(fp)
     doc1_path = str(data_dir / "doc1.md")
     stale_mtimes[doc1_path] = 0.0
-    with open(cache_dir / "mtimes.json", "w") as f:
+    with open(shard_cache / "mtimes.json", "w") as f:
         json.dump(stale_mtimes, f)
 
     mock_embeddings = MagicMock()
     with patch.object(FileTag, "_cache_dir", return_value=cache_dir), \
-         patch("macllm.tags.file_tag.txtai.Embeddings", return_value=mock_embeddings):
+         patch.object(FileTag, "_new_vector_index", return_value=mock_embeddings):
         FileTag._build_embeddings()
 
     mock_embeddings.load.assert_called_once()
@@ -398,25 +730,26 @@ def test_cold_start_with_stale_cache_upserts_changed(file_tag_with_files, tmp_pa
     mock_embeddings.upsert.assert_called_once()
     upserted = mock_embeddings.upsert.call_args[0][0]
     assert len(upserted) == 1
-    assert upserted[0][0] == doc1_path
+    assert upserted[0][0].startswith(doc1_path + "#")
 
 
 def test_corrupted_cache_falls_back_to_full_index(file_tag_with_files, tmp_path):
     """A corrupted cache should be ignored and a full index() should run."""
     tag, _ = file_tag_with_files
     cache_dir = tmp_path / "cache"
-    cache_dir.mkdir()
+    shard_cache = cache_dir / "shards" / shard().key
+    shard_cache.mkdir(parents=True)
 
-    with open(cache_dir / "mtimes.json", "w") as f:
+    with open(shard_cache / "mtimes.json", "w") as f:
         f.write("NOT VALID JSON{{{")
 
     mock_embeddings = MagicMock()
     with patch.object(FileTag, "_cache_dir", return_value=cache_dir), \
-         patch("macllm.tags.file_tag.txtai.Embeddings", return_value=mock_embeddings):
+         patch.object(FileTag, "_new_vector_index", return_value=mock_embeddings):
         FileTag._build_embeddings()
 
     mock_embeddings.index.assert_called_once()
-    assert FileTag._embedding_ready.is_set()
+    assert shard().embedding_ready.is_set()
 
 
 def test_no_cache_on_disk_does_full_index(file_tag_with_files, tmp_path):
@@ -426,8 +759,98 @@ def test_no_cache_on_disk_does_full_index(file_tag_with_files, tmp_path):
 
     mock_embeddings = MagicMock()
     with patch.object(FileTag, "_cache_dir", return_value=cache_dir), \
-         patch("macllm.tags.file_tag.txtai.Embeddings", return_value=mock_embeddings):
+         patch.object(FileTag, "_new_vector_index", return_value=mock_embeddings):
         FileTag._build_embeddings()
 
     mock_embeddings.index.assert_called_once()
-    assert FileTag._first_build_done is True
+    assert shard().first_build_done is True
+
+
+def test_first_build_publishes_each_batch(file_tag_with_files):
+    tag, _ = file_tag_with_files
+    config_mod._RUNTIME_CONFIG.index = IndexConfig(cpu_budget=1.0, batch_size=1)
+    messages = []
+    FileTag._macllm.debug_log = lambda msg, *a, **k: messages.append(msg)
+
+    ready_during_build = []
+    mock_embeddings = MagicMock()
+    mock_embeddings.upsert.side_effect = lambda docs: ready_during_build.append(
+        shard().embedding_ready.is_set()
+    )
+    with patch.object(FileTag, "_new_vector_index", return_value=mock_embeddings):
+        FileTag._build_embeddings()
+
+    mock_embeddings.index.assert_called_once()
+    assert mock_embeddings.upsert.call_count == 2
+    assert ready_during_build == [True, True]
+    assert any("Embedding progress: 3/3 passages (100%)" in m for m in messages)
+    assert len(shard().file_chunks) == 3
+
+
+def test_batches_keep_files_whole():
+    chunks = {
+        "/a.md": ["a1", "a2", "a3"],
+        "/b.md": ["b1"],
+        "/c.md": [],
+        "/d.md": ["d1", "d2"],
+    }
+    batches = list(FileTag._batches(chunks, 2))
+    assert batches == [
+        (["/a.md"], ["a1", "a2", "a3"]),
+        (["/b.md", "/c.md", "/d.md"], ["b1", "d1", "d2"]),
+    ]
+
+
+def test_warm_up_without_indexed_mounts_is_not_repeated(monkeypatch):
+    monkeypatch.setattr(
+        config_mod, "_RUNTIME_CONFIG", MacLLMConfig(index=IndexConfig(warmup_after_launch=0, unload_after=0.3))
+    )
+    FileTag(DummyApp())
+    builds = []
+    monkeypatch.setattr(FileTag, "build_index", classmethod(lambda cls: builds.append(1)))
+    monkeypatch.setattr(FileTag, "_load_embedding_model", classmethod(lambda cls: FakeEncoder()))
+    FileTag.start_warmup_scheduler()
+    try:
+        FileTag.request_warmup("@ typed")
+        for _ in range(200):
+            if FileTag.is_warm():
+                break
+            time.sleep(0.01)
+        assert FileTag.is_warm() and not FileTag._shards
+        FileTag.request_warmup("@ typed")
+        time.sleep(0.05)
+        assert FileTag.warmup_stats()["warmups"] == 1
+        assert builds == [1]
+
+        # Unloading goes by the model, not by the (empty) index.
+        for _ in range(200):
+            if not FileTag.is_model_loaded():
+                break
+            time.sleep(0.01)
+        assert FileTag.warmup_stats()["unloads"] == 1
+        assert not FileTag.is_warm()
+    finally:
+        FileTag._warmup.stop()
+        FileTag._warmup = None
+        FileTag._encoder = None
+
+
+def test_model_loaded_by_a_search_is_unloaded_when_idle(file_tag_with_files, monkeypatch):
+    monkeypatch.setattr(config_mod._RUNTIME_CONFIG, "index", IndexConfig(warmup_after_launch=0, unload_after=0.2))
+    encoder = FileTag._encoder
+    FileTag._encoder = None
+    FileTag.start_warmup_scheduler()
+    try:
+        time.sleep(0.05)
+        with patch.object(FileTag, "_load_embedding_model", return_value=encoder):
+            FileTag.search("machine learning", engine="vector")
+        assert FileTag.is_model_loaded()
+        for _ in range(300):
+            if not FileTag.is_model_loaded():
+                break
+            time.sleep(0.01)
+        assert not FileTag.is_model_loaded()
+        assert FileTag.warmup_stats()["warmups"] == 0 and FileTag.warmup_stats()["unloads"] == 1
+    finally:
+        FileTag._warmup.stop()
+        FileTag._warmup = None
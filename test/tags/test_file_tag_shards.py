@@ -0,0 +1,210 @@
+import hashlib
+import threading
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from macllm.core import config as config_mod
+from macllm.core.config import FilesystemConfig, FilesystemMountConfig, MacLLMConfig
+from macllm.index.shard import IndexShard
+from macllm.tags.file_tag import FileTag
+
+
+class DummyArgs:
+    debug = False
+
+
+class DummyApp:
+    args = DummyArgs()
+
+    def debug_log(self, *args, **kwargs):
+        pass
+
+
+class FakeEncoder:
+    def batchtransform(self, texts):
+        return [
+            np.frombuffer(hashlib.sha256(text.encode()).digest(), dtype=np.uint8)[:8] / 255.0
+            for text in texts
+        ]
+
+
+def mount(path, virtual, **kwargs):
+    return FilesystemMountConfig(virtual, str(path), "read-write", "read-only", True, **kwargs)
+
+
+@pytest.fixture
+def two_mounts(tmp_path, monkeypatch):
+    notes, memory = tmp_path / "notes", tmp_path / "memory"
+    notes.mkdir()
+    memory.mkdir()
+    (notes / "trip.md").write_text("Flights to Lisbon are booked for May.")
+    (memory / "prefs.md").write_text("Prefers aisle seats on Lisbon flights.")
+    monkeypatch.setattr(
+        config_mod,
+        "_RUNTIME_CONFIG",
+        MacLLMConfig(filesystem=FilesystemConfig({
+            "notes": mount(notes, "/notes/personal"),
+            "memory": mount(memory, "/memory", reindex_interval=30),
+        })),
+    )
+    FileTag(DummyApp())
+    FileTag._encoder = FakeEncoder()
+    with patch.object(FileTag, "_cache_dir", return_value=tmp_path / "cache"):
+        FileTag.build_index()
+        yield notes, memory
+    FileTag._shards = {}
+    FileTag._index = []
+    FileTag._filepath_to_idx = {}
+    FileTag._encoder = None
+    FileTag._reindex_event = threading.Event()
+
+
+def test_each_indexed_mount_gets_a_shard(two_mounts, tmp_path):
+    notes, memory = two_mounts
+    assert sorted(FileTag._shards) == ["memory", "notes"]
+    assert FileTag._shards["memory"].reindex_interval == 30
+    assert list(FileTag._shards["notes"].files()) == [str(notes / "trip.md")]
+    FileTag._build_embeddings()
+    shard_dirs = {FileTag._shard_dir(shard) for shard in FileTag._shards.values()}
+    assert len(shard_dirs) == 2
+    assert all((d / "mtimes.json").exists() for d in shard_dirs)
+
+
+def test_search_merges_hits_from_all_shards(two_mounts):
+    notes, memory = two_mounts
+    hits = FileTag.search("Lisbon", engine="keyword")
+    assert sorted(hit[2] for hit in hits) == [str(memory / "prefs.md"), str(notes / "trip.md")]
+    assert all(shard.embeddings is not None for shard in FileTag._shards.values())
+
+
+def test_write_to_one_mount_only_rebuilds_its_shard(two_mounts):
+    notes, memory = two_mounts
+    FileTag._build_embeddings()
+    notes_shard, memory_shard = FileTag._shards["notes"], FileTag._shards["memory"]
+    generations = (notes_shard.generation, memory_shard.generation)
+    for shard in (notes_shard, memory_shard):
+        shard.requested = False
+        shard.next_refresh = time.monotonic() + 3600
+
+    (memory / "new.md").write_text("Allergic to peanuts.")
+    FileTag.request_reindex("memory")
+    assert memory_shard.requested and not notes_shard.requested
+    with patch.object(notes_shard.journal, "scan") as notes_scan:
+        FileTag._refresh_shard(notes_shard, 300)
+        FileTag._refresh_shard(memory_shard, 300)
+
+    notes_scan.assert_not_called()
+    assert notes_shard.generation == generations[0]
+    assert memory_shard.generation > generations[1]
+    assert str(memory / "new.md") in memory_shard.file_mtimes
+    assert memory_shard.next_refresh == pytest.approx(time.monotonic() + 30, abs=5)
+
+
+def test_watch_events_are_routed_to_the_owning_shard(two_mounts):
+    notes, memory = two_mounts
+    FileTag._on_watch_event([str(memory), str(notes / "sub")], True)
+    assert FileTag._shards["memory"].dirty_dirs == {str(memory): True}
+    assert FileTag._shards["notes"].dirty_dirs == {str(notes / "sub"): True}
+
+
+def test_nested_mount_owns_its_files(tmp_path, monkeypatch):
+    outer = tmp_path / "vault"
+    inner = outer / "work"
+    inner.mkdir(parents=True)
+    (outer / "home.md").write_text("home")
+    (inner / "plan.md").write_text("plan")
+    monkeypatch.setattr(
+        config_mod,
+        "_RUNTIME_CONFIG",
+        MacLLMConfig(filesystem=FilesystemConfig({
+            "vault": mount(outer, "/notes/vault"),
+            "work": mount(inner, "/notes/work"),
+        })),
+    )
+    FileTag(DummyApp())
+    try:
+        FileTag.build_index()
+        assert list(FileTag._shards["vault"].files()) == [str(outer / "home.md")]
+        assert list(FileTag._shards["work"].files()) == [str(inner / "plan.md")]
+        assert sorted(name for name, _ in FileTag._index) == ["home.md", "plan.md"]
+    finally:
+        FileTag._shards = {}
+        FileTag._index = []
+        FileTag._filepath_to_idx = {}
+
+
+def test_writes_are_queued_on_the_nested_shard_that_owns_them(tmp_path, monkeypatch):
+    outer = tmp_path / "vault"
+    inner = outer / "work"
+    inner.mkdir(parents=True)
+    monkeypatch.setattr(
+        config_mod,
+        "_RUNTIME_CONFIG",
+        MacLLMConfig(filesystem=FilesystemConfig({
+            "vault": mount(outer, "/notes/vault"),
+            "work": mount(inner, "/notes/work"),
+        })),
+    )
+    FileTag(DummyApp())
+    try:
+        FileTag.build_index()
+        vault, work = FileTag._shards["vault"], FileTag._shards["work"]
+        (inner / "plan.md").write_text("plan")
+        (outer / "home.md").write_text("home")
+        # Written through the outer mount, e.g. /notes/vault/work/plan.md.
+        FileTag.notify_paths_changed([str(inner / "plan.md"), str(outer / "home.md"), str(tmp_path / "x.md")])
+        assert work.pending_paths == {str(inner / "plan.md")}
+        assert vault.pending_paths == {str(outer / "home.md")}
+
+        work.pending_last -= 60
+        work.pending_first -= 60
+        with patch.object(FileTag, "_build_embeddings"):
+            FileTag._refresh_shard(work, 300)
+        assert str(inner / "plan.md") in work.files()
+    finally:
+        FileTag._shards = {}
+        FileTag._index = []
+        FileTag._filepath_to_idx = {}
+
+
+def test_moving_a_mount_starts_a_new_shard(tmp_path):
+    first = IndexShard("notes", str(tmp_path / "a"))
+    assert first.key != IndexShard("notes", str(tmp_path / "b")).key
+    assert IndexShard("my notes/2", "/x").key.startswith("my_notes_2-")
+
+
+def test_tool_writes_are_coalesced_into_one_targeted_update(two_mounts):
+    notes, memory = two_mounts
+    config_mod._RUNTIME_CONFIG.index.write_debounce = 60
+    FileTag._build_embeddings()
+    memory_shard = FileTag._shards["memory"]
+    memory_shard.requested = False
+    memory_shard.next_refresh = time.monotonic() + 3600
+    log = memory / "log.md"
+    for i in range(20):
+        log.write_text(f"entry {i}\n" * (i + 1))
+        FileTag.notify_paths_changed([str(log)])
+    assert memory_shard.pending_paths == {str(log)}
+
+    with patch.object(FileTag, "_build_embeddings") as build:
+        FileTag._refresh_shard(memory_shard, 300)
+    build.assert_not_called()  # still inside the debounce window
+
+    memory_shard.pending_last -= 60
+    with patch.object(memory_shard.journal, "scan") as scan:
+        FileTag._refresh_shard(memory_shard, 300)
+    scan.assert_not_called()
+    assert not memory_shard.pending_paths
+    assert str(log) in memory_shard.file_mtimes
+    assert any(path == str(log) for _, path in FileTag._index)
+
+
+def test_long_write_bursts_are_applied_after_the_max_delay(two_mounts):
+    notes, memory = two_mounts
+    memory_shard = FileTag._shards["memory"]
+    FileTag.notify_paths_changed([str(memory / "a.md")])
+    memory_shard.pending_first -= FileTag.WRITE_MAX_DELAY
+    assert FileTag._pending_due(memory_shard) <= time.monotonic()
@@ -5,6 +5,7 @@ from unittest.mock import MagicMock
 
 from macllm.core import config as config_mod
 from macllm.core.config import FilesystemConfig, FilesystemMountConfig, MacLLMConfig
+from macllm.index.shard import IndexShard
 from macllm.tags.file_tag import FileTag
 
 MOUNT_VIRTUAL = "/notes/Notes"
@@ -25,6 +26,11 @@ class DummyApp:
         pass
 
 
+def note_shard() -> IndexShard:
+    """The shard of the ``file_env`` mount."""
+    return FileTag._shards["Notes"]
+
+
 @pytest.fixture
 def file_env(tmp_path):
     """Set up FileTag with an indexed directory containing sample files.
@@ -54,8 +60,11 @@ def file_env(tmp_path):
         })
     )
     FileTag._macllm = dummy
+    FileTag._encoder = MagicMock()
+    FileTag._encoder.batchtransform.return_value = [[0.0]]
     MacLLM._instance = dummy
     FileTag._indexed_directories = [str(tmp_path)]
+    FileTag._shards = {"Notes": IndexShard("Notes", str(tmp_path))}
     FileTag._index = [
         ("alpha.md", str(tmp_path / "alpha.md")),
         ("beta.txt", str(tmp_path / "beta.txt")),
@@ -72,6 +81,8 @@ def file_env(tmp_path):
     config_mod._RUNTIME_CONFIG = previous_config
     FileTag._index = []
     FileTag._indexed_directories = []
+    FileTag._shards = {}
     FileTag._filepath_to_idx = {}
+    FileTag._encoder = None
     FileTag._macllm = None
     MacLLM._instance = None
@@ -1,4 +1,5 @@
 from types import SimpleNamespace
+from unittest.mock import call, patch
 
 import pytest
 
@@ -116,6 +117,17 @@ def test_parent_can_write_memory_and_granted_host(filesystem_env):
     assert host.joinpath("artifact.md").read_text() == "artifact"
 
 
+def test_writes_queue_changed_paths_for_indexed_mounts_only(filesystem_env):
+    from macllm.tools import filesystem as fs
+
+    _, notes, *_ = filesystem_env
+    with patch.object(FileTag, "notify_paths_changed") as notify:
+        fs.append_file.forward("/notes/Notes/log.md", "one")
+        fs.append_file.forward("/notes/Notes/log.md", "two")
+        fs.write_file.forward("/memory/fact.md", "fact")
+    assert notify.call_args_list == [call([str(notes / "log.md")])] * 2
+
+
 def test_copy_from_notes_to_subagent_home(filesystem_env):
     from macllm.tools import filesystem as fs
 
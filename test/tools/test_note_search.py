@@ -8,15 +8,15 @@ from macllm.tags.file_tag import FileTag
 from macllm.tools.filesystem import read_file
 from macllm.tools.note import search_notes
 
-from .conftest import MOUNT_VIRTUAL
+from .conftest import MOUNT_VIRTUAL, note_shard
 
 
 class TestSearchNotes:
     def test_returns_virtual_paths_and_scores(self, file_env):
         mock_emb = MagicMock()
         mock_emb.search.return_value = [(0, 0.95), (1, 0.80)]
-        FileTag._embeddings = mock_emb
-        FileTag._embedding_ready.set()
+        note_shard().embeddings = mock_emb
+        note_shard().embedding_ready.set()
 
         result = search_notes("travel")
 
@@ -26,20 +26,37 @@ class TestSearchNotes:
         assert "Score: 0.800" in result
         assert "Alpha content" in result
 
-        FileTag._embeddings = None
-        FileTag._embedding_ready.clear()
+        note_shard().embeddings = None
+        note_shard().embedding_ready.clear()
+
+    def test_engine_is_passed_through(self, file_env, monkeypatch):
+        calls = []
+        monkeypatch.setattr(FileTag, "search", lambda query, **kw: calls.append(kw) or [])
+        search_notes("PROJ-4521", engine="keyword")
+        assert calls == [{"engine": "keyword"}]
+        assert search_notes("x") == "No matching notes found"
+        assert calls[-1] == {"engine": None}
+
+    def test_unknown_engine_is_reported(self, file_env):
+        note_shard().embeddings = MagicMock()
+        note_shard().embedding_ready.set()
+        try:
+            assert search_notes("x", engine="fuzzy").startswith("Error: Unknown search engine")
+        finally:
+            note_shard().embeddings = None
+            note_shard().embedding_ready.clear()
 
     def test_no_results(self, file_env):
         mock_emb = MagicMock()
         mock_emb.search.return_value = []
-        FileTag._embeddings = mock_emb
-        FileTag._embedding_ready.set()
+        note_shard().embeddings = mock_emb
+        note_shard().embedding_ready.set()
 
         result = search_notes("nonexistent")
         assert "No matching notes found" in result
 
-        FileTag._embeddings = None
-        FileTag._embedding_ready.clear()
+        note_shard().embeddings = None
+        note_shard().embedding_ready.clear()
 
     def test_truncated_indicator(self, file_env):
         long_file = file_env / "long.md"
@@ -49,26 +66,26 @@ class TestSearchNotes:
 
         mock_emb = MagicMock()
         mock_emb.search.return_value = [(str(long_file), 0.9)]
-        FileTag._embeddings = mock_emb
-        FileTag._embedding_ready.set()
+        note_shard().embeddings = mock_emb
+        note_shard().embedding_ready.set()
 
         result = search_notes("test")
         assert "(truncated)" in result
 
-        FileTag._embeddings = None
-        FileTag._embedding_ready.clear()
+        note_shard().embeddings = None
+        note_shard().embedding_ready.clear()
 
     def test_no_file_ids_in_output(self, file_env):
         mock_emb = MagicMock()
         mock_emb.search.return_value = [(0, 0.95)]
-        FileTag._embeddings = mock_emb
-        FileTag._embedding_ready.set()
+        note_shard().embeddings = mock_emb
+        note_shard().embedding_ready.set()
 
         result = search_notes("travel")
         assert "[File ID:" not in result
 
-        FileTag._embeddings = None
-        FileTag._embedding_ready.clear()
+        note_shard().embeddings = None
+        note_shard().embedding_ready.clear()
 
     def test_search_path_can_be_read_directly(self, file_env):
         conversation = Conversation()
@@ -0,0 +1,115 @@
+import importlib
+
+import pytest
+
+from macllm.core.chat_history import Conversation
+from macllm.core.config import ToolCacheConfig, _from_dict
+from macllm.core.context import set_current_conversation
+from macllm.core.tool_cache import CachePolicy, ToolCache, configure_tool_cache
+from macllm.tools._debug import macllm_tool
+from macllm.tools.web_search import web_fetch
+
+calls = []
+
+
+@macllm_tool(cache=CachePolicy("notes", ttl=60))
+def read_note(name: str, limit: int = 10) -> str:
+    """
+    Read a note.
+
+    Args:
+        name: Note name.
+        limit: Maximum lines.
+    """
+    calls.append(name)
+    return "Error: missing" if name == "missing" else f"{name} ({limit} lines)"
+
+
+@macllm_tool(invalidates=("notes",))
+def write_note(name: str) -> str:
+    """
+    Write a note.
+
+    Args:
+        name: Note name.
+    """
+    return f"wrote {name}"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    calls.clear()
+    cache = ToolCache(tmp_path / "tool_cache.sqlite")
+    configure_tool_cache(cache)
+    yield cache
+    configure_tool_cache(None)
+
+
+def test_read_tools_reuse_results_until_a_write_invalidates(cache):
+    assert read_note("a") == "a (10 lines)"
+    assert read_note(name="a", limit=10) == "a (10 lines)"
+    assert read_note("a", limit=5) == "a (5 lines)"
+    assert calls == ["a", "a"]
+
+    write_note("a")
+    read_note("a")
+    read_note("missing")
+    read_note("missing")
+    assert calls == ["a", "a", "a", "missing", "missing"]  # errors are never cached
+
+    stats = cache.stats()
+    assert (stats["read_note"].hits, stats["read_note"].misses) == (1, 5)
+    assert stats["write_note"].invalidations == 2
+
+
+def test_without_a_cache_tools_always_run():
+    calls.clear()
+    read_note("a")
+    read_note("a")
+    assert calls == ["a", "a"]
+
+
+def test_expiry_and_size_cap(tmp_path):
+    cache = ToolCache(tmp_path / "c.sqlite", max_bytes=250)
+    for i in range(3):
+        cache.put("t", "ns", f"k{i}", "x" * 100, ttl=60, now=1000.0 + i)
+    assert cache.get("t", "k0", now=1010.0) is None  # evicted, least recently used
+    assert cache.get("t", "k2", now=1010.0) == "x" * 100
+    assert cache.usage() == (2, 200)
+    assert cache.get("t", "k1", now=2000.0) is None  # expired
+
+    overridden = ToolCache(tmp_path / "c.sqlite", ttl={"t": 0})
+    assert overridden.ttl_for("t", CachePolicy("ns", ttl=60)) == 0
+    assert overridden.ttl_for("u", CachePolicy("ns", ttl=60)) == 60
+
+
+def test_cached_web_fetch_still_records_its_source(cache, monkeypatch):
+    ws_module = importlib.import_module("macllm.tools.web_search")
+    fetched = []
+
+    class Response:
+        text = "<html><body><p>page</p></body></html>"
+
+        def raise_for_status(self):
+            pass
+
+    monkeypatch.setattr(ws_module.requests, "get", lambda url, **kwargs: fetched.append(url) or Response())
+    url = "https://example.com/page"
+    first, second = Conversation(), Conversation()
+    try:
+        set_current_conversation(first)
+        assert web_fetch(url) == "page"
+        set_current_conversation(second)
+        assert web_fetch(url) == "page"
+    finally:
+        set_current_conversation(None)
+
+    assert fetched == [url]
+    assert second.sources == [{"kind": "web", "ref": url}]
+    assert second.run_activity.tool_calls() == [{"tool": "web_fetch", "message": "Using tool: web_fetch (cached)"}]
+
+
+def test_tool_cache_config():
+    assert _from_dict({}).tool_cache == ToolCacheConfig()
+    config = _from_dict({"tool_cache": {"max_mb": -1, "ttl": {"web_fetch": 10}}})
+    assert config.tool_cache == ToolCacheConfig(max_mb=0.0, ttl={"web_fetch": 10.0})
@@ -1,10 +1,9 @@
 from macllm.core.conversation_log import (
     ConversationLog,
-    add_tool_call,
-    append_activity_marker,
     append_run_start,
     append_step,
 )
+from macllm.core.run_activity import RunActivity
 from macllm.ui.agent_activity import extract_update, project_activity, without_update
 
 
@@ -28,36 +27,36 @@ def test_extract_update_is_independent_of_plan_item():
 
 
 def test_parent_planning_update_is_ephemeral_then_persistent():
-    log = ConversationLog()
+    log, activity = ConversationLog(), RunActivity()
     append_run_start(log, {})
-    append_activity_marker(log, "planning_started", "default")
-    assert project_activity(log, "default") == ([], ("planning", None))
+    activity.mark("planning_started", "default", len(log))
+    assert project_activity(log, "default", activity) == ([], ("planning", None))
 
     _planning(log, "Searching for Sam's last name")
-    assert project_activity(log, "default") == (
+    assert project_activity(log, "default", activity) == (
         [],
         ("update", "Searching for Sam's last name"),
     )
 
-    append_activity_marker(log, "action_started", "default")
-    assert project_activity(log, "default") == (
+    activity.mark("action_started", "default", len(log))
+    assert project_activity(log, "default", activity) == (
         ["Searching for Sam's last name"],
         None,
     )
 
-    add_tool_call(log, "web_search", "Searching the web")
-    assert project_activity(log, "default") == (
+    activity.add_tool_call("web_search", "Searching the web", len(log))
+    assert project_activity(log, "default", activity) == (
         ["Searching for Sam's last name"],
         ("tool", {"tool": "web_search", "message": "Searching the web"}),
     )
 
 
 def test_subagent_activity_never_promotes_an_update():
-    log = ConversationLog()
+    log, activity = ConversationLog(), RunActivity()
     append_run_start(log, {})
-    append_activity_marker(log, "planning_started", "default")
+    activity.mark("planning_started", "default", len(log))
     _planning(log, "Reading the latest email")
-    append_activity_marker(log, "action_started", "default")
+    activity.mark("action_started", "default", len(log))
     append_step(log, {
         "agent_name": "email",
         "agent_role": "subagent",
@@ -65,15 +64,15 @@ def test_subagent_activity_never_promotes_an_update():
         "task": "Read the latest email",
         "observations": None,
     })
-    append_activity_marker(log, "action_started", "email")
+    activity.mark("action_started", "email", len(log))
 
-    assert project_activity(log, "default") == (
+    assert project_activity(log, "default", activity) == (
         ["Reading the latest email"],
         ("subagent", "email"),
     )
 
-    add_tool_call(log, "search_email", "Searching email")
-    assert project_activity(log, "default") == (
+    activity.add_tool_call("search_email", "Searching email", len(log))
+    assert project_activity(log, "default", activity) == (
         ["Reading the latest email"],
         ("tool", {"tool": "search_email", "message": "Searching email"}),
     )
@@ -84,4 +83,4 @@ def test_subagent_activity_never_promotes_an_update():
         "step_type": "action",
         "observations": "email report",
     })
-    assert project_activity(log, "default") == (["Reading the latest email"], None)
+    assert project_activity(log, "default", activity) == (["Reading the latest email"], None)
@@ -1,12 +1,11 @@
 from macllm.core.chat_history import Conversation
 from macllm.core.conversation_log import (
-    append_activity_marker,
     append_plan,
     append_run_start,
     append_step,
     message,
 )
-from macllm.ui.debug_window import extract_cards
+from macllm.ui.debug_window import extract_cards, note_index_card, persistence_card
 
 
 def test_step_card_body_hides_runtime_metadata():
@@ -54,8 +53,8 @@ def test_step_card_body_hides_runtime_metadata():
 
 def test_activity_markers_are_not_debug_cards():
     conv = Conversation()
-    append_activity_marker(conv.conversation_log, "planning_started", "default")
-    append_activity_marker(conv.conversation_log, "action_started", "default")
+    conv.add_activity_marker("planning_started", "default")
+    conv.add_activity_marker("action_started", "default")
 
     assert extract_cards(conv) == []
 
@@ -123,3 +122,40 @@ def test_extract_cards_dedupes_each_request_independently():
     assert "Expanded request:\nsecond question with context" in cards[3].body
     assert cards[2].body == "first answer"
     assert cards[5].body == "second answer"
+
+
+def test_note_index_card_shows_warm_and_cold_timings():
+    card = note_index_card({
+        "model_loaded": True,
+        "index_loaded": True,
+        "warmups": 1,
+        "unloads": 0,
+        "last_warmup_ms": 1520.0,
+        "last_reason": "@ typed",
+        "model_load_ms": 900.0,
+        "cold_search": {"count": 1, "p50_ms": 2100.0, "p99_ms": 2100.0},
+        "warm_search": {"count": 0, "p50_ms": 0.0, "p99_ms": 0.0},
+    })
+
+    assert card.title == "Note Search: warm"
+    assert "Last warm-up: 1520 ms (@ typed)" in card.body
+    assert "Model load: 900 ms" in card.body
+    assert "Cold searches: 1, p50 2100 ms" in card.body
+    assert "Warm searches" not in card.body
+
+
+def test_persistence_card_shows_coalescing_and_latency():
+    card = persistence_card({
+        "requests": 12,
+        "saves": 3,
+        "coalesced": 9,
+        "failures": 0,
+        "pending": 1,
+        "latency": {"count": 3, "p50_ms": 510.0, "p99_ms": 640.0},
+        "write": {"count": 3, "p50_ms": 4.0, "p99_ms": 9.0},
+    })
+
+    assert card.title == "Persistence"
+    assert "writes: 3 (9 coalesced)" in card.body
+    assert "Pending conversations: 1" in card.body
+    assert "Request to disk: p50 510 ms, p99 640 ms" in card.body